@@ -0,0 +1,198 @@
+"""
+요청 수락 제어 (admission control)
+
+요청을 경로에 따라 등급으로 나누고 등급별 동시 처리 수를 제한합니다.
+- checkin: 출석 체크. 가장 중요하며 DB 연결도 우선 배정받습니다 (database.connection_priority).
+- heavy: 엑셀 내보내기/업로드처럼 오래 걸리는 요청. 몇 개만 동시에 처리합니다.
+- read / write: 그 밖의 조회 / 변경 요청.
+
+한도를 넘은 요청은 등급별 대기열에서 기다리고, 대기열이 가득 찼거나 대기 시간이 지나면
+503 과 Retry-After 를 돌려줍니다. 내보내기가 몰려도 풀 연결을 다 차지하지 못하므로
+출석 체크가 밀리지 않습니다.
+
+한도는 워커 프로세스마다 적용됩니다.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+
+from database import connection_priority
+
+RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER", "2"))
+
+# 등급: (동시 처리 한도, 대기열 길이, 최대 대기 초)
+CLASS_LIMITS = {
+    "checkin": (int(os.getenv("ADMISSION_CHECKIN_LIMIT", "8")), int(os.getenv("ADMISSION_CHECKIN_QUEUE", "200")),
+                float(os.getenv("ADMISSION_CHECKIN_WAIT", "10"))),
+    "read": (int(os.getenv("ADMISSION_READ_LIMIT", "10")), int(os.getenv("ADMISSION_READ_QUEUE", "100")),
+             float(os.getenv("ADMISSION_READ_WAIT", "5"))),
+    "write": (int(os.getenv("ADMISSION_WRITE_LIMIT", "6")), int(os.getenv("ADMISSION_WRITE_QUEUE", "50")),
+              float(os.getenv("ADMISSION_WRITE_WAIT", "5"))),
+    "heavy": (int(os.getenv("ADMISSION_HEAVY_LIMIT", "2")), int(os.getenv("ADMISSION_HEAVY_QUEUE", "10")),
+              float(os.getenv("ADMISSION_HEAVY_WAIT", "15"))),
+}
+
+# (메서드, 경로) 규칙. 경로는 끝의 '/' 를 뺀 값과 비교하며, '*' 로 끝나면 접두사 일치입니다.
+CHECKIN_ROUTES = [
+    ("POST", "/api/attendance"),
+    ("POST", "/api/attendance/kiosk"),
+]
+HEAVY_ROUTES = [
+    ("GET", "/api/users/export"),
+    ("POST", "/api/upload/*"),
+    ("POST", "/api/analytics/refresh"),
+    ("POST", "/api/automations/run"),
+]
+# 수락 제어를 거치지 않는 경로 (상태 확인, 지표)
+EXEMPT_PATHS = {"/api/health", "/api/metrics/admission", "/api/metrics/singleflight"}
+
+
+def route_matches(rules, method, path):
+    for rule_method, rule_path in rules:
+        if rule_method != method:
+            continue
+        if rule_path.endswith("*") and path.startswith(rule_path[:-1]):
+            return True
+        if path == rule_path:
+            return True
+    return False
+
+
+def classify(method, path):
+    """요청의 등급을 돌려줍니다. 수락 제어 대상이 아니면 None."""
+    path = path.rstrip("/") or "/"
+    if not path.startswith("/api/") or path in EXEMPT_PATHS or method == "OPTIONS":
+        return None
+    if route_matches(CHECKIN_ROUTES, method, path):
+        return "checkin"
+    if route_matches(HEAVY_ROUTES, method, path):
+        return "heavy"
+    return "read" if method in ("GET", "HEAD") else "write"
+
+
+class Limiter:
+    """동시 처리 한도 + 길이가 정해진 FIFO 대기열"""
+
+    def __init__(self, limit, queue_size, timeout):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self._waiters = deque()
+        # 지표
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.max_waiting = 0
+        self.queued = 0
+        self.total_wait = 0.0
+
+    @property
+    def waiting(self):
+        return len(self._waiters)
+
+    async def acquire(self):
+        """자리를 얻으면 True, 대기열이 가득 찼거나 시간이 지나면 False"""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.queue_size:
+            self.rejected += 1
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.queued += 1
+        self.max_waiting = max(self.max_waiting, len(self._waiters))
+        started = time.perf_counter()
+        try:
+            # release() 가 자리를 넘겨주면서 future 를 완료합니다 (active 는 이미 증가된 상태).
+            await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            # 시간 초과와 같은 순간에 release() 가 자리를 넘겨줬다면 (active 는 이미 증가) 그 자리를 씁니다.
+            # 그냥 False 를 돌려주면 넘겨받은 자리가 영영 반납되지 않습니다.
+            if not (future.done() and not future.cancelled()):
+                self.timed_out += 1
+                return False
+        except asyncio.CancelledError:
+            # 자리를 넘겨받은 직후 취소되었다면 다음 대기자에게 돌려줍니다.
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            if future in self._waiters:
+                self._waiters.remove(future)
+            self.total_wait += time.perf_counter() - started
+        self.admitted += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                self.active += 1
+                future.set_result(True)
+                return
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "queueSize": self.queue_size,
+            "maxWaiting": self.max_waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timedOut": self.timed_out,
+            "queued": self.queued,
+            "avgQueueWaitMs": round(self.total_wait / self.queued * 1000, 2) if self.queued else 0,
+        }
+
+
+limiters = {name: Limiter(*limits) for name, limits in CLASS_LIMITS.items()}
+
+
+async def send_overloaded(send, retry_after=RETRY_AFTER_SECONDS):
+    body = json.dumps({"detail": "요청이 많아 잠시 후 다시 시도해 주세요."}, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"retry-after", str(retry_after).encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        route_class = classify(scope["method"], scope["path"])
+        if route_class is None:
+            return await self.app(scope, receive, send)
+
+        limiter = limiters[route_class]
+        if not await limiter.acquire():
+            return await send_overloaded(send)
+
+        # 출석 체크는 DB 연결 대기열에서도 다른 요청보다 먼저 연결을 받습니다.
+        token = connection_priority.set("high" if route_class == "checkin" else "normal")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            connection_priority.reset(token)
+            limiter.release()
+
+
+def metrics():
+    return {name: limiter.stats() for name, limiter in limiters.items()}
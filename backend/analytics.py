@@ -0,0 +1,362 @@
+"""
+회원 유지율 / 이탈 분석 엔진
+
+users·attendance (보관 테이블 포함)를 열(column) 배열로 가져와 NumPy 로 한꺼번에 계산합니다.
+
+- 회원: 한 번의 조회로 id, 상품, 시작일, 종료일, 잔여 횟수를 배열로 받습니다 (회원 수만큼).
+- 출석: COPY (SELECT 회원 번호, 날짜) TO STDOUT (FORMAT binary) 한 번으로 스트리밍하고,
+  ANALYTICS_CHUNK_ROWS 행씩 np.frombuffer 로 바로 정수 배열로 바꿔 집계한 뒤 버립니다.
+  행 단위 Python 객체를 만들지 않으므로 1억 행도 메모리에 올리지 않고 처리합니다.
+
+메모리 사용량은 대략 회원 수 × ANALYTICS_WEEKS × 4 바이트(주별 출석 행렬)
++ 청크 크기 × 18 바이트 + 청크당 bincount 임시 배열(회원 수 × 주 수 × 8 바이트) 입니다.
+10만 명 × 52주 기준 100MB 안팎입니다.
+
+계산 결과(Snapshot)는 ANALYTICS_CACHE_SECONDS 동안 재사용하며, 야간 작업이 미리 만들어 둡니다.
+"""
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import psycopg2.extras
+
+from cache import TTLCache
+from database import db
+
+ANALYTICS_WEEKS = int(os.getenv("ANALYTICS_WEEKS", "52"))
+ANALYTICS_CHUNK_ROWS = int(os.getenv("ANALYTICS_CHUNK_ROWS", "1000000"))
+ANALYTICS_CACHE_SECONDS = float(os.getenv("ANALYTICS_CACHE_SECONDS", "900"))
+
+EPOCH = date(2000, 1, 1)
+# 주당 평균 출석 횟수 구간: [0, 0.5), [0.5, 1), [1, 2), [2, 3), [3, 4), [4, ∞)
+FREQUENCY_EDGES = np.array([0.5, 1, 2, 3, 4])
+FREQUENCY_LABELS = ["<0.5", "0.5-1", "1-2", "2-3", "3-4", "4+"]
+# 이탈 예측에 쓰는 초기 관찰 기간 (주)
+EARLY_WEEKS = 8
+
+_cache = TTLCache(ttl=ANALYTICS_CACHE_SECONDS, maxsize=1)
+_build_lock = threading.Lock()
+
+MEMBERS_SQL = """
+    SELECT m.id, COALESCE(m.product_id, -1) AS product_id,
+           COALESCE(m.start_date, m.reg_date, m.created_at::date) - DATE '2000-01-01' AS start_day,
+           COALESCE(m.end_date - DATE '2000-01-01', -1) AS end_day,
+           COALESCE(m.remaining, 0) AS remaining
+    FROM (SELECT id, product_id, start_date, reg_date, created_at, end_date, remaining FROM users
+          UNION ALL
+          SELECT id, product_id, start_date, reg_date, created_at, end_date, remaining FROM users_archive) m
+    ORDER BY m.id
+"""
+
+# 회원 번호(idx)는 MEMBERS_SQL 의 정렬 순서(0부터)와 같습니다.
+ATTENDANCE_COPY_SQL = """
+    COPY (
+        WITH m AS (
+            SELECT id, (row_number() OVER (ORDER BY id) - 1)::int AS idx
+            FROM (SELECT id FROM users UNION ALL SELECT id FROM users_archive) ids
+        )
+        SELECT m.idx, (a.date - DATE '2000-01-01')::int
+        FROM (SELECT user_id, date FROM attendance
+              UNION ALL
+              SELECT user_id, date FROM attendance_archive) a
+        JOIN m ON m.id = a.user_id
+    ) TO STDOUT (FORMAT binary)
+"""
+
+
+def day_number(value):
+    return (value - EPOCH).days
+
+
+def day_to_date(number):
+    return EPOCH + timedelta(days=int(number))
+
+
+class _BinaryCopyReader:
+    """
+    COPY ... (FORMAT binary) 출력을 받아 (int4, int4) 행을 청크 단위 NumPy 배열로 넘겨주는 파일 객체.
+    행 형식: 필드 수(int16) + [길이(int32) + 값(int32)] × 2 = 18 바이트 (NULL 없음)
+    """
+    HEADER_SIZE = 19
+    ROW = np.dtype([('fields', '>i2'), ('len1', '>i4'), ('idx', '>i4'), ('len2', '>i4'), ('day', '>i4')])
+
+    def __init__(self, on_chunk, chunk_rows):
+        self.on_chunk = on_chunk
+        self.chunk_bytes = chunk_rows * self.ROW.itemsize
+        self.buffer = bytearray()
+        self.header_done = False
+        self.rows = 0
+
+    def write(self, data):
+        self.buffer += data
+        if not self.header_done:
+            if len(self.buffer) < self.HEADER_SIZE:
+                return
+            extension = int.from_bytes(self.buffer[15:19], 'big')
+            if len(self.buffer) < self.HEADER_SIZE + extension:
+                return
+            del self.buffer[:self.HEADER_SIZE + extension]
+            self.header_done = True
+        if len(self.buffer) >= self.chunk_bytes:
+            self._emit(len(self.buffer) // self.ROW.itemsize)
+
+    def close(self):
+        # 마지막에는 2 바이트 종료 표시(-1)가 남습니다.
+        if self.header_done:
+            self._emit((len(self.buffer) - 2) // self.ROW.itemsize)
+
+    def _emit(self, count):
+        if count <= 0:
+            return
+        size = count * self.ROW.itemsize
+        rows = np.frombuffer(bytes(self.buffer[:size]), dtype=self.ROW)
+        del self.buffer[:size]
+        self.rows += count
+        self.on_chunk(rows['idx'].astype(np.int64), rows['day'].astype(np.int32))
+
+
+class Snapshot:
+    """회원별 배열과 주별 출석 행렬. 모든 분석은 여기서 벡터 연산으로 계산합니다."""
+
+    def __init__(self, ids, product, start, end, remaining, today, weeks=ANALYTICS_WEEKS):
+        self.ids = ids
+        self.product = product
+        self.start = start
+        self.end = end
+        self.remaining = remaining
+        self.today = today
+        self.weeks = weeks
+        n = len(ids)
+        self.weekly = np.zeros(n * weeks, dtype=np.int32)   # 시작 주 기준 w 주차 출석 수 (n × weeks)
+        self.total = np.zeros(n, dtype=np.int64)
+        self.last = np.full(n, -1, dtype=np.int32)          # 마지막 출석일 (없으면 -1)
+        self.last28 = np.zeros(n, dtype=np.int32)
+        self.prev28 = np.zeros(n, dtype=np.int32)
+        self.attendance_rows = 0
+        self.built_at = None
+        self.build_seconds = None
+
+    def add_chunk(self, idx, day):
+        n, weeks = len(self.ids), self.weeks
+        self.total += np.bincount(idx, minlength=n)
+        np.maximum.at(self.last, idx, day)
+
+        recent = day > self.today - 28
+        previous = (day > self.today - 56) & ~recent
+        self.last28 += np.bincount(idx[recent], minlength=n).astype(np.int32)
+        self.prev28 += np.bincount(idx[previous], minlength=n).astype(np.int32)
+
+        week = (day - self.start[idx]) // 7
+        keep = (week >= 0) & (week < weeks)
+        cells = idx[keep] * weeks + week[keep]
+        np.add(self.weekly, np.bincount(cells, minlength=n * weeks), out=self.weekly, casting='unsafe')
+        self.attendance_rows += len(idx)
+
+    @property
+    def matrix(self):
+        return self.weekly.reshape(len(self.ids), self.weeks)
+
+    @property
+    def elapsed_weeks(self):
+        """시작일부터 오늘까지 지난 주 수"""
+        return np.maximum((self.today - self.start) // 7, 0)
+
+
+def _load_members(cursor):
+    cursor.execute(MEMBERS_SQL)
+    rows = cursor.fetchall()
+    ids = np.array([r[0] for r in rows], dtype=object)
+    columns = np.array([r[1:] for r in rows], dtype=np.int64).reshape(len(rows), 4)
+    return ids, columns[:, 0], columns[:, 1].astype(np.int32), columns[:, 2].astype(np.int32), columns[:, 3]
+
+
+def build_snapshot(chunk_rows=ANALYTICS_CHUNK_ROWS, today=None):
+    started = time.perf_counter()
+    today_number = day_number(today or date.today())
+    conn = db.get_connection()
+    try:
+        # 두 조회가 같은 시점의 데이터를 보도록 REPEATABLE READ 로 읽습니다.
+        conn.set_session(isolation_level=psycopg2.extensions.ISOLATION_LEVEL_REPEATABLE_READ, readonly=True)
+        cursor = conn.cursor()
+        ids, product, start, end, remaining = _load_members(cursor)
+        snapshot = Snapshot(ids, product, start, end, remaining, today_number)
+        reader = _BinaryCopyReader(snapshot.add_chunk, chunk_rows)
+        cursor.copy_expert(ATTENDANCE_COPY_SQL, reader)
+        reader.close()
+        conn.commit()
+    finally:
+        conn.rollback()
+        conn.set_session(isolation_level=psycopg2.extensions.ISOLATION_LEVEL_DEFAULT, readonly=False)
+        db.return_connection(conn)
+    snapshot.built_at = time.time()
+    snapshot.build_seconds = round(time.perf_counter() - started, 3)
+    print(f"[ANALYTICS] Snapshot built: {len(ids)} members, {snapshot.attendance_rows} check-ins "
+          f"in {snapshot.build_seconds}s")
+    return snapshot
+
+
+def get_snapshot():
+    """캐시된 스냅샷을 돌려줍니다. 없으면 한 스레드만 만들고 나머지는 기다립니다."""
+    snapshot = _cache.get("snapshot")
+    if snapshot is not None:
+        return snapshot
+    with _build_lock:
+        snapshot = _cache.get("snapshot")
+        if snapshot is None:
+            snapshot = build_snapshot()
+            _cache.set("snapshot", snapshot)
+    return snapshot
+
+
+def refresh():
+    """야간 작업: 스냅샷을 새로 만들어 캐시에 넣습니다."""
+    with _build_lock:
+        snapshot = build_snapshot()
+        _cache.set("snapshot", snapshot)
+    return {"members": len(snapshot.ids), "attendance": snapshot.attendance_rows, "seconds": snapshot.build_seconds}
+
+
+# ---------------------------------------------------------------------------
+# 분석
+# ---------------------------------------------------------------------------
+
+def _group_sums(keys, values):
+    """keys 별로 values 행을 더합니다 (정렬 + reduceat). (고유 키, 합계 행렬, 개수)"""
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    unique, starts, counts = np.unique(sorted_keys, return_index=True, return_counts=True)
+    sums = np.add.reduceat(values[order], starts, axis=0) if len(unique) else np.zeros((0,) + values.shape[1:])
+    return unique, sums, counts
+
+
+def _cohort_keys(snapshot, by):
+    if by == "product":
+        return snapshot.product
+    start_dates = snapshot.start.astype('timedelta64[D]') + np.datetime64(EPOCH.isoformat(), 'D')
+    return start_dates.astype('datetime64[M]').astype(np.int64)  # 1970-01 부터의 월 번호
+
+
+def cohort_retention(snapshot, by="month", weeks=None, product_id=None, min_size=1):
+    """
+    코호트별 주차 유지율: w 주차에 한 번 이상 출석한 회원 비율.
+    아직 w 주가 지나지 않은 회원은 그 주차의 분모에서 뺍니다.
+    """
+    weeks = min(weeks or snapshot.weeks, snapshot.weeks)
+    mask = snapshot.start >= 0
+    if product_id is not None:
+        mask &= snapshot.product == product_id
+    keys = _cohort_keys(snapshot, by)[mask]
+    eligible = (snapshot.elapsed_weeks[mask, None] > np.arange(weeks)).astype(np.int32)
+    active = (snapshot.matrix[mask, :weeks] > 0) * eligible
+
+    unique, active_sums, sizes = _group_sums(keys, active)
+    _, eligible_sums, _ = _group_sums(keys, eligible)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = np.where(eligible_sums > 0, active_sums / np.maximum(eligible_sums, 1), np.nan)
+
+    cohorts = []
+    for key, size, curve in zip(unique, sizes, rates):
+        if size < min_size:
+            continue
+        label = int(key) if by == "product" else str(np.datetime64(int(key), 'M'))
+        cohorts.append({
+            "cohort": label,
+            "size": int(size),
+            "retention": [None if np.isnan(v) else round(float(v), 4) for v in curve]
+        })
+    return cohorts
+
+
+def weekly_frequency(snapshot):
+    """
+    회원별 주당 평균 출석 횟수의 분포 (전체, 상품별)와
+    초기 EARLY_WEEKS 주 출석 빈도 구간별 미갱신(종료일 경과) 비율.
+    """
+    observed = np.clip(snapshot.elapsed_weeks, 0, snapshot.weeks)
+    mask = observed > 0
+    rate = snapshot.matrix.sum(axis=1) / np.maximum(observed, 1)
+    bucket = np.digitize(rate, FREQUENCY_EDGES)
+    buckets = len(FREQUENCY_LABELS)
+
+    overall = np.bincount(bucket[mask], minlength=buckets)
+    products, product_counts, _ = _group_sums(snapshot.product[mask], np.eye(buckets, dtype=np.int64)[bucket[mask]])
+
+    # 초기 빈도 → 미갱신: 시작 후 EARLY_WEEKS 주가 지났고 종료일이 있는 회원
+    early_mask = (snapshot.elapsed_weeks >= EARLY_WEEKS) & (snapshot.end >= 0)
+    early_rate = snapshot.matrix[:, :EARLY_WEEKS].sum(axis=1) / EARLY_WEEKS
+    early_bucket = np.digitize(early_rate[early_mask], FREQUENCY_EDGES)
+    lapsed = snapshot.end[early_mask] < snapshot.today
+    totals = np.bincount(early_bucket, minlength=buckets)
+    lapsed_counts = np.bincount(early_bucket[lapsed], minlength=buckets)
+
+    return {
+        "buckets": FREQUENCY_LABELS,
+        "overall": overall.tolist(),
+        "byProduct": [{"productId": int(p), "counts": c.tolist()} for p, c in zip(products, product_counts)],
+        "nonRenewalByEarlyFrequency": [{
+            "bucket": label,
+            "members": int(total),
+            "lapsed": int(count),
+            "rate": round(float(count / total), 4) if total else None
+        } for label, total, count in zip(FREQUENCY_LABELS, totals, lapsed_counts)]
+    }
+
+
+def churn_risk(snapshot, limit=50, product_id=None):
+    """
+    현재 회원의 이탈 위험 점수 (0~1). 가중치 합:
+    최근 방문 공백 0.4, 최근 4주 방문 감소 0.2, 종료일 임박 0.2, 최근 4주 방문 빈도 낮음 0.2
+    """
+    today = snapshot.today
+    active = (snapshot.end >= today) | ((snapshot.end < 0) & (snapshot.remaining > 0))
+    if product_id is not None:
+        active &= snapshot.product == product_id
+
+    since_last = np.where(snapshot.last >= 0, today - snapshot.last, today - snapshot.start).astype(np.float64)
+    recency = 1 - np.exp(-np.maximum(since_last, 0) / 14)
+    trend = np.clip((snapshot.prev28 - snapshot.last28) / np.maximum(snapshot.prev28, 1), 0, 1)
+    days_left = np.where(snapshot.end >= 0, snapshot.end - today, 10 ** 6).astype(np.float64)
+    expiry = np.where(days_left <= 14, 1.0, np.exp(-(days_left - 14) / 30))
+    low_frequency = 1 - np.minimum(snapshot.last28 / 8, 1)
+    score = 0.4 * recency + 0.2 * trend + 0.2 * expiry + 0.2 * low_frequency
+
+    candidates = np.flatnonzero(active)
+    if len(candidates) > limit:
+        top = candidates[np.argpartition(-score[candidates], limit)[:limit]]
+    else:
+        top = candidates
+    top = top[np.argsort(-score[top])]
+
+    return {
+        "activeMembers": int(active.sum()),
+        "distribution": np.histogram(score[active], bins=10, range=(0, 1))[0].tolist(),
+        "members": [{
+            "id": snapshot.ids[i],
+            "productId": int(snapshot.product[i]),
+            "score": round(float(score[i]), 4),
+            "daysSinceLastVisit": int(since_last[i]),
+            "visitsLast28Days": int(snapshot.last28[i]),
+            "visitsPrevious28Days": int(snapshot.prev28[i]),
+            "endDate": day_to_date(snapshot.end[i]) if snapshot.end[i] >= 0 else None
+        } for i in top]
+    }
+
+
+def product_summary(snapshot):
+    """상품별 회원 수, 현재 회원 비율, 평균 재적 주 수, 주당 평균 출석"""
+    today = snapshot.today
+    current = (snapshot.end >= today) | ((snapshot.end < 0) & (snapshot.remaining > 0))
+    tenure = np.where(snapshot.end >= 0, np.minimum(snapshot.end, today), today) - snapshot.start
+    observed = np.maximum(np.clip(snapshot.elapsed_weeks, 0, snapshot.weeks), 1)
+    rate = snapshot.matrix.sum(axis=1) / observed
+    values = np.stack([np.ones_like(rate), current.astype(np.float64), np.maximum(tenure, 0) / 7, rate], axis=1)
+    products, sums, counts = _group_sums(snapshot.product, values)
+    return [{
+        "productId": int(p),
+        "members": int(c),
+        "currentRate": round(float(s[1] / c), 4),
+        "avgTenureWeeks": round(float(s[2] / c), 1),
+        "avgWeeklyVisits": round(float(s[3] / c), 2)
+    } for p, s, c in zip(products, sums, counts)]
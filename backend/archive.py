@@ -0,0 +1,132 @@
+"""
+비활성 회원 보관 작업
+
+end_date 가 ARCHIVE_AFTER_DAYS 일 이상 지난 회원과 그 출석 기록을 users_archive /
+attendance_archive 로 옮깁니다. hot 테이블(users, attendance)은 현재 회원 규모에 비례하게 유지되고,
+보관된 회원은 POST /api/users/{id}/restore 로 되돌릴 수 있습니다.
+
+배치마다 짧은 트랜잭션으로 처리하고 FOR UPDATE SKIP LOCKED 로 후보를 잡으므로
+운영 중에 실행해도 되고, 여러 프로세스가 동시에 돌려도 같은 회원을 두 번 옮기지 않습니다.
+
+사용 예 (backend/ 에서):
+    python archive.py --after-days 365
+"""
+import argparse
+import os
+import time
+
+from database import db
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+
+USER_COLUMNS = ['id', 'name', 'gender', 'phone', 'product_id', 'reg_date', 'start_date',
+                'end_date', 'remaining', 'created_at', 'updated_at', 'version']
+ATTENDANCE_COLUMNS = ['id', 'user_id', 'date', 'time', 'status', 'created_at', 'coach_id']
+
+
+def _move(cursor, source, target, columns, condition, params):
+    """source 에서 condition 에 맞는 행을 지우고 같은 행을 target 에 넣습니다 (한 문장)."""
+    cols = ', '.join(columns)
+    cursor.execute(f"""
+        WITH moved AS (
+            DELETE FROM {source} WHERE {condition}
+            RETURNING {cols}
+        )
+        INSERT INTO {target} ({cols})
+        SELECT {cols} FROM moved
+    """, params)
+    return cursor.rowcount
+
+
+def archive_batch(cursor, after_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    """보관 대상 회원 한 배치를 옮깁니다. (회원 수, 출석 수)를 돌려줍니다."""
+    cursor.execute("""
+        SELECT id FROM users
+        WHERE end_date < CURRENT_DATE - %s
+        ORDER BY end_date
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    """, (after_days, batch_size))
+    user_ids = [row[0] for row in cursor.fetchall()]
+    if not user_ids:
+        return 0, 0
+
+    # 출석을 먼저 옮겨야 users 삭제 시 ON DELETE CASCADE 로 사라지지 않습니다.
+    attendance_count = _move(cursor, 'attendance', 'attendance_archive', ATTENDANCE_COLUMNS,
+                             "user_id = ANY(%s)", (user_ids,))
+    user_count = _move(cursor, 'users', 'users_archive', USER_COLUMNS,
+                       "id = ANY(%s)", (user_ids,))
+    return user_count, attendance_count
+
+
+def archive_expired_members(after_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE, pause=0.05):
+    """보관 대상이 없어질 때까지 배치를 반복합니다. 옮긴 회원/출석 수를 돌려줍니다."""
+    totals = {"users": 0, "attendance": 0}
+    started = time.perf_counter()
+    while True:
+        conn = db.get_connection()
+        try:
+            cursor = conn.cursor()
+            users, attendance = archive_batch(cursor, after_days, batch_size)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            db.return_connection(conn)
+
+        if users == 0:
+            break
+        totals["users"] += users
+        totals["attendance"] += attendance
+        # 배치 사이에 연결을 반납하고 잠시 쉬어 요청 처리에 양보합니다.
+        time.sleep(pause)
+
+    if totals["users"]:
+        print(f"[ARCHIVE] users={totals['users']}, attendance={totals['attendance']} "
+              f"({time.perf_counter() - started:.1f}s)")
+    return totals
+
+
+def restore_member(cursor, user_id):
+    """
+    보관된 회원과 출석 기록을 hot 테이블로 되돌립니다.
+    복원된 회원 행(dict 커서면 dict)을 돌려주며, 보관 테이블에 없으면 None 입니다.
+    """
+    cols = ', '.join(USER_COLUMNS)
+    cursor.execute(f"""
+        WITH moved AS (
+            DELETE FROM users_archive WHERE id = %s
+            RETURNING {cols}
+        )
+        INSERT INTO users ({cols})
+        SELECT {cols} FROM moved
+        RETURNING *
+    """, (user_id,))
+    restored = cursor.fetchone()
+    if not restored:
+        return None
+    _move(cursor, 'attendance_archive', 'attendance', ATTENDANCE_COLUMNS, "user_id = %s", (user_id,))
+    return restored
+
+
+def run_archive_job():
+    """스케줄러에서 호출하는 진입점"""
+    return archive_expired_members()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="만료 회원 보관 작업")
+    parser.add_argument('--after-days', type=int, default=ARCHIVE_AFTER_DAYS,
+                        help="종료일로부터 이 기간이 지난 회원을 보관")
+    parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    totals = archive_expired_members(args.after_days, args.batch_size)
+    print(f"✅ Archived {totals['users']} member(s), {totals['attendance']} attendance record(s).")
+    db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+파일 산출물 캐시
+
+엑셀 다운로드처럼 만들기 비싼 파일을 로컬 디스크에 저장해 두고 재사용합니다.
+파일 이름에 내용 버전(version)이 들어가므로 데이터가 바뀌면 새 파일이 만들어지고,
+바뀌지 않았다면 이후 다운로드는 디스크의 파일을 그대로 내려보내는 정적 파일 서빙이 됩니다.
+
+- 응답은 FileResponse 이므로 Range 요청(이어받기)을 지원합니다.
+- ETag 는 이름+버전이며, If-None-Match 가 같으면 본문 없이 304 를 돌려줍니다.
+- 같은 산출물을 동시에 요청하면 한 번만 만들고 나머지는 기다렸다가 같은 파일을 씁니다.
+"""
+import os
+import tempfile
+import threading
+import time
+
+from fastapi import Response
+from fastapi.responses import FileResponse
+
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifacts"))
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(key):
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def _path(name, version, suffix):
+    return os.path.join(ARTIFACT_DIR, f"{name}__{version}{suffix}")
+
+
+def get_or_render(name, version, render, suffix=".xlsx"):
+    """
+    name + version 산출물의 경로를 돌려줍니다. 없으면 render(file) 로 만들어 저장합니다.
+    render 는 열린 바이너리 파일을 받아 내용을 씁니다. 저장은 임시 파일 → rename 이라
+    만드는 도중의 파일이 다른 요청에 보이지 않습니다.
+    """
+    path = _path(name, version, suffix)
+    if os.path.exists(path):
+        return path
+
+    with _lock_for(name):
+        if os.path.exists(path):
+            return path
+        os.makedirs(ARTIFACT_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=ARTIFACT_DIR, prefix=".tmp-", suffix=suffix)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                render(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        print(f"[ARTIFACT] Rendered {os.path.basename(path)}")
+    return path
+
+
+def etag_for(name, version):
+    return f'"{name}-{version}"'
+
+
+def file_response(request, path, etag, headers=None, media_type=None):
+    """If-None-Match 가 맞으면 304, 아니면 Range 를 지원하는 FileResponse"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    headers = dict(headers or {}, ETag=etag)
+    headers.setdefault("Cache-Control", "no-cache")
+    return FileResponse(path, headers=headers, media_type=media_type)
+
+
+def prune(keep, grace=3600):
+    """
+    keep 에 없는 산출물 중 grace 초보다 오래된 것을 지웁니다. 요청 처리 중에는 지우지 않고
+    (그 파일을 막 내려받기 시작한 요청이 있을 수 있으므로) 야간 작업에서만 호출합니다.
+    """
+    if not os.path.isdir(ARTIFACT_DIR):
+        return 0
+    keep = {os.path.abspath(path) for path in keep}
+    now = time.time()
+    removed = 0
+    for entry in os.listdir(ARTIFACT_DIR):
+        path = os.path.abspath(os.path.join(ARTIFACT_DIR, entry))
+        try:
+            if path not in keep and now - os.path.getmtime(path) > grace:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def clear():
+    """모든 산출물을 지웁니다 (다음 요청 때 다시 만들어집니다)."""
+    if not os.path.isdir(ARTIFACT_DIR):
+        return 0
+    removed = 0
+    for entry in os.listdir(ARTIFACT_DIR):
+        os.remove(os.path.join(ARTIFACT_DIR, entry))
+        removed += 1
+    return removed
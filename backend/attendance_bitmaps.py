@@ -0,0 +1,246 @@
+"""
+회원 × 월별 출석일 비트맵
+
+attendance_bitmaps (migrations/0018) 는 회원-월마다 출석한 날을 정수 하나의 비트로 담습니다 (n 일 → 비트 n-1).
+출석 INSERT/DELETE/UPDATE 트리거가 바로 갱신하며, 이 모듈은
+- 회원별 요약: 최근 몇 개월 비트맵(한 달에 정수 하나)만 읽어 월 출석일, 현재/최장 연속 출석을 계산
+- 빈도 코호트: "최근 30일 중 8일 이상 출석한 회원" 을 월별 마스크 AND + bit_count 로 계산
+- 월 단위 재계산: 기존 출석 채우기(마이그레이션 0019)와 수동 보정 (원본과 비교해 어긋난 회원-월만 고침)
+을 맡습니다. 출석한 날은 하루에 여러 번 체크해도 한 번으로 셉니다.
+
+사용 예 (backend/ 에서):
+    python attendance_bitmaps.py                        # 전체 기간 재계산
+    python attendance_bitmaps.py --from 2024-01 --to 2024-12
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+from database import db
+from heatmap import month_start, next_month
+
+
+def day_mask(start_day, end_day):
+    """그 달 start_day 일부터 end_day 일까지(포함)의 비트"""
+    return ((1 << end_day) - 1) & ~((1 << (start_day - 1)) - 1)
+
+
+def attended_days(month, bits):
+    """비트맵 → 출석한 날짜 목록"""
+    return [month.replace(day=d) for d in range(1, 32) if bits >> (d - 1) & 1]
+
+
+def window_masks(start, end):
+    """[start, end] 를 덮는 (월, 그 달 안의 날짜 마스크) 목록"""
+    masks = []
+    month = month_start(start)
+    while month <= end:
+        last = (next_month(month) - timedelta(days=1)).day
+        first_day = start.day if month == month_start(start) else 1
+        last_day = end.day if month == month_start(end) else last
+        masks.append((month, day_mask(first_day, last_day)))
+        month = next_month(month)
+    return masks
+
+
+def streaks(bitmaps, today):
+    """
+    {월: 비트맵} 으로 (현재 연속 출석일, 최장 연속 출석일, 마지막 출석일).
+    오늘 아직 출석하지 않았으면 어제까지 이어진 연속을 현재 연속으로 봅니다.
+    """
+    days = sorted(d for month, bits in bitmaps.items() for d in attended_days(month, bits) if d <= today)
+    if not days:
+        return 0, 0, None
+    longest = run = 1
+    for previous, current in zip(days, days[1:]):
+        run = run + 1 if current - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+    current_streak = 0
+    if days[-1] >= today - timedelta(days=1):
+        current_streak = run
+    return current_streak, longest, days[-1]
+
+
+# ---------------------------------------------------------------------------
+# 조회
+# ---------------------------------------------------------------------------
+
+def member_summary(cursor, user_id, months=12, today=None):
+    """
+    회원의 최근 months 개월 월별 출석일과 연속 출석. 비트맵 months 개(행당 정수 하나)만 읽습니다.
+    최장 연속은 이 기간 안에서만 셉니다. cursor 는 일반 커서여도 되고 RealDictCursor 여도 됩니다.
+    """
+    today = today or date.today()
+    first = month_start(today)
+    for _ in range(months - 1):
+        first = month_start(first - timedelta(days=1))
+    cursor.execute("""
+        SELECT month, days FROM attendance_bitmaps
+        WHERE user_id = %s AND month >= %s AND month <= %s
+    """, (user_id, first, today))
+    bitmaps = {}
+    for row in cursor.fetchall():
+        month, bits = (row['month'], row['days']) if isinstance(row, dict) else row
+        bitmaps[month] = bits
+
+    current_streak, longest, last = streaks(bitmaps, today)
+    monthly = []
+    month = first
+    while month <= today:
+        bits = bitmaps.get(month, 0)
+        monthly.append({"month": month.strftime("%Y-%m"), "days": bin(bits).count("1"),
+                        "dates": [d.day for d in attended_days(month, bits)]})
+        month = next_month(month)
+    return {
+        "userId": user_id,
+        "currentStreak": current_streak,
+        "longestStreak": longest,
+        "lastAttended": last,
+        "daysThisMonth": monthly[-1]["days"],
+        "monthly": monthly
+    }
+
+
+def frequency_cohort(cursor, start, end, min_days, product_id=None, limit=200):
+    """
+    [start, end] 에 min_days 일 이상 출석한 회원 수와 (출석일 많은 순) 상위 limit 명.
+    기간에 걸친 달마다 비트맵 & 마스크 의 비트 수를 더하며, 그 기간에 한 번도 오지 않은 회원은 집계 전에 뺍니다.
+    cursor 는 RealDictCursor 여야 합니다.
+    """
+    months, masks = zip(*window_masks(start, end))
+    product_join = "JOIN users u ON u.id = b.user_id AND u.product_id = %(product)s" if product_id is not None else ""
+    cursor.execute(f"""
+        WITH w AS (
+            SELECT * FROM unnest(%(months)s::date[], %(masks)s::int[]) AS w(month, mask)
+        ),
+        cohort AS (
+            SELECT b.user_id, SUM(bit_count((b.days & w.mask)::bit(32)))::int AS days
+            FROM w
+            JOIN attendance_bitmaps b ON b.month = w.month AND b.days & w.mask <> 0
+            {product_join}
+            GROUP BY b.user_id
+            HAVING SUM(bit_count((b.days & w.mask)::bit(32))) >= %(min_days)s
+        ),
+        top AS (
+            SELECT * FROM cohort ORDER BY days DESC, user_id LIMIT %(limit)s
+        )
+        SELECT (SELECT COUNT(*) FROM cohort) AS total, top.user_id, top.days, m.name, m.product_id
+        FROM (SELECT 1) one
+        LEFT JOIN top ON TRUE
+        LEFT JOIN users m ON m.id = top.user_id
+        ORDER BY top.days DESC, top.user_id
+    """, {"months": list(months), "masks": list(masks), "min_days": min_days, "product": product_id,
+          "limit": limit})
+    rows = cursor.fetchall()
+    return {
+        "startDate": str(start),
+        "endDate": str(end),
+        "minDays": min_days,
+        "productId": product_id,
+        "count": rows[0]['total'] if rows else 0,
+        "members": [{"userId": r['user_id'], "name": r['name'], "productId": r['product_id'], "days": r['days']}
+                    for r in rows if r['user_id'] is not None]
+    }
+
+
+# ---------------------------------------------------------------------------
+# 재계산
+# ---------------------------------------------------------------------------
+
+def rebuild_month(conn, month):
+    """
+    한 달치 비트맵을 원본 출석에서 다시 계산해 어긋난 회원-월만 고칩니다.
+    원본과 현재 비트맵을 한 문장(같은 스냅샷)에서 비교해 빠진 비트는 OR 로 더하고 남은 비트는 지우므로,
+    테이블 잠금 없이 어긋난 행의 잠금만 잠깐 잡고 그 사이 출석 체크 트리거가 더한 비트도 그대로 둡니다.
+    고친 회원-월 수를 돌려줍니다.
+    """
+    start, end = month_start(month), next_month(month)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            WITH fresh AS (
+                SELECT user_id, bit_or(1 << (EXTRACT(DAY FROM date)::int - 1)) AS days
+                FROM attendance
+                WHERE date >= %(start)s AND date < %(end)s
+                GROUP BY user_id
+            ),
+            diff AS (
+                SELECT COALESCE(f.user_id, b.user_id) AS user_id, b.user_id IS NOT NULL AS present,
+                       COALESCE(f.days, 0) & ~COALESCE(b.days, 0) AS missing,
+                       COALESCE(b.days, 0) & ~COALESCE(f.days, 0) AS stale
+                FROM fresh f
+                FULL JOIN (SELECT user_id, days FROM attendance_bitmaps WHERE month = %(start)s) b
+                    ON b.user_id = f.user_id
+                WHERE COALESCE(f.days, 0) <> COALESCE(b.days, 0)
+            ),
+            updated AS (
+                UPDATE attendance_bitmaps b SET days = (b.days | d.missing) & ~d.stale
+                FROM diff d
+                WHERE d.present AND b.user_id = d.user_id AND b.month = %(start)s
+                RETURNING 1
+            ),
+            inserted AS (
+                INSERT INTO attendance_bitmaps AS b (user_id, month, days)
+                SELECT user_id, %(start)s, missing FROM diff WHERE NOT present
+                ORDER BY 1
+                ON CONFLICT (user_id, month) DO UPDATE SET days = b.days | EXCLUDED.days
+                RETURNING 1
+            )
+            SELECT (SELECT COUNT(*) FROM updated) + (SELECT COUNT(*) FROM inserted)
+        """, {"start": start, "end": end})
+        members = cursor.fetchone()[0]
+        cursor.execute("DELETE FROM attendance_bitmaps WHERE month = %s AND days = 0", (start,))
+        conn.commit()
+        return members
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def rebuild(conn, start=None, end=None, pause=0.05):
+    """start 달부터 end 달까지(포함) 한 달씩 다시 계산하고 달마다 커밋합니다. 기본은 전체 기간입니다."""
+    if start is None or end is None:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MIN(date), MAX(date) FROM attendance")
+        first, last = cursor.fetchone()
+        conn.commit()
+        if first is None:
+            return {"months": 0, "rows": 0}
+        start, end = start or first, end or last
+
+    totals = {"months": 0, "rows": 0}
+    started = time.perf_counter()
+    month = month_start(start)
+    while month <= end:
+        totals["rows"] += rebuild_month(conn, month)
+        totals["months"] += 1
+        month = next_month(month)
+        if pause:
+            time.sleep(pause)
+    print(f"[BITMAPS] rebuilt {totals['months']} month(s), corrected {totals['rows']} member-month(s) "
+          f"({time.perf_counter() - started:.1f}s)")
+    return totals
+
+
+def _parse_month(value):
+    year, month = value.split('-')[:2]
+    return date(int(year), int(month), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="회원 월별 출석 비트맵 재계산")
+    parser.add_argument('--from', dest='start', type=_parse_month, help="시작 달 (YYYY-MM)")
+    parser.add_argument('--to', dest='end', type=_parse_month, help="끝 달 (YYYY-MM, 포함)")
+    args = parser.parse_args()
+
+    conn = db.get_connection()
+    try:
+        totals = rebuild(conn, args.start, args.end)
+    finally:
+        db.return_connection(conn)
+        db.close_all()
+    print(f"✅ Rebuilt {totals['months']} month(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+관리자 작업 감사 로그
+
+누가(관리자) 언제 무엇을(대상, 변경 전/후) 바꿨는지 audit_log 에 남깁니다.
+요청 처리 중에는 DB 에 쓰지 않습니다:
+
+1) AuditMiddleware 가 쓰기 요청(POST/PUT/PATCH/DELETE)마다 요청 범위의 이벤트 목록과
+   관리자 정보(Bearer 토큰을 메모리에서 해석)를 contextvar 에 둡니다.
+2) 라우터/도우미가 stage() 로 변경 전/후를 넣습니다. 별도 조회 없이 UPDATE ... RETURNING 으로 얻은 값을 씁니다.
+3) 응답이 성공(< 400)이면 이벤트를 메모리 링 버퍼로 옮깁니다. 실패(롤백)한 요청의 이벤트는 버립니다.
+   stage() 를 부르지 않은 쓰기 경로도 경로 단위 이벤트(변경 내용 없이)로 남깁니다.
+4) 백그라운드 스레드가 AUDIT_FLUSH_SECONDS 마다(또는 AUDIT_BATCH_ROWS 가 차면) COPY 로 한꺼번에 씁니다.
+   앱 종료 시 남은 이벤트를 모두 쓰고 끝납니다.
+
+버퍼(AUDIT_BUFFER_SIZE)가 가득 차면 가장 오래된 이벤트부터 버리고 dropped 로 셉니다 (DB 장애가 길 때).
+audit_log 는 occurred_at 월별 파티션이며, 매일 다음 달 파티션을 미리 만들고 보관 기간이 지난 파티션을 지웁니다.
+"""
+import contextvars
+import io
+import json
+import os
+import threading
+from collections import deque
+from datetime import date, datetime
+
+from database import db
+import security
+
+AUDIT_BUFFER_SIZE = int(os.getenv("AUDIT_BUFFER_SIZE", "100000"))
+AUDIT_BATCH_ROWS = int(os.getenv("AUDIT_BATCH_ROWS", "5000"))
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "1"))
+AUDIT_RETENTION_MONTHS = int(os.getenv("AUDIT_RETENTION_MONTHS", "24"))
+
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+# 감사 대상이 아닌 쓰기 경로 (로그인 등)
+EXEMPT_PREFIXES = ("/api/auth",)
+# diff 에서 뺄 컬럼 (자동으로 바뀌거나 남기면 안 되는 값)
+IGNORED_FIELDS = {"updated_at", "version", "password", "token_version", "search_key", "name_key", "phone_key"}
+
+COLUMNS = ("occurred_at", "admin_id", "admin_name", "entity", "entity_id", "action", "changes",
+           "method", "path", "client_ip")
+
+_request = contextvars.ContextVar("audit_request", default=None)
+
+
+# ---------------------------------------------------------------------------
+# 이벤트 만들기
+# ---------------------------------------------------------------------------
+
+def _jsonable(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def diff(before, after):
+    """{필드: [변경 전, 변경 후]} — 바뀐 필드만. 생성은 before=None, 삭제는 after=None."""
+    before, after = before or {}, after or {}
+    changes = {}
+    for key in before.keys() | after.keys():
+        if key in IGNORED_FIELDS:
+            continue
+        old, new = _jsonable(before.get(key)), _jsonable(after.get(key))
+        if old != new:
+            changes[key] = [old, new]
+    return changes
+
+
+def stage(entity, entity_id, action, before=None, after=None, changes=None):
+    """
+    현재 요청의 감사 이벤트를 하나 넣습니다 (요청이 성공하면 기록됨).
+    before/after 는 행 dict (컬럼 이름 기준), changes 를 주면 diff 대신 그대로 씁니다.
+    요청 밖(스케줄러, 스크립트)에서 부르면 아무것도 하지 않습니다.
+    """
+    request = _request.get()
+    if request is None:
+        return
+    request["events"].append((entity, str(entity_id) if entity_id is not None else None, action,
+                              changes if changes is not None else diff(before, after)))
+
+
+def stage_update(entity, row):
+    """UPDATE ... FROM <테이블> o RETURNING *, to_jsonb(o) AS audit_before 로 받은 행의 변경 내용을 넣습니다."""
+    before = row.pop("audit_before", None)
+    stage(entity, row["id"], "update", before, row)
+
+
+def _actor(scope):
+    """Authorization 헤더의 토큰에서 관리자 정보를 꺼냅니다 (서명·만료만 확인, DB 조회 없음)."""
+    header = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"authorization"), "")
+    if not header.startswith("Bearer "):
+        return None, None
+    try:
+        claims = security.decode_token(header[7:])
+    except Exception:
+        return None, None
+    return claims.get("sub"), claims.get("name") or claims.get("usr")
+
+
+def _route_event(method, path):
+    """stage() 가 없던 쓰기 요청: /api/<대상>/<id>/... 에서 대상과 id 를 추정합니다."""
+    parts = [p for p in path.split("/") if p][1:]
+    entity = parts[0] if parts else path
+    entity_id = parts[1] if len(parts) > 1 else None
+    action = {"POST": "create", "PUT": "update", "PATCH": "update", "DELETE": "delete"}[method]
+    if len(parts) > 2:
+        action = f"{action}:{'/'.join(parts[2:])}"
+    return entity, entity_id, action, None
+
+
+class AuditMiddleware:
+    """쓰기 요청의 감사 이벤트를 모아 성공한 경우에만 버퍼로 넘기는 ASGI 미들웨어"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] not in MUTATING_METHODS
+                or scope["path"].startswith(EXEMPT_PREFIXES)):
+            return await self.app(scope, receive, send)
+
+        request = {"events": []}
+        token = _request.set(request)
+        status = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request.reset(token)
+            if status is not None and status < 400:
+                method, path = scope["method"], scope["path"].rstrip("/") or "/"
+                admin_id, admin_name = _actor(scope)
+                client = scope.get("client")
+                events = request["events"] or [_route_event(method, path)]
+                now = datetime.now()
+                writer.extend([(now, admin_id, admin_name, entity, entity_id, action, changes, method, path,
+                                client[0] if client else None)
+                               for entity, entity_id, action, changes in events])
+
+
+# ---------------------------------------------------------------------------
+# 버퍼와 COPY 쓰기
+# ---------------------------------------------------------------------------
+
+def _copy_value(value):
+    """COPY text 형식의 한 칸"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, dict):
+        value = json.dumps(value, ensure_ascii=False, default=str)
+    elif isinstance(value, datetime):
+        value = value.isoformat(sep=" ")
+    else:
+        value = str(value)
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def copy_rows(cursor, rows):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY audit_log ({', '.join(COLUMNS)}) FROM STDIN", buffer)
+
+
+class AuditWriter:
+    """링 버퍼 + 백그라운드 COPY 스레드. start() / stop() 은 앱 시작/종료 때 부릅니다."""
+
+    def __init__(self, size=AUDIT_BUFFER_SIZE):
+        self._buffer = deque(maxlen=size)
+        # 쓰기에 실패한 배치. 가득 찬 버퍼에 되돌리면 새 이벤트가 밀려나므로 따로 두고 다음 flush 때 먼저 씁니다.
+        self._retry = []
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self.stats = {"written": 0, "dropped": 0, "flushes": 0, "failures": 0, "lastError": None,
+                      "lastFlushAt": None}
+
+    @property
+    def pending(self):
+        return len(self._buffer) + len(self._retry)
+
+    def extend(self, rows):
+        overflow = len(self._buffer) + len(rows) - self._buffer.maxlen
+        if overflow > 0:
+            self.stats["dropped"] += overflow
+        self._buffer.extend(rows)
+        if len(self._buffer) >= AUDIT_BATCH_ROWS:
+            self._wake.set()
+
+    def flush(self):
+        """
+        버퍼를 비울 때까지 AUDIT_BATCH_ROWS 씩 씁니다. 실패한 배치는 재시도 칸에 남겨 다음 flush 때 먼저 쓰며,
+        그동안 버퍼에 들어온 이벤트는 밀어내지 않습니다.
+        """
+        written = 0
+        with self._flush_lock:
+            while self._retry or self._buffer:
+                if not self._retry:
+                    while self._buffer and len(self._retry) < AUDIT_BATCH_ROWS:
+                        self._retry.append(self._buffer.popleft())
+                batch = self._retry
+                conn = db.get_connection()
+                try:
+                    copy_rows(conn.cursor(), batch)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    db.return_connection(conn)
+                self._retry = []
+                written += len(batch)
+                self.stats["written"] += len(batch)
+                self.stats["flushes"] += 1
+        if written:
+            self.stats["lastFlushAt"] = datetime.now()
+        return written
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(AUDIT_FLUSH_SECONDS)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.stats["failures"] += 1
+                self.stats["lastError"] = str(e)
+                print(f"[AUDIT] flush failed ({self.pending} pending): {e}")
+                self._stopping.wait(min(AUDIT_FLUSH_SECONDS * 5, 30))
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """스레드를 멈추고 남은 이벤트를 모두 씁니다 (db.close_all 전에 불러야 합니다)."""
+        if self._thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        try:
+            written = self.flush()
+            if written:
+                print(f"[AUDIT] flushed {written} events on shutdown")
+        except Exception as e:
+            print(f"[AUDIT] final flush failed, {self.pending} events lost: {e}")
+
+
+writer = AuditWriter()
+
+
+# ---------------------------------------------------------------------------
+# 파티션 관리
+# ---------------------------------------------------------------------------
+
+def _add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def maintain_partitions(ahead=2, retention_months=AUDIT_RETENTION_MONTHS):
+    """
+    스케줄러 진입점: 이번 달부터 ahead 개월 뒤까지 파티션을 만들고, 보관 기간이 지난 파티션을 지웁니다.
+    달마다 따로 커밋하므로 한 달 파티션을 만들지 못해도 나머지 달과 보관 기간 정리는 계속하고, 끝에 예외를 냅니다.
+    """
+    this_month = date.today().replace(day=1)
+    oldest = _add_months(this_month, -retention_months)
+    failed = []
+    dropped = []
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        for i in range(ahead + 1):
+            month = _add_months(this_month, i)
+            try:
+                cursor.execute("SELECT audit_log_create_partition(%s)", (month,))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                failed.append(month.strftime("%Y-%m"))
+                print(f"[ERROR] audit_log partition {month:%Y-%m} not created, rows stay in audit_log_default: {e}")
+        try:
+            cursor.execute("""
+                SELECT c.relname FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = 'audit_log'::regclass AND c.relname ~ '^audit_log_[0-9]{6}$'
+            """)
+            for (name,) in cursor.fetchall():
+                if date(int(name[-6:-2]), int(name[-2:]), 1) < oldest:
+                    cursor.execute(f"DROP TABLE {name}")
+                    dropped.append(name)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        db.return_connection(conn)
+    if dropped:
+        print(f"[AUDIT] dropped partitions: {', '.join(dropped)}")
+    if failed:
+        raise RuntimeError(f"audit_log partition(s) not created: {', '.join(failed)}")
+    return dropped
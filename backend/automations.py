@@ -0,0 +1,224 @@
+"""
+회원 자동화 규칙 엔진
+
+규칙은 조건 목록(AND)과 동작으로 이루어집니다. 규칙 하나는 SQL 한 문장으로 바뀌어 DB 안에서 평가되며,
+회원을 Python 으로 가져와 돌지 않습니다:
+
+    WITH matched AS (SELECT u.id, 실행 키 FROM users u WHERE 평가 범위 AND 조건1 AND 조건2 ...),
+         fired AS (INSERT INTO automation_firings ... SELECT ... FROM matched
+                   ON CONFLICT DO NOTHING RETURNING user_id)
+    INSERT INTO message_outbox ... WHERE u.id IN (SELECT user_id FROM fired)
+
+- 중복 방지: automation_firings (규칙, 회원, 등록 시작일) 기본 키로 회원당 규칙당 한 번만 실행됩니다.
+- 증분 평가: 규칙마다 마지막 평가 시각 / 최대 출석 id / 날짜를 저장해 두고, 다음 평가에서는
+  그 뒤에 수정된 회원, 출석한 회원, 날짜가 지나며 조건 경계를 넘은 회원만 다시 봅니다.
+  커밋 순서가 뒤바뀐 트랜잭션을 놓치지 않도록 워터마크를 조금씩 겹쳐 잡습니다 (중복은 키가 걸러냄).
+- 규칙을 수정하면 워터마크를 지워 다음 평가에서 전체 회원을 다시 봅니다.
+"""
+import os
+import time
+from datetime import timedelta
+
+import psycopg2.extras
+
+from database import db
+import messaging
+
+AUTOMATION_INTERVAL_SECONDS = int(os.getenv("AUTOMATION_INTERVAL_SECONDS", "300"))
+# 워터마크를 겹쳐 잡는 폭 (늦게 커밋된 트랜잭션 대비)
+AUTOMATION_LAG_SECONDS = int(os.getenv("AUTOMATION_LAG_SECONDS", "300"))
+AUTOMATION_ATTENDANCE_OVERLAP = int(os.getenv("AUTOMATION_ATTENDANCE_OVERLAP", "1000"))
+
+ACTIONS = ("message", "record")
+
+# 조건 종류: (조건 SQL, 날짜 경계 SQL 또는 None). {v} 는 조건 값 파라미터로 바뀝니다.
+# 날짜 경계 SQL 은 마지막 평가일(%(last_date)s) 이후 오늘까지 날짜가 지나며 새로 조건을 만족했을 수 있는 회원입니다.
+CONDITIONS = {
+    # 잔여 횟수 N 이하 (횟수제 회원)
+    "remaining_lte": ("u.remaining <= {v}", None),
+    "remaining_gte": ("u.remaining >= {v}", None),
+    # 종료일이 오늘부터 N 일 안
+    "end_within_days": (
+        "u.end_date BETWEEN CURRENT_DATE AND CURRENT_DATE + {v}",
+        "u.end_date > %(last_date)s + {v} AND u.end_date <= CURRENT_DATE + {v}",
+    ),
+    # 종료된 지 N 일 이내 (재등록 유도)
+    "expired_within_days": (
+        "u.end_date BETWEEN CURRENT_DATE - {v} AND CURRENT_DATE - 1",
+        "u.end_date >= %(last_date)s AND u.end_date < CURRENT_DATE",
+    ),
+    # 최근 N 일 동안 출석 없음 (등록한 지 N 일이 안 된 회원은 제외)
+    "no_attendance_days": (
+        "u.start_date <= CURRENT_DATE - {v} AND NOT EXISTS ("
+        "SELECT 1 FROM attendance a WHERE a.user_id = u.id AND a.date > CURRENT_DATE - {v})",
+        "u.id IN (SELECT a.user_id FROM attendance a"
+        " WHERE a.date > %(last_date)s - {v} AND a.date <= CURRENT_DATE - {v})"
+        " OR (u.start_date > %(last_date)s - {v} AND u.start_date <= CURRENT_DATE - {v})",
+    ),
+    "product": ("u.product_id = {v}", None),
+}
+
+# 회원당 규칙당 한 번: 등록 시작일이 바뀌면(재등록) 다시 실행됩니다.
+FIRE_KEY_SQL = "COALESCE(u.start_date::text, '-')"
+
+
+def validate_conditions(conditions):
+    """조건 목록을 검사해 [{"type", "value"}] 로 돌려줍니다. 잘못되면 ValueError."""
+    if not conditions:
+        raise ValueError("조건이 하나 이상 필요합니다.")
+    result = []
+    for condition in conditions:
+        kind, value = condition.get("type"), condition.get("value")
+        if kind not in CONDITIONS:
+            raise ValueError(f"알 수 없는 조건입니다: {kind}")
+        if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+            raise ValueError(f"조건 값은 0 이상의 정수여야 합니다: {kind}")
+        result.append({"type": kind, "value": value})
+    return result
+
+
+def compile_rule(conditions, incremental):
+    """조건 목록 → (WHERE 절, 파라미터). incremental 이면 워터마크 이후 바뀐 회원으로 범위를 좁힙니다."""
+    params = {}
+    clauses, crossings = [], []
+    for i, condition in enumerate(conditions):
+        name = f"c{i}"
+        params[name] = condition["value"]
+        sql, crossing = CONDITIONS[condition["type"]]
+        clauses.append(f"({sql.format(v=f'%({name})s')})")
+        if crossing:
+            crossings.append(f"({crossing.format(v=f'%({name})s')})")
+
+    if incremental:
+        scope = ["u.updated_at > %(since)s",
+                 "u.id IN (SELECT a.user_id FROM attendance a WHERE a.id > %(attendance_id)s)"]
+        clauses.insert(0, f"({' OR '.join(scope + crossings)})")
+    return " AND ".join(clauses), params
+
+
+def _matched_sql(where):
+    return f"""
+        matched AS (
+            SELECT u.id, {FIRE_KEY_SQL} AS fire_key FROM users u WHERE {where}
+        ),
+        fired AS (
+            INSERT INTO automation_firings (rule_id, user_id, fire_key)
+            SELECT %(rule_id)s, id, fire_key FROM matched
+            ON CONFLICT DO NOTHING
+            RETURNING user_id
+        )
+    """
+
+
+RULE_SQL = """
+    SELECT r.*, t.channel AS template_channel, t.body AS template_body
+    FROM automation_rules r
+    LEFT JOIN message_templates t ON t.id = r.template_id AND t.active
+"""
+
+
+def evaluate_rule(cursor, rule, full=False):
+    """
+    규칙 하나를 평가해 대상 회원에게 동작을 실행하고 워터마크를 옮깁니다 (호출한 쪽에서 커밋).
+    rule 은 RULE_SQL 로 읽은 행이며, 같은 트랜잭션에서 FOR UPDATE 로 잠가 두어야 합니다.
+    """
+    if rule['action'] == 'message' and not rule['template_channel']:
+        # 템플릿이 없거나 꺼져 있으면 실행 기록도 남기지 않아, 템플릿을 고친 뒤 대상 회원이 받게 합니다.
+        return {"ruleId": rule['id'], "fired": 0, "queued": 0, "skipped": "템플릿이 없거나 비활성입니다."}
+    started = time.perf_counter()
+    cursor.execute("SELECT LOCALTIMESTAMP AS now, CURRENT_DATE AS today, "
+                   "(SELECT COALESCE(MAX(id), 0) FROM attendance) AS attendance_id")
+    mark = cursor.fetchone()
+    incremental = not full and rule['last_evaluated_at'] is not None
+    where, params = compile_rule(rule['conditions'], incremental)
+    if incremental:
+        params.update(last_date=rule['last_evaluated_date'],
+                      since=rule['last_evaluated_at'] - timedelta(seconds=AUTOMATION_LAG_SECONDS),
+                      attendance_id=(rule['last_attendance_id'] or 0) - AUTOMATION_ATTENDANCE_OVERLAP)
+    params['rule_id'] = rule['id']
+
+    queued = 0
+    if rule['action'] == 'message':
+        template = {"id": rule['template_id'], "channel": rule['template_channel'], "body": rule['template_body']}
+        queued = messaging.enqueue_template(cursor, template, "u.id IN (SELECT user_id FROM fired)", params,
+                                            with_sql=_matched_sql(where))
+        # fired_at 은 트랜잭션 시작 시각(= mark['now'])이므로 이번 평가에서 넣은 행만 셉니다.
+        cursor.execute("SELECT COUNT(*) AS fired FROM automation_firings WHERE rule_id = %s AND fired_at = %s",
+                       (rule['id'], mark['now']))
+    else:
+        cursor.execute(f"WITH {_matched_sql(where)} SELECT COUNT(*) AS fired FROM fired", params)
+    fired = cursor.fetchone()['fired']
+
+    duration_ms = round((time.perf_counter() - started) * 1000)
+    cursor.execute("""
+        UPDATE automation_rules
+        SET last_evaluated_at = %s, last_evaluated_date = %s, last_attendance_id = %s, last_duration_ms = %s
+        WHERE id = %s
+    """, (mark['now'], mark['today'], mark['attendance_id'], duration_ms, rule['id']))
+    return {"ruleId": rule['id'], "fired": fired, "queued": queued, "incremental": incremental,
+            "durationMs": duration_ms}
+
+
+def run_rule(rule_id, full=False):
+    """규칙 하나를 자체 트랜잭션에서 평가합니다. 다른 곳에서 평가 중이면 None 을 돌려줍니다."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute(RULE_SQL + " WHERE r.id = %s FOR UPDATE OF r SKIP LOCKED", (rule_id,))
+        rule = cursor.fetchone()
+        if not rule:
+            conn.rollback()
+            return None
+        result = evaluate_rule(cursor, rule, full)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db.return_connection(conn)
+    if result['queued']:
+        messaging.dispatcher.wake()
+    return result
+
+
+def evaluate_all(full=False):
+    """스케줄러 진입점: 활성 규칙을 차례로 평가합니다. 한 규칙이 실패해도 나머지는 계속합니다."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM automation_rules WHERE active ORDER BY id")
+        rule_ids = [row[0] for row in cursor.fetchall()]
+        conn.commit()
+    finally:
+        db.return_connection(conn)
+
+    started = time.perf_counter()
+    results, errors = [], {}
+    for rule_id in rule_ids:
+        try:
+            result = run_rule(rule_id, full)
+        except Exception as e:
+            errors[rule_id] = str(e)
+            print(f"[AUTOMATION] rule {rule_id} failed: {e}")
+            continue
+        if result:
+            results.append(result)
+    summary = {"rules": len(results), "fired": sum(r['fired'] for r in results),
+               "queued": sum(r['queued'] for r in results), "errors": errors,
+               "durationMs": round((time.perf_counter() - started) * 1000)}
+    if summary['fired'] or errors:
+        print(f"[AUTOMATION] {summary['rules']} rules, fired {summary['fired']}, queued {summary['queued']}, "
+              f"{summary['durationMs']} ms, errors {len(errors)}")
+    return dict(summary, results=results)
+
+
+def preview(cursor, conditions, limit=20):
+    """조건에 맞는 전체 회원 수와 일부 목록 (실행하지 않음)"""
+    where, params = compile_rule(conditions, incremental=False)
+    cursor.execute(f"SELECT COUNT(*) AS count FROM users u WHERE {where}", params)
+    count = cursor.fetchone()['count']
+    cursor.execute(f"""
+        SELECT u.id, u.name, u.phone, u.end_date, u.remaining FROM users u
+        WHERE {where} ORDER BY u.id LIMIT %(limit)s
+    """, dict(params, limit=limit))
+    return count, cursor.fetchall()
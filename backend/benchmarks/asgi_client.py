@@ -0,0 +1,95 @@
+"""
+벤치마크용 최소 ASGI 클라이언트
+
+네트워크/소켓을 거치지 않고 FastAPI 앱을 프로세스 안에서 직접 호출합니다.
+측정값에는 라우팅, 검증, 핸들러, DB 왕복, 직렬화 비용만 포함됩니다.
+"""
+import asyncio
+import json
+import os
+import sys
+import uuid
+from urllib.parse import urlencode
+
+# backend/ 모듈(database, routers, main)을 import 할 수 있도록 경로 추가
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+def encode_multipart(field, filename, content, content_type):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode('utf-8') + content + f"\r\n--{boundary}--\r\n".encode('utf-8')
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+async def request(app, method, path, params=None, json_body=None, body=b'', headers=None):
+    """app에 HTTP 요청 하나를 보내고 Response를 돌려줍니다."""
+    raw_headers = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in (headers or {}).items()]
+    if json_body is not None:
+        body = json.dumps(json_body, default=str).encode('utf-8')
+        raw_headers.append((b'content-type', b'application/json'))
+    raw_headers.append((b'content-length', str(len(body)).encode('latin-1')))
+    raw_headers.append((b'host', b'bench'))
+
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode('utf-8'),
+        'query_string': urlencode(params or {}, doseq=True).encode('latin-1'),
+        'headers': raw_headers,
+        'client': ('127.0.0.1', 50000),
+        'server': ('bench', 80),
+        'root_path': '',
+    }
+
+    sent = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        # 응답이 끝날 때까지 연결이 살아 있는 것처럼 기다립니다 (FileResponse 등은 끊김을 감시합니다).
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    status = None
+    response_headers = {}
+    chunks = []
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+            for key, value in message.get('headers', []):
+                response_headers[key.decode('latin-1')] = value.decode('latin-1')
+        elif message['type'] == 'http.response.body':
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                finished.set()
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        finished.set()
+    return Response(status, response_headers, b''.join(chunks))
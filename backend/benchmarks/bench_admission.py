@@ -0,0 +1,153 @@
+"""
+수락 제어 부하 테스트
+
+출석 체크를 일정한 동시성으로 보내면서 지연 시간을 재고,
+1) 단독으로 실행했을 때와 2) 엑셀 내보내기 N개(기본 10개)가 동시에 계속 돌 때를 비교합니다.
+내보내기는 매번 벤치마크용 상품을 건드려 내용 버전을 올리므로 캐시된 파일이 아니라 실제로 다시 만들어집니다.
+
+결과에는 출석 체크 p50/p99, 내보내기 성공/503 수, 실행 중 관찰된 등급별 최대 대기열 길이가 들어갑니다.
+
+사용 예 (backend/ 에서, generate_data.py 로 데이터를 적재한 뒤):
+    python benchmarks/bench_admission.py --checkins 500 --exports 10
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import timedelta
+
+from asgi_client import request
+
+import admission
+from bench_api import BENCH_DATE, BENCH_PREFIX, cleanup, load_context, summarize
+from database import db
+import main
+
+
+async def run_checkins(app, ctx, count, concurrency, day_offset):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        body = {"userId": ctx["user_ids"][i % len(ctx["user_ids"])],
+                "date": str(BENCH_DATE + timedelta(days=day_offset + i // 1440)),
+                "time": f"{(i // 60) % 24:02d}:{i % 60:02d}", "status": "Present"}
+        async with semaphore:
+            started = time.perf_counter()
+            response = await request(app, "POST", "/api/attendance/", json_body=body)
+            latencies.append(time.perf_counter() - started)
+        if response.status != 201:
+            errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def _bump_product(product_id):
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE products SET price = price WHERE id = %s", (product_id,))
+        conn.commit()
+    finally:
+        db.return_connection(conn)
+
+
+async def run_exports(app, product_id, workers, stop):
+    counts = {"ok": 0, "overloaded": 0, "other": 0}
+
+    async def worker():
+        while not stop.is_set():
+            await asyncio.to_thread(_bump_product, product_id)
+            response = await request(app, "GET", "/api/users/export")
+            if response.status == 200:
+                counts["ok"] += 1
+            elif response.status == 503:
+                counts["overloaded"] += 1
+                await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+            else:
+                counts["other"] += 1
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return counts
+
+
+async def sample_queues(stop, peaks):
+    while not stop.is_set():
+        for name, stats in admission.metrics().items():
+            peaks[name] = max(peaks.get(name, 0), stats["waiting"])
+        peaks["pool_in_use"] = max(peaks.get("pool_in_use", 0), db.pool_stats()["inUse"])
+        await asyncio.sleep(0.01)
+
+
+def _create_bench_product():
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO products (name, reg_months) VALUES (%s, 1) RETURNING id",
+                       (f"{BENCH_PREFIX}-admission",))
+        product_id = cursor.fetchone()[0]
+        conn.commit()
+        return product_id
+    finally:
+        db.return_connection(conn)
+
+
+async def run(args):
+    db.initialize()
+    ctx = load_context()
+    product_id = _create_bench_product()
+    app = main.app
+    try:
+        baseline = await run_checkins(app, ctx, args.checkins, args.concurrency, day_offset=0)
+        print(f"check-in alone      p50 {baseline['p50_ms']:>9} ms  p99 {baseline['p99_ms']:>9} ms  "
+              f"errors {baseline['errors']}")
+
+        stop = asyncio.Event()
+        peaks = {}
+        exports = asyncio.create_task(run_exports(app, product_id, args.exports, stop))
+        sampler = asyncio.create_task(sample_queues(stop, peaks))
+        await asyncio.sleep(args.warmup)
+        loaded = await run_checkins(app, ctx, args.checkins, args.concurrency, day_offset=100)
+        stop.set()
+        export_counts = await exports
+        await sampler
+        print(f"check-in + exports  p50 {loaded['p50_ms']:>9} ms  p99 {loaded['p99_ms']:>9} ms  "
+              f"errors {loaded['errors']}")
+        print(f"exports: {export_counts}  peak queue depth: {peaks}")
+    finally:
+        cleanup()
+        db.close_all()
+
+    return {
+        "checkins": args.checkins,
+        "concurrency": args.concurrency,
+        "exports": args.exports,
+        "checkin_alone": baseline,
+        "checkin_with_exports": loaded,
+        "export_results": export_counts,
+        "peak_queue_depth": peaks,
+        "admission": admission.metrics(),
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="수락 제어 부하 테스트 (출석 체크 vs 동시 내보내기)")
+    parser.add_argument('--checkins', type=int, default=500, help="단계별 출석 체크 요청 수")
+    parser.add_argument('--concurrency', type=int, default=8, help="출석 체크 동시 요청 수")
+    parser.add_argument('--exports', type=int, default=10, help="동시에 반복 실행할 내보내기 수")
+    parser.add_argument('--warmup', type=float, default=1.0, help="내보내기 시작 후 측정 전 대기 초")
+    parser.add_argument('--output', help="결과 JSON 경로")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main_cli()
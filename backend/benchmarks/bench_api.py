@@ -0,0 +1,368 @@
+"""
+API 벤치마크 스위트
+
+모든 라우터 엔드포인트를 ASGI 앱을 통해 프로세스 안에서 호출하고
+엔드포인트별 처리량(req/s)과 지연 시간 백분위수를 JSON으로 기록합니다.
+
+먼저 generate_data.py 로 원하는 규모의 데이터를 적재한 뒤 실행하세요.
+
+사용 예 (backend/ 에서):
+    python benchmarks/bench_api.py --requests 200 --concurrency 8 --output benchmarks/baseline.json
+    python benchmarks/bench_api.py --compare benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from asgi_client import request, encode_multipart
+
+from database import db
+import main
+
+# 쓰기 벤치마크가 만든 출석 기록은 이 날짜 이후에 기록되고 종료 시 정리됩니다.
+BENCH_DATE = date(2099, 1, 1)
+BENCH_PREFIX = "bench"
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+def summarize(latencies, wall, errors):
+    values = sorted(latencies)
+    ms = lambda v: round(v * 1000, 3) if v is not None else None
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / wall, 2) if wall > 0 else None,
+        "p50_ms": ms(percentile(values, 50)),
+        "p90_ms": ms(percentile(values, 90)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1] if values else None),
+    }
+
+
+def load_context():
+    """벤치마크 요청에 사용할 실제 ID 샘플을 DB에서 가져옵니다."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM users ORDER BY random() LIMIT 1000")
+        user_ids = [r[0] for r in cursor.fetchall()]
+        cursor.execute("SELECT id FROM products WHERE active = true ORDER BY id")
+        product_ids = [r[0] for r in cursor.fetchall()]
+        cursor.execute("SELECT id FROM coaches ORDER BY id")
+        coach_ids = [r[0] for r in cursor.fetchall()]
+        cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM sync_changes")
+        sync_token = cursor.fetchone()[0]
+        cursor.execute("SELECT MIN(date), MAX(date) FROM attendance")
+        first_day, last_day = cursor.fetchone()
+        cursor.execute("SELECT (SELECT COUNT(*) FROM users), (SELECT COUNT(*) FROM attendance), "
+                       "(SELECT COUNT(*) FROM products), (SELECT COUNT(*) FROM coaches)")
+        users, attendance, products, coaches = cursor.fetchone()
+    finally:
+        db.return_connection(conn)
+
+    if not user_ids or not product_ids:
+        sys.exit("❌ 회원/상품 데이터가 없습니다. 먼저 generate_data.py 를 실행하세요.")
+
+    last_day = last_day or date.today()
+    return {
+        "user_ids": user_ids,
+        "product_ids": product_ids,
+        "coach_ids": coach_ids or ['C001'],
+        "sync_token": sync_token,
+        "range_start": str(max(first_day or last_day, last_day - timedelta(days=30))),
+        "range_end": str(last_day),
+        "dataset": {"users": users, "attendance": attendance, "products": products, "coaches": coaches},
+        "created_users": [],
+        "created_products": [],
+        "created_coaches": [],
+        "created_admins": [],
+    }
+
+
+def _upload_workbook(rows):
+    import openpyxl
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(['이름', '성별', '전화번호', '상품명', '접수일', '시작일', '종료일', '잔여 횟수'])
+    for row in rows:
+        ws.append(row)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# 시나리오: (이름, 요청 생성 함수, 허용 상태 코드, 순차 실행 여부)
+# 요청 생성 함수는 (i, ctx) 를 받아 request() 인자 dict 를 돌려줍니다.
+# 응답 처리가 필요한 시나리오는 on_response(i, ctx, response) 를 가집니다.
+# ---------------------------------------------------------------------------
+
+def _pick(seq, i):
+    return seq[i % len(seq)]
+
+
+def _bench_name(kind, i):
+    return f"{BENCH_PREFIX}-{kind}-{i}"
+
+
+SCENARIOS = [
+    # --- 조회 ---
+    dict(name="health", build=lambda i, c: dict(method="GET", path="/api/health")),
+    dict(name="users.list", build=lambda i, c: dict(method="GET", path="/api/users/")),
+    dict(name="users.search", build=lambda i, c: dict(method="GET", path="/api/users/",
+                                                      params={"search": f"010-{i % 100:04d}"})),
+    dict(name="users.by_product", build=lambda i, c: dict(method="GET", path="/api/users/",
+                                                          params={"type": str(_pick(c["product_ids"], i))})),
+    dict(name="users.get", build=lambda i, c: dict(method="GET", path=f"/api/users/{_pick(c['user_ids'], i)}")),
+    dict(name="users.profile", build=lambda i, c: dict(method="GET",
+                                                       path=f"/api/users/{_pick(c['user_ids'], i)}/profile")),
+    dict(name="users.export", build=lambda i, c: dict(method="GET", path="/api/users/export",
+                                                      params={"type": str(_pick(c["product_ids"], i))}),
+         heavy=True),
+    dict(name="users.template", build=lambda i, c: dict(method="GET", path="/api/users/template")),
+    dict(name="users.duplicates", build=lambda i, c: dict(method="GET", path="/api/users/duplicates"),
+         heavy=True),
+    dict(name="attendance.list_range", build=lambda i, c: dict(method="GET", path="/api/attendance/",
+                                                               params={"startDate": c["range_end"],
+                                                                       "endDate": c["range_end"]})),
+    dict(name="attendance.list_user", build=lambda i, c: dict(method="GET", path="/api/attendance/",
+                                                              params={"userId": _pick(c["user_ids"], i)})),
+    dict(name="attendance.stats", build=lambda i, c: dict(method="GET", path="/api/attendance/stats",
+                                                          params={"startDate": c["range_start"],
+                                                                  "endDate": c["range_end"]})),
+    dict(name="attendance.heatmap", build=lambda i, c: dict(method="GET", path="/api/attendance/heatmap",
+                                                            params={"startDate": "2015-01-01",
+                                                                    "endDate": c["range_end"]})),
+    dict(name="attendance.streak", build=lambda i, c: dict(method="GET",
+                                                           path=f"/api/attendance/streak/{_pick(c['user_ids'], i)}")),
+    dict(name="attendance.frequency", build=lambda i, c: dict(method="GET", path="/api/attendance/frequency",
+                                                              params={"endDate": c["range_end"], "days": 30,
+                                                                      "minDays": 8})),
+    dict(name="products.list", build=lambda i, c: dict(method="GET", path="/api/products/")),
+    dict(name="coaches.list", build=lambda i, c: dict(method="GET", path="/api/coaches/")),
+    dict(name="coaches.get", build=lambda i, c: dict(method="GET", path=f"/api/coaches/{_pick(c['coach_ids'], i)}")),
+    dict(name="coaches.workload", build=lambda i, c: dict(method="GET",
+                                                          path=f"/api/coaches/{_pick(c['coach_ids'], i)}/workload")),
+    dict(name="reports.payroll", build=lambda i, c: dict(method="GET", path="/api/reports/payroll")),
+    dict(name="admins.list", build=lambda i, c: dict(method="GET", path="/api/admins/")),
+    dict(name="dashboard.summary", build=lambda i, c: dict(method="GET", path="/api/dashboard/summary")),
+    dict(name="analytics.retention", build=lambda i, c: dict(method="GET", path="/api/analytics/retention"),
+         heavy=True),
+    dict(name="analytics.churn_risk", build=lambda i, c: dict(method="GET", path="/api/analytics/churn-risk"),
+         heavy=True),
+    dict(name="sync.delta", build=lambda i, c: dict(method="GET", path="/api/sync/", params={"since": c["sync_token"]})),
+    dict(name="auth.login", build=lambda i, c: dict(method="POST", path="/api/auth/login",
+                                                    json_body={"username": "admin", "password": "1234"}),
+         ok=(200, 401)),
+
+    # --- 쓰기 (생성 → 수정 → 삭제 순서로 실행되어 데이터가 남지 않습니다) ---
+    dict(name="attendance.check_in", build=lambda i, c: dict(
+        method="POST", path="/api/attendance/",
+        json_body={"userId": _pick(c["user_ids"], i), "date": str(BENCH_DATE + timedelta(days=i // 1440)),
+                   "time": f"{(i // 60) % 24:02d}:{i % 60:02d}", "status": "Present"}),
+         ok=(201,)),
+    dict(name="users.create", build=lambda i, c: dict(
+        method="POST", path="/api/users/",
+        json_body={"name": _bench_name("user", i), "gender": "남", "phone": f"000-{c['run']}-{i}",
+                   "productId": _pick(c["product_ids"], i), "remaining": 10}),
+         ok=(201,), sequential=True, on_response=lambda i, c, r: c["created_users"].append(r.json()["id"])),
+    dict(name="users.update", build=lambda i, c: dict(
+        method="PUT", path=f"/api/users/{_pick(c['created_users'], i)}",
+        json_body={"name": _bench_name("user", i), "gender": "여", "phone": f"000-{c['run']}-{i}",
+                   "productId": _pick(c["product_ids"], i), "remaining": 5}),
+         needs="created_users"),
+    dict(name="users.delete", build=lambda i, c: dict(method="DELETE", path=f"/api/users/{c['created_users'][i]}"),
+         needs="created_users", exact=True),
+    dict(name="products.create", build=lambda i, c: dict(
+        method="POST", path="/api/products/",
+        json_body={"name": _bench_name("product", i), "regMonths": 3, "price": 1000}),
+         ok=(201,), on_response=lambda i, c, r: c["created_products"].append(r.json()["id"])),
+    dict(name="products.update", build=lambda i, c: dict(
+        method="PUT", path=f"/api/products/{_pick(c['created_products'], i)}",
+        json_body={"name": _bench_name("product", i), "regMonths": 6, "price": 2000}),
+         needs="created_products"),
+    dict(name="products.delete", build=lambda i, c: dict(method="DELETE",
+                                                         path=f"/api/products/{c['created_products'][i]}"),
+         needs="created_products", exact=True),
+    dict(name="coaches.create", build=lambda i, c: dict(
+        method="POST", path="/api/coaches/", json_body={"name": _bench_name("coach", i)}),
+         sequential=True, on_response=lambda i, c, r: c["created_coaches"].append(r.json()["id"])),
+    dict(name="coaches.update", build=lambda i, c: dict(
+        method="PUT", path=f"/api/coaches/{_pick(c['created_coaches'], i)}", json_body={"status": "inactive"}),
+         needs="created_coaches"),
+    dict(name="coaches.delete", build=lambda i, c: dict(method="DELETE",
+                                                        path=f"/api/coaches/{c['created_coaches'][i]}"),
+         needs="created_coaches", exact=True),
+    dict(name="admins.create", build=lambda i, c: dict(
+        method="POST", path="/api/admins/",
+        json_body={"username": f"{_bench_name('admin', i)}-{c['run']}", "password": "bench", "name": "bench"}),
+         on_response=lambda i, c, r: c["created_admins"].append(r.json()["id"])),
+    dict(name="admins.update", build=lambda i, c: dict(
+        method="PUT", path=f"/api/admins/{_pick(c['created_admins'], i)}", json_body={"name": "bench2"}),
+         needs="created_admins"),
+    dict(name="admins.delete", build=lambda i, c: dict(method="DELETE",
+                                                       path=f"/api/admins/{c['created_admins'][i]}"),
+         needs="created_admins", exact=True),
+    dict(name="upload.users", build=lambda i, c: dict(method="POST", path="/api/upload/upload-users",
+                                                      **_upload_request(i, c)),
+         sequential=True, heavy=True),
+]
+
+
+def _upload_request(i, ctx):
+    rows = [[_bench_name("upload", f"{i}-{n}"), '남', f"000-{ctx['run']}-u{i}-{n}", None,
+             '2026-01-01', '2026-01-01', None, 10] for n in range(50)]
+    body, content_type = encode_multipart(
+        'file', 'bench.xlsx', _upload_workbook(rows),
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    return {"body": body, "headers": {"content-type": content_type}}
+
+
+async def run_scenario(app, scenario, ctx, count, concurrency):
+    needs = scenario.get("needs")
+    if needs:
+        available = len(ctx[needs])
+        if not available:
+            return None
+        if scenario.get("exact"):
+            count = available
+    if scenario.get("heavy"):
+        count = max(1, count // 10)
+    if scenario.get("sequential"):
+        concurrency = 1
+
+    ok = scenario.get("ok", (200,))
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        nonlocal errors
+        kwargs = scenario["build"](i, ctx)
+        async with semaphore:
+            started = time.perf_counter()
+            response = await request(app, **kwargs)
+            latencies.append(time.perf_counter() - started)
+        if response.status not in ok:
+            errors += 1
+        elif scenario.get("on_response"):
+            scenario["on_response"](i, ctx, response)
+
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return summarize(latencies, time.perf_counter() - wall_started, errors)
+
+
+def cleanup():
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM attendance WHERE date >= %s", (BENCH_DATE,))
+        cursor.execute("DELETE FROM users WHERE name LIKE %s", (f"{BENCH_PREFIX}-%",))
+        cursor.execute("DELETE FROM products WHERE name LIKE %s", (f"{BENCH_PREFIX}-%",))
+        conn.commit()
+    finally:
+        db.return_connection(conn)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(baseline, current, threshold):
+    """기준선 대비 p99 지연 또는 처리량이 threshold(%) 이상 나빠진 엔드포인트 목록을 돌려줍니다."""
+    regressions = []
+    print(f"\n{'scenario':<24}{'p99 base':>10}{'p99 now':>10}{'Δ%':>8}{'rps base':>10}{'rps now':>10}{'Δ%':>8}")
+    for name, now in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base or not now or not base.get("p99_ms") or not base.get("throughput_rps"):
+            continue
+        p99_delta = (now["p99_ms"] - base["p99_ms"]) / base["p99_ms"] * 100
+        rps_delta = (now["throughput_rps"] - base["throughput_rps"]) / base["throughput_rps"] * 100
+        flag = ""
+        if p99_delta > threshold or rps_delta < -threshold:
+            regressions.append(name)
+            flag = "  ⚠️"
+        print(f"{name:<24}{base['p99_ms']:>10}{now['p99_ms']:>10}{p99_delta:>8.1f}"
+              f"{base['throughput_rps']:>10}{now['throughput_rps']:>10}{rps_delta:>8.1f}{flag}")
+    return regressions
+
+
+async def run(args):
+    db.initialize()
+    ctx = load_context()
+    ctx["run"] = datetime.now().strftime("%H%M%S")
+    selected = [s for s in SCENARIOS if not args.only or any(s["name"].startswith(p) for p in args.only)]
+
+    results = {}
+    try:
+        for scenario in selected:
+            summary = await run_scenario(main.app, scenario, ctx, args.requests, args.concurrency)
+            results[scenario["name"]] = summary
+            if summary:
+                print(f"{scenario['name']:<24} {summary['throughput_rps']:>9} req/s  "
+                      f"p50 {summary['p50_ms']:>9} ms  p99 {summary['p99_ms']:>9} ms  errors {summary['errors']}")
+    finally:
+        cleanup()
+        db.close_all()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "dataset": ctx["dataset"],
+        },
+        "results": results,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="API 처리량/지연 시간 벤치마크")
+    parser.add_argument('--requests', type=int, default=200, help="시나리오당 요청 수")
+    parser.add_argument('--concurrency', type=int, default=8, help="동시 요청 수")
+    parser.add_argument('--only', nargs='*', help="이 접두사로 시작하는 시나리오만 실행 (예: users attendance)")
+    parser.add_argument('--output', help="결과를 저장할 JSON 경로 (기준선)")
+    parser.add_argument('--compare', help="비교할 기준선 JSON 경로")
+    parser.add_argument('--threshold', type=float, default=20.0, help="회귀로 판단할 변화율(%%)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n✅ Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print(f"\n❌ Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ No regressions.")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,43 @@
+"""
+인증 오버헤드 마이크로 벤치마크
+
+요청마다 실행되는 토큰 검증(서명 + 만료 + 폐기 캐시 확인)의 비용을 µs 단위로,
+로그인 때만 실행되는 비밀번호 해시 검증 비용을 ms 단위로 측정합니다. DB 연결이 필요 없습니다.
+
+사용 예 (backend/ 에서):
+    python benchmarks/bench_auth.py
+"""
+import time
+import timeit
+
+import asgi_client  # noqa: F401  (backend 경로 설정)
+import security
+
+
+def main():
+    admin = {"id": 1, "username": "admin", "name": "관리자", "role": "admin", "token_version": 1}
+    # 폐기 캐시를 DB 없이 채웁니다.
+    security.revocations._versions = {1: 1}
+    security.revocations.refreshed_at = time.time()
+
+    token = security.issue_token(admin)
+    header = f"Bearer {token}"
+    number = 100000
+
+    for label, func in [
+        ("issue_token", lambda: security.issue_token(admin)),
+        ("decode_token", lambda: security.decode_token(token)),
+        ("verify_token", lambda: security.verify_token(token)),
+        ("require_admin", lambda: security.require_admin(header)),
+    ]:
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        print(f"{label:<16} {seconds / number * 1e6:8.2f} µs/op")
+
+    stored = security.hash_password("1234")
+    seconds = min(timeit.repeat(lambda: security.verify_password("1234", stored), number=5, repeat=3))
+    print(f"{'verify_password':<16} {seconds / 5 * 1e3:8.2f} ms/op  ({security.PASSWORD_ITERATIONS} iterations)")
+    print(f"token size: {len(token)} bytes")
+
+
+if __name__ == "__main__":
+    main()
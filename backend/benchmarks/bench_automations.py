@@ -0,0 +1,120 @@
+"""
+자동화 규칙 평가 시간 측정
+
+조건 조합이 다른 규칙 --rules 개(record 동작: 대상 기록만)를 만들고
+1) 전체 평가 (워터마크 없음), 2) 바로 이어서 증분 평가, 3) 회원 --touch 명 수정 후 증분 평가
+시간을 잽니다. 끝나면 벤치마크 규칙과 실행 기록을 지웁니다.
+
+사용 예 (backend/ 에서, generate_data.py 로 회원 10만 명을 적재한 뒤):
+    python benchmarks/bench_automations.py --rules 50
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime
+
+import asgi_client  # noqa: F401  (backend 경로 설정)
+import psycopg2.extras
+
+from database import db
+import automations
+
+PREFIX = f"bench-{datetime.now().strftime('%H%M%S')}"
+
+
+def _rule_conditions(rng):
+    kind = rng.choice(["remaining", "expiry", "expired", "inactive", "mixed"])
+    if kind == "remaining":
+        return [{"type": "remaining_lte", "value": rng.randint(1, 5)}]
+    if kind == "expiry":
+        return [{"type": "end_within_days", "value": rng.randint(3, 30)}]
+    if kind == "expired":
+        return [{"type": "expired_within_days", "value": rng.randint(7, 60)}]
+    if kind == "inactive":
+        return [{"type": "no_attendance_days", "value": rng.randint(7, 30)}]
+    return [{"type": "end_within_days", "value": rng.randint(7, 30)},
+            {"type": "no_attendance_days", "value": rng.randint(7, 21)}]
+
+
+def _setup(count):
+    rng = random.Random(7)
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        for i in range(count):
+            cursor.execute("""
+                INSERT INTO automation_rules (name, conditions, action) VALUES (%s, %s, 'record')
+            """, (f"{PREFIX}-{i}", psycopg2.extras.Json(_rule_conditions(rng))))
+        cursor.execute("UPDATE automation_rules SET active = FALSE WHERE name NOT LIKE %s AND active RETURNING id",
+                       (f"{PREFIX}-%",))
+        paused = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT COUNT(*) FROM users")
+        members = cursor.fetchone()[0]
+        conn.commit()
+        return paused, members
+    finally:
+        db.return_connection(conn)
+
+
+def _touch(count):
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE users SET updated_at = CURRENT_TIMESTAMP
+            WHERE id IN (SELECT id FROM users ORDER BY random() LIMIT %s)
+        """, (count,))
+        conn.commit()
+    finally:
+        db.return_connection(conn)
+
+
+def _teardown(paused):
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM automation_rules WHERE name LIKE %s", (f"{PREFIX}-%",))
+        cursor.execute("UPDATE automation_rules SET active = TRUE WHERE id = ANY(%s)", (paused,))
+        conn.commit()
+    finally:
+        db.return_connection(conn)
+
+
+def _measure(label, full=False):
+    started = time.perf_counter()
+    summary = automations.evaluate_all(full)
+    elapsed = time.perf_counter() - started
+    slowest = max(summary['results'], key=lambda r: r['durationMs'], default=None)
+    print(f"{label:<12} {summary['rules']} rules  {elapsed:.2f} s  fired {summary['fired']}  "
+          f"slowest rule {slowest and slowest['durationMs']} ms  errors {len(summary['errors'])}")
+    return {"seconds": round(elapsed, 3), "fired": summary['fired'], "errors": summary['errors'],
+            "slowestMs": slowest and slowest['durationMs']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="자동화 규칙 평가 시간 측정")
+    parser.add_argument('--rules', type=int, default=50, help="규칙 수")
+    parser.add_argument('--touch', type=int, default=1000, help="증분 평가 전에 수정할 회원 수")
+    parser.add_argument('--output', help="결과 JSON 경로")
+    args = parser.parse_args()
+
+    db.initialize()
+    paused, members = _setup(args.rules)
+    print(f"members {members}, rules {args.rules} (other active rules paused: {len(paused)})")
+    report = {"members": members, "rules": args.rules}
+    try:
+        report["full"] = _measure("full")
+        report["incremental"] = _measure("incremental")
+        _touch(args.touch)
+        report["touched"] = _measure(f"touched {args.touch}")
+    finally:
+        _teardown(paused)
+        db.close_all()
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+출석 비트맵 조회 비교
+
+같은 질문을 원본 출석을 훑는 쿼리와 비트맵(attendance_bitmaps) 쿼리로 각각 --repeat 번 실행해 지연 p50/p99 를 비교합니다.
+- cohort  : --end-date 까지 최근 --days 일 동안 --min-days 일 이상 출석한 회원 수
+- member  : 회원 한 명의 최근 12개월 출석일 (연속 출석 계산의 입력)
+비트맵 테이블의 크기(회원-월당 바이트)도 함께 출력합니다.
+
+사용 예 (backend/ 에서, generate_data.py 로 데이터를 적재하고 migrate.py 를 실행한 뒤):
+    python benchmarks/bench_bitmaps.py --repeat 50 --days 30 --min-days 8
+"""
+import argparse
+import json
+import time
+from datetime import date, timedelta
+
+import psycopg2.extras
+
+from bench_api import summarize
+from database import db
+import attendance_bitmaps
+
+SCAN_COHORT_SQL = """
+    SELECT COUNT(*) AS total FROM (
+        SELECT user_id FROM attendance
+        WHERE date >= %(start)s AND date <= %(end)s
+        GROUP BY user_id
+        HAVING COUNT(DISTINCT date) >= %(min_days)s
+    ) c
+"""
+
+SCAN_MEMBER_SQL = """
+    SELECT DISTINCT date FROM attendance WHERE user_id = %s AND date >= %s ORDER BY date
+"""
+
+
+def timed(func, repeat):
+    latencies = []
+    started = time.perf_counter()
+    result = None
+    for i in range(repeat):
+        call_started = time.perf_counter()
+        result = func(i)
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(latencies, time.perf_counter() - started, 0), result
+
+
+def _print(label, result):
+    print(f"  {label:<10} p50 {result['p50_ms']:>9} ms  p99 {result['p99_ms']:>9} ms")
+
+
+def run(args):
+    db.initialize()
+    conn = db.get_connection()
+    report = {"repeat": args.repeat, "days": args.days, "minDays": args.min_days}
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute("""
+            SELECT COUNT(*) AS rows, pg_table_size('attendance_bitmaps') AS table_bytes,
+                   pg_total_relation_size('attendance_bitmaps') AS total_bytes,
+                   (SELECT COUNT(*) FROM attendance) AS attendance_rows,
+                   pg_total_relation_size('attendance') AS attendance_bytes
+            FROM attendance_bitmaps
+        """)
+        size = cursor.fetchone()
+        report["size"] = dict(size)
+        per_row = size["table_bytes"] / size["rows"] if size["rows"] else 0
+        print(f"bitmaps: {size['rows']:,} member-month(s), {size['total_bytes'] / 1024 / 1024:.1f} MB "
+              f"({per_row:.0f} bytes/row incl. tuple header) vs attendance {size['attendance_rows']:,} row(s), "
+              f"{size['attendance_bytes'] / 1024 / 1024:.1f} MB")
+
+        end = args.end_date or date.today()
+        start = end - timedelta(days=args.days - 1)
+        params = {"start": start, "end": end, "min_days": args.min_days}
+
+        def scan_cohort(_):
+            cursor.execute(SCAN_COHORT_SQL, params)
+            return cursor.fetchone()["total"]
+
+        def bitmap_cohort(_):
+            return attendance_bitmaps.frequency_cohort(cursor, start, end, args.min_days, limit=0)["count"]
+
+        print(f"\ncohort: {start} ~ {end}, >= {args.min_days} day(s)")
+        scan, scan_count = timed(scan_cohort, args.repeat)
+        bitmap, bitmap_count = timed(bitmap_cohort, args.repeat)
+        _print("scan", scan)
+        _print("bitmap", bitmap)
+        if scan_count != bitmap_count:
+            print(f"[WARN] 결과가 다릅니다: scan {scan_count} / bitmap {bitmap_count} (비트맵 재계산 필요)")
+        report["cohort"] = {"scan": scan, "bitmap": bitmap, "members": bitmap_count}
+
+        cursor.execute("SELECT user_id FROM attendance_bitmaps GROUP BY user_id LIMIT %s", (args.repeat,))
+        user_ids = [r["user_id"] for r in cursor.fetchall()] or [""]
+        since = end - timedelta(days=365)
+
+        def scan_member(i):
+            cursor.execute(SCAN_MEMBER_SQL, (user_ids[i % len(user_ids)], since))
+            return len(cursor.fetchall())
+
+        def bitmap_member(i):
+            return attendance_bitmaps.member_summary(cursor, user_ids[i % len(user_ids)], 12, end)
+
+        print("\nmember (12 months)")
+        report["member"] = {"scan": timed(scan_member, args.repeat)[0],
+                            "bitmap": timed(bitmap_member, args.repeat)[0]}
+        _print("scan", report["member"]["scan"])
+        _print("bitmap", report["member"]["bitmap"])
+        conn.commit()
+    finally:
+        db.return_connection(conn)
+        db.close_all()
+    return report
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="출석 비트맵 조회 비교")
+    parser.add_argument('--repeat', type=int, default=50, help="쿼리마다 실행 횟수")
+    parser.add_argument('--days', type=int, default=30, help="코호트 기간 (일)")
+    parser.add_argument('--min-days', type=int, default=8, help="코호트 최소 출석일")
+    parser.add_argument('--end-date', type=date.fromisoformat, help="코호트 기간 끝 (기본 오늘)")
+    parser.add_argument('--output', help="결과 JSON 경로")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+
+
+if __name__ == "__main__":
+    main_cli()
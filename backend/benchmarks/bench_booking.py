@@ -0,0 +1,188 @@
+"""
+수업 예약 동시성 테스트
+
+1) 경쟁: 정원 6명인 수업 하나에 서로 다른 회원 500명이 동시에 예약합니다.
+   정확히 6건만 201 이고 나머지는 409 여야 하며, DB 의 카운터와 예약 행 수도 6 이어야 합니다.
+2) 처리량: 여러 수업(정원 + 대기열)에 무작위 회원 예약을 동시에 보내 req/s 와 지연 시간을 잽니다.
+3) 취소: 확정 예약의 절반을 동시에 취소해 대기자 승격을 확인합니다.
+각 단계 뒤에 모든 수업에서 booked 카운터 = 자리를 차지한 예약 수 ≤ 정원 인지 검사합니다.
+
+500 개 요청이 모두 DB 까지 가도록 쓰기 등급의 대기열/대기 시간을 늘려서 실행합니다
+(ADMISSION_WRITE_QUEUE, ADMISSION_WRITE_WAIT 로 바꿀 수 있습니다).
+
+사용 예 (backend/ 에서, generate_data.py 로 회원을 1000명 이상 적재한 뒤):
+    python benchmarks/bench_booking.py --clients 500 --capacity 6
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("ADMISSION_WRITE_QUEUE", "5000")
+os.environ.setdefault("ADMISSION_WRITE_WAIT", "120")
+
+from asgi_client import request
+
+from bench_api import load_context, summarize
+from database import db
+import main
+
+
+def _setup(sessions, capacity, waitlist):
+    """벤치마크용 코치와 수업을 만들고 (코치 id, [수업 id...]) 를 돌려줍니다."""
+    coach_id = f"CB{datetime.now().strftime('%H%M%S')}"
+    starts_at = datetime.now().replace(microsecond=0) + timedelta(days=30)
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO coaches (id, name, specialty) VALUES (%s, %s, 'FPT')",
+                       (coach_id, "bench-booking"))
+        session_ids = []
+        for i in range(sessions):
+            cursor.execute("""
+                INSERT INTO coach_sessions (coach_id, title, starts_at, ends_at, capacity, waitlist_limit)
+                VALUES (%s, %s, %s, %s, %s, %s) RETURNING id
+            """, (coach_id, f"bench-{i}", starts_at + timedelta(hours=i), starts_at + timedelta(hours=i, minutes=50),
+                  capacity, waitlist))
+            session_ids.append(cursor.fetchone()[0])
+        conn.commit()
+        return coach_id, session_ids
+    finally:
+        db.return_connection(conn)
+
+
+def _teardown(coach_id):
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM coaches WHERE id = %s", (coach_id,))
+        conn.commit()
+    finally:
+        db.return_connection(conn)
+
+
+def check_invariants(session_ids):
+    """카운터와 실제 예약 수가 다르거나 정원을 넘은 수업 목록을 돌려줍니다."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT s.id, s.capacity, s.booked, s.waitlisted,
+                   COUNT(b.id) FILTER (WHERE b.status IN ('booked', 'attended', 'no_show')),
+                   COUNT(b.id) FILTER (WHERE b.status = 'waitlisted')
+            FROM coach_sessions s LEFT JOIN session_bookings b ON b.session_id = s.id
+            WHERE s.id = ANY(%s)
+            GROUP BY s.id
+        """, (session_ids,))
+        rows = cursor.fetchall()
+        conn.commit()
+    finally:
+        db.return_connection(conn)
+    return [{"session": r[0], "capacity": r[1], "booked": r[2], "waitlisted": r[3], "seatedRows": r[4],
+             "waitlistedRows": r[5]}
+            for r in rows if r[2] != r[4] or r[3] != r[5] or r[4] > r[1]]
+
+
+async def _fire(app, calls, concurrency):
+    """calls: [(method, path, body)] 를 동시에 보내고 (응답 목록, 요약) 을 돌려줍니다."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    responses = [None] * len(calls)
+
+    async def one(i, method, path, body):
+        async with semaphore:
+            started = time.perf_counter()
+            responses[i] = await request(app, method, path, json_body=body)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i, *call) for i, call in enumerate(calls)))
+    errors = sum(1 for r in responses if r.status >= 500)
+    return responses, summarize(latencies, time.perf_counter() - started, errors)
+
+
+def _status_counts(responses):
+    counts = {}
+    for r in responses:
+        counts[r.status] = counts.get(r.status, 0) + 1
+    return counts
+
+
+async def run(args):
+    db.initialize()
+    ctx = load_context()
+    users = ctx["user_ids"]
+    if len(users) < args.clients:
+        sys.exit(f"❌ 회원이 {args.clients}명 이상 필요합니다 (현재 샘플 {len(users)}명).")
+    app = main.app
+    report = {}
+
+    # 1) 한 수업에 500명 경쟁
+    coach_id, (race_session,) = _setup(1, args.capacity, 0)
+    try:
+        calls = [("POST", f"/api/sessions/{race_session}/bookings", {"userId": users[i]})
+                 for i in range(args.clients)]
+        responses, summary = await _fire(app, calls, args.clients)
+        counts = _status_counts(responses)
+        winners = counts.get(201, 0)
+        violations = check_invariants([race_session])
+        passed = winners == args.capacity and not violations and set(counts) <= {201, 409}
+        print(f"race: {args.clients} clients / {args.capacity} seats -> {counts}  "
+              f"{'✅ PASS' if passed else '❌ FAIL'}  ({summary['throughput_rps']} req/s, p99 {summary['p99_ms']} ms)")
+        report["race"] = {"clients": args.clients, "capacity": args.capacity, "statuses": counts,
+                          "winners": winners, "violations": violations, "passed": passed, "latency": summary}
+    finally:
+        _teardown(coach_id)
+
+    # 2) 여러 수업에 무작위 예약, 3) 확정 예약 절반 취소
+    coach_id, session_ids = _setup(args.sessions, args.capacity, args.waitlist)
+    try:
+        rng = random.Random(42)
+        calls = [("POST", f"/api/sessions/{rng.choice(session_ids)}/bookings", {"userId": rng.choice(users)})
+                 for _ in range(args.requests)]
+        responses, summary = await _fire(app, calls, args.concurrency)
+        violations = check_invariants(session_ids)
+        print(f"book:   {summary['throughput_rps']:>9} req/s  p50 {summary['p50_ms']} ms  p99 {summary['p99_ms']} ms  "
+              f"{_status_counts(responses)}  violations {len(violations)}")
+        report["booking"] = {"statuses": _status_counts(responses), "violations": violations, "latency": summary}
+
+        booked = [r.json() for r in responses if r.status == 201]
+        cancels = [("DELETE", f"/api/sessions/{b['sessionId']}/bookings/{b['id']}", None) for b in booked[::2]]
+        responses, summary = await _fire(app, cancels, args.concurrency)
+        promoted = sum(1 for r in responses if r.status == 200 and r.json().get("promoted"))
+        violations = check_invariants(session_ids)
+        print(f"cancel: {summary['throughput_rps']:>9} req/s  p50 {summary['p50_ms']} ms  p99 {summary['p99_ms']} ms  "
+              f"promoted {promoted}  violations {len(violations)}")
+        report["cancel"] = {"statuses": _status_counts(responses), "promoted": promoted,
+                            "violations": violations, "latency": summary}
+    finally:
+        _teardown(coach_id)
+        db.close_all()
+    return report
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="수업 예약 동시성 테스트")
+    parser.add_argument('--clients', type=int, default=500, help="한 수업에 동시에 예약하는 회원 수")
+    parser.add_argument('--capacity', type=int, default=6, help="수업 정원")
+    parser.add_argument('--sessions', type=int, default=50, help="처리량 단계의 수업 수")
+    parser.add_argument('--waitlist', type=int, default=3, help="처리량 단계의 대기 인원 한도")
+    parser.add_argument('--requests', type=int, default=2000, help="처리량 단계의 예약 요청 수")
+    parser.add_argument('--concurrency', type=int, default=32, help="처리량 단계의 동시 요청 수")
+    parser.add_argument('--output', help="결과 JSON 경로")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+    if not report["race"]["passed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,151 @@
+"""
+응답 압축/간결한 형식 비교
+
+회원 목록(GET /api/users/, 회원 1만 명 기준), 출석 목록, 상품 목록을 인코딩 조합별로 --repeat 번 요청하고
+- 전송 바이트 (본문 크기)
+- 서버 지연 p50/p99 (핸들러 + 직렬화 + 변환/압축)
+- 클라이언트 디코딩 시간 (압축 해제 + 파싱)
+- 종단 지연 추정: 서버 p50 + 전송 시간(--mbps 대역폭) + 디코딩
+을 표로 냅니다. brotli / msgpack 이 설치되어 있지 않으면 해당 조합은 건너뜁니다.
+같은 조회가 합쳐지거나 보관 응답이 재사용되지 않도록 single-flight 는 끄고 잽니다.
+
+사용 예 (backend/ 에서, generate_data.py --users 10000 으로 적재한 뒤):
+    python benchmarks/bench_encoding.py --repeat 20 --mbps 5
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import time
+
+from asgi_client import request
+
+from bench_api import summarize
+from database import db
+import main
+import response_encoding
+import singleflight
+
+ROUTES = [
+    ("users.list", "/api/users/", None),
+    ("attendance.month", "/api/attendance/", "month"),
+    ("products.list", "/api/products/", None),
+]
+
+VARIANTS = [
+    ("json", {}),
+    ("json+gzip", {"Accept-Encoding": "gzip"}),
+    ("json+br", {"Accept-Encoding": "br"}),
+    ("columnar", {"Accept": response_encoding.COLUMNAR_TYPE}),
+    ("columnar+gzip", {"Accept": response_encoding.COLUMNAR_TYPE, "Accept-Encoding": "gzip"}),
+    ("columnar+br", {"Accept": response_encoding.COLUMNAR_TYPE, "Accept-Encoding": "br"}),
+    ("msgpack", {"Accept": response_encoding.MSGPACK_TYPE}),
+    ("msgpack+gzip", {"Accept": response_encoding.MSGPACK_TYPE, "Accept-Encoding": "gzip"}),
+]
+
+
+def _available(headers):
+    if "br" in headers.get("Accept-Encoding", "") and response_encoding.brotli is None:
+        return False
+    if headers.get("Accept") == response_encoding.MSGPACK_TYPE and response_encoding.msgpack is None:
+        return False
+    return True
+
+
+def _decode(response):
+    """클라이언트 쪽 처리: 압축 해제 → 파싱. 행 수를 돌려줍니다."""
+    body = response.body
+    encoding = response.headers.get("content-encoding")
+    if encoding == "gzip":
+        body = gzip.decompress(body)
+    elif encoding == "br":
+        body = response_encoding.brotli.decompress(body)
+    content_type = response.headers.get("content-type", "")
+    if content_type.startswith(response_encoding.MSGPACK_TYPE):
+        value = response_encoding.msgpack.unpackb(body, raw=False)
+    else:
+        value = json.loads(body)
+    if isinstance(value, dict) and "rows" in value:
+        return len(value["rows"])
+    return len(value) if isinstance(value, list) else 1
+
+
+def _params(kind):
+    if kind == "month":
+        today = time.localtime()
+        return {"startDate": f"{today.tm_year}-{today.tm_mon:02d}-01",
+                "endDate": time.strftime("%Y-%m-%d", today)}
+    return None
+
+
+async def measure(app, path, params, headers, repeat, mbps):
+    latencies, decode_times = [], []
+    size = rows = 0
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        request_started = time.perf_counter()
+        response = await request(app, "GET", path, params=params, headers=headers)
+        latencies.append(time.perf_counter() - request_started)
+        if response.status != 200:
+            errors += 1
+            continue
+        size = len(response.body)
+        decode_started = time.perf_counter()
+        rows = _decode(response)
+        decode_times.append(time.perf_counter() - decode_started)
+    result = summarize(latencies, time.perf_counter() - started, errors)
+    decode_ms = round(1000 * sum(decode_times) / len(decode_times), 3) if decode_times else None
+    transfer_ms = round(size * 8 / (mbps * 1_000_000) * 1000, 1)
+    result.update({
+        "bytes": size,
+        "rows": rows,
+        "decode_ms": decode_ms,
+        "transfer_ms": transfer_ms,
+        "end_to_end_ms": round(result["p50_ms"] + transfer_ms + (decode_ms or 0), 1) if result["p50_ms"] else None,
+    })
+    return result
+
+
+async def run(args):
+    db.initialize()
+    singleflight.SINGLEFLIGHT_ENABLED = False
+    app = main.app
+    report = {"repeat": args.repeat, "mbps": args.mbps, "brotli": response_encoding.brotli is not None,
+              "msgpack": response_encoding.msgpack is not None, "routes": {}}
+    try:
+        for name, path, kind in ROUTES:
+            params = _params(kind)
+            results = {}
+            print(f"\n{name} ({args.mbps} Mbps)")
+            print(f"  {'variant':<15}{'bytes':>12}{'rows':>8}{'server p50':>12}{'p99':>10}"
+                  f"{'decode':>9}{'transfer':>10}{'end-to-end':>12}")
+            for variant, headers in VARIANTS:
+                if not _available(headers):
+                    continue
+                await request(app, "GET", path, params=params, headers=headers)  # 준비 실행
+                r = await measure(app, path, params, headers, args.repeat, args.mbps)
+                results[variant] = r
+                print(f"  {variant:<15}{r['bytes']:>12,}{r['rows']:>8}{r['p50_ms']:>10} ms{r['p99_ms']:>7} ms"
+                      f"{r['decode_ms']:>6} ms{r['transfer_ms']:>7} ms{r['end_to_end_ms']:>9} ms")
+            report["routes"][name] = results
+    finally:
+        db.close_all()
+    return report
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="응답 압축/간결한 형식 비교")
+    parser.add_argument('--repeat', type=int, default=20, help="조합마다 요청 수")
+    parser.add_argument('--mbps', type=float, default=5.0, help="종단 지연 추정에 쓸 대역폭 (Mbps)")
+    parser.add_argument('--output', help="결과 JSON 경로")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main_cli()
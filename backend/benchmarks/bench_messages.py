@@ -0,0 +1,131 @@
+"""
+메시지 아웃박스 처리량 측정
+
+1) 재등록 안내: 벤치마크용 템플릿으로 회원 --members 명에게 안내를 넣는 요청 하나의 응답 시간을 잽니다
+   (INSERT ... SELECT 한 번이므로 건수와 무관하게 짧아야 합니다).
+2) 발송: 파일 공급자(MESSAGE_PROVIDERS 기본값)로 디스패처가 큐를 비우는 시간과 초당 발송 수를 잽니다.
+   --rate 로 채널 초당 한도를 바꿀 수 있습니다.
+끝나면 벤치마크 템플릿과 메시지를 지웁니다.
+
+사용 예 (backend/ 에서, generate_data.py 로 회원을 적재한 뒤):
+    python benchmarks/bench_messages.py --members 10000 --rate 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from asgi_client import request
+
+from database import db
+
+
+def _setup(members):
+    """종료일이 있는 회원 members 명을 대상으로 하는 템플릿을 만들고 (템플릿 id, 대상 일수) 를 돌려줍니다."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT COALESCE(MAX(end_date - CURRENT_DATE), 0) FROM (
+                SELECT end_date FROM users
+                WHERE end_date >= CURRENT_DATE AND COALESCE(phone, '') <> ''
+                ORDER BY end_date LIMIT %s
+            ) t
+        """, (members,))
+        days = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO message_templates (name, channel, body)
+            VALUES (%s, 'sms', '{name}님, {product} 이용권이 {endDate}에 끝납니다 ({daysLeft}일 남음).')
+            RETURNING id
+        """, (f"bench-{datetime.now().strftime('%H%M%S%f')}",))
+        template_id = cursor.fetchone()[0]
+        conn.commit()
+        return template_id, days
+    finally:
+        db.return_connection(conn)
+
+
+def _pending(template_id):
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT COUNT(*) FILTER (WHERE status IN ('pending', 'sending')), COUNT(*) FILTER (WHERE status = 'sent')
+            FROM message_outbox WHERE template_id = %s
+        """, (template_id,))
+        result = cursor.fetchone()
+        conn.commit()
+        return result
+    finally:
+        db.return_connection(conn)
+
+
+def _teardown(template_id):
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM message_outbox WHERE template_id = %s", (template_id,))
+        cursor.execute("DELETE FROM message_templates WHERE id = %s", (template_id,))
+        conn.commit()
+    finally:
+        db.return_connection(conn)
+
+
+async def run(args):
+    import main
+    import messaging
+    app = main.app
+    db.initialize()
+    messaging.dispatcher.start()
+    template_id, days = _setup(args.members)
+    report = {}
+    try:
+        started = time.perf_counter()
+        response = await request(app, "POST", "/api/messages/renewal-reminders",
+                                 json_body={"templateId": template_id, "withinDays": days})
+        elapsed = time.perf_counter() - started
+        if response.status != 202:
+            sys.exit(f"❌ 재등록 안내 요청 실패: {response.status} {response.json()}")
+        queued = response.json()["queued"]
+        print(f"enqueue: {queued} messages in {elapsed * 1000:.1f} ms (single request)")
+        report["enqueue"] = {"queued": queued, "ms": round(elapsed * 1000, 1)}
+
+        started = time.perf_counter()
+        while True:
+            pending, sent = await asyncio.to_thread(_pending, template_id)
+            if pending == 0 or time.perf_counter() - started > args.timeout:
+                break
+            await asyncio.sleep(0.5)
+        elapsed = time.perf_counter() - started
+        print(f"dispatch: {sent}/{queued} sent in {elapsed:.1f} s ({sent / elapsed:.0f} msg/s), "
+              f"pending {pending}  stats {messaging.dispatcher.stats['sms']}")
+        report["dispatch"] = {"sent": sent, "pending": pending, "seconds": round(elapsed, 2),
+                              "rate": round(sent / elapsed, 1), "stats": messaging.dispatcher.stats}
+    finally:
+        await messaging.dispatcher.stop()
+        _teardown(template_id)
+        db.close_all()
+    return report
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="메시지 아웃박스 처리량 측정")
+    parser.add_argument('--members', type=int, default=10000, help="안내를 받을 회원 수 (대략)")
+    parser.add_argument('--rate', type=int, default=2000, help="sms 채널 초당 발송 한도")
+    parser.add_argument('--timeout', type=float, default=300, help="발송 대기 최대 시간(초)")
+    parser.add_argument('--output', help="결과 JSON 경로")
+    args = parser.parse_args()
+
+    os.environ["MESSAGE_RATE_SMS"] = str(args.rate)
+    os.environ.setdefault("MESSAGE_BATCH_SIZE", "500")
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+
+
+if __name__ == "__main__":
+    main_cli()
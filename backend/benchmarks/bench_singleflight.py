@@ -0,0 +1,121 @@
+"""
+동시 조회 합치기(single-flight) 부하 테스트
+
+개장 시각을 흉내 내어 기기 --devices 대가 회원 목록, 출석 통계, 상품 목록을 같은 순간에 요청하는
+버스트를 --bursts 번 보냅니다. 합치기를 끈 경우와 켠 경우 각각
+- 풀 연결 대여 횟수(db.pool_stats 의 acquired 증가분)와 버스트 중 최대 동시 대여 수
+- 요청 지연 p50/p99, 상태 코드별 수
+를 비교합니다. 버스트 사이에는 보관 기간(SINGLEFLIGHT_STALE_MS)보다 길게 쉬어 매 버스트가 새로 실행되게 합니다.
+
+사용 예 (backend/ 에서, generate_data.py 로 데이터를 적재한 뒤):
+    python benchmarks/bench_singleflight.py --devices 12 --bursts 20
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+from asgi_client import request
+
+from bench_api import summarize
+from database import db
+import main
+import singleflight
+
+ROUTES = [
+    ("/api/users/", None),
+    ("/api/attendance/stats", None),
+    ("/api/products/", None),
+]
+
+
+async def sample_pool(stop, peak):
+    while not stop.is_set():
+        peak["inUse"] = max(peak["inUse"], db.pool_stats()["inUse"])
+        await asyncio.sleep(0.002)
+
+
+async def run_bursts(app, devices, bursts, pause):
+    latencies = []
+    statuses = Counter()
+    peak = {"inUse": 0}
+    acquired_before = db.pool_stats()["acquired"]
+
+    async def one(path, params):
+        started = time.perf_counter()
+        response = await request(app, "GET", path, params=params)
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status] += 1
+
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_pool(stop, peak))
+    started = time.perf_counter()
+    for _ in range(bursts):
+        await asyncio.gather(*(one(path, params) for _ in range(devices) for path, params in ROUTES))
+        await asyncio.sleep(pause)
+    elapsed = time.perf_counter() - started - pause * bursts
+    stop.set()
+    await sampler
+
+    errors = sum(count for status, count in statuses.items() if status != 200)
+    result = summarize(latencies, elapsed, errors)
+    result.update({
+        "requests": len(latencies),
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "pool_acquired": db.pool_stats()["acquired"] - acquired_before,
+        "pool_peak_in_use": peak["inUse"],
+    })
+    return result
+
+
+def _print(label, result):
+    print(f"{label:<18} requests {result['requests']:>5}  pool acquired {result['pool_acquired']:>5}  "
+          f"peak in use {result['pool_peak_in_use']:>3}  p50 {result['p50_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  "
+          f"statuses {result['statuses']}")
+
+
+async def run(args):
+    db.initialize()
+    await asyncio.to_thread(db.warm_up)
+    app = main.app
+    pause = singleflight.SINGLEFLIGHT_STALE_MS / 1000 + 0.1
+    report = {"devices": args.devices, "bursts": args.bursts, "staleMs": singleflight.SINGLEFLIGHT_STALE_MS,
+              "pool": db.pool_stats()}
+    try:
+        # 첫 실행 비용(캐시, import)이 한쪽에만 들어가지 않도록 한 번 돌려 둡니다.
+        await run_bursts(app, 1, 1, pause)
+
+        singleflight.SINGLEFLIGHT_ENABLED = False
+        report["disabled"] = await run_bursts(app, args.devices, args.bursts, pause)
+        _print("single-flight off", report["disabled"])
+
+        singleflight.SINGLEFLIGHT_ENABLED = True
+        singleflight.invalidate()
+        report["enabled"] = await run_bursts(app, args.devices, args.bursts, pause)
+        _print("single-flight on", report["enabled"])
+        report["singleflight"] = singleflight.metrics()
+    finally:
+        db.close_all()
+
+    off, on = report["disabled"]["pool_acquired"], report["enabled"]["pool_acquired"]
+    if off:
+        print(f"pool checkouts reduced by {100 * (off - on) / off:.0f}% ({off} -> {on})")
+    return report
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="동시 조회 합치기 부하 테스트")
+    parser.add_argument('--devices', type=int, default=12, help="버스트마다 같은 조회를 보내는 기기 수")
+    parser.add_argument('--bursts', type=int, default=20, help="버스트 횟수")
+    parser.add_argument('--output', help="결과 JSON 경로")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main_cli()
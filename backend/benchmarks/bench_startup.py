@@ -0,0 +1,98 @@
+"""
+콜드 부팅 벤치마크
+
+uvicorn 프로세스를 새로 띄워 다음을 측정합니다.
+- startup: 프로세스 시작부터 /api/health 가 200 을 돌려줄 때까지
+- first request: 기동 직후 첫 요청의 지연 시간 (엔드포인트별)
+- second request: 같은 요청을 한 번 더 보냈을 때의 지연 시간 (워밍업 후 비교용)
+
+사용 예 (backend/ 에서):
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --paths /api/users/template /api/users/
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from asgi_client import BACKEND_DIR
+
+DEFAULT_PATHS = ["/api/users/template", "/api/products/", "/api/users/?search=010"]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _get(url, timeout=30):
+    started = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        response.read()
+        return response.status, time.perf_counter() - started
+
+
+def boot_once(paths, timeout):
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, SCHEDULER_ENABLED="false")
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    try:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(process.stderr.read().decode('utf-8', 'replace'))
+            if time.perf_counter() - started > timeout:
+                raise TimeoutError("server did not become healthy in time")
+            try:
+                status, _ = _get(base + "/api/health", timeout=1)
+                if status == 200:
+                    break
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        result = {"startup_ms": (time.perf_counter() - started) * 1000, "first": {}, "second": {}}
+        for path in paths:
+            _, first = _get(base + path)
+            _, second = _get(base + path)
+            result["first"][path] = first * 1000
+            result["second"][path] = second * 1000
+        return result
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="uvicorn 콜드 부팅/첫 요청 지연 벤치마크")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--paths', nargs='*', default=DEFAULT_PATHS)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--output', help="결과 JSON 경로")
+    args = parser.parse_args()
+
+    runs = [boot_once(args.paths, args.timeout) for _ in range(args.runs)]
+
+    median = lambda values: round(statistics.median(values), 2)
+    report = {
+        "runs": args.runs,
+        "startup_ms": median([r["startup_ms"] for r in runs]),
+        "first_request_ms": {p: median([r["first"][p] for r in runs]) for p in args.paths},
+        "second_request_ms": {p: median([r["second"][p] for r in runs]) for p in args.paths},
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
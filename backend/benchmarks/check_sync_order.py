@@ -0,0 +1,77 @@
+"""
+델타 동기화 순서 점검 (두 연결 교차 실행)
+
+먼저 seq 를 받은 쓰기(A)가 커밋하기 전에, 먼저 시작한 다른 쓰기(B)가 더 큰 seq 로 먼저 커밋하는 상황을 재현합니다.
+1) B 가 트랜잭션 id 를 먼저 받고, 이어서 A 가 받습니다 (B 의 txid < A 의 txid).
+2) A 는 SET CONSTRAINTS ALL IMMEDIATE 로 변경 기록 트리거를 바로 실행해 seq 를 받고 커밋하지 않습니다.
+3) B 는 다른 상품을 고치고 별도 스레드에서 커밋합니다.
+4) A 가 커밋하기 전과 후에 GET /api/sync 를 토큰을 이어 가며 두 번 부릅니다.
+두 상품이 모두 돌아오면 통과입니다. seq 가 커밋 순서대로 붙으면 B 의 커밋은 A 가 끝날 때까지 기다립니다.
+점검은 상품 이름을 같은 값으로 다시 써서 변경 기록만 남기므로 데이터는 바뀌지 않습니다.
+
+사용 예 (backend/ 에서, 상품이 2개 이상 있는 DB 로):
+    python benchmarks/check_sync_order.py
+"""
+import sys
+import threading
+import time
+
+import asgi_client  # noqa: F401  (backend/ 를 import 경로에 추가)
+from database import db
+from routers.sync import get_changes
+
+TOUCH_SQL = "UPDATE products SET name = name WHERE id = %s"
+
+
+def run():
+    db.initialize()
+    conn_a = db.get_connection()
+    conn_b = db.get_connection()
+    try:
+        cursor_a, cursor_b = conn_a.cursor(), conn_b.cursor()
+        cursor_a.execute("SELECT id FROM products ORDER BY id LIMIT 2")
+        ids = [row[0] for row in cursor_a.fetchall()]
+        cursor_a.execute("SELECT COALESCE(MAX(seq), 0) FROM sync_changes")
+        since = cursor_a.fetchone()[0]
+        conn_a.commit()
+        if len(ids) < 2:
+            print("[SKIP] 상품이 2개 이상 필요합니다.")
+            return True
+        product_a, product_b = ids
+
+        cursor_b.execute("SELECT pg_current_xact_id()")
+        cursor_a.execute("SELECT pg_current_xact_id()")
+        cursor_a.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor_a.execute(TOUCH_SQL, (product_a,))  # A: seq 를 받고 커밋 전
+        cursor_b.execute(TOUCH_SQL, (product_b,))  # B: 커밋할 때 seq 를 받음
+
+        committer = threading.Thread(target=conn_b.commit)
+        committer.start()
+        time.sleep(0.5)
+        b_waited = committer.is_alive()
+
+        first = get_changes(since=since, limit=1000)
+        conn_a.commit()
+        committer.join(timeout=10)
+        second = get_changes(since=int(first["token"]), limit=1000)
+    finally:
+        conn_a.rollback()
+        conn_b.rollback()
+        db.return_connection(conn_a)
+        db.return_connection(conn_b)
+        db.close_all()
+
+    seen = {p["id"] for p in first["products"] + second["products"]}
+    missing = [pid for pid in (product_a, product_b) if pid not in seen]
+    print(f"B commit waited for A: {b_waited}")
+    print(f"first read: token {first['token']}, products {[p['id'] for p in first['products']]}")
+    print(f"second read: token {second['token']}, products {[p['id'] for p in second['products']]}")
+    if missing:
+        print(f"[FAIL] 건너뛴 변경: products {missing}")
+        return False
+    print("[OK] 두 변경을 모두 받았습니다.")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run() else 1)
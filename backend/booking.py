@@ -0,0 +1,273 @@
+"""
+수업 예약 엔진
+
+코치 수업(coach_sessions)의 정원을 동시 요청 속에서도 넘기지 않도록 관리합니다 (migrations/0011).
+
+- 자리 잡기: UPDATE coach_sessions SET booked = booked + 1 WHERE ... AND booked < capacity 한 문장.
+  같은 수업의 요청만 그 행의 잠금으로 줄을 서고, 다른 수업 예약은 서로 기다리지 않습니다.
+- 정원이 차면 대기열(waitlist_limit 까지)에 넣고, 확정 예약이 취소되면 가장 먼저 대기한 회원을 승격합니다.
+  취소와 승격은 수업 행을 잠근 한 트랜잭션에서 일어나므로 자리가 빈 채로 대기자가 남지 않습니다.
+- 출석 체크는 수업 시작 CHECKIN_EARLY_MINUTES 분 전부터 종료 시각 사이의 확정 예약을 attended 로 바꾸고,
+  종료 후 NO_SHOW_GRACE_MINUTES 분이 지나도 확정 상태인 예약은 주기 작업이 no_show 로 바꿉니다.
+
+모든 함수는 호출한 쪽의 트랜잭션 안에서 동작하며 cursor 는 RealDictCursor 여야 합니다.
+"""
+import os
+
+from fastapi import HTTPException
+
+from database import db
+
+CHECKIN_EARLY_MINUTES = int(os.getenv("BOOKING_CHECKIN_EARLY_MINUTES", "30"))
+NO_SHOW_GRACE_MINUTES = int(os.getenv("BOOKING_NO_SHOW_GRACE_MINUTES", "30"))
+# 대기열에 넣으려는 사이 자리가 나면 처음부터 다시 시도합니다.
+RESERVE_ATTEMPTS = 3
+
+# 자리를 차지하는 예약 상태 (coach_sessions.booked 에 포함)
+SEATED_STATUSES = ('booked', 'attended', 'no_show')
+
+OPEN_CONDITION = "status = 'scheduled' AND starts_at > LOCALTIMESTAMP"
+
+
+def _session_or_error(cursor, session_id, lock=False):
+    cursor.execute(f"""
+        SELECT id, status, starts_at, capacity, booked, waitlist_limit, waitlisted,
+               starts_at > LOCALTIMESTAMP AS upcoming
+        FROM coach_sessions WHERE id = %s {'FOR UPDATE' if lock else ''}
+    """, (session_id,))
+    session = cursor.fetchone()
+    if session is None:
+        raise HTTPException(status_code=404, detail="수업을 찾을 수 없습니다.")
+    return session
+
+
+def _insert_booking(cursor, session_id, user_id, status):
+    cursor.execute("""
+        INSERT INTO session_bookings (session_id, user_id, status)
+        VALUES (%s, %s, %s)
+        RETURNING *
+    """, (session_id, user_id, status))
+    return cursor.fetchone()
+
+
+def reserve(cursor, session_id, user_id):
+    """
+    자리를 잡거나 대기열에 넣습니다. 예약 행(dict)을 돌려주며 대기 중이면 position(대기 순번)이 들어갑니다.
+    이미 유효한 예약이 있으면 INSERT 가 UniqueViolation 을 일으키므로 호출한 쪽에서 409 로 바꿔야 합니다.
+    """
+    cursor.execute("SELECT 1 FROM users WHERE id = %s", (user_id,))
+    if not cursor.fetchone():
+        raise HTTPException(status_code=404, detail="회원을 찾을 수 없습니다.")
+
+    for _ in range(RESERVE_ATTEMPTS):
+        cursor.execute(f"""
+            UPDATE coach_sessions SET booked = booked + 1
+            WHERE id = %s AND {OPEN_CONDITION} AND booked < capacity
+            RETURNING id
+        """, (session_id,))
+        if cursor.fetchone():
+            return _insert_booking(cursor, session_id, user_id, 'booked')
+
+        session = _session_or_error(cursor, session_id)
+        if session['status'] != 'scheduled':
+            raise HTTPException(status_code=409, detail="취소된 수업입니다.")
+        if not session['upcoming']:
+            raise HTTPException(status_code=409, detail="이미 시작한 수업은 예약할 수 없습니다.")
+
+        # 정원이 찬 상태일 때만 대기열에 넣습니다 (그 사이 자리가 났으면 다시 자리 잡기부터).
+        cursor.execute(f"""
+            UPDATE coach_sessions SET waitlisted = waitlisted + 1
+            WHERE id = %s AND {OPEN_CONDITION} AND booked >= capacity AND waitlisted < waitlist_limit
+            RETURNING waitlisted
+        """, (session_id,))
+        row = cursor.fetchone()
+        if row:
+            booking = _insert_booking(cursor, session_id, user_id, 'waitlisted')
+            booking['position'] = row['waitlisted']
+            return booking
+
+        session = _session_or_error(cursor, session_id)
+        if session['booked'] >= session['capacity']:
+            raise HTTPException(status_code=409, detail="정원이 찼습니다." if session['waitlist_limit'] == 0
+                                else "정원과 대기 인원이 모두 찼습니다.")
+    raise HTTPException(status_code=409, detail="예약 요청이 몰려 처리하지 못했습니다. 다시 시도해 주세요.",
+                        headers={"Retry-After": "1"})
+
+
+def _promote(cursor, session_id):
+    """가장 먼저 대기한 회원을 확정으로 바꿉니다. 수업 행이 잠긴 상태에서 호출해야 합니다."""
+    cursor.execute("""
+        UPDATE session_bookings SET status = 'booked', updated_at = LOCALTIMESTAMP
+        WHERE id = (
+            SELECT id FROM session_bookings
+            WHERE session_id = %s AND status = 'waitlisted'
+            ORDER BY created_at, id
+            LIMIT 1
+        )
+        RETURNING *
+    """, (session_id,))
+    promoted = cursor.fetchone()
+    if promoted:
+        cursor.execute("UPDATE coach_sessions SET waitlisted = waitlisted - 1 WHERE id = %s", (session_id,))
+    return promoted
+
+
+def _release(cursor, session, booking_id, allowed):
+    """
+    예약을 취소하고 자리를 반납합니다. 확정 예약이었고 수업 전이면 대기자를 승격합니다.
+    반환값: (취소된 예약, 승격된 예약 또는 None). allowed 에 없는 상태면 예약은 None 입니다.
+    """
+    cursor.execute("""
+        UPDATE session_bookings b SET status = 'cancelled', updated_at = LOCALTIMESTAMP
+        FROM (SELECT id, status FROM session_bookings WHERE id = %s AND session_id = %s FOR UPDATE) previous
+        WHERE b.id = previous.id AND previous.status = ANY(%s)
+        RETURNING b.*, previous.status AS previous_status
+    """, (booking_id, session['id'], list(allowed)))
+    cancelled = cursor.fetchone()
+    if cancelled is None:
+        return None, None
+
+    promoted = None
+    if cancelled['previous_status'] == 'waitlisted':
+        cursor.execute("UPDATE coach_sessions SET waitlisted = waitlisted - 1 WHERE id = %s", (session['id'],))
+    else:
+        if session['upcoming'] and session['status'] == 'scheduled':
+            promoted = _promote(cursor, session['id'])
+        if promoted is None:
+            cursor.execute("UPDATE coach_sessions SET booked = booked - 1 WHERE id = %s", (session['id'],))
+    return cancelled, promoted
+
+
+def cancel(cursor, session_id, booking_id):
+    """확정/대기 예약을 취소합니다. (취소된 예약, 승격된 예약 또는 None)"""
+    session = _session_or_error(cursor, session_id, lock=True)
+    cancelled, promoted = _release(cursor, session, booking_id, ('booked', 'waitlisted'))
+    if cancelled is None:
+        cursor.execute("SELECT status FROM session_bookings WHERE id = %s AND session_id = %s",
+                       (booking_id, session_id))
+        existing = cursor.fetchone()
+        if existing is None:
+            raise HTTPException(status_code=404, detail="예약을 찾을 수 없습니다.")
+        raise HTTPException(status_code=409, detail=f"취소할 수 없는 예약입니다 (상태: {existing['status']}).")
+    return cancelled, promoted
+
+
+def cancel_session(cursor, session_id):
+    """수업을 취소하고 남은 확정/대기 예약을 모두 취소합니다. 취소된 예약 수를 돌려줍니다."""
+    session = _session_or_error(cursor, session_id, lock=True)
+    if session['status'] == 'cancelled':
+        raise HTTPException(status_code=409, detail="이미 취소된 수업입니다.")
+    cursor.execute("""
+        UPDATE session_bookings SET status = 'cancelled', updated_at = LOCALTIMESTAMP
+        WHERE session_id = %s AND status IN ('booked', 'waitlisted')
+    """, (session_id,))
+    count = cursor.rowcount
+    cursor.execute("""
+        UPDATE coach_sessions
+        SET status = 'cancelled', waitlisted = 0,
+            booked = (SELECT COUNT(*) FROM session_bookings WHERE session_id = %s AND status = ANY(%s))
+        WHERE id = %s
+    """, (session_id, list(SEATED_STATUSES), session_id))
+    return count
+
+
+def cancel_member_bookings(cursor, user_id):
+    """
+    회원의 앞으로 있을 확정/대기 예약을 모두 취소합니다 (회원 삭제 전). 대기자 승격이 일어납니다.
+    교착을 피하려고 수업 id 순서로 잠급니다.
+    """
+    cursor.execute("""
+        SELECT b.id, b.session_id FROM session_bookings b
+        JOIN coach_sessions s ON s.id = b.session_id
+        WHERE b.user_id = %s AND b.status IN ('booked', 'waitlisted') AND s.starts_at > LOCALTIMESTAMP
+        ORDER BY b.session_id
+    """, (user_id,))
+    cancelled = 0
+    for row in cursor.fetchall():
+        session = _session_or_error(cursor, row['session_id'], lock=True)
+        booking, _ = _release(cursor, session, row['id'], ('booked', 'waitlisted'))
+        cancelled += booking is not None
+    return cancelled
+
+
+def resolve_merge_collisions(cursor, target_id, duplicate_ids):
+    """
+    회원 병합 전에, 같은 수업에 target 과 중복 회원(또는 중복 회원끼리)이 모두 예약한 경우
+    하나만 남기고(target 우선, 그다음 먼저 한 예약) 나머지를 취소합니다.
+    """
+    cursor.execute("""
+        SELECT id, session_id FROM (
+            SELECT b.id, b.session_id,
+                   row_number() OVER (PARTITION BY b.session_id
+                                      ORDER BY (b.user_id = %(target)s) DESC, b.created_at, b.id) AS rank
+            FROM session_bookings b
+            WHERE b.status <> 'cancelled' AND (b.user_id = %(target)s OR b.user_id = ANY(%(dups)s))
+        ) ranked
+        WHERE rank > 1
+        ORDER BY session_id
+    """, {"target": target_id, "dups": duplicate_ids})
+    for row in cursor.fetchall():
+        session = _session_or_error(cursor, row['session_id'], lock=True)
+        _release(cursor, session, row['id'], ('waitlisted',) + SEATED_STATUSES)
+
+
+# 출석 체크(user, date, time)와 같은 시간대의 확정(또는 불참 처리된) 예약 b 와 그 수업 s
+CHECKIN_MATCH = """
+    b.session_id = s.id AND b.user_id = %(user)s AND b.status IN ('booked', 'no_show')
+      AND s.status = 'scheduled'
+      AND %(date)s::date + %(time)s::time BETWEEN s.starts_at - make_interval(mins => %(early)s) AND s.ends_at
+"""
+
+
+def checkin_bookings_sql(attendance_id="%(attendance)s"):
+    """
+    출석 체크와 같은 시간대의 확정(또는 불참 처리된) 예약을 출석으로 바꾸는 UPDATE 문.
+    파라미터: user, date, time, early. attendance_id 에 SQL 식을 넣으면 CTE 안에서 쓸 수 있습니다.
+    """
+    return f"""
+        UPDATE session_bookings b
+        SET status = 'attended', attendance_id = {attendance_id}, updated_at = LOCALTIMESTAMP
+        FROM coach_sessions s
+        WHERE {CHECKIN_MATCH}
+        RETURNING b.id
+    """
+
+
+def checkin_coach_sql():
+    """출석 체크와 같은 시간대 예약 수업의 코치 (여러 개면 먼저 시작하는 수업). 스칼라 서브쿼리로 씁니다."""
+    return f"""
+        SELECT s.coach_id FROM session_bookings b, coach_sessions s
+        WHERE {CHECKIN_MATCH}
+        ORDER BY s.starts_at, s.id
+        LIMIT 1
+    """
+
+
+def reconcile_checkin(cursor, user_id, attendance_id, date, time):
+    """출석 체크를 같은 시간대의 예약과 맞춥니다. 맞춰진 예약 id 목록을 돌려줍니다."""
+    cursor.execute(checkin_bookings_sql(), {"attendance": attendance_id, "user": user_id, "date": date,
+                                            "time": time, "early": CHECKIN_EARLY_MINUTES})
+    return [row['id'] for row in cursor.fetchall()]
+
+
+def mark_no_shows(grace_minutes=NO_SHOW_GRACE_MINUTES):
+    """주기 작업: 끝난 수업의 확정 예약 중 출석이 없는 것을 no_show 로 바꿉니다."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE session_bookings b SET status = 'no_show', updated_at = LOCALTIMESTAMP
+            FROM coach_sessions s
+            WHERE b.session_id = s.id AND b.status = 'booked'
+              AND s.ends_at < LOCALTIMESTAMP - make_interval(mins => %s)
+        """, (grace_minutes,))
+        count = cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db.return_connection(conn)
+    if count:
+        print(f"[BOOKING] marked {count} no-show booking(s)")
+    return count
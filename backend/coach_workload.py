@@ -0,0 +1,256 @@
+"""
+코치별 수업 집계와 월 급여 정산
+
+출석(attendance.coach_id)에 담당 코치가 있으면 그 출석이 코치의 수업 한 회입니다.
+날짜/월 × 코치별 수업 수(coach_workload_daily / coach_workload_monthly, migrations/0020)는 출석 트리거가
+바로 갱신하므로 코치 업무량과 월 정산은 원본 출석을 훑지 않고 집계 테이블만 읽습니다.
+이미 진행한 수업은 회원이 삭제되어도 정산에 남습니다 (지워진 출석은 coach_workload_retained 에 옮겨 둠).
+
+담당 코치 도입 전 출석은 backfill() 이 예약 수업과 맞춰진 출석에 그 수업의 코치를 채웁니다.
+
+사용 예 (backend/ 에서):
+    python coach_workload.py backfill     # 예약 수업과 맞춰진 출석에 코치 채우기 (중단 후 다시 실행해도 됨)
+    python coach_workload.py rebuild      # 집계 테이블을 출석(보관 포함)에서 다시 계산해 어긋난 만큼 보정
+"""
+import argparse
+import time
+from datetime import timedelta
+
+from database import db
+import heatmap
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+# ---------------------------------------------------------------------------
+# 조회
+# ---------------------------------------------------------------------------
+
+def workload(cursor, coach_id, start, end, group_by="month"):
+    """
+    코치의 [start, end] 수업 수. group_by 가 month 면 범위 안의 온전한 달은 월 합계에서, 앞뒤 자투리 날짜만
+    일별 합계에서 읽습니다. cursor 는 RealDictCursor 여야 합니다.
+    """
+    parts, params = [], []
+    if group_by == "day":
+        day_ranges, month_range = [(start, end + timedelta(days=1))], None
+    else:
+        day_ranges, month_range = heatmap.split_range(start, end)
+    period = "date" if group_by == "day" else "date_trunc('month', date)::date"
+    for range_start, range_end in day_ranges:
+        parts.append(f"""
+            SELECT {period} AS period, sessions FROM coach_workload_daily
+            WHERE coach_id = %s AND date >= %s AND date < %s
+        """)
+        params += [coach_id, range_start, range_end]
+    if month_range:
+        parts.append("""
+            SELECT month AS period, sessions FROM coach_workload_monthly
+            WHERE coach_id = %s AND month >= %s AND month < %s
+        """)
+        params += [coach_id, *month_range]
+
+    cursor.execute(f"""
+        SELECT period, SUM(sessions)::int AS sessions
+        FROM ({' UNION ALL '.join(parts)}) c
+        GROUP BY 1
+        HAVING SUM(sessions) <> 0
+        ORDER BY 1
+    """, params)
+    series = [{"period": str(row['period']), "sessions": row['sessions']} for row in cursor.fetchall()]
+    return {
+        "coachId": coach_id,
+        "startDate": str(start),
+        "endDate": str(end),
+        "groupBy": group_by,
+        "series": series,
+        "total": sum(s["sessions"] for s in series)
+    }
+
+
+def payroll(cursor, month, rate=None):
+    """
+    month 달 전체 코치의 수업 수 (월 합계 테이블, 코치 수만큼의 행). 수업이 없는 활동 중 코치도 0 으로 포함합니다.
+    rate(회당 금액)를 주면 정산 금액도 계산합니다. cursor 는 RealDictCursor 여야 합니다.
+    """
+    cursor.execute("""
+        SELECT c.id, c.name, c.specialty, c.status, COALESCE(w.sessions, 0) AS sessions
+        FROM coaches c
+        LEFT JOIN coach_workload_monthly w ON w.coach_id = c.id AND w.month = %s
+        WHERE c.status = 'active' OR w.sessions <> 0
+        ORDER BY sessions DESC, c.name
+    """, (month,))
+    coaches = [{
+        "coachId": row['id'],
+        "name": row['name'],
+        "specialty": row['specialty'],
+        "status": row['status'],
+        "sessions": row['sessions'],
+        "amount": row['sessions'] * rate if rate is not None else None
+    } for row in cursor.fetchall()]
+    sessions = sum(c["sessions"] for c in coaches)
+    return {
+        "month": month.strftime("%Y-%m"),
+        "rate": rate,
+        "coaches": coaches,
+        "total": {"sessions": sessions, "amount": sessions * rate if rate is not None else None}
+    }
+
+
+# ---------------------------------------------------------------------------
+# 채우기 / 재집계
+# ---------------------------------------------------------------------------
+
+def backfill(conn, batch_size=BACKFILL_BATCH_SIZE, pause=0.05):
+    """
+    예약 수업과 맞춰진 출석(session_bookings.attendance_id) 중 담당 코치가 없는 것에 그 수업의 코치를 채웁니다.
+    예약을 id 순서로 batch_size 건씩 처리하고 배치마다 커밋하므로 출석 행 잠금은 짧게 유지됩니다.
+    """
+    cursor = conn.cursor()
+    last_id, updated = 0, 0
+    started = time.perf_counter()
+    while True:
+        cursor.execute("""
+            WITH batch AS (
+                SELECT b.id, b.attendance_id, s.coach_id
+                FROM session_bookings b
+                JOIN coach_sessions s ON s.id = b.session_id
+                WHERE b.id > %s AND b.attendance_id IS NOT NULL
+                ORDER BY b.id
+                LIMIT %s
+            ),
+            attributed AS (
+                UPDATE attendance a SET coach_id = batch.coach_id
+                FROM batch
+                WHERE a.id = batch.attendance_id AND a.coach_id IS NULL
+                RETURNING 1
+            )
+            SELECT (SELECT MAX(id) FROM batch), (SELECT COUNT(*) FROM attributed)
+        """, (last_id, batch_size))
+        batch_last, count = cursor.fetchone()
+        conn.commit()
+        if batch_last is None:
+            break
+        last_id = batch_last
+        updated += count
+        if pause:
+            time.sleep(pause)
+    print(f"[WORKLOAD] attributed {updated} check-in(s) ({time.perf_counter() - started:.1f}s)")
+    return updated
+
+
+def rebuild_rollups(conn, pause=0.05):
+    """
+    집계 테이블을 출석(보관 포함)과 삭제된 회원의 수업(coach_workload_retained)에서 한 달씩 다시 계산해
+    어긋난 만큼만 더하고 달마다 커밋합니다. 원본과 집계를 한 문장(같은 스냅샷)에서 비교하므로 테이블 잠금이 없고,
+    그 사이 커밋되는 출석 체크의 트리거 증분과도 겹치지 않습니다. 고친 일별 버킷 수를 돌려줍니다.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT MIN(d), MAX(d) FROM (
+            SELECT MIN(date) AS d FROM attendance WHERE coach_id IS NOT NULL
+            UNION ALL SELECT MAX(date) FROM attendance WHERE coach_id IS NOT NULL
+            UNION ALL SELECT MIN(date) FROM attendance_archive WHERE coach_id IS NOT NULL
+            UNION ALL SELECT MAX(date) FROM attendance_archive WHERE coach_id IS NOT NULL
+            UNION ALL SELECT MIN(date) FROM coach_workload_retained
+            UNION ALL SELECT MAX(date) FROM coach_workload_retained
+            UNION ALL SELECT MIN(date) FROM coach_workload_daily
+            UNION ALL SELECT MAX(date) FROM coach_workload_daily
+        ) bounds
+    """)
+    first, last = cursor.fetchone()
+    conn.commit()
+    if first is None:
+        return 0
+
+    months, corrected = 0, 0
+    started = time.perf_counter()
+    month = heatmap.month_start(first)
+    while month <= last:
+        corrected += _rebuild_month(conn, month)
+        months += 1
+        month = heatmap.next_month(month)
+        if pause:
+            time.sleep(pause)
+    print(f"[WORKLOAD] rebuilt {months} month(s), corrected {corrected} bucket(s) "
+          f"({time.perf_counter() - started:.1f}s)")
+    return corrected
+
+
+def _rebuild_month(conn, month):
+    start, end = month, heatmap.next_month(month)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            WITH source AS (
+                SELECT coach_id, date, COUNT(*)::int AS sessions
+                FROM (SELECT coach_id, date FROM attendance
+                      WHERE coach_id IS NOT NULL AND date >= %(start)s AND date < %(end)s
+                      UNION ALL
+                      SELECT coach_id, date FROM attendance_archive
+                      WHERE coach_id IS NOT NULL AND date >= %(start)s AND date < %(end)s) a
+                GROUP BY 1, 2
+                UNION ALL
+                SELECT coach_id, date, sessions FROM coach_workload_retained
+                WHERE date >= %(start)s AND date < %(end)s
+            ),
+            daily_diff AS (
+                SELECT coach_id, date, SUM(n)::int AS n
+                FROM (SELECT coach_id, date, sessions AS n FROM source
+                      UNION ALL
+                      SELECT coach_id, date, -sessions FROM coach_workload_daily
+                      WHERE date >= %(start)s AND date < %(end)s) d
+                GROUP BY 1, 2
+                HAVING SUM(n) <> 0
+            ),
+            monthly_diff AS (
+                SELECT coach_id, SUM(n)::int AS n
+                FROM (SELECT coach_id, sessions AS n FROM source
+                      UNION ALL
+                      SELECT coach_id, -sessions FROM coach_workload_monthly WHERE month = %(start)s) m
+                GROUP BY 1
+                HAVING SUM(n) <> 0
+            ),
+            fix_daily AS (
+                INSERT INTO coach_workload_daily AS w (coach_id, date, sessions)
+                SELECT coach_id, date, n FROM daily_diff
+                ORDER BY 1, 2
+                ON CONFLICT (coach_id, date) DO UPDATE SET sessions = w.sessions + EXCLUDED.sessions
+                RETURNING 1
+            ),
+            fix_monthly AS (
+                INSERT INTO coach_workload_monthly AS w (month, coach_id, sessions)
+                SELECT %(start)s, coach_id, n FROM monthly_diff
+                ORDER BY 2
+                ON CONFLICT (month, coach_id) DO UPDATE SET sessions = w.sessions + EXCLUDED.sessions
+                RETURNING 1
+            )
+            SELECT (SELECT COUNT(*) FROM fix_daily), (SELECT COUNT(*) FROM fix_monthly)
+        """, {"start": start, "end": end})
+        days = cursor.fetchone()[0]
+        conn.commit()
+        return days
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description="출석 담당 코치 채우기 / 코치 수업 집계 재계산")
+    parser.add_argument('command', choices=['backfill', 'rebuild'])
+    parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE)
+    args = parser.parse_args()
+
+    conn = db.get_connection()
+    try:
+        if args.command == 'backfill':
+            backfill(conn, args.batch_size)
+        else:
+            print(f"✅ Corrected {rebuild_rollups(conn)} daily bucket(s).")
+    finally:
+        db.return_connection(conn)
+        db.close_all()
+
+
+if __name__ == "__main__":
+    main()
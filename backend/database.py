@@ -1,41 +1,129 @@
 
+import contextvars
 import os
+import threading
+import time
 import psycopg2
 from psycopg2 import pool
 from dotenv import load_dotenv
 
 load_dotenv()
 
+POOL_MAX = int(os.getenv("DB_POOL_MAX", "20"))
+# 우선순위 높은 요청(출석 체크)만 쓸 수 있도록 남겨 두는 연결 수
+POOL_RESERVED = int(os.getenv("DB_POOL_RESERVED", "2"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+
+# 현재 요청의 연결 우선순위 ("high" / "normal"). admission 미들웨어가 설정합니다.
+connection_priority = contextvars.ContextVar("connection_priority", default="normal")
+
+
+class PoolTimeout(Exception):
+    """풀의 연결이 모두 사용 중이고 POOL_TIMEOUT 안에 반납되지 않았습니다."""
+
+
 class Database:
     _pool = None
+    # 풀 한도를 넘지 않도록 대여를 조절하는 대기열. 연결이 없으면 예외 대신 기다리고,
+    # high 대기자가 있으면 normal 대기자보다 먼저 받습니다.
+    _cond = threading.Condition()
+    _in_use = 0
+    _waiting = {"high": 0, "normal": 0}
+    # 누적 대여 횟수 (벤치마크/지표용)
+    _acquired = 0
+
+    @staticmethod
+    def connect_kwargs():
+        """풀을 거치지 않는 전용 연결(대량 적재, 마이그레이션 등)에 쓰는 접속 정보"""
+        return dict(
+            host=os.getenv("DB_HOST"),
+            port=os.getenv("DB_PORT"),
+            database=os.getenv("DB_NAME"),
+            user=os.getenv("DB_USER"),
+            password=os.getenv("DB_PASSWORD")
+        )
 
     @classmethod
     def initialize(cls):
         if cls._pool is None:
             try:
-                cls._pool = psycopg2.pool.SimpleConnectionPool(
-                    1, 20,
-                    host=os.getenv("DB_HOST"),
-                    port=os.getenv("DB_PORT"),
-                    database=os.getenv("DB_NAME"),
-                    user=os.getenv("DB_USER"),
-                    password=os.getenv("DB_PASSWORD")
-                )
+                # 요청 핸들러가 스레드 풀에서 실행되므로 스레드 안전한 풀을 사용합니다.
+                cls._pool = psycopg2.pool.ThreadedConnectionPool(1, POOL_MAX, **cls.connect_kwargs())
                 print("[OK] PostgreSQL DB connected.")
             except Exception as e:
                 print(f"[ERROR] DB connection failed: {e}")
                 raise e
 
     @classmethod
-    def get_connection(cls):
+    def _can_acquire(cls, priority):
+        if priority == "high":
+            return cls._in_use < POOL_MAX
+        return cls._in_use < POOL_MAX - POOL_RESERVED and cls._waiting["high"] == 0
+
+    @classmethod
+    def get_connection(cls, timeout=None):
+        """
+        풀에서 연결을 빌립니다. 풀이 차 있으면 최대 POOL_TIMEOUT 동안 스레드를 막고 기다리므로,
+        async 핸들러에서는 run_in_threadpool / asyncio.to_thread 안에서만 부릅니다.
+        """
         if cls._pool is None:
             cls.initialize()
-        return cls._pool.getconn()
+        priority = connection_priority.get()
+        deadline = time.monotonic() + (POOL_TIMEOUT if timeout is None else timeout)
+        with cls._cond:
+            cls._waiting[priority] += 1
+            try:
+                while not cls._can_acquire(priority):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout("connection pool exhausted")
+                    cls._cond.wait(remaining)
+                cls._in_use += 1
+                cls._acquired += 1
+            finally:
+                cls._waiting[priority] -= 1
+                if priority == "high":
+                    cls._cond.notify_all()
+        try:
+            return cls._pool.getconn()
+        except Exception:
+            cls._release_slot()
+            raise
+
+    @classmethod
+    def _release_slot(cls):
+        with cls._cond:
+            cls._in_use -= 1
+            cls._cond.notify_all()
+
+    @classmethod
+    def pool_stats(cls):
+        with cls._cond:
+            return {"max": POOL_MAX, "reserved": POOL_RESERVED, "inUse": cls._in_use, "waiting": dict(cls._waiting),
+                    "acquired": cls._acquired}
+
+    @classmethod
+    def warm_up(cls, count=None):
+        """풀에 연결을 미리 만들어 둡니다 (DB_POOL_WARM, 기본 5개)."""
+        count = count if count is not None else int(os.getenv("DB_POOL_WARM", "5"))
+        conns = []
+        try:
+            for _ in range(count):
+                conn = cls.get_connection()
+                conns.append(conn)
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                conn.commit()
+        finally:
+            for conn in conns:
+                cls.return_connection(conn)
+        return len(conns)
 
     @classmethod
     def return_connection(cls, conn):
         if cls._pool:
             cls._pool.putconn(conn)
+            cls._release_slot()
 
     @classmethod
     def close_all(cls):
@@ -6,6 +6,30 @@ DROP TABLE IF EXISTS users CASCADE;
 DROP TABLE IF EXISTS coaches CASCADE;
 DROP TABLE IF EXISTS products CASCADE;
 DROP TABLE IF EXISTS admins CASCADE;
+DROP TABLE IF EXISTS schema_migrations CASCADE;
+DROP TABLE IF EXISTS sync_changes CASCADE;
+DROP TABLE IF EXISTS sync_horizon CASCADE;
+DROP SEQUENCE IF EXISTS sync_seq;
+DROP TABLE IF EXISTS attendance_archive CASCADE;
+DROP TABLE IF EXISTS users_archive CASCADE;
+DROP TABLE IF EXISTS idempotency_keys CASCADE;
+DROP TABLE IF EXISTS attendance_hourly CASCADE;
+DROP TABLE IF EXISTS attendance_hourly_monthly CASCADE;
+DROP TABLE IF EXISTS session_bookings CASCADE;
+DROP TABLE IF EXISTS coach_sessions CASCADE;
+DROP TABLE IF EXISTS automation_firings CASCADE;
+DROP TABLE IF EXISTS automation_rules CASCADE;
+DROP TABLE IF EXISTS message_outbox CASCADE;
+DROP TABLE IF EXISTS message_templates CASCADE;
+DROP TABLE IF EXISTS audit_log CASCADE;
+DROP TABLE IF EXISTS qr_signing_keys CASCADE;
+DROP TABLE IF EXISTS qr_revocations CASCADE;
+DROP TABLE IF EXISTS payments CASCADE;
+DROP TABLE IF EXISTS revenue_daily CASCADE;
+DROP TABLE IF EXISTS revenue_monthly CASCADE;
+DROP TABLE IF EXISTS attendance_bitmaps CASCADE;
+DROP TABLE IF EXISTS coach_workload_daily CASCADE;
+DROP TABLE IF EXISTS coach_workload_monthly CASCADE;
 
 -- 관리자 테이블
 CREATE TABLE admins (
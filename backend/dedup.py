@@ -0,0 +1,173 @@
+"""
+중복 회원 탐지
+
+회원 테이블의 정규화 키 phone_key / name_key (migrations/0008, 트리거가 유지) 를 블로킹 키로 써서
+같은 블록 안에서만 비교합니다. 전체 N² 비교 없이 인덱스 조회와 해시 조인으로 후보를 찾습니다.
+
+일치 규칙
+- exact: 정규화한 이름과 전화번호가 모두 같음 (하이픈/공백 차이, 다른 상품으로 재등록)
+- phone: 전화번호만 같음 (이름 오타, 띄어쓰기 외의 표기 차이, 가족이 같은 번호를 쓰는 경우 포함)
+- name : 이름이 같고 전화번호 끝 4자리가 같음 (번호 앞자리 변경, 지역번호 누락)
+
+아래 normalize_* 함수는 SQL 함수 normalize_phone / normalize_name 과 같은 규칙입니다.
+"""
+import re
+import unicodedata
+
+import booking
+
+# 이 크기를 넘는 블록(예: 000-0000-0000 같은 임시 번호)은 중복이 아니라 자리표시자로 보고 건너뜁니다.
+MAX_BLOCK_SIZE = 20
+
+# 병합 시 회원 ID 를 옮겨야 하는 (테이블, 컬럼) 목록
+MERGE_REFERENCES = [
+    ("attendance", "user_id"),
+    ("session_bookings", "user_id"),
+    ("message_outbox", "user_id"),
+    ("payments", "user_id"),
+]
+
+_NON_DIGITS = re.compile(r'[^0-9]')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_phone(value):
+    digits = _NON_DIGITS.sub('', value or '')
+    if digits.startswith('82') and 11 <= len(digits) <= 12:
+        digits = '0' + digits[2:]
+    return digits
+
+
+def normalize_name(value):
+    return _WHITESPACE.sub('', unicodedata.normalize('NFC', value or '')).lower()
+
+
+def classify(name_key, phone_key, other_name_key, other_phone_key):
+    if phone_key and phone_key == other_phone_key:
+        return "exact" if name_key == other_name_key else "phone"
+    if name_key == other_name_key and len(phone_key) >= 4 and phone_key[-4:] == other_phone_key[-4:]:
+        return "name"
+    return None
+
+
+def find_candidates(cursor, people):
+    """
+    people: [(이름, 전화번호), ...] 에 대해 기존 회원 중 후보를 한 번의 조회로 찾습니다.
+    반환값: 입력 순서와 같은 길이의 목록. 각 항목은 [{"id", "name", "phone", "productId", "match"}...]
+    cursor 는 RealDictCursor 여야 합니다.
+    """
+    if not people:
+        return []
+    name_keys = [normalize_name(name) for name, _ in people]
+    phone_keys = [normalize_phone(phone) for _, phone in people]
+    cursor.execute("""
+        WITH input AS (
+            SELECT * FROM unnest(%s::text[], %s::text[]) WITH ORDINALITY AS i(name_key, phone_key, idx)
+        )
+        SELECT i.idx, u.id, u.name, u.phone, u.product_id, u.name_key, u.phone_key
+        FROM input i JOIN users u ON u.phone_key = i.phone_key
+        WHERE i.phone_key <> ''
+        UNION
+        SELECT i.idx, u.id, u.name, u.phone, u.product_id, u.name_key, u.phone_key
+        FROM input i JOIN users u ON u.name_key = i.name_key
+        WHERE length(i.phone_key) >= 4 AND right(u.phone_key, 4) = right(i.phone_key, 4)
+    """, (name_keys, phone_keys))
+
+    results = [[] for _ in people]
+    for row in cursor.fetchall():
+        i = row['idx'] - 1
+        match = classify(name_keys[i], phone_keys[i], row['name_key'], row['phone_key'])
+        if match:
+            results[i].append({"id": row['id'], "name": row['name'], "phone": row['phone'],
+                               "productId": row['product_id'], "match": match})
+    return results
+
+
+def find_clusters(cursor, max_block_size=MAX_BLOCK_SIZE):
+    """
+    전체 회원에서 중복 후보 묶음을 찾습니다. 블록 안의 쌍만 만들고 union-find 로 묶습니다.
+    반환값: (묶음 목록 [[회원 id...]...], 쌍별 일치 종류 {(a, b): match}, 건너뛴 큰 블록 수)
+    """
+    cursor.execute("""
+        WITH phone_blocks AS (
+            SELECT phone_key FROM users WHERE phone_key <> ''
+            GROUP BY phone_key HAVING COUNT(*) BETWEEN 2 AND %(max)s
+        ),
+        name_blocks AS (
+            SELECT name_key, right(phone_key, 4) AS suffix FROM users WHERE length(phone_key) >= 4
+            GROUP BY 1, 2 HAVING COUNT(*) BETWEEN 2 AND %(max)s
+        )
+        SELECT a.id AS a, b.id AS b, a.name_key = b.name_key AS same_name, TRUE AS same_phone
+        FROM phone_blocks k
+        JOIN users a ON a.phone_key = k.phone_key
+        JOIN users b ON b.phone_key = k.phone_key AND a.id < b.id
+        UNION
+        SELECT a.id, b.id, TRUE, a.phone_key = b.phone_key
+        FROM name_blocks k
+        JOIN users a ON a.name_key = k.name_key AND right(a.phone_key, 4) = k.suffix
+        JOIN users b ON b.name_key = k.name_key AND right(b.phone_key, 4) = k.suffix AND a.id < b.id
+    """, {"max": max_block_size})
+    pairs = {}
+    for row in cursor.fetchall():
+        if row['same_phone']:
+            pairs[(row['a'], row['b'])] = "exact" if row['same_name'] else "phone"
+        else:
+            pairs.setdefault((row['a'], row['b']), "name")
+
+    cursor.execute("""
+        SELECT
+            (SELECT COUNT(*) FROM (SELECT 1 FROM users WHERE phone_key <> ''
+                                   GROUP BY phone_key HAVING COUNT(*) > %(max)s) p) +
+            (SELECT COUNT(*) FROM (SELECT 1 FROM users WHERE length(phone_key) >= 4
+                                   GROUP BY name_key, right(phone_key, 4) HAVING COUNT(*) > %(max)s) n) AS skipped
+    """, {"max": max_block_size})
+    skipped = cursor.fetchone()['skipped']
+
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in pairs:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[root_b] = root_a
+
+    clusters = {}
+    for member in parent:
+        clusters.setdefault(find(member), []).append(member)
+    return list(clusters.values()), pairs, skipped
+
+
+def merge_members(cursor, target_id, duplicate_ids):
+    """
+    duplicate_ids 회원의 기록을 target_id 로 옮기고 중복 회원을 삭제합니다.
+    같은 날짜/시각의 출석이 이미 있으면 중복 쪽 기록은 버립니다. cursor 는 RealDictCursor 여야 합니다.
+    반환값: {"moved": {테이블: 행 수}, "dropped": 버린 출석 수}
+    """
+    # 같은 (날짜, 시각) 출석은 하나만 남깁니다: target 것이 있으면 target, 없으면 중복들 중 가장 작은 id.
+    cursor.execute("""
+        DELETE FROM attendance d
+        WHERE d.user_id = ANY(%(dups)s)
+          AND EXISTS (
+              SELECT 1 FROM attendance k
+              WHERE k.date = d.date AND k.time = d.time
+                AND (k.user_id = %(target)s OR (k.user_id = ANY(%(dups)s) AND k.id < d.id))
+          )
+    """, {"dups": duplicate_ids, "target": target_id})
+    dropped = cursor.rowcount
+
+    # 같은 수업의 예약이 겹치면 하나만 남깁니다 (자리 반납, 대기자 승격 포함).
+    booking.resolve_merge_collisions(cursor, target_id, duplicate_ids)
+
+    moved = {}
+    for table, column in MERGE_REFERENCES:
+        cursor.execute(f"UPDATE {table} SET {column} = %s WHERE {column} = ANY(%s)", (target_id, duplicate_ids))
+        moved[table] = cursor.rowcount
+
+    cursor.execute("DELETE FROM users WHERE id = ANY(%s)", (duplicate_ids,))
+    return {"moved": moved, "dropped": dropped}
@@ -0,0 +1,247 @@
+"""
+대용량 합성 데이터 생성기
+
+운영 규모(예: 회원 100만 명 / 출석 1억 건)에서 API 동작을 확인하기 위해
+products, coaches, users, attendance 테이블에 합성 데이터를 COPY로 적재합니다.
+
+- 같은 --seed 값이면 항상 같은 데이터가 생성됩니다 (--jobs 값과 무관).
+- 행은 청크 단위로 생성되어 스트리밍되므로 메모리 사용량은 일정합니다.
+
+사용 예:
+    python generate_data.py --users 1000000 --attendance 100000000 --reset --jobs 8
+"""
+import argparse
+import calendar
+import io
+import random
+import time
+from datetime import date, timedelta
+from multiprocessing import Pool
+
+import psycopg2
+from database import db
+
+# 시드가 같으면 결과가 같도록 회원을 고정 크기 청크로 나누고 청크마다 독립된 시드를 사용합니다.
+CHUNK_USERS = 10000
+
+SURNAMES = ['김', '이', '박', '최', '정', '강', '조', '윤', '장', '임', '한', '오', '서', '신', '권', '황', '안', '송', '류', '홍']
+GIVEN_SYLLABLES = ['민', '서', '지', '현', '우', '준', '윤', '희', '수', '영', '하', '은', '도', '유', '진', '성', '태', '소', '동', '연']
+SPECIALTIES = ['FPT', 'PT', 'Group']
+# 체크인 시각 분포 (오전/저녁 피크)
+CHECKIN_HOURS = [6, 7, 7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 18, 18, 19, 19, 20, 20, 21, 22]
+
+DATA_START = date(2023, 1, 1)
+
+
+class RowStream(io.RawIOBase):
+    """
+    행 이터레이터를 copy_expert()가 읽을 수 있는 파일 객체로 감싸는 클래스.
+    전체 데이터를 메모리에 올리지 않고 COPY로 흘려보냅니다.
+    """
+
+    def __init__(self, lines):
+        self._lines = lines
+        self._buffer = b''
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._lines).encode('utf-8')
+            except StopIteration:
+                break
+        if size < 0:
+            chunk, self._buffer = self._buffer, b''
+        else:
+            chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+    def readinto(self, b):
+        chunk = self.read(len(b))
+        b[:len(chunk)] = chunk
+        return len(chunk)
+
+
+def _chunk_rng(seed, kind, chunk_index):
+    return random.Random(f"{seed}:{kind}:{chunk_index}")
+
+
+def _add_months(start, months):
+    target_month = start.month + months
+    new_year = start.year + (target_month - 1) // 12
+    new_month = (target_month - 1) % 12 + 1
+    new_day = min(start.day, calendar.monthrange(new_year, new_month)[1])
+    return date(new_year, new_month, new_day)
+
+
+def product_rows(count):
+    for i in range(1, count + 1):
+        if i % 5 == 0:
+            # FPT 횟수권: 기간 없음
+            yield f"{i}\tFPT {i * 10}회\t0\tmonths\t{i * 50000}\t합성 데이터\tt\n"
+        else:
+            months = [1, 3, 6, 12][i % 4]
+            yield f"{i}\t회원권 {months}개월 #{i}\t{months}\tmonths\t{months * 90000}\t합성 데이터\tt\n"
+
+
+def coach_rows(count, seed):
+    rng = _chunk_rng(seed, 'coaches', 0)
+    for i in range(1, count + 1):
+        name = rng.choice(SURNAMES) + rng.choice(GIVEN_SYLLABLES) + rng.choice(GIVEN_SYLLABLES)
+        status = 'active' if rng.random() < 0.85 else 'inactive'
+        yield f"C{i:03d}\t{name}\t010-9{i // 10000:03d}-{i % 10000:04d}\t{status}\t{rng.choice(SPECIALTIES)}\n"
+
+
+def _user(i, rng, product_count, today):
+    """회원 i의 속성. 출석 생성에서도 같은 값을 다시 계산할 수 있도록 rng는 회원 단위로 소비합니다."""
+    name = rng.choice(SURNAMES) + rng.choice(GIVEN_SYLLABLES) + rng.choice(GIVEN_SYLLABLES)
+    gender = rng.choice(['남', '여'])
+    product_id = rng.randint(1, product_count)
+    span = (today - DATA_START).days
+    reg_date = DATA_START + timedelta(days=rng.randint(0, span))
+    start_date = reg_date + timedelta(days=rng.randint(0, 14))
+    if product_id % 5 == 0:
+        end_date = None
+    else:
+        end_date = _add_months(start_date, [1, 3, 6, 12][product_id % 4])
+    remaining = rng.randint(0, 100)
+    return name, gender, product_id, reg_date, start_date, end_date, remaining
+
+
+def user_rows(chunk_index, user_count, product_count, seed, today):
+    rng = _chunk_rng(seed, 'users', chunk_index)
+    first = chunk_index * CHUNK_USERS + 1
+    last = min(first + CHUNK_USERS, user_count + 1)
+    for i in range(first, last):
+        name, gender, product_id, reg_date, start_date, end_date, remaining = _user(i, rng, product_count, today)
+        # UNIQUE(name, phone) 충돌을 피하기 위해 전화번호는 회원 번호로부터 만듭니다.
+        phone = f"010-{i // 10000:04d}-{i % 10000:04d}"
+        end = end_date.isoformat() if end_date else '\\N'
+        yield f"{i}\t{name}\t{gender}\t{phone}\t{product_id}\t{reg_date}\t{start_date}\t{end}\t{remaining}\n"
+
+
+def attendance_rows(chunk_index, user_count, product_count, per_user, seed, today):
+    """
+    회원 청크의 출석 행을 생성합니다. 한 회원은 하루에 한 번만 출석하므로
+    UNIQUE(user_id, date, time) 제약을 위반하지 않습니다.
+    """
+    user_rng = _chunk_rng(seed, 'users', chunk_index)
+    rng = _chunk_rng(seed, 'attendance', chunk_index)
+    first = chunk_index * CHUNK_USERS + 1
+    last = min(first + CHUNK_USERS, user_count + 1)
+    for i in range(first, last):
+        _, _, _, _, start_date, end_date, _ = _user(i, user_rng, product_count, today)
+        window_end = min(end_date, today) if end_date else today
+        days = (window_end - start_date).days + 1
+        if days <= 0:
+            continue
+        # 회원마다 출석 빈도를 다르게 (평균 per_user)
+        visits = min(days, int(rng.expovariate(1 / per_user)) if per_user > 0 else 0)
+        if visits == 0:
+            continue
+        for offset in sorted(rng.sample(range(days), visits)):
+            day = start_date + timedelta(days=offset)
+            yield f"{i}\t{day}\t{rng.choice(CHECKIN_HOURS):02d}:{rng.randint(0, 59):02d}\tPresent\n"
+
+
+def _copy(conn, table, columns, lines):
+    cursor = conn.cursor()
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", RowStream(lines), size=1 << 20)
+    conn.commit()
+
+
+USER_COLUMNS = ['id', 'name', 'gender', 'phone', 'product_id', 'reg_date', 'start_date', 'end_date', 'remaining']
+ATTENDANCE_COLUMNS = ['user_id', 'date', 'time', 'status']
+
+
+def _load_chunks(args):
+    """워커 프로세스: 담당 청크들의 회원/출석을 각각 COPY로 적재합니다."""
+    kind, chunk_indexes, user_count, product_count, per_user, seed, today = args
+    conn = psycopg2.connect(**db.connect_kwargs())
+    try:
+        for chunk_index in chunk_indexes:
+            if kind == 'users':
+                _copy(conn, 'users', USER_COLUMNS,
+                      user_rows(chunk_index, user_count, product_count, seed, today))
+            else:
+                _copy(conn, 'attendance', ATTENDANCE_COLUMNS,
+                      attendance_rows(chunk_index, user_count, product_count, per_user, seed, today))
+    finally:
+        conn.close()
+    return len(chunk_indexes)
+
+
+def _parallel(kind, user_count, product_count, per_user, seed, today, jobs):
+    chunk_count = (user_count + CHUNK_USERS - 1) // CHUNK_USERS
+    chunks = list(range(chunk_count))
+    if jobs <= 1:
+        _load_chunks((kind, chunks, user_count, product_count, per_user, seed, today))
+        return
+    tasks = [(kind, chunks[j::jobs], user_count, product_count, per_user, seed, today) for j in range(jobs)]
+    with Pool(jobs) as pool:
+        pool.map(_load_chunks, tasks)
+
+
+def generate(users, attendance, products, coaches, seed, jobs, reset, today):
+    per_user = attendance / users if users else 0
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        if reset:
+            print("Truncating attendance, users, coaches, products...")
+            cursor.execute("TRUNCATE attendance, users, coaches, products RESTART IDENTITY CASCADE")
+            conn.commit()
+
+        started = time.perf_counter()
+        _copy(conn, 'products', ['id', 'name', 'reg_months', 'duration_unit', 'price', 'description', 'active'],
+              product_rows(products))
+        cursor.execute("SELECT setval(pg_get_serial_sequence('products', 'id'), (SELECT MAX(id) FROM products))")
+        _copy(conn, 'coaches', ['id', 'name', 'phone', 'status', 'specialty'], coach_rows(coaches, seed))
+        conn.commit()
+        print(f"[OK] products={products}, coaches={coaches} ({time.perf_counter() - started:.1f}s)")
+    finally:
+        db.return_connection(conn)
+
+    started = time.perf_counter()
+    _parallel('users', users, products, per_user, seed, today, jobs)
+    print(f"[OK] users={users} ({time.perf_counter() - started:.1f}s)")
+
+    started = time.perf_counter()
+    _parallel('attendance', users, products, per_user, seed, today, jobs)
+    print(f"[OK] attendance≈{attendance} ({time.perf_counter() - started:.1f}s)")
+
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT setval(pg_get_serial_sequence('attendance', 'id'), COALESCE((SELECT MAX(id) FROM attendance), 1))")
+        print("Running ANALYZE...")
+        cursor.execute("ANALYZE products, coaches, users, attendance")
+        conn.commit()
+    finally:
+        db.return_connection(conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="합성 데이터 생성기 (COPY 기반)")
+    parser.add_argument('--users', type=int, default=10000, help="생성할 회원 수")
+    parser.add_argument('--attendance', type=int, default=200000, help="생성할 출석 기록 수 (근사치)")
+    parser.add_argument('--products', type=int, default=20, help="생성할 상품 수")
+    parser.add_argument('--coaches', type=int, default=30, help="생성할 코치 수")
+    parser.add_argument('--seed', type=int, default=42, help="난수 시드 (같은 시드 = 같은 데이터)")
+    parser.add_argument('--jobs', type=int, default=1, help="병렬 적재 프로세스 수")
+    parser.add_argument('--today', type=date.fromisoformat, default=date.today(),
+                        help="기준일 (YYYY-MM-DD). 재현 가능한 결과를 원하면 고정하세요.")
+    parser.add_argument('--reset', action='store_true', help="적재 전에 기존 데이터를 모두 삭제")
+    args = parser.parse_args()
+
+    if not args.reset:
+        print("ℹ️ --reset 없이 실행합니다. 기존 데이터와 ID가 겹치면 COPY가 실패합니다.")
+    generate(args.users, args.attendance, args.products, args.coaches,
+             args.seed, args.jobs, args.reset, args.today)
+    print("✅ Synthetic data generated.")
+
+
+if __name__ == "__main__":
+    main()
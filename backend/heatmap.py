@@ -0,0 +1,234 @@
+"""
+출석 시간대 집계 (요일 × 시간)
+
+attendance_hourly / attendance_hourly_monthly (migrations/0009) 는 출석 INSERT/DELETE 트리거가
+바로 갱신합니다. 이 모듈은
+- 요일 × 시간 히트맵 조회: 범위 안의 온전한 달은 월 합계에서, 앞뒤 자투리 날짜만 일별 합계에서 읽어
+  여러 해 범위도 원본 출석을 훑지 않고 수천 행 이내로 답합니다.
+- 월 단위 재집계: 기존 데이터 채우기(마이그레이션 0010)와 야간 보정(최근 두 달). 원본과 비교해 어긋난 만큼만 더하므로
+  출석 체크를 막지 않습니다.
+
+상품은 회원의 현재 상품(users → users_archive 순)입니다. 회원 상품이 바뀌면 0009 의 트리거가 그 회원의 출석을
+새 상품으로 옮기므로 트리거와 재집계가 같은 기준으로 셉니다.
+
+사용 예 (backend/ 에서):
+    python heatmap.py                       # 전체 기간 재집계
+    python heatmap.py --from 2024-01 --to 2024-12
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+from database import db
+
+WEEKDAYS = ["월", "화", "수", "목", "금", "토", "일"]
+RECONCILE_MONTHS = 2
+
+
+def month_start(value):
+    return value.replace(day=1)
+
+
+def next_month(value):
+    return (value.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def split_range(start, end):
+    """
+    [start, end] 를 (일별 구간들, 월 합계 구간) 으로 나눕니다. 구간은 모두 [시작, 끝) 입니다.
+    온전한 달이 없으면 월 합계 구간은 None 입니다.
+    """
+    end_exclusive = end + timedelta(days=1)
+    first_full = start if start.day == 1 else next_month(start)
+    last_full = month_start(end_exclusive)
+    if first_full >= last_full:
+        return [(start, end_exclusive)], None
+    days = [(s, e) for s, e in ((start, first_full), (last_full, end_exclusive)) if s < e]
+    return days, (first_full, last_full)
+
+
+def heatmap(cursor, start, end, product_id=None, bucket_hours=1):
+    """
+    요일(월~일) × 시간 구간별 출석 수. 반환값의 counts 는 7 행 × (24 / bucket_hours) 열입니다.
+    cursor 는 일반 커서여도 되고 RealDictCursor 여도 됩니다.
+    """
+    day_ranges, month_range = split_range(start, end)
+    product_condition = "AND product_id = %s" if product_id is not None else ""
+
+    parts = []
+    params = []
+    for range_start, range_end in day_ranges:
+        parts.append(f"""
+            SELECT EXTRACT(ISODOW FROM date)::int AS weekday, hour, count
+            FROM attendance_hourly
+            WHERE date >= %s AND date < %s {product_condition}
+        """)
+        params += [range_start, range_end] + ([product_id] if product_id is not None else [])
+    if month_range:
+        parts.append(f"""
+            SELECT weekday, hour, count
+            FROM attendance_hourly_monthly
+            WHERE month >= %s AND month < %s {product_condition}
+        """)
+        params += list(month_range) + ([product_id] if product_id is not None else [])
+
+    cursor.execute(f"""
+        SELECT weekday, hour / %s AS bucket, SUM(count) AS count
+        FROM ({' UNION ALL '.join(parts)}) c
+        GROUP BY 1, 2
+    """, [bucket_hours] + params)
+
+    buckets = 24 // bucket_hours
+    counts = [[0] * buckets for _ in WEEKDAYS]
+    for row in cursor.fetchall():
+        weekday, bucket, count = (row['weekday'], row['bucket'], row['count']) if isinstance(row, dict) else row
+        counts[weekday - 1][bucket] = int(count)
+
+    total = sum(map(sum, counts))
+    peak = max(((w, b) for w in range(len(WEEKDAYS)) for b in range(buckets)),
+               key=lambda wb: counts[wb[0]][wb[1]])
+    return {
+        "startDate": str(start),
+        "endDate": str(end),
+        "productId": product_id,
+        "bucketHours": bucket_hours,
+        "weekdays": WEEKDAYS,
+        "hours": [b * bucket_hours for b in range(buckets)],
+        "counts": counts,
+        "byWeekday": [sum(row) for row in counts],
+        "byHour": [sum(counts[w][b] for w in range(len(WEEKDAYS))) for b in range(buckets)],
+        "total": total,
+        "peak": {"weekday": WEEKDAYS[peak[0]], "hour": peak[1] * bucket_hours,
+                 "count": counts[peak[0]][peak[1]]} if total else None
+    }
+
+
+def rebuild_month(conn, month):
+    """
+    한 달치 집계를 원본 출석(보관 포함)에서 다시 계산해 어긋난 만큼만 더합니다.
+    원본 집계와 현재 집계 테이블을 한 문장(같은 스냅샷)에서 비교하므로, 그 사이 커밋되는 출석 체크의 트리거 증분과
+    겹치지 않습니다. 테이블 잠금 없이 어긋난 버킷의 행 잠금만 잠깐 잡습니다. 고친 일별 버킷 수를 돌려줍니다.
+    """
+    start, end = month_start(month), next_month(month)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            WITH source AS (
+                SELECT a.date, EXTRACT(HOUR FROM a.time)::smallint AS hour,
+                       COALESCE(u.product_id, ua.product_id, 0) AS product_id, COUNT(*)::int AS count
+                FROM (SELECT user_id, date, time FROM attendance WHERE date >= %(start)s AND date < %(end)s
+                      UNION ALL
+                      SELECT user_id, date, time FROM attendance_archive WHERE date >= %(start)s AND date < %(end)s) a
+                LEFT JOIN users u ON u.id = a.user_id
+                LEFT JOIN users_archive ua ON ua.id = a.user_id AND u.id IS NULL
+                WHERE u.id IS NOT NULL OR ua.id IS NOT NULL
+                GROUP BY 1, 2, 3
+            ),
+            daily_diff AS (
+                SELECT date, hour, product_id, SUM(n)::int AS n
+                FROM (SELECT date, hour, product_id, count AS n FROM source
+                      UNION ALL
+                      SELECT date, hour, product_id, -count FROM attendance_hourly
+                      WHERE date >= %(start)s AND date < %(end)s) d
+                GROUP BY 1, 2, 3
+                HAVING SUM(n) <> 0
+            ),
+            monthly_diff AS (
+                SELECT weekday, hour, product_id, SUM(n)::int AS n
+                FROM (SELECT EXTRACT(ISODOW FROM date)::smallint AS weekday, hour, product_id, count AS n FROM source
+                      UNION ALL
+                      SELECT weekday, hour, product_id, -count FROM attendance_hourly_monthly
+                      WHERE month = %(start)s) m
+                GROUP BY 1, 2, 3
+                HAVING SUM(n) <> 0
+            ),
+            fix_daily AS (
+                INSERT INTO attendance_hourly AS h (date, hour, product_id, count)
+                SELECT date, hour, product_id, n FROM daily_diff
+                ORDER BY 1, 2, 3
+                ON CONFLICT (date, hour, product_id) DO UPDATE SET count = h.count + EXCLUDED.count
+                RETURNING 1
+            ),
+            fix_monthly AS (
+                INSERT INTO attendance_hourly_monthly AS m (month, weekday, hour, product_id, count)
+                SELECT %(start)s, weekday, hour, product_id, n FROM monthly_diff
+                ORDER BY 2, 3, 4
+                ON CONFLICT (month, weekday, hour, product_id) DO UPDATE SET count = m.count + EXCLUDED.count
+                RETURNING 1
+            )
+            SELECT (SELECT COUNT(*) FROM fix_daily), (SELECT COUNT(*) FROM fix_monthly)
+        """, {"start": start, "end": end})
+        buckets = cursor.fetchone()[0]
+        conn.commit()
+        return buckets
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def rebuild(conn, start=None, end=None, pause=0.05):
+    """start 달부터 end 달까지(포함) 한 달씩 재집계하고 달마다 커밋합니다. 기본은 전체 기간입니다."""
+    if start is None or end is None:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT MIN(d), MAX(d) FROM (
+                SELECT MIN(date) AS d FROM attendance UNION ALL SELECT MAX(date) FROM attendance
+                UNION ALL
+                SELECT MIN(date) FROM attendance_archive UNION ALL SELECT MAX(date) FROM attendance_archive
+            ) bounds
+        """)
+        first, last = cursor.fetchone()
+        conn.commit()
+        if first is None:
+            return {"months": 0, "buckets": 0}
+        start, end = start or first, end or last
+
+    totals = {"months": 0, "buckets": 0}
+    started = time.perf_counter()
+    month = month_start(start)
+    while month <= end:
+        totals["buckets"] += rebuild_month(conn, month)
+        totals["months"] += 1
+        month = next_month(month)
+        if pause:
+            time.sleep(pause)
+    print(f"[HEATMAP] rebuilt {totals['months']} month(s), corrected {totals['buckets']} bucket(s) "
+          f"({time.perf_counter() - started:.1f}s)")
+    return totals
+
+
+def reconcile_recent(months=RECONCILE_MONTHS):
+    """스케줄러 진입점: 최근 months 달을 다시 계산합니다."""
+    today = date.today()
+    start = month_start(today)
+    for _ in range(months - 1):
+        start = month_start(start - timedelta(days=1))
+    conn = db.get_connection()
+    try:
+        return rebuild(conn, start, today)
+    finally:
+        db.return_connection(conn)
+
+
+def _parse_month(value):
+    year, month = value.split('-')[:2]
+    return date(int(year), int(month), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="출석 시간대 집계 재계산")
+    parser.add_argument('--from', dest='start', type=_parse_month, help="시작 달 (YYYY-MM)")
+    parser.add_argument('--to', dest='end', type=_parse_month, help="끝 달 (YYYY-MM, 포함)")
+    args = parser.parse_args()
+
+    conn = db.get_connection()
+    try:
+        totals = rebuild(conn, args.start, args.end)
+    finally:
+        db.return_connection(conn)
+        db.close_all()
+    print(f"✅ Rebuilt {totals['months']} month(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Idempotency-Key 지원
+
+키오스크가 타임아웃 뒤 같은 POST 를 다시 보내도 한 번만 처리되도록, 클라이언트가 보낸
+Idempotency-Key 헤더별로 첫 응답을 저장해 두고 재시도에는 핸들러를 다시 실행하지 않고 그 응답을 돌려줍니다.
+
+- 저장소: idempotency_keys 테이블 (IDEMPOTENCY_TTL 초 후 만료, 주기 작업으로 정리) + 메모리 LRU.
+- 같은 키의 요청이 동시에 들어오면 한 요청만 실행되고 나머지는 그 결과를 기다렸다가 받습니다.
+  다른 워커 프로세스에서 처리 중이면 409 와 Retry-After 를 돌려줍니다.
+- 같은 키로 본문이 다른 요청을 보내면 422 입니다.
+- 5xx 응답은 저장하지 않으므로 재시도하면 다시 실행됩니다.
+"""
+import asyncio
+import hashlib
+import json
+import os
+
+from admission import route_matches
+from cache import TTLCache
+from database import db
+
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+# 처리 중 표시가 이 시간보다 오래되면 (워커가 죽은 경우 등) 다른 요청이 다시 선점할 수 있습니다.
+PENDING_TIMEOUT = int(os.getenv("IDEMPOTENCY_PENDING_TIMEOUT", "60"))
+MAX_KEY_LENGTH = 255
+
+IDEMPOTENT_ROUTES = [
+    ("POST", "/api/attendance"),
+    ("POST", "/api/attendance/kiosk"),
+    ("POST", "/api/users"),
+    ("POST", "/api/users/*"),
+    ("POST", "/api/products"),
+    ("POST", "/api/coaches"),
+    ("POST", "/api/sessions"),
+    ("POST", "/api/sessions/*"),
+    ("POST", "/api/messages/*"),
+]
+
+_cache = TTLCache(ttl=IDEMPOTENCY_TTL, maxsize=int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000")))
+_inflight = {}
+
+
+# ---------------------------------------------------------------------------
+# 저장소
+# ---------------------------------------------------------------------------
+
+def _claim(key, method, path, fingerprint):
+    """
+    키를 선점합니다. ("claimed", None) / ("done", 저장된 응답) / ("pending", None) 중 하나를 돌려줍니다.
+    만료되었거나 오래 처리 중으로 남은 행은 새로 선점합니다.
+    """
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO idempotency_keys (idem_key, method, path, fingerprint, expires_at)
+            VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP + make_interval(secs => %s))
+            ON CONFLICT (idem_key, method, path) DO UPDATE
+            SET fingerprint = EXCLUDED.fingerprint, status = NULL, headers = NULL, body = NULL,
+                created_at = CURRENT_TIMESTAMP, expires_at = EXCLUDED.expires_at
+            WHERE idempotency_keys.expires_at < CURRENT_TIMESTAMP
+               OR (idempotency_keys.status IS NULL
+                   AND idempotency_keys.created_at < CURRENT_TIMESTAMP - make_interval(secs => %s))
+            RETURNING 1
+        """, (key, method, path, fingerprint, IDEMPOTENCY_TTL, PENDING_TIMEOUT))
+        if cursor.fetchone():
+            conn.commit()
+            return "claimed", None
+
+        cursor.execute("""
+            SELECT fingerprint, status, headers, body FROM idempotency_keys
+            WHERE idem_key = %s AND method = %s AND path = %s
+        """, (key, method, path))
+        row = cursor.fetchone()
+        conn.commit()
+        if row is None or row[1] is None:
+            return "pending", None
+        return "done", {"fingerprint": row[0], "status": row[1],
+                        "headers": [(k.encode('latin-1'), v.encode('latin-1')) for k, v in row[2]],
+                        "body": bytes(row[3])}
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db.return_connection(conn)
+
+
+def _store(key, method, path, response):
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        headers = [[k.decode('latin-1'), v.decode('latin-1')] for k, v in response["headers"]]
+        cursor.execute("""
+            UPDATE idempotency_keys SET status = %s, headers = %s, body = %s
+            WHERE idem_key = %s AND method = %s AND path = %s
+        """, (response["status"], json.dumps(headers), response["body"], key, method, path))
+        conn.commit()
+    finally:
+        db.return_connection(conn)
+
+
+def _release(key, method, path):
+    """처리 실패(5xx, 예외) 시 선점을 풀어 재시도가 다시 실행되게 합니다."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM idempotency_keys WHERE idem_key = %s AND method = %s AND path = %s AND status IS NULL",
+                       (key, method, path))
+        conn.commit()
+    finally:
+        db.return_connection(conn)
+
+
+def purge_expired(batch_size=5000):
+    """만료된 키를 배치로 지웁니다. 지운 행 수를 돌려줍니다."""
+    total = 0
+    while True:
+        conn = db.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                DELETE FROM idempotency_keys WHERE ctid IN (
+                    SELECT ctid FROM idempotency_keys WHERE expires_at < CURRENT_TIMESTAMP LIMIT %s
+                )
+            """, (batch_size,))
+            deleted = cursor.rowcount
+            conn.commit()
+        finally:
+            db.return_connection(conn)
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+# ---------------------------------------------------------------------------
+# 미들웨어
+# ---------------------------------------------------------------------------
+
+async def _send_error(send, status, detail, extra_headers=()):
+    body = json.dumps({"detail": detail}, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("latin-1")), *extra_headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _replay(send, stored):
+    await send({"type": "http.response.start", "status": stored["status"],
+                "headers": stored["headers"] + [(b"idempotent-replayed", b"true")]})
+    await send({"type": "http.response.body", "body": stored["body"]})
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        method = scope["method"]
+        path = scope["path"].rstrip("/") or "/"
+        key = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"idempotency-key"), None)
+        if not key or not route_matches(IDEMPOTENT_ROUTES, method, path):
+            return await self.app(scope, receive, send)
+        if len(key) > MAX_KEY_LENGTH:
+            return await _send_error(send, 400, "Idempotency-Key 가 너무 깁니다.")
+
+        body = await _read_body(receive)
+        if body is None:
+            return
+        await self._handle(scope, receive, send, (key, method, path), body)
+
+    async def _handle(self, scope, receive, send, cache_key, body):
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        stored = _cache.get(cache_key)
+        if stored is None and cache_key in _inflight:
+            # 같은 프로세스에서 처리 중인 요청의 결과를 기다립니다.
+            stored = await asyncio.shield(_inflight[cache_key])
+            if stored is None:
+                # 먼저 온 요청이 예외로 끝났으면 이 요청이 다시 시도합니다.
+                return await self._handle(scope, receive, send, cache_key, body)
+        if stored is not None:
+            return await self._respond_stored(send, stored, fingerprint)
+
+        future = asyncio.get_running_loop().create_future()
+        _inflight[cache_key] = future
+        result = None
+        try:
+            state, stored = await asyncio.to_thread(_claim, *cache_key, fingerprint)
+            if state == "done":
+                _cache.set(cache_key, stored)
+                result = stored
+                return await self._respond_stored(send, stored, fingerprint)
+            if state == "pending":
+                return await _send_error(send, 409, "같은 요청을 처리 중입니다. 잠시 후 다시 시도해 주세요.",
+                                         [(b"retry-after", b"1")])
+
+            result = await self._run(scope, receive, send, body, fingerprint)
+            if result["status"] < 500:
+                await asyncio.to_thread(_store, *cache_key, result)
+                _cache.set(cache_key, result)
+            else:
+                await asyncio.to_thread(_release, *cache_key)
+        except BaseException:
+            if result is None:
+                try:
+                    await asyncio.shield(asyncio.to_thread(_release, *cache_key))
+                except Exception as e:
+                    print(f"[IDEMPOTENCY] release failed: {e}")
+            raise
+        finally:
+            del _inflight[cache_key]
+            future.set_result(result)
+
+    async def _respond_stored(self, send, stored, fingerprint):
+        if stored["fingerprint"] != fingerprint:
+            return await _send_error(send, 422, "같은 Idempotency-Key 로 다른 요청이 전송되었습니다.")
+        await _replay(send, stored)
+
+    async def _run(self, scope, receive, send, body, fingerprint):
+        """핸들러를 실행하면서 응답을 클라이언트로 보내고 동시에 기록합니다."""
+        response = {"fingerprint": fingerprint, "status": 500, "headers": [], "body": b""}
+        chunks = []
+        delivered = False
+
+        async def receive_once():
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, receive_once, capture)
+        response["body"] = b"".join(chunks)
+        return response
@@ -2,6 +2,7 @@
 import os
 import psycopg2
 from dotenv import load_dotenv
+from migrate import apply_migrations
 
 load_dotenv()
 
@@ -30,6 +31,10 @@ def init_db():
             cursor.execute(seed)
 
         conn.commit()
+
+        # schema.sql 이후의 변경 사항은 migrations/ 에서 순서대로 적용합니다.
+        print("Applying migrations...")
+        apply_migrations(conn)
         print("✅ Database initialized successfully.")
 
     except Exception as e:
@@ -0,0 +1,42 @@
+"""
+무거운 의존성의 지연 로딩
+
+openpyxl 처럼 import 비용이 큰 모듈은 앱 기동 시점이 아니라 처음 필요할 때 한 번만 import 하고
+모듈 수준 변수에 보관합니다. 이후 호출은 import 문 없이 캐시된 모듈을 그대로 돌려줍니다.
+
+앱 기동 후에는 preload() 가 백그라운드 스레드에서 미리 불러 두므로
+첫 엑셀 다운로드 요청도 import 비용을 치르지 않습니다.
+"""
+import importlib
+import threading
+
+_modules = {}
+_lock = threading.Lock()
+
+
+def load(name):
+    module = _modules.get(name)
+    if module is None:
+        with _lock:
+            module = _modules.get(name)
+            if module is None:
+                module = importlib.import_module(name)
+                _modules[name] = module
+    return module
+
+
+def openpyxl():
+    return load("openpyxl")
+
+
+def preload(names=("openpyxl",)):
+    """기동을 막지 않도록 별도 스레드에서 모듈들을 미리 불러옵니다."""
+    def run():
+        for name in names:
+            try:
+                load(name)
+            except ImportError as e:
+                print(f"[WARN] Preload of {name} failed: {e}")
+    thread = threading.Thread(target=run, name="lazy-preload", daemon=True)
+    thread.start()
+    return thread
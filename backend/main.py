@@ -1,9 +1,25 @@
 
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from database import db
-from routers import users, coaches, attendance, products, upload, auth, messages, templates, automations, admins
-
+from fastapi.responses import JSONResponse
+from database import db, PoolTimeout
+import admission
+import audit
+import idempotency
+from scheduler import scheduler
+import archive
+import booking
+import heatmap
+import lazy_imports
+import messaging
+import qr_tokens
+import registry
+import response_encoding
+import security
+import singleflight
+import os
+from routers import sync, users
 
 
 
@@ -13,6 +29,26 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# 쓰기 요청의 감사 이벤트를 모아 성공한 요청만 기록합니다. 가장 안쪽에 두어
+# 수락 제어에서 거절되거나 Idempotency-Key 로 재생된 응답은 기록하지 않습니다.
+app.add_middleware(audit.AuditMiddleware)
+
+# Idempotency-Key 가 있는 생성 요청은 첫 응답을 저장해 재시도에 그대로 돌려줍니다.
+# 수락 제어 안쪽에서 동작하도록 먼저 등록합니다 (나중에 등록한 미들웨어가 바깥입니다).
+app.add_middleware(idempotency.IdempotencyMiddleware)
+
+# 경로 등급별 동시 처리 한도와 대기열 (초과 시 503 + Retry-After).
+# CORS 보다 먼저 등록해야 CORS 가 바깥에서 감싸 503 응답에도 CORS 헤더가 붙습니다.
+app.add_middleware(admission.AdmissionMiddleware)
+
+# 같은 조회(경로 + 쿼리)가 동시에 몰리면 한 번만 실행하고 응답을 나눠 줍니다.
+# 수락 제어 바깥에 두어 합류한 요청은 대기열 자리나 DB 연결을 잡지 않습니다.
+app.add_middleware(singleflight.SingleFlightMiddleware)
+
+# gzip/br 압축과 간결한 형식(열 단위 JSON, MessagePack) 협상. single-flight 바깥에 두어
+# 합쳐진 조회도 요청마다 자기 Accept / Accept-Encoding 에 맞춰 인코딩합니다.
+app.add_middleware(response_encoding.ResponseEncodingMiddleware)
+
 # CORS 설정
 app.add_middleware(
     CORSMiddleware,
@@ -22,26 +58,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(users.router)
-app.include_router(coaches.router)
-app.include_router(attendance.router)
-app.include_router(products.router)
-app.include_router(upload.router)
-app.include_router(auth.router)
-app.include_router(messages.router)
-app.include_router(templates.router)
-app.include_router(automations.router)
-app.include_router(admins.router)
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    return JSONResponse(status_code=503, content={"detail": "요청이 많아 잠시 후 다시 시도해 주세요."},
+                        headers={"Retry-After": str(admission.RETRY_AFTER_SECONDS)})
+
+# AUTH_REQUIRED=true 이면 /api/auth 를 제외한 모든 API 에 Bearer 토큰이 필요합니다.
+# 토큰 검증은 메모리에서만 이뤄지므로 요청당 DB 조회가 추가되지 않습니다.
+protected = [Depends(security.require_admin)] if os.getenv("AUTH_REQUIRED", "false").lower() == "true" else []
+
+# 라우터 목록은 registry.py 에서 관리합니다 (없는 optional 라우터는 건너뜀).
+registry.register_routers(app, protected)
 
 
 
+# 주기 작업 (SCHEDULER_ENABLED=false 로 끌 수 있습니다)
+scheduler.daily(0, 10, "audit-partitions", audit.maintain_partitions)
+scheduler.daily(3, 0, "archive-members", archive.run_archive_job)
+scheduler.daily(3, 30, "sync-prune-tombstones", sync.prune_tombstones)
+scheduler.daily(4, 0, "prerender-artifacts", users.prerender_artifacts)
+scheduler.daily(4, 45, "attendance-hourly-reconcile", heatmap.reconcile_recent)
+scheduler.every(600, "booking-no-shows", booking.mark_no_shows)
+scheduler.daily(9, 0, "message-scheduled-notices", messaging.enqueue_scheduled_notices)
+scheduler.daily(5, 0, "message-purge", messaging.purge_sent)
+scheduler.every(3600, "idempotency-purge", idempotency.purge_expired)
+scheduler.every(security.REVOCATION_REFRESH_SECONDS, "token-revocations", security.revocations.refresh)
+scheduler.every(qr_tokens.QR_REFRESH_SECONDS, "qr-keys", qr_tokens.keyring.refresh)
+scheduler.daily(0, 20, "qr-key-rotation", qr_tokens.rotate_keys)
+if "analytics" in registry.loaded:
+    import analytics
+    scheduler.daily(4, 30, "analytics-refresh", analytics.refresh)
+if "automations" in registry.loaded:
+    import automations
+    scheduler.every(automations.AUTOMATION_INTERVAL_SECONDS, "automation-rules", automations.evaluate_all)
 
 @app.on_event("startup")
 async def startup_event():
     db.initialize()
+    # 첫 요청이 연결 생성 비용을 치르지 않도록 풀을 미리 채웁니다.
+    await asyncio.to_thread(db.warm_up)
+    lazy_imports.preload()
+    # 키오스크 QR 검증용 서명 키와 폐기 목록 (이후 스케줄러가 주기적으로 새로 읽음)
+    try:
+        await asyncio.to_thread(qr_tokens.keyring.refresh)
+    except Exception as e:
+        print(f"[WARN] QR signing keys not loaded: {e}")
+    scheduler.start()
+    audit.writer.start()
+    messaging.dispatcher.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await scheduler.stop()
+    await messaging.dispatcher.stop()
+    # 버퍼에 남은 감사 이벤트를 모두 쓴 뒤 연결을 닫습니다.
+    await asyncio.to_thread(audit.writer.stop)
     db.close_all()
 
 @app.get("/")
@@ -55,4 +126,14 @@ def read_root():
 
 @app.get("/api/health")
 def health_check():
-    return {"status": "ok"}
+    return {"status": "ok", "routers": list(registry.loaded), "skippedRouters": list(registry.skipped)}
+
+@app.get("/api/metrics/admission")
+def admission_metrics():
+    """등급별 처리 중/대기 요청 수와 DB 풀 대여 현황"""
+    return {"classes": admission.metrics(), "pool": db.pool_stats()}
+
+@app.get("/api/metrics/singleflight")
+def singleflight_metrics():
+    """합친 조회 수 (leader: 실행, shared: 실행 중 합류, stale: 보관 응답 재사용)"""
+    return singleflight.metrics()
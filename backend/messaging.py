@@ -0,0 +1,456 @@
+"""
+회원 알림 발송 (트랜잭션 아웃박스)
+
+보내기: 요청 핸들러는 enqueue_* 함수로 message_outbox 에 행을 넣기만 합니다 (업무 변경과 같은 트랜잭션).
+  커밋 후 dispatcher.wake() 를 부르면 폴링을 기다리지 않고 바로 발송합니다.
+  회원 1만 명에게 보내는 갱신 안내도 INSERT ... SELECT 한 문장이므로 요청 스레드나 DB 연결을 오래 잡지 않습니다.
+  본문의 {name} 같은 자리표시자는 SQL 안에서 채웁니다 (TEMPLATE_FIELDS).
+
+발송: Dispatcher 가 채널마다 asyncio 작업 하나로
+  1) 짧은 트랜잭션에서 FOR UPDATE SKIP LOCKED 로 배치를 가져와 sending 으로 표시하고 (연결 반납)
+  2) 공급자(Provider)의 초당 한도에 맞춰 DB 연결 없이 보내고
+  3) 결과를 한 번의 UPDATE 로 기록합니다. 실패는 지수 백오프로 다시 시도하고 MESSAGE_MAX_ATTEMPTS 번 뒤 failed 입니다.
+
+공급자는 MESSAGE_PROVIDERS (예: "sms=http,kakao=file") 로 채널별로 고릅니다.
+- file: 메시지를 JSON 한 줄씩 파일에 기록하는 로컬 대체 공급자 (개발/테스트용, 기본값)
+- http: MESSAGE_HTTP_URL 로 배치를 POST 하는 공급자 (발송 대행 게이트웨이/테스트 서버)
+새 공급자는 Provider 를 상속해 send() 를 구현하고 PROVIDER_TYPES 에 등록합니다.
+
+초당 한도는 워커 프로세스마다 적용됩니다.
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+from database import db
+
+MESSAGE_BATCH_SIZE = int(os.getenv("MESSAGE_BATCH_SIZE", "100"))
+MESSAGE_POLL_SECONDS = float(os.getenv("MESSAGE_POLL_SECONDS", "2"))
+MESSAGE_LEASE_SECONDS = int(os.getenv("MESSAGE_LEASE_SECONDS", "120"))
+MESSAGE_MAX_ATTEMPTS = int(os.getenv("MESSAGE_MAX_ATTEMPTS", "5"))
+MESSAGE_BACKOFF_BASE = float(os.getenv("MESSAGE_BACKOFF_BASE", "30"))
+MESSAGE_BACKOFF_MAX = float(os.getenv("MESSAGE_BACKOFF_MAX", "3600"))
+MESSAGE_RETENTION_DAYS = int(os.getenv("MESSAGE_RETENTION_DAYS", "90"))
+
+CHANNELS = ("sms", "kakao")
+EVENTS = ("manual", "attendance", "expiry", "low_remaining")
+# 채널별 기본 초당 발송 한도
+DEFAULT_RATES = {"sms": 10, "kakao": 30}
+
+# 템플릿 자리표시자 → SQL 식 (u: users, p: products)
+TEMPLATE_FIELDS = {
+    "name": "u.name",
+    "phone": "COALESCE(u.phone, '')",
+    "product": "COALESCE(p.name, '')",
+    "endDate": "COALESCE(to_char(u.end_date, 'YYYY-MM-DD'), '')",
+    "daysLeft": "COALESCE((u.end_date - CURRENT_DATE)::text, '')",
+    "remaining": "COALESCE(u.remaining, 0)::text",
+}
+
+
+def render_sql(body_param="%(body)s"):
+    """본문 파라미터의 자리표시자를 회원 값으로 바꾸는 SQL 식"""
+    expression = body_param
+    for field, value in TEMPLATE_FIELDS.items():
+        expression = f"replace({expression}, '{{{field}}}', {value})"
+    return expression
+
+
+# ---------------------------------------------------------------------------
+# 넣기 (호출한 쪽 트랜잭션 안에서)
+# ---------------------------------------------------------------------------
+
+def enqueue_where(cursor, channel, body, condition, params=None, template_id=None, dedup_key_sql=None,
+                  with_sql=None):
+    """
+    condition(SQL 조각, users u / products p 사용)에 맞는 회원마다 메시지를 한 행씩 넣습니다.
+    dedup_key_sql 을 주면 같은 키가 이미 있는 회원은 건너뜁니다. 넣은 행 수를 돌려줍니다.
+    with_sql 을 주면 같은 문장 앞에 WITH 절로 붙입니다 (condition 에서 참조 가능).
+    """
+    params = dict(params or {}, body=body, channel=channel, template_id=template_id)
+    cursor.execute(f"""
+        {f'WITH {with_sql}' if with_sql else ''}
+        INSERT INTO message_outbox (user_id, template_id, channel, recipient, body, dedup_key)
+        SELECT u.id, %(template_id)s, %(channel)s, u.phone, {render_sql()}, {dedup_key_sql or 'NULL'}
+        FROM users u
+        LEFT JOIN products p ON p.id = u.product_id
+        WHERE COALESCE(u.phone, '') <> '' AND ({condition})
+        ON CONFLICT (dedup_key) WHERE dedup_key IS NOT NULL DO NOTHING
+    """, params)
+    return cursor.rowcount
+
+
+def enqueue_members(cursor, user_ids, channel, body, template_id=None, dedup_key=None):
+    """지정한 회원들에게 보냅니다. dedup_key 를 주면 회원 id 를 붙여 회원별 키로 씁니다."""
+    return enqueue_where(cursor, channel, body, "u.id = ANY(%(user_ids)s)", {"user_ids": list(user_ids),
+                         "dedup": dedup_key}, template_id,
+                         "%(dedup)s || ':' || u.id" if dedup_key else None)
+
+
+def enqueue_template(cursor, template, condition, params=None, dedup_key_sql=None, with_sql=None):
+    """템플릿 dict(id, channel, body) 로 condition 에 맞는 회원에게 보냅니다."""
+    return enqueue_where(cursor, template['channel'], template['body'], condition, params,
+                         template['id'], dedup_key_sql, with_sql)
+
+
+# event 에 연결된 활성 템플릿으로 회원 한 명에게 넣는 문장 (파라미터: event, user_id)
+EVENT_SQL = f"""
+    INSERT INTO message_outbox (user_id, template_id, channel, recipient, body)
+    SELECT u.id, t.id, t.channel, u.phone, {render_sql('t.body')}
+    FROM message_templates t
+    JOIN users u ON u.id = %(user_id)s
+    LEFT JOIN products p ON p.id = u.product_id
+    WHERE t.active AND t.event = %(event)s AND COALESCE(u.phone, '') <> ''
+"""
+
+
+def enqueue_event(cursor, event, user_id):
+    """
+    event 에 연결된 활성 템플릿이 있으면 회원에게 보냅니다 (예: 출석 체크와 같은 트랜잭션).
+    템플릿이 없으면 행을 넣지 않으므로 비용은 인덱스 조회 한 번입니다.
+    """
+    cursor.execute(EVENT_SQL, {"event": event, "user_id": user_id})
+    return cursor.rowcount
+
+
+# 예약 알림: 이벤트별 (대상 조건, 중복 방지 키). %(param)s 는 템플릿의 event_param 입니다.
+SCHEDULED_EVENTS = {
+    "expiry": ("u.end_date = CURRENT_DATE + %(param)s",
+               "'expiry:' || %(template_id)s || ':' || u.id || ':' || u.end_date"),
+    "low_remaining": ("u.end_date IS NULL AND u.remaining BETWEEN 1 AND %(param)s",
+                      "'low:' || %(template_id)s || ':' || u.id || ':' || COALESCE(u.start_date::text, '')"),
+}
+
+
+def enqueue_scheduled_notices():
+    """스케줄러 진입점: expiry / low_remaining 템플릿의 대상 회원에게 알림을 넣습니다 (하루 한 번)."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, channel, body, event, event_param FROM message_templates
+            WHERE active AND event = ANY(%s) AND event_param IS NOT NULL
+        """, (list(SCHEDULED_EVENTS),))
+        totals = {}
+        for template_id, channel, body, event, param in cursor.fetchall():
+            condition, dedup_key_sql = SCHEDULED_EVENTS[event]
+            template = {"id": template_id, "channel": channel, "body": body}
+            totals[template_id] = enqueue_template(cursor, template, condition, {"param": param}, dedup_key_sql)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db.return_connection(conn)
+    if any(totals.values()):
+        dispatcher.wake()
+        print(f"[MESSAGES] scheduled notices queued: {totals}")
+    return totals
+
+
+def purge_sent(days=MESSAGE_RETENTION_DAYS, batch_size=5000):
+    """보관 기간이 지난 발송 완료/실패 메시지를 배치로 지웁니다."""
+    total = 0
+    while True:
+        conn = db.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                DELETE FROM message_outbox WHERE id IN (
+                    SELECT id FROM message_outbox
+                    WHERE created_at < LOCALTIMESTAMP - make_interval(days => %s) AND status IN ('sent', 'failed')
+                    LIMIT %s
+                )
+            """, (days, batch_size))
+            deleted = cursor.rowcount
+            conn.commit()
+        finally:
+            db.return_connection(conn)
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+# ---------------------------------------------------------------------------
+# 공급자
+# ---------------------------------------------------------------------------
+
+class TokenBucket:
+    """초당 rate 개, 최대 burst 개까지 모아 쓸 수 있는 비동기 발송 한도"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    async def acquire(self, count=1):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= count:
+                self.tokens -= count
+                return
+            await asyncio.sleep((count - self.tokens) / self.rate)
+
+
+class Provider:
+    """
+    발송 공급자. send() 는 메시지 dict(id, channel, recipient, body) 목록을 받아
+    같은 순서로 결과 dict 를 돌려줍니다: {"ok": bool, "messageId": str, "error": str, "retry": bool}
+    """
+    name = "base"
+
+    def __init__(self, channel, rate, batch_size=MESSAGE_BATCH_SIZE):
+        self.channel = channel
+        self.limiter = TokenBucket(rate)
+        self.batch_size = batch_size
+
+    async def send(self, messages):
+        raise NotImplementedError
+
+
+class FileProvider(Provider):
+    """MESSAGE_FILE_PATH 에 한 줄에 한 메시지씩 JSON 으로 기록합니다. MESSAGE_FILE_FAIL_RATE 로 실패를 흉내 냅니다."""
+    name = "file"
+    path = os.getenv("MESSAGE_FILE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                       "outbox", "messages.jsonl"))
+    fail_rate = float(os.getenv("MESSAGE_FILE_FAIL_RATE", "0"))
+
+    def _write(self, lines):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(lines)
+
+    async def send(self, messages):
+        results, lines = [], []
+        now = datetime.now().isoformat(timespec='seconds')
+        for message in messages:
+            if random.random() < self.fail_rate:
+                results.append({"ok": False, "error": "simulated failure", "retry": True})
+                continue
+            lines.append(json.dumps(dict(message, sentAt=now), ensure_ascii=False) + "\n")
+            results.append({"ok": True, "messageId": f"file-{message['id']}"})
+        await asyncio.to_thread(self._write, lines)
+        return results
+
+
+class HttpProvider(Provider):
+    """
+    MESSAGE_HTTP_URL 로 {"channel", "messages": [...]} 를 POST 합니다.
+    응답 {"results": [{"ok", "messageId", "error"}...]} 가 있으면 메시지별로, 없으면 2xx 를 모두 성공으로 봅니다.
+    429/5xx/연결 오류는 재시도, 그 밖의 4xx 는 실패로 처리합니다.
+    """
+    name = "http"
+    url = os.getenv("MESSAGE_HTTP_URL", "")
+    token = os.getenv("MESSAGE_HTTP_TOKEN", "")
+    timeout = float(os.getenv("MESSAGE_HTTP_TIMEOUT", "10"))
+
+    def _post(self, messages):
+        payload = json.dumps({"channel": self.channel, "messages": messages}, ensure_ascii=False).encode('utf-8')
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        req = urllib.request.Request(self.url, data=payload, headers=headers, method="POST")
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                body = response.read()
+        except urllib.error.HTTPError as e:
+            retry = e.code == 429 or e.code >= 500
+            return [{"ok": False, "error": f"HTTP {e.code}", "retry": retry} for _ in messages]
+        except (urllib.error.URLError, TimeoutError) as e:
+            return [{"ok": False, "error": str(e), "retry": True} for _ in messages]
+
+        try:
+            results = json.loads(body or b"{}").get("results")
+        except ValueError:
+            results = None
+        if not isinstance(results, list) or len(results) != len(messages):
+            return [{"ok": True} for _ in messages]
+        return [{"ok": bool(r.get("ok")), "messageId": r.get("messageId"), "error": r.get("error"),
+                 "retry": bool(r.get("retry", False))} for r in results]
+
+    async def send(self, messages):
+        if not self.url:
+            return [{"ok": False, "error": "MESSAGE_HTTP_URL is not set", "retry": True} for _ in messages]
+        return await asyncio.to_thread(self._post, messages)
+
+
+PROVIDER_TYPES = {
+    "file": FileProvider,
+    "http": HttpProvider,
+}
+
+
+def load_providers():
+    """MESSAGE_PROVIDERS 와 MESSAGE_RATE_<채널> 로 채널별 공급자를 만듭니다."""
+    configured = dict(item.split("=", 1) for item in os.getenv("MESSAGE_PROVIDERS", "").split(",") if "=" in item)
+    providers = {}
+    for channel in CHANNELS:
+        kind = configured.get(channel, "file").strip()
+        rate = float(os.getenv(f"MESSAGE_RATE_{channel.upper()}", str(DEFAULT_RATES[channel])))
+        providers[channel] = PROVIDER_TYPES[kind](channel, rate)
+    return providers
+
+
+# ---------------------------------------------------------------------------
+# 디스패처
+# ---------------------------------------------------------------------------
+
+def claim_batch(channel, limit, lease=MESSAGE_LEASE_SECONDS):
+    """발송할 메시지를 가져와 sending 으로 표시합니다. 임대 시각이 지난 sending 행도 다시 가져옵니다."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE message_outbox o
+            SET status = 'sending', attempts = o.attempts + 1,
+                next_attempt_at = LOCALTIMESTAMP + make_interval(secs => %s)
+            FROM (
+                SELECT id FROM message_outbox
+                WHERE channel = %s AND status IN ('pending', 'sending') AND next_attempt_at <= LOCALTIMESTAMP
+                ORDER BY next_attempt_at, id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            ) due
+            WHERE o.id = due.id
+            RETURNING o.id, o.channel, o.recipient, o.body, o.attempts
+        """, (lease, channel, limit))
+        rows = cursor.fetchall()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db.return_connection(conn)
+    return [{"id": r[0], "channel": r[1], "recipient": r[2], "body": r[3], "attempts": r[4]} for r in rows]
+
+
+def backoff_seconds(attempts):
+    delay = min(MESSAGE_BACKOFF_BASE * (2 ** (attempts - 1)), MESSAGE_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def record_results(messages, results):
+    """발송 결과를 한 번의 UPDATE 로 기록합니다. (sent, retry, failed) 개수를 돌려줍니다."""
+    ids, statuses, provider_ids, errors, delays = [], [], [], [], []
+    counts = {"sent": 0, "retry": 0, "failed": 0}
+    for message, result in zip(messages, results):
+        if result.get("ok"):
+            status, delay = "sent", 0
+            counts["sent"] += 1
+        elif result.get("retry") and message["attempts"] < MESSAGE_MAX_ATTEMPTS:
+            status, delay = "pending", backoff_seconds(message["attempts"])
+            counts["retry"] += 1
+        else:
+            status, delay = "failed", 0
+            counts["failed"] += 1
+        ids.append(message["id"])
+        statuses.append(status)
+        provider_ids.append(result.get("messageId"))
+        errors.append(result.get("error"))
+        delays.append(delay)
+
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE message_outbox o
+            SET status = r.status, provider_message_id = r.provider_id, last_error = r.error,
+                sent_at = CASE WHEN r.status = 'sent' THEN LOCALTIMESTAMP END,
+                next_attempt_at = LOCALTIMESTAMP + make_interval(secs => r.delay)
+            FROM unnest(%s::bigint[], %s::text[], %s::text[], %s::text[], %s::float8[])
+                 AS r(id, status, provider_id, error, delay)
+            WHERE o.id = r.id AND o.status = 'sending'
+        """, (ids, statuses, provider_ids, errors, delays))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db.return_connection(conn)
+    return counts
+
+
+class Dispatcher:
+    """채널별 발송 루프. 앱 시작 시 start(), 종료 시 stop() 을 호출합니다."""
+
+    def __init__(self):
+        self.providers = {}
+        self._tasks = []
+        self._wake = None
+        self._loop = None
+        self.stats = {channel: {"sent": 0, "retry": 0, "failed": 0, "batches": 0, "lastError": None}
+                      for channel in CHANNELS}
+
+    @property
+    def enabled(self):
+        return os.getenv("MESSAGE_DISPATCH_ENABLED", "true").lower() not in ("0", "false", "no")
+
+    def start(self):
+        if not self.enabled or self._tasks:
+            return
+        self.providers = load_providers()
+        self._loop = asyncio.get_running_loop()
+        self._wake = {channel: asyncio.Event() for channel in self.providers}
+        for channel, provider in self.providers.items():
+            self._tasks.append(asyncio.create_task(self._run(channel, provider), name=f"messages:{channel}"))
+        print(f"[OK] Message dispatcher started "
+              f"({', '.join(f'{c}={p.name}@{p.limiter.rate}/s' for c, p in self.providers.items())}).")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self):
+        """새 메시지가 커밋되었음을 알립니다 (요청 스레드에서 불러도 됩니다)."""
+        if self._loop is None or self._loop.is_closed():
+            return
+        for event in self._wake.values():
+            self._loop.call_soon_threadsafe(event.set)
+
+    async def _run(self, channel, provider):
+        stats = self.stats[channel]
+        while True:
+            try:
+                batch = await asyncio.to_thread(claim_batch, channel, provider.batch_size)
+                if not batch:
+                    event = self._wake[channel]
+                    event.clear()
+                    try:
+                        await asyncio.wait_for(event.wait(), MESSAGE_POLL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                results = []
+                for start in range(0, len(batch), provider.limiter.burst):
+                    chunk = batch[start:start + provider.limiter.burst]
+                    await provider.limiter.acquire(len(chunk))
+                    try:
+                        results += await provider.send(
+                            [{k: m[k] for k in ("id", "channel", "recipient", "body")} for m in chunk])
+                    except Exception as e:
+                        results += [{"ok": False, "error": str(e), "retry": True} for _ in chunk]
+
+                counts = await asyncio.to_thread(record_results, batch, results)
+                stats["batches"] += 1
+                for key, value in counts.items():
+                    stats[key] += value
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stats["lastError"] = str(e)
+                print(f"[MESSAGES] {channel} dispatch failed: {e}")
+                await asyncio.sleep(MESSAGE_POLL_SECONDS)
+
+
+dispatcher = Dispatcher()
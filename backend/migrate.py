@@ -0,0 +1,402 @@
+"""
+버전 관리 마이그레이션 실행기
+
+migrations/ 디렉터리의 NNNN_이름.sql / NNNN_이름.py 파일을 번호 순서대로 적용하고
+schema_migrations 테이블에 기록합니다. 운영 중인 DB에서도 안전하게 돌릴 수 있도록:
+
+- 모든 DDL은 lock_timeout 안에서 실행되고, 잠금을 얻지 못하면 출석 체크 등
+  다른 쿼리를 막고 대기하는 대신 즉시 실패한 뒤 재시도합니다.
+- `-- migrate:no-transaction` 지시어가 있는 SQL 파일은 문장 단위 autocommit으로
+  실행되므로 CREATE INDEX CONCURRENTLY 를 쓸 수 있습니다.
+- 파이썬 마이그레이션은 ctx.backfill() 로 큰 테이블을 짧은 트랜잭션 여러 개로 나눠 갱신합니다.
+
+SQL 파일 지시어 (파일 상단 주석):
+    -- migrate:no-transaction        트랜잭션 없이 문장별로 실행 (세미콜론으로 분리)
+    -- migrate:lock-timeout 2s       이 파일의 lock_timeout
+    -- migrate:statement-timeout 0   이 파일의 statement_timeout
+
+파이썬 마이그레이션:
+    TRANSACTION = False   # 선택: backfill 처럼 스스로 커밋하는 경우
+    def upgrade(ctx): ...
+
+사용 예 (backend/ 에서):
+    python migrate.py            # 대기 중인 마이그레이션 모두 적용
+    python migrate.py status     # 적용 현황
+    python migrate.py up --target 3
+"""
+import argparse
+import hashlib
+import importlib.util
+import os
+import re
+import sys
+import time
+
+import psycopg2
+import psycopg2.errors
+from database import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+DEFAULT_LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "3s")
+LOCK_RETRIES = int(os.getenv("MIGRATION_LOCK_RETRIES", "10"))
+# 동시에 두 실행기가 돌지 않도록 잡는 advisory lock 키 (임의의 상수)
+ADVISORY_LOCK_KEY = 727_001
+
+FILENAME_PATTERN = re.compile(r'^(\d{4})_([\w\-]+)\.(sql|py)$')
+DIRECTIVE_PATTERN = re.compile(r'^--[ \t]*migrate:([\w\-]+)[ \t]*(.*?)[ \t]*$', re.MULTILINE)
+CONCURRENT_INDEX_PATTERN = re.compile(
+    r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)', re.IGNORECASE)
+
+
+class Migration:
+    def __init__(self, version, name, path, kind):
+        self.version = version
+        self.name = name
+        self.path = path
+        self.kind = kind
+        with open(path, 'rb') as f:
+            self.source = f.read()
+        self.checksum = hashlib.sha256(self.source).hexdigest()[:16]
+        self.started = None
+
+    @property
+    def label(self):
+        return f"{self.version:04d}_{self.name}"
+
+    def directives(self):
+        if self.kind != 'sql':
+            return {}
+        return {key: value for key, value in DIRECTIVE_PATTERN.findall(self.source.decode('utf-8'))}
+
+
+class MigrationContext:
+    """파이썬 마이그레이션의 upgrade(ctx) 에 전달되는 객체"""
+
+    def __init__(self, conn, lock_timeout):
+        self.conn = conn
+        self.lock_timeout = lock_timeout
+
+    def execute(self, sql, params=None):
+        cursor = self.conn.cursor()
+        cursor.execute(sql, params)
+        return cursor
+
+    def ddl(self, sql):
+        """DDL 한 문장을 lock_timeout 안에서 별도 트랜잭션으로 실행하고, 잠금 실패 시 재시도합니다."""
+        def apply():
+            cursor = self.conn.cursor()
+            cursor.execute(f"SET LOCAL lock_timeout = '{self.lock_timeout}'")
+            cursor.execute(sql)
+            self.conn.commit()
+        _with_lock_retry(self.conn, apply)
+
+    def concurrently(self, sql):
+        """CREATE/DROP INDEX CONCURRENTLY 처럼 트랜잭션 밖에서만 실행할 수 있는 문장을 실행합니다."""
+        self.conn.commit()
+        self.conn.autocommit = True
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(f"SET lock_timeout = '{self.lock_timeout}'")
+            _with_lock_retry(self.conn, lambda: _execute_concurrently(self.conn, cursor, sql))
+            cursor.execute("RESET lock_timeout")
+        finally:
+            self.conn.autocommit = False
+
+    def backfill(self, table, set_clause, where=None, key='id', batch_size=5000, pause=0.05, params=(),
+                 quiet=False):
+        """
+        큰 테이블을 key 순서로 batch_size 행씩 나눠 UPDATE 하고 배치마다 커밋합니다.
+        한 배치가 잡는 행 잠금은 짧게 유지되므로 동시에 들어오는 INSERT(출석 체크)를 막지 않습니다.
+
+        set_clause 와 where 는 SQL 조각입니다 (예: "coach_id = s.coach_id").
+        where 는 이미 처리된 행을 제외하도록 작성해야 중단 후 재실행이 안전합니다.
+        quiet=True 면 배치 트랜잭션에 app.backfill = 'on' 을 걸어 행 버전/동기화 트리거가 건너뜁니다
+        (정규화 키처럼 API 에 보이지 않는 파생 컬럼을 채울 때: 모든 회원의 버전이 오르거나 키오스크가 전체를 다시 받지 않도록).
+        """
+        condition = f"AND ({where})" if where else ""
+
+        def statement(operator):
+            return f"""
+                WITH batch AS (
+                    SELECT {key} FROM {table}
+                    WHERE {key} {operator} %s {condition}
+                    ORDER BY {key}
+                    LIMIT %s
+                )
+                UPDATE {table} t SET {set_clause}
+                FROM batch
+                WHERE t.{key} = batch.{key}
+                RETURNING t.{key}
+            """
+
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT MIN({key}) FROM {table}")
+        bound = cursor.fetchone()[0]
+        self.conn.commit()
+        if bound is None:
+            return 0
+
+        # 첫 배치는 최소 키를 포함(>=)하고, 이후 배치는 직전 배치의 마지막 키 다음(>)부터 진행합니다.
+        sql = statement('>=')
+        total = 0
+        started = time.perf_counter()
+        while True:
+            rows = _with_lock_retry(self.conn, lambda: self._backfill_batch(
+                cursor, sql, (bound, *params, batch_size), quiet))
+            if not rows:
+                break
+            bound = max(r[0] for r in rows)
+            sql = statement('>')
+            total += len(rows)
+            if total % (batch_size * 20) < batch_size:
+                print(f"  ... {table}: {total} rows ({time.perf_counter() - started:.1f}s)")
+            if pause:
+                time.sleep(pause)
+        return total
+
+    def _backfill_batch(self, cursor, sql, args, quiet=False):
+        cursor.execute(f"SET LOCAL lock_timeout = '{self.lock_timeout}'")
+        if quiet:
+            cursor.execute("SET LOCAL app.backfill = 'on'")
+        cursor.execute(sql, args)
+        rows = cursor.fetchall()
+        self.conn.commit()
+        return rows
+
+
+def _with_lock_retry(conn, action, retries=LOCK_RETRIES):
+    """lock_timeout 으로 실패하면 지수 백오프 후 재시도합니다."""
+    for attempt in range(retries + 1):
+        try:
+            return action()
+        except psycopg2.errors.LockNotAvailable:
+            conn.rollback()
+            if attempt == retries:
+                raise
+            delay = min(0.2 * (2 ** attempt), 10)
+            print(f"  ⏳ lock_timeout, retrying in {delay:.1f}s ({attempt + 1}/{retries})")
+            time.sleep(delay)
+
+
+def discover(directory=MIGRATIONS_DIR):
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = FILENAME_PATTERN.match(filename)
+        if match:
+            version, name, kind = match.groups()
+            migrations.append(Migration(int(version), name, os.path.join(directory, filename), kind))
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError("마이그레이션 번호가 중복되었습니다.")
+    return migrations
+
+
+def ensure_table(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(200) NOT NULL,
+            checksum VARCHAR(64) NOT NULL,
+            duration_ms INTEGER,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+
+
+def applied_versions(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT version, checksum FROM schema_migrations ORDER BY version")
+    rows = dict(cursor.fetchall())
+    conn.commit()
+    return rows
+
+
+def split_statements(sql):
+    """no-transaction 파일용 단순 문장 분리기 (줄 끝의 세미콜론 기준)."""
+    body = DIRECTIVE_PATTERN.sub('', sql)
+    statements = []
+    current = []
+    for line in body.splitlines():
+        if line.strip().startswith('--') and not current:
+            continue
+        current.append(line)
+        if line.rstrip().endswith(';'):
+            statement = '\n'.join(current).strip()
+            if statement.strip(';').strip():
+                statements.append(statement)
+            current = []
+    if '\n'.join(current).strip():
+        statements.append('\n'.join(current).strip())
+    return statements
+
+
+def _drop_invalid_indexes(conn, statement):
+    """
+    CREATE INDEX CONCURRENTLY 가 중간에 실패하면 INVALID 인덱스가 남고,
+    IF NOT EXISTS 때문에 재실행 시 건너뛰게 됩니다. 재실행 전에 정리합니다.
+    """
+    cursor = conn.cursor()
+    for index_name in _invalid_indexes(conn, statement):
+        print(f"  🧹 dropping invalid index {index_name}")
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+
+def _invalid_indexes(conn, statement):
+    """statement 가 만드는 인덱스 중 INVALID 상태인 것의 이름"""
+    cursor = conn.cursor()
+    invalid = []
+    for index_name in CONCURRENT_INDEX_PATTERN.findall(statement):
+        cursor.execute("""
+            SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = %s AND NOT i.indisvalid
+        """, (index_name,))
+        if cursor.fetchone():
+            invalid.append(index_name)
+    return invalid
+
+
+def _execute_concurrently(conn, cursor, statement):
+    """
+    트랜잭션 밖 문장 하나를 실행합니다. lock_timeout 재시도마다 앞선 시도가 남긴 INVALID 인덱스를 먼저 지우고,
+    실행 뒤에도 INVALID 로 남아 있으면 예외를 내 마이그레이션이 적용된 것으로 기록되지 않게 합니다.
+    """
+    _drop_invalid_indexes(conn, statement)
+    cursor.execute(statement)
+    invalid = _invalid_indexes(conn, statement)
+    if invalid:
+        raise RuntimeError(f"인덱스가 INVALID 상태로 남았습니다: {', '.join(invalid)}")
+
+
+def _run_sql(conn, migration):
+    directives = migration.directives()
+    lock_timeout = directives.get('lock-timeout', DEFAULT_LOCK_TIMEOUT)
+    statement_timeout = directives.get('statement-timeout', '0')
+    sql = migration.source.decode('utf-8')
+
+    if 'no-transaction' in directives:
+        conn.autocommit = True
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"SET lock_timeout = '{lock_timeout}'")
+            cursor.execute(f"SET statement_timeout = '{statement_timeout}'")
+            for statement in split_statements(sql):
+                _with_lock_retry(conn, lambda: _execute_concurrently(conn, cursor, statement))
+            cursor.execute("RESET lock_timeout")
+            cursor.execute("RESET statement_timeout")
+        finally:
+            conn.autocommit = False
+        _record(conn, migration)
+        conn.commit()
+    else:
+        def apply():
+            cursor = conn.cursor()
+            cursor.execute(f"SET LOCAL lock_timeout = '{lock_timeout}'")
+            cursor.execute(f"SET LOCAL statement_timeout = '{statement_timeout}'")
+            cursor.execute(sql)
+            _record(conn, migration)
+            conn.commit()
+        _with_lock_retry(conn, apply)
+
+
+def _run_python(conn, migration):
+    spec = importlib.util.spec_from_file_location(f"migration_{migration.label}", migration.path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    ctx = MigrationContext(conn, getattr(module, 'LOCK_TIMEOUT', DEFAULT_LOCK_TIMEOUT))
+
+    if getattr(module, 'TRANSACTION', True):
+        def apply():
+            ctx.execute(f"SET LOCAL lock_timeout = '{ctx.lock_timeout}'")
+            module.upgrade(ctx)
+            _record(conn, migration)
+            conn.commit()
+        _with_lock_retry(conn, apply)
+    else:
+        module.upgrade(ctx)
+        conn.commit()
+        _record(conn, migration)
+        conn.commit()
+
+
+def _record(conn, migration):
+    cursor = conn.cursor()
+    duration_ms = int((time.perf_counter() - migration.started) * 1000)
+    cursor.execute(
+        "INSERT INTO schema_migrations (version, name, checksum, duration_ms) VALUES (%s, %s, %s, %s)",
+        (migration.version, migration.name, migration.checksum, duration_ms)
+    )
+
+
+def apply_migrations(conn, target=None, dry_run=False):
+    """대기 중인 마이그레이션을 적용하고 적용한 개수를 돌려줍니다."""
+    ensure_table(conn)
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_advisory_lock(%s)", (ADVISORY_LOCK_KEY,))
+    conn.commit()
+    try:
+        done = applied_versions(conn)
+        count = 0
+        for migration in discover():
+            if target is not None and migration.version > target:
+                break
+            if migration.version in done:
+                if done[migration.version] != migration.checksum:
+                    print(f"⚠️ {migration.label}: 적용 후 파일이 수정되었습니다 (checksum mismatch).")
+                continue
+            if dry_run:
+                print(f"[PENDING] {migration.label}")
+                count += 1
+                continue
+
+            print(f"Applying {migration.label}...")
+            migration.started = time.perf_counter()
+            if migration.kind == 'sql':
+                _run_sql(conn, migration)
+            else:
+                _run_python(conn, migration)
+            print(f"[OK] {migration.label} ({time.perf_counter() - migration.started:.2f}s)")
+            count += 1
+        return count
+    finally:
+        cursor = conn.cursor()
+        cursor.execute("SELECT pg_advisory_unlock(%s)", (ADVISORY_LOCK_KEY,))
+        conn.commit()
+
+
+def print_status(conn):
+    ensure_table(conn)
+    done = applied_versions(conn)
+    for migration in discover():
+        state = "applied" if migration.version in done else "pending"
+        if migration.version in done and done[migration.version] != migration.checksum:
+            state = "modified"
+        print(f"{migration.label:<50} {state}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DB 마이그레이션 실행기")
+    parser.add_argument('command', nargs='?', default='up', choices=['up', 'status'])
+    parser.add_argument('--target', type=int, help="이 번호까지만 적용")
+    parser.add_argument('--dry-run', action='store_true', help="적용하지 않고 대기 목록만 출력")
+    args = parser.parse_args()
+
+    # 마이그레이션은 풀 대신 전용 연결을 사용합니다 (autocommit 전환, 긴 실행 시간).
+    conn = psycopg2.connect(**db.connect_kwargs())
+    try:
+        if args.command == 'status':
+            print_status(conn)
+            return
+        count = apply_migrations(conn, target=args.target, dry_run=args.dry_run)
+        print(f"✅ {count} migration(s) {'pending' if args.dry_run else 'applied'}.")
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+-- 상품 기간 단위 (months / days)
+-- 기존 migrate_duration_unit.py 를 대체합니다. 상수 기본값이므로 테이블 재작성 없이 즉시 적용됩니다.
+ALTER TABLE products ADD COLUMN IF NOT EXISTS duration_unit VARCHAR(10) DEFAULT 'months';
@@ -0,0 +1,11 @@
+-- migrate:no-transaction
+-- 조회 경로용 인덱스. CONCURRENTLY 로 만들어 출석 체크(INSERT)를 막지 않습니다.
+
+-- 회원 목록 정렬 (ORDER BY u.created_at DESC)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_created_at ON users (created_at DESC);
+
+-- 출석 목록 정렬 (ORDER BY a.date DESC, a.time DESC) 및 날짜 범위 조회
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_attendance_date_time ON attendance (date DESC, time DESC);
+
+-- UNIQUE(user_id, date, time) 인덱스가 user_id 조회를 이미 처리하므로 중복 인덱스를 제거합니다.
+DROP INDEX CONCURRENTLY IF EXISTS idx_attendance_user_id;
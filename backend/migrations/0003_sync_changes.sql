@@ -0,0 +1,84 @@
+-- 델타 동기화용 변경 피드 (GET /api/sync)
+--
+-- users / products / coaches 의 생성·수정·삭제를 엔티티당 한 행으로 기록합니다.
+-- 같은 엔티티가 여러 번 바뀌면 행이 갱신되므로 테이블 크기는 엔티티 수에 비례하고,
+-- 삭제는 deleted = TRUE 인 툼스톤으로 남습니다.
+--
+-- 트리거는 DEFERRABLE INITIALLY DEFERRED 라서 커밋 직전에 seq 를 받습니다.
+-- seq 를 받기 전에 트랜잭션 advisory lock 을 잡아 커밋할 때까지 쥐고 있으므로, 다음 쓰기는 앞선 쓰기가
+-- 커밋되어 보이게 된 뒤에야 seq 를 받습니다. 즉 seq 순서가 커밋 순서와 같아서, 읽는 쪽이 seq N 을 보았다면
+-- N 보다 작은 seq 는 모두 이미 보입니다 (늦게 커밋된 작은 seq 가 생기지 않음).
+-- 잠금은 커밋 직전 트리거부터 커밋까지만 잡히므로 쓰기끼리 줄을 서는 시간은 짧습니다.
+
+CREATE SEQUENCE IF NOT EXISTS sync_seq;
+
+CREATE TABLE IF NOT EXISTS sync_changes (
+    entity VARCHAR(20) NOT NULL,
+    entity_id VARCHAR(20) NOT NULL,
+    seq BIGINT NOT NULL,
+    deleted BOOLEAN NOT NULL DEFAULT FALSE,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (entity, entity_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_sync_changes_seq ON sync_changes (seq);
+
+-- 툼스톤 정리 후 이보다 오래된 토큰은 전체 재동기화(reset)가 필요합니다.
+CREATE TABLE IF NOT EXISTS sync_horizon (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    min_seq BIGINT NOT NULL DEFAULT 0
+);
+INSERT INTO sync_horizon DEFAULT VALUES ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION record_sync_change() RETURNS trigger AS $$
+BEGIN
+    -- API 에 보이지 않는 파생 컬럼 채우기(migrate.py 의 backfill(quiet=True))는 동기화할 변경이 아닙니다.
+    IF current_setting('app.backfill', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    -- seq 를 커밋 순서대로 붙입니다 (키는 임의의 상수, 트랜잭션 끝에 풀림).
+    PERFORM pg_advisory_xact_lock(727002);
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.id IS DISTINCT FROM NEW.id) THEN
+        INSERT INTO sync_changes (entity, entity_id, seq, deleted, changed_at)
+        VALUES (TG_TABLE_NAME, OLD.id::text, nextval('sync_seq'), TRUE, CURRENT_TIMESTAMP)
+        ON CONFLICT (entity, entity_id) DO UPDATE
+        SET seq = EXCLUDED.seq, deleted = TRUE, changed_at = EXCLUDED.changed_at;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        INSERT INTO sync_changes (entity, entity_id, seq, deleted, changed_at)
+        VALUES (TG_TABLE_NAME, NEW.id::text, nextval('sync_seq'), FALSE, CURRENT_TIMESTAMP)
+        ON CONFLICT (entity, entity_id) DO UPDATE
+        SET seq = EXCLUDED.seq, deleted = FALSE, changed_at = EXCLUDED.changed_at;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS users_sync_change ON users;
+CREATE CONSTRAINT TRIGGER users_sync_change
+    AFTER INSERT OR UPDATE OR DELETE ON users
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION record_sync_change();
+
+DROP TRIGGER IF EXISTS products_sync_change ON products;
+CREATE CONSTRAINT TRIGGER products_sync_change
+    AFTER INSERT OR UPDATE OR DELETE ON products
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION record_sync_change();
+
+DROP TRIGGER IF EXISTS coaches_sync_change ON coaches;
+CREATE CONSTRAINT TRIGGER coaches_sync_change
+    AFTER INSERT OR UPDATE OR DELETE ON coaches
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION record_sync_change();
+
+-- 기존 행을 피드에 등록 (since=0 전체 동기화의 기준)
+INSERT INTO sync_changes (entity, entity_id, seq)
+SELECT 'products', id::text, nextval('sync_seq') FROM products
+ON CONFLICT DO NOTHING;
+INSERT INTO sync_changes (entity, entity_id, seq)
+SELECT 'coaches', id, nextval('sync_seq') FROM coaches
+ON CONFLICT DO NOTHING;
+INSERT INTO sync_changes (entity, entity_id, seq)
+SELECT 'users', id, nextval('sync_seq') FROM users
+ON CONFLICT DO NOTHING;
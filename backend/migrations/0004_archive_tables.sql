@@ -0,0 +1,33 @@
+-- 보관(archive) 계층: 만료된 회원과 그 출석 기록을 hot 테이블 밖으로 옮겨 둡니다.
+-- 보관 테이블에는 FK/UNIQUE 제약이 없으며, 조회와 복원에 필요한 인덱스만 둡니다.
+
+CREATE TABLE IF NOT EXISTS users_archive (
+    id VARCHAR(10) PRIMARY KEY,
+    name VARCHAR(50) NOT NULL,
+    gender VARCHAR(10),
+    phone VARCHAR(20),
+    product_id INTEGER,
+    reg_date DATE,
+    start_date DATE,
+    end_date DATE,
+    remaining INTEGER DEFAULT 0,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_users_archive_name_phone ON users_archive (name, phone);
+CREATE INDEX IF NOT EXISTS idx_users_archive_end_date ON users_archive (end_date);
+
+CREATE TABLE IF NOT EXISTS attendance_archive (
+    id INTEGER PRIMARY KEY,
+    user_id VARCHAR(10) NOT NULL,
+    date DATE NOT NULL,
+    time TIME NOT NULL,
+    status VARCHAR(20),
+    created_at TIMESTAMP,
+    archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_attendance_archive_user_date ON attendance_archive (user_id, date);
+CREATE INDEX IF NOT EXISTS idx_attendance_archive_date ON attendance_archive (date);
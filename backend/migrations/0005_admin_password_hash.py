@@ -0,0 +1,20 @@
+"""
+관리자 비밀번호 해시 전환 + 토큰 폐기용 token_version 컬럼
+
+평문으로 저장된 admins.password 를 PBKDF2 해시로 바꿉니다.
+관리자 수는 적으므로 한 트랜잭션에서 처리합니다.
+"""
+from security import hash_password, is_hashed
+
+
+def upgrade(ctx):
+    ctx.execute("ALTER TABLE admins ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 1")
+
+    cursor = ctx.execute("SELECT id, password FROM admins")
+    rows = cursor.fetchall()
+    hashed = 0
+    for admin_id, password in rows:
+        if not is_hashed(password):
+            ctx.execute("UPDATE admins SET password = %s WHERE id = %s", (hash_password(password), admin_id))
+            hashed += 1
+    print(f"  hashed {hashed} admin password(s)")
@@ -0,0 +1,18 @@
+-- Idempotency-Key 로 보낸 POST 요청의 첫 응답을 저장해 재시도 때 그대로 돌려줍니다.
+-- status 가 NULL 인 행은 아직 처리 중인 요청의 선점(claim) 표시입니다.
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    idem_key VARCHAR(255) NOT NULL,
+    method VARCHAR(10) NOT NULL,
+    path VARCHAR(255) NOT NULL,
+    fingerprint CHAR(64) NOT NULL,
+    status INTEGER,
+    headers JSONB,
+    body BYTEA,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (idem_key, method, path)
+);
+
+-- 만료 행 정리용
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys (expires_at);
@@ -0,0 +1,32 @@
+-- 낙관적 동시성 제어용 행 버전 (PATCH 의 If-Match / version 비교)
+--
+-- 상수 DEFAULT 를 가진 컬럼 추가는 테이블을 다시 쓰지 않습니다 (PostgreSQL 11+).
+-- 버전은 BEFORE UPDATE 트리거가 올리므로 PUT, 비활성화 등 어떤 경로로 수정되어도 증가합니다.
+-- 예외: 마이그레이션이 API 에 보이지 않는 파생 컬럼을 채울 때(app.backfill = 'on', migrate.py 의 backfill(quiet=True))는 올리지 않습니다.
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE coaches ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE users_archive ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+
+CREATE OR REPLACE FUNCTION bump_row_version() RETURNS trigger AS $$
+BEGIN
+    IF current_setting('app.backfill', true) = 'on' THEN
+        RETURN NEW;
+    END IF;
+    NEW.version := OLD.version + 1;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS users_bump_version ON users;
+CREATE TRIGGER users_bump_version BEFORE UPDATE ON users
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+DROP TRIGGER IF EXISTS products_bump_version ON products;
+CREATE TRIGGER products_bump_version BEFORE UPDATE ON products
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+DROP TRIGGER IF EXISTS coaches_bump_version ON coaches;
+CREATE TRIGGER coaches_bump_version BEFORE UPDATE ON coaches
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
@@ -0,0 +1,60 @@
+"""
+중복 회원 탐지용 정규화 키와 블로킹 인덱스
+
+phone_key: 숫자만 남긴 전화번호 (+82 10... → 010...)
+name_key : NFC 정규화 후 공백을 모두 없애고 소문자로 바꾼 이름 ("홍 길동" = "홍길동")
+dedup.py 의 normalize_phone / normalize_name 과 같은 규칙이어야 합니다.
+
+출석 체크(회원 외래 키 조회)를 막지 않도록 생성 컬럼 대신 세 단계로 나눕니다:
+1) 기본값 없는 NULL 컬럼과 BEFORE INSERT/UPDATE 트리거 추가 (카탈로그만 바뀌므로 잠금은 순간, lock_timeout 재시도)
+   → 이후 들어오는 등록/수정은 트리거가 키를 채웁니다.
+2) 기존 회원을 id 순서로 배치마다 커밋하며 채우기. 파생 컬럼이므로 행 버전/동기화 트리거는 건너뜁니다 (quiet).
+3) 인덱스를 CONCURRENTLY 로 생성
+"""
+
+TRANSACTION = False
+
+KEY_FUNCTIONS_SQL = r"""
+    CREATE OR REPLACE FUNCTION normalize_phone(value TEXT) RETURNS TEXT AS $$
+        SELECT CASE WHEN digits LIKE '82%' AND length(digits) BETWEEN 11 AND 12 THEN '0' || substr(digits, 3)
+                    ELSE digits END
+        FROM (SELECT regexp_replace(COALESCE(value, ''), '[^0-9]', '', 'g') AS digits) d
+    $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+    CREATE OR REPLACE FUNCTION normalize_name(value TEXT) RETURNS TEXT AS $$
+        SELECT lower(regexp_replace(normalize(COALESCE(value, ''), NFC), '\s+', '', 'g'))
+    $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+    CREATE OR REPLACE FUNCTION users_dedup_keys() RETURNS trigger AS $$
+    BEGIN
+        NEW.phone_key := normalize_phone(NEW.phone);
+        NEW.name_key := normalize_name(NEW.name);
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+COLUMNS_SQL = """
+    ALTER TABLE users ADD COLUMN IF NOT EXISTS phone_key TEXT;
+    ALTER TABLE users ADD COLUMN IF NOT EXISTS name_key TEXT;
+
+    DROP TRIGGER IF EXISTS users_dedup_keys ON users;
+    CREATE TRIGGER users_dedup_keys BEFORE INSERT OR UPDATE OF name, phone ON users
+        FOR EACH ROW EXECUTE FUNCTION users_dedup_keys();
+"""
+
+
+def upgrade(ctx):
+    ctx.ddl(KEY_FUNCTIONS_SQL)
+    ctx.ddl(COLUMNS_SQL)
+
+    filled = ctx.backfill(
+        "users",
+        "phone_key = normalize_phone(t.phone), name_key = normalize_name(t.name)",
+        where="phone_key IS NULL OR name_key IS NULL",
+        quiet=True)
+    print(f"  filled dedup keys for {filled} member(s)")
+
+    ctx.concurrently("CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_phone_key ON users (phone_key) "
+                     "WHERE phone_key <> ''")
+    ctx.concurrently("CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_name_key ON users (name_key)")
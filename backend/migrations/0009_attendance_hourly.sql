@@ -0,0 +1,151 @@
+-- 출석 시간대 집계 (GET /api/attendance/heatmap)
+--
+-- attendance_hourly         : 날짜 × 시 × 상품별 출석 수
+-- attendance_hourly_monthly : 월 × 요일 × 시 × 상품별 출석 수 (여러 해 범위를 몇 천 행으로 답하기 위한 월 단위 합계)
+--
+-- 두 테이블 모두 attendance / attendance_archive 의 문장 단위 트리거가 전이 테이블(new_rows/old_rows)을
+-- 묶어서 갱신하므로 출석 체크 한 건은 두 번의 upsert 만 추가합니다. 보관/복원처럼 두 테이블 사이에서
+-- 행을 옮기는 작업은 -1/+1 이 상쇄되어 합계가 그대로 유지됩니다.
+--
+-- 상품은 회원의 현재 상품(users → users_archive 순으로 조회)이며, product_id 0 은 상품 없음입니다.
+-- 회원 상품이 바뀌면 AFTER UPDATE 트리거가 그 회원의 출석(보관 포함)을 이전 상품에서 빼서 새 상품에 더하므로,
+-- 출석 삭제/보관 때 빼는 상품과 더했던 상품이 항상 같고 heatmap.py 의 재집계와도 기준이 같습니다.
+-- 회원 삭제는 BEFORE DELETE 트리거가 먼저 빼고, 이어지는 CASCADE 삭제는 회원이 없으므로 건너뜁니다.
+-- 기존 데이터 채우기와 야간 보정은 heatmap.py 가 월 단위로 원본과 비교해 어긋난 만큼만 더합니다.
+
+CREATE TABLE IF NOT EXISTS attendance_hourly (
+    date DATE NOT NULL,
+    hour SMALLINT NOT NULL,
+    product_id INTEGER NOT NULL DEFAULT 0,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (date, hour, product_id)
+);
+
+CREATE TABLE IF NOT EXISTS attendance_hourly_monthly (
+    month DATE NOT NULL,
+    weekday SMALLINT NOT NULL,  -- ISO 요일 (1=월 … 7=일)
+    hour SMALLINT NOT NULL,
+    product_id INTEGER NOT NULL DEFAULT 0,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, weekday, hour, product_id)
+);
+
+CREATE OR REPLACE FUNCTION attendance_hourly_add(dates DATE[], hours SMALLINT[], products INTEGER[], counts INTEGER[])
+RETURNS void AS $$
+BEGIN
+    INSERT INTO attendance_hourly AS h (date, hour, product_id, count)
+    SELECT d, hr, p, SUM(n)
+    FROM unnest(dates, hours, products, counts) AS x(d, hr, p, n)
+    GROUP BY 1, 2, 3
+    HAVING SUM(n) <> 0
+    ORDER BY 1, 2, 3
+    ON CONFLICT (date, hour, product_id) DO UPDATE SET count = h.count + EXCLUDED.count;
+
+    INSERT INTO attendance_hourly_monthly AS m (month, weekday, hour, product_id, count)
+    SELECT date_trunc('month', d)::date, EXTRACT(ISODOW FROM d)::smallint, hr, p, SUM(n)
+    FROM unnest(dates, hours, products, counts) AS x(d, hr, p, n)
+    GROUP BY 1, 2, 3, 4
+    HAVING SUM(n) <> 0
+    ORDER BY 1, 2, 3, 4
+    ON CONFLICT (month, weekday, hour, product_id) DO UPDATE SET count = m.count + EXCLUDED.count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 전이 테이블의 행을 (날짜, 시, 상품, ±1) 로 바꿔 더합니다. 회원을 찾을 수 없는 행은 건너뜁니다.
+CREATE OR REPLACE FUNCTION attendance_hourly_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM attendance_hourly_add(array_agg(r.date), array_agg(EXTRACT(HOUR FROM r.time)::smallint),
+                                      array_agg(COALESCE(u.product_id, ua.product_id, 0)), array_agg(1))
+        FROM new_rows r
+        LEFT JOIN users u ON u.id = r.user_id
+        LEFT JOIN users_archive ua ON ua.id = r.user_id AND u.id IS NULL
+        WHERE u.id IS NOT NULL OR ua.id IS NOT NULL;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM attendance_hourly_add(array_agg(r.date), array_agg(EXTRACT(HOUR FROM r.time)::smallint),
+                                      array_agg(COALESCE(u.product_id, ua.product_id, 0)), array_agg(-1))
+        FROM old_rows r
+        LEFT JOIN users u ON u.id = r.user_id
+        LEFT JOIN users_archive ua ON ua.id = r.user_id AND u.id IS NULL
+        WHERE u.id IS NOT NULL OR ua.id IS NOT NULL;
+    ELSE
+        PERFORM attendance_hourly_add(array_agg(c.date), array_agg(c.hour), array_agg(c.product_id), array_agg(c.n))
+        FROM (
+            SELECT r.date, EXTRACT(HOUR FROM r.time)::smallint AS hour,
+                   COALESCE(u.product_id, ua.product_id, 0) AS product_id, -1 AS n
+            FROM old_rows r
+            LEFT JOIN users u ON u.id = r.user_id
+            LEFT JOIN users_archive ua ON ua.id = r.user_id AND u.id IS NULL
+            WHERE u.id IS NOT NULL OR ua.id IS NOT NULL
+            UNION ALL
+            SELECT r.date, EXTRACT(HOUR FROM r.time)::smallint,
+                   COALESCE(u.product_id, ua.product_id, 0), 1
+            FROM new_rows r
+            LEFT JOIN users u ON u.id = r.user_id
+            LEFT JOIN users_archive ua ON ua.id = r.user_id AND u.id IS NULL
+            WHERE u.id IS NOT NULL OR ua.id IS NOT NULL
+        ) c;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 회원 삭제 시 남아 있는 출석을 먼저 뺍니다 (CASCADE 로 지워질 때는 회원이 없어 건너뜀).
+CREATE OR REPLACE FUNCTION attendance_hourly_member_deleted() RETURNS trigger AS $$
+BEGIN
+    PERFORM attendance_hourly_add(array_agg(a.date), array_agg(EXTRACT(HOUR FROM a.time)::smallint),
+                                  array_agg(COALESCE(OLD.product_id, 0)), array_agg(-1))
+    FROM attendance a
+    WHERE a.user_id = OLD.id;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 회원 상품이 바뀌면 그 회원의 출석을 새 상품으로 옮깁니다 (UNIQUE(user_id, date, time) / (user_id, date) 인덱스로 조회).
+CREATE OR REPLACE FUNCTION attendance_hourly_member_product_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM attendance_hourly_add(array_agg(c.date), array_agg(c.hour), array_agg(c.product_id), array_agg(c.n))
+    FROM (
+        SELECT a.date, EXTRACT(HOUR FROM a.time)::smallint AS hour, p.product_id, p.n
+        FROM (SELECT date, time FROM attendance WHERE user_id = NEW.id
+              UNION ALL
+              SELECT date, time FROM attendance_archive WHERE user_id = NEW.id) a
+        CROSS JOIN (VALUES (COALESCE(OLD.product_id, 0), -1), (COALESCE(NEW.product_id, 0), 1)) AS p(product_id, n)
+    ) c;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS attendance_hourly_insert ON attendance;
+CREATE TRIGGER attendance_hourly_insert AFTER INSERT ON attendance
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION attendance_hourly_apply();
+
+DROP TRIGGER IF EXISTS attendance_hourly_delete ON attendance;
+CREATE TRIGGER attendance_hourly_delete AFTER DELETE ON attendance
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION attendance_hourly_apply();
+
+DROP TRIGGER IF EXISTS attendance_hourly_update ON attendance;
+CREATE TRIGGER attendance_hourly_update AFTER UPDATE ON attendance
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION attendance_hourly_apply();
+
+DROP TRIGGER IF EXISTS attendance_archive_hourly_insert ON attendance_archive;
+CREATE TRIGGER attendance_archive_hourly_insert AFTER INSERT ON attendance_archive
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION attendance_hourly_apply();
+
+DROP TRIGGER IF EXISTS attendance_archive_hourly_delete ON attendance_archive;
+CREATE TRIGGER attendance_archive_hourly_delete AFTER DELETE ON attendance_archive
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION attendance_hourly_apply();
+
+DROP TRIGGER IF EXISTS users_attendance_hourly_delete ON users;
+CREATE TRIGGER users_attendance_hourly_delete BEFORE DELETE ON users
+    FOR EACH ROW EXECUTE FUNCTION attendance_hourly_member_deleted();
+
+DROP TRIGGER IF EXISTS users_attendance_hourly_product ON users;
+CREATE TRIGGER users_attendance_hourly_product AFTER UPDATE OF product_id ON users
+    FOR EACH ROW WHEN (OLD.product_id IS DISTINCT FROM NEW.product_id)
+    EXECUTE FUNCTION attendance_hourly_member_product_changed();
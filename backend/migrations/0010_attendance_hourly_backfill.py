@@ -0,0 +1,14 @@
+"""
+출석 시간대 집계 채우기
+
+0009 에서 트리거를 먼저 걸어 두었으므로 이후 들어오는 출석은 이미 반영되고 있습니다.
+기존 출석을 한 달씩 다시 계산해 트리거가 이미 더한 값과의 차이만 채우며, 달마다 커밋하므로 중단 후 다시 실행해도 됩니다.
+"""
+import heatmap
+
+TRANSACTION = False
+
+
+def upgrade(ctx):
+    totals = heatmap.rebuild(ctx.conn)
+    print(f"  backfilled {totals['months']} month(s), {totals['buckets']} hourly bucket(s)")
@@ -0,0 +1,69 @@
+-- 코치 수업(소그룹 FPT 슬롯)과 예약
+--
+-- coach_sessions.booked 는 자리를 차지한 예약(booked/attended/no_show) 수, waitlisted 는 대기 수입니다. 예약은
+--   UPDATE coach_sessions SET booked = booked + 1 WHERE id = ? AND booked < capacity
+-- 한 문장으로 자리를 잡으므로 전역 잠금 없이 같은 수업의 요청끼리만 행 잠금으로 줄을 섭니다.
+-- CHECK 제약이 카운터가 정원을 넘지 않도록 한 번 더 막습니다.
+--
+-- session_bookings.status: booked(확정) / waitlisted(대기) / cancelled(취소) / attended(출석) / no_show(불참)
+
+CREATE TABLE IF NOT EXISTS coach_sessions (
+    id SERIAL PRIMARY KEY,
+    coach_id VARCHAR(10) NOT NULL REFERENCES coaches(id) ON DELETE CASCADE,
+    product_id INTEGER REFERENCES products(id) ON DELETE SET NULL,
+    title VARCHAR(100),
+    starts_at TIMESTAMP NOT NULL,
+    ends_at TIMESTAMP NOT NULL,
+    capacity INTEGER NOT NULL,
+    waitlist_limit INTEGER NOT NULL DEFAULT 0,
+    booked INTEGER NOT NULL DEFAULT 0,
+    waitlisted INTEGER NOT NULL DEFAULT 0,
+    status VARCHAR(20) NOT NULL DEFAULT 'scheduled',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CHECK (ends_at > starts_at),
+    CHECK (capacity > 0 AND waitlist_limit >= 0),
+    CHECK (booked BETWEEN 0 AND capacity),
+    CHECK (waitlisted BETWEEN 0 AND waitlist_limit)
+);
+
+CREATE INDEX IF NOT EXISTS idx_coach_sessions_starts_at ON coach_sessions (starts_at);
+CREATE INDEX IF NOT EXISTS idx_coach_sessions_coach_starts_at ON coach_sessions (coach_id, starts_at);
+
+CREATE TABLE IF NOT EXISTS session_bookings (
+    id SERIAL PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES coach_sessions(id) ON DELETE CASCADE,
+    user_id VARCHAR(10) NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    status VARCHAR(20) NOT NULL,
+    attendance_id INTEGER REFERENCES attendance(id) ON DELETE SET NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 한 회원은 한 수업에 유효한 예약을 하나만 가집니다 (동시에 두 번 눌러도 한 건).
+CREATE UNIQUE INDEX IF NOT EXISTS idx_session_bookings_active
+    ON session_bookings (session_id, user_id) WHERE status <> 'cancelled';
+-- 대기자 승격 순서
+CREATE INDEX IF NOT EXISTS idx_session_bookings_waitlist
+    ON session_bookings (session_id, created_at, id) WHERE status = 'waitlisted';
+-- 출석 체크 시 회원의 확정 예약 찾기
+CREATE INDEX IF NOT EXISTS idx_session_bookings_user_status ON session_bookings (user_id, status);
+-- 불참 처리 대상 (확정 상태로 남은 예약만)
+CREATE INDEX IF NOT EXISTS idx_session_bookings_booked
+    ON session_bookings (session_id) WHERE status = 'booked';
+
+-- 회원 삭제/보관 CASCADE 로 유효한 예약이 지워져도 카운터가 맞도록 자리를 반납합니다.
+-- (API 의 회원 삭제는 먼저 예약을 취소해 대기자를 승격시키므로 여기서는 지울 유효 예약이 없습니다.)
+CREATE OR REPLACE FUNCTION session_bookings_release() RETURNS trigger AS $$
+BEGIN
+    IF OLD.status IN ('booked', 'attended', 'no_show') THEN
+        UPDATE coach_sessions SET booked = booked - 1 WHERE id = OLD.session_id;
+    ELSIF OLD.status = 'waitlisted' THEN
+        UPDATE coach_sessions SET waitlisted = waitlisted - 1 WHERE id = OLD.session_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS session_bookings_release ON session_bookings;
+CREATE TRIGGER session_bookings_release AFTER DELETE ON session_bookings
+    FOR EACH ROW EXECUTE FUNCTION session_bookings_release();
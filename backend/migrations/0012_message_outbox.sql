@@ -0,0 +1,49 @@
+-- 회원 알림 (SMS / 카카오 알림톡) 템플릿과 트랜잭션 아웃박스
+--
+-- 요청 처리 중에는 message_outbox 에 행을 넣기만 하고(업무 변경과 같은 트랜잭션), 실제 발송은
+-- messaging.py 의 디스패처가 SELECT ... FOR UPDATE SKIP LOCKED 로 배치를 가져가 처리합니다.
+-- 여러 워커가 동시에 돌아도 같은 메시지를 두 번 가져가지 않습니다.
+--
+-- status: pending(대기) / sending(발송 중, next_attempt_at 까지 임대) / sent / failed
+-- 발송 중에 프로세스가 죽으면 임대 시각(next_attempt_at)이 지난 뒤 다시 가져갑니다.
+
+CREATE TABLE IF NOT EXISTS message_templates (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL UNIQUE,
+    channel VARCHAR(10) NOT NULL DEFAULT 'sms',
+    -- manual(직접 발송) / attendance(출석 체크 시) / expiry(종료 event_param 일 전) / low_remaining(잔여 event_param 회 이하)
+    event VARCHAR(20) NOT NULL DEFAULT 'manual',
+    event_param INTEGER,
+    body TEXT NOT NULL,
+    active BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_message_templates_event ON message_templates (event) WHERE active;
+
+CREATE TABLE IF NOT EXISTS message_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    user_id VARCHAR(10),
+    template_id INTEGER REFERENCES message_templates(id) ON DELETE SET NULL,
+    channel VARCHAR(10) NOT NULL,
+    recipient VARCHAR(20) NOT NULL,
+    body TEXT NOT NULL,
+    status VARCHAR(10) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP NOT NULL DEFAULT LOCALTIMESTAMP,
+    -- 같은 알림을 두 번 넣지 않기 위한 키 (예: expiry:템플릿:회원:종료일)
+    dedup_key VARCHAR(200),
+    provider_message_id VARCHAR(100),
+    last_error TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT LOCALTIMESTAMP,
+    sent_at TIMESTAMP
+);
+
+-- 디스패처가 가져갈 행 (채널별, 발송 시각 순)
+CREATE INDEX IF NOT EXISTS idx_message_outbox_due
+    ON message_outbox (channel, next_attempt_at, id) WHERE status IN ('pending', 'sending');
+CREATE UNIQUE INDEX IF NOT EXISTS idx_message_outbox_dedup
+    ON message_outbox (dedup_key) WHERE dedup_key IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_message_outbox_user ON message_outbox (user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_message_outbox_created_at ON message_outbox (created_at);
@@ -0,0 +1,39 @@
+-- 회원 자동화 규칙 (조건 + 동작)
+--
+-- conditions 는 [{"type": "remaining_lte", "value": 3}, ...] 형태이며 모두 AND 로 묶입니다.
+-- automations.py 가 규칙마다 SQL 한 문장으로 바꿔 일괄 평가합니다.
+--
+-- 증분 평가용 워터마크: 마지막 평가 시각(users.updated_at 비교), 그때의 최대 출석 id,
+-- 평가한 날짜(날짜가 바뀌며 조건을 새로 만족하게 된 회원 계산). 비어 있으면 전체 회원을 평가합니다.
+
+CREATE TABLE IF NOT EXISTS automation_rules (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL UNIQUE,
+    conditions JSONB NOT NULL,
+    -- message(템플릿 발송) / record(대상 기록만)
+    action VARCHAR(20) NOT NULL DEFAULT 'message',
+    template_id INTEGER REFERENCES message_templates(id) ON DELETE SET NULL,
+    active BOOLEAN NOT NULL DEFAULT TRUE,
+    last_evaluated_at TIMESTAMP,
+    last_attendance_id BIGINT,
+    last_evaluated_date DATE,
+    last_duration_ms INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 규칙이 회원에게 실행된 기록. fire_key(등록 시작일) 단위로 한 번만 실행됩니다.
+-- 재등록하면 시작일이 바뀌므로 같은 규칙이 다시 실행될 수 있습니다.
+CREATE TABLE IF NOT EXISTS automation_firings (
+    rule_id INTEGER NOT NULL REFERENCES automation_rules(id) ON DELETE CASCADE,
+    user_id VARCHAR(10) NOT NULL,
+    fire_key VARCHAR(40) NOT NULL,
+    fired_at TIMESTAMP NOT NULL DEFAULT LOCALTIMESTAMP,
+    PRIMARY KEY (rule_id, user_id, fire_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_automation_firings_user ON automation_firings (user_id);
+CREATE INDEX IF NOT EXISTS idx_automation_firings_fired_at ON automation_firings (rule_id, fired_at DESC);
+
+-- 증분 평가에서 최근 수정된 회원을 찾는 경로
+CREATE INDEX IF NOT EXISTS idx_users_updated_at ON users (updated_at);
@@ -0,0 +1,61 @@
+-- 관리자 작업 감사 로그 (audit.py 가 COPY 로 일괄 기록)
+--
+-- occurred_at 기준 월별 파티션입니다. 조회는 기간 조건으로 필요한 파티션만 읽고,
+-- 오래된 로그는 파티션을 통째로 지워 정리합니다 (DELETE 없음).
+-- 해당 월 파티션이 없을 때 들어온 행은 default 파티션에 쌓이고, 나중에 그 달 파티션을 만들 때 옮겨집니다.
+
+CREATE TABLE IF NOT EXISTS audit_log (
+    id BIGSERIAL,
+    occurred_at TIMESTAMP NOT NULL,
+    admin_id INTEGER,
+    admin_name VARCHAR(50),
+    entity VARCHAR(40) NOT NULL,
+    entity_id VARCHAR(40),
+    action VARCHAR(60) NOT NULL,
+    -- {"필드": [변경 전, 변경 후]}
+    changes JSONB,
+    method VARCHAR(10),
+    path TEXT,
+    client_ip VARCHAR(45)
+) PARTITION BY RANGE (occurred_at);
+
+CREATE TABLE IF NOT EXISTS audit_log_default PARTITION OF audit_log DEFAULT;
+
+CREATE INDEX IF NOT EXISTS idx_audit_log_entity ON audit_log (entity, entity_id, occurred_at DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_log_admin ON audit_log (admin_id, occurred_at DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_log_occurred_at ON audit_log (occurred_at DESC, id DESC);
+
+-- month 가 속한 달의 파티션(audit_log_YYYYMM)을 만듭니다. 이미 있으면 아무것도 하지 않습니다.
+-- 작업이 밀려 그 달 행이 이미 default 파티션에 들어와 있으면 새 파티션 제약과 겹쳐 만들 수 없으므로,
+-- default 를 잠깐 떼어 낸 뒤 파티션을 만들고 그 달 행을 옮겨 다시 붙입니다 (모두 한 트랜잭션).
+CREATE OR REPLACE FUNCTION audit_log_create_partition(month DATE) RETURNS VOID AS $$
+DECLARE
+    start_date DATE := date_trunc('month', month)::date;
+    end_date DATE := (date_trunc('month', month) + INTERVAL '1 month')::date;
+    partition_name TEXT := 'audit_log_' || to_char(start_date, 'YYYYMM');
+    moved BIGINT;
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM audit_log_default WHERE occurred_at >= start_date AND occurred_at < end_date) THEN
+        EXECUTE format('CREATE TABLE %I PARTITION OF audit_log FOR VALUES FROM (%L) TO (%L)',
+                       partition_name, start_date, end_date);
+        RETURN;
+    END IF;
+
+    ALTER TABLE audit_log DETACH PARTITION audit_log_default;
+    EXECUTE format('CREATE TABLE %I PARTITION OF audit_log FOR VALUES FROM (%L) TO (%L)',
+                   partition_name, start_date, end_date);
+    EXECUTE format('INSERT INTO %I SELECT * FROM audit_log_default WHERE occurred_at >= %L AND occurred_at < %L',
+                   partition_name, start_date, end_date);
+    DELETE FROM audit_log_default WHERE occurred_at >= start_date AND occurred_at < end_date;
+    GET DIAGNOSTICS moved = ROW_COUNT;
+    ALTER TABLE audit_log ATTACH PARTITION audit_log_default DEFAULT;
+    RAISE NOTICE 'audit_log: moved % row(s) from default into %', moved, partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT audit_log_create_partition(CURRENT_DATE);
+SELECT audit_log_create_partition((CURRENT_DATE + INTERVAL '1 month')::date);
+SELECT audit_log_create_partition((CURRENT_DATE + INTERVAL '2 month')::date);
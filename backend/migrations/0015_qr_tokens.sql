@@ -0,0 +1,17 @@
+-- 회원 QR 출석 토큰의 서명 키와 폐기 목록 (qr_tokens.py)
+--
+-- qr_signing_keys 에는 salt 만 저장합니다. 실제 서명 키는 HMAC(AUTH_SECRET, salt) 입니다.
+-- retired_at 이 비어 있는 키로 서명된 토큰만 통과하며, 새 토큰은 가장 큰 version 으로 서명합니다.
+
+CREATE TABLE IF NOT EXISTS qr_signing_keys (
+    version SERIAL PRIMARY KEY,
+    salt BYTEA NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT LOCALTIMESTAMP,
+    retired_at TIMESTAMP
+);
+
+-- 회원별로 revoked_at 이전에 발급된 토큰은 무효입니다.
+CREATE TABLE IF NOT EXISTS qr_revocations (
+    user_id VARCHAR(10) PRIMARY KEY,
+    revoked_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
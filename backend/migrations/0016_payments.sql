@@ -0,0 +1,99 @@
+-- 결제 원장과 매출 집계 (GET /api/reports/revenue)
+--
+-- payments        : 회원 등록/재등록 때 같은 트랜잭션에서 한 행씩 쌓는 원장 (고치지 않고, 정정은 음수 금액 행으로 추가)
+-- revenue_daily   : 날짜 × 상품별 매출 합계와 건수
+-- revenue_monthly : 월 × 상품별 매출 합계와 건수 (여러 해 범위를 몇 백 행으로 답하기 위한 월 단위 합계)
+--
+-- 두 집계 테이블은 payments 의 문장 단위 트리거가 전이 테이블을 묶어 갱신하므로,
+-- 엑셀 업로드나 기존 회원 채우기처럼 한 문장에 수만 행이 들어와도 upsert 는 두 번뿐입니다.
+-- 회원이 보관/삭제되어도 원장은 남도록 users 를 참조하지 않습니다 (회원 병합 시 dedup.py 가 옮김).
+-- product_id 0 은 상품 없음입니다.
+
+CREATE TABLE IF NOT EXISTS payments (
+    id BIGSERIAL PRIMARY KEY,
+    user_id VARCHAR(10) NOT NULL,
+    product_id INTEGER NOT NULL DEFAULT 0,
+    amount INTEGER NOT NULL,
+    -- registration: 신규 등록, renewal: 재등록, backfill: 원장 도입 전 회원 (현재 상태로 추정)
+    kind VARCHAR(20) NOT NULL,
+    paid_on DATE NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_payments_user_id ON payments (user_id, paid_on);
+CREATE INDEX IF NOT EXISTS idx_payments_paid_on ON payments (paid_on);
+
+CREATE TABLE IF NOT EXISTS revenue_daily (
+    date DATE NOT NULL,
+    product_id INTEGER NOT NULL DEFAULT 0,
+    amount BIGINT NOT NULL DEFAULT 0,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (date, product_id)
+);
+
+CREATE TABLE IF NOT EXISTS revenue_monthly (
+    month DATE NOT NULL,
+    product_id INTEGER NOT NULL DEFAULT 0,
+    amount BIGINT NOT NULL DEFAULT 0,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, product_id)
+);
+
+CREATE OR REPLACE FUNCTION revenue_add(dates DATE[], products INTEGER[], amounts BIGINT[], counts INTEGER[])
+RETURNS void AS $$
+BEGIN
+    INSERT INTO revenue_daily AS r (date, product_id, amount, count)
+    SELECT d, p, SUM(a), SUM(n)
+    FROM unnest(dates, products, amounts, counts) AS x(d, p, a, n)
+    GROUP BY 1, 2
+    HAVING SUM(a) <> 0 OR SUM(n) <> 0
+    ORDER BY 1, 2
+    ON CONFLICT (date, product_id) DO UPDATE
+        SET amount = r.amount + EXCLUDED.amount, count = r.count + EXCLUDED.count;
+
+    INSERT INTO revenue_monthly AS r (month, product_id, amount, count)
+    SELECT date_trunc('month', d)::date, p, SUM(a), SUM(n)
+    FROM unnest(dates, products, amounts, counts) AS x(d, p, a, n)
+    GROUP BY 1, 2
+    HAVING SUM(a) <> 0 OR SUM(n) <> 0
+    ORDER BY 1, 2
+    ON CONFLICT (month, product_id) DO UPDATE
+        SET amount = r.amount + EXCLUDED.amount, count = r.count + EXCLUDED.count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 전이 테이블의 행을 (날짜, 상품, ±금액, ±1) 로 바꿔 더합니다.
+CREATE OR REPLACE FUNCTION revenue_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM revenue_add(array_agg(paid_on), array_agg(product_id), array_agg(amount::bigint), array_agg(1))
+        FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM revenue_add(array_agg(paid_on), array_agg(product_id), array_agg(-amount::bigint), array_agg(-1))
+        FROM old_rows;
+    ELSE
+        PERFORM revenue_add(array_agg(c.paid_on), array_agg(c.product_id), array_agg(c.amount), array_agg(c.n))
+        FROM (
+            SELECT paid_on, product_id, -amount::bigint AS amount, -1 AS n FROM old_rows
+            UNION ALL
+            SELECT paid_on, product_id, amount::bigint, 1 FROM new_rows
+        ) c;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS payments_revenue_insert ON payments;
+CREATE TRIGGER payments_revenue_insert AFTER INSERT ON payments
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION revenue_apply();
+
+DROP TRIGGER IF EXISTS payments_revenue_delete ON payments;
+CREATE TRIGGER payments_revenue_delete AFTER DELETE ON payments
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION revenue_apply();
+
+DROP TRIGGER IF EXISTS payments_revenue_update ON payments;
+CREATE TRIGGER payments_revenue_update AFTER UPDATE ON payments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION revenue_apply();
@@ -0,0 +1,15 @@
+"""
+결제 원장 채우기
+
+0016 이후 등록/재등록은 이미 원장에 쌓이고 있습니다. 그 전 회원(보관 포함)을 현재 상품·가격으로
+한 명당 한 행씩 채우며, 배치마다 커밋하고 이미 결제가 있는 회원은 건너뛰므로 중단 후 다시 실행해도 됩니다.
+집계 테이블은 payments 트리거가 배치마다 함께 갱신합니다.
+"""
+import payments
+
+TRANSACTION = False
+
+
+def upgrade(ctx):
+    totals = payments.backfill(ctx.conn)
+    print(f"  backfilled {totals['users']} member(s), {totals['users_archive']} archived member(s)")
@@ -0,0 +1,81 @@
+-- 회원 × 월별 출석일 비트맵 (연속 출석, 월 출석일 수, 빈도 코호트 조회)
+--
+-- days 의 비트 (n - 1) 이 그 달 n 일 출석 여부입니다 (1일 = 1, 31일 = 1 << 30). 하루에 여러 번 체크해도 한 비트입니다.
+-- 출석일 수는 bit_count(days::bit(32)) (PostgreSQL 14+), 기간 필터는 days & 마스크 로 계산하므로
+-- 원본 출석을 훑지 않습니다. 비트맵은 attendance(보관 제외)와 같은 내용을 유지합니다:
+-- - INSERT: 문장 단위 트리거가 전이 테이블을 회원-월로 묶어 OR 로 upsert (출석 체크 한 건에 upsert 한 번)
+-- - DELETE / UPDATE: 같은 날 다른 출석이 남아 있을 수 있으므로 해당 회원-월만 원본에서 다시 계산
+--   (회원 삭제·보관, 병합도 이 경로로 반영됨)
+-- 기존 출석 채우기와 전체 재계산은 attendance_bitmaps.py 가 월 단위로 합니다.
+
+CREATE TABLE IF NOT EXISTS attendance_bitmaps (
+    user_id VARCHAR(10) NOT NULL,
+    month DATE NOT NULL,
+    days INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, month)
+);
+
+-- 빈도 코호트: 월별로 모든 회원의 비트맵을 인덱스만 읽어 가져옵니다.
+CREATE INDEX IF NOT EXISTS idx_attendance_bitmaps_month ON attendance_bitmaps (month) INCLUDE (user_id, days);
+
+-- 주어진 회원-월의 비트맵을 원본 출석에서 다시 계산합니다 (출석이 하나도 없으면 행을 지움).
+CREATE OR REPLACE FUNCTION attendance_bitmaps_recompute(users VARCHAR[], months DATE[]) RETURNS void AS $$
+    WITH affected AS (
+        SELECT DISTINCT u AS user_id, m AS month FROM unnest(users, months) AS x(u, m)
+    ),
+    fresh AS (
+        SELECT x.user_id, x.month, bit_or(1 << (EXTRACT(DAY FROM a.date)::int - 1)) AS days
+        FROM affected x
+        JOIN attendance a ON a.user_id = x.user_id AND a.date >= x.month AND a.date < x.month + INTERVAL '1 month'
+        GROUP BY 1, 2
+    ),
+    removed AS (
+        DELETE FROM attendance_bitmaps b
+        USING affected x
+        WHERE b.user_id = x.user_id AND b.month = x.month
+          AND NOT EXISTS (SELECT 1 FROM fresh f WHERE f.user_id = x.user_id AND f.month = x.month)
+    )
+    INSERT INTO attendance_bitmaps AS b (user_id, month, days)
+    SELECT user_id, month, days FROM fresh
+    ORDER BY 1, 2
+    ON CONFLICT (user_id, month) DO UPDATE SET days = EXCLUDED.days;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION attendance_bitmaps_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO attendance_bitmaps AS b (user_id, month, days)
+        SELECT user_id, date_trunc('month', date)::date, bit_or(1 << (EXTRACT(DAY FROM date)::int - 1))
+        FROM new_rows
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        ON CONFLICT (user_id, month) DO UPDATE SET days = b.days | EXCLUDED.days;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM attendance_bitmaps_recompute(array_agg(user_id), array_agg(date_trunc('month', date)::date))
+        FROM old_rows;
+    ELSE
+        PERFORM attendance_bitmaps_recompute(array_agg(c.user_id), array_agg(c.month))
+        FROM (
+            SELECT user_id, date_trunc('month', date)::date AS month FROM old_rows
+            UNION
+            SELECT user_id, date_trunc('month', date)::date FROM new_rows
+        ) c;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS attendance_bitmaps_insert ON attendance;
+CREATE TRIGGER attendance_bitmaps_insert AFTER INSERT ON attendance
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION attendance_bitmaps_apply();
+
+DROP TRIGGER IF EXISTS attendance_bitmaps_delete ON attendance;
+CREATE TRIGGER attendance_bitmaps_delete AFTER DELETE ON attendance
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION attendance_bitmaps_apply();
+
+DROP TRIGGER IF EXISTS attendance_bitmaps_update ON attendance;
+CREATE TRIGGER attendance_bitmaps_update AFTER UPDATE ON attendance
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION attendance_bitmaps_apply();
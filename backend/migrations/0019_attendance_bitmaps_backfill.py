@@ -0,0 +1,14 @@
+"""
+출석 비트맵 채우기
+
+0018 이후 출석은 트리거가 바로 반영합니다. 그 전 출석을 한 달씩 다시 계산하며 달마다 커밋하므로
+중단 후 다시 실행해도 됩니다. 보관된 출석은 비트맵에 넣지 않습니다.
+"""
+import attendance_bitmaps
+
+TRANSACTION = False
+
+
+def upgrade(ctx):
+    totals = attendance_bitmaps.rebuild(ctx.conn)
+    print(f"  backfilled {totals['months']} month(s), {totals['rows']} member-month(s)")
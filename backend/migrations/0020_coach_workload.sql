@@ -0,0 +1,129 @@
+-- 출석의 담당 코치와 코치별 수업 집계 (GET /api/coaches/{id}/workload, GET /api/reports/payroll)
+--
+-- attendance.coach_id : 그 출석을 진행한 코치 (선택). 출석 체크 때 coachId 를 받거나, 같은 시간대 예약 수업의 코치로 채웁니다.
+--   기본값 없는 NULL 컬럼 추가와 NOT VALID 외래 키는 테이블을 훑거나 다시 쓰지 않으므로 잠금은 순간입니다.
+--   인덱스(CONCURRENTLY), 기존 출석 채우기, 외래 키 검증은 0021 이 출석 체크를 막지 않고 따로 합니다.
+-- coach_workload_daily   : 코치 × 날짜별 수업(담당 출석) 수
+-- coach_workload_monthly : 월 × 코치별 수업 수 (월 급여 정산을 코치 수만큼의 행으로 답하기 위한 월 단위 합계)
+-- coach_workload_retained: 삭제된 회원의 담당 출석 수 (코치 × 날짜, 재집계가 출석 대신 셈)
+--
+-- 두 집계 테이블은 attendance / attendance_archive 의 문장 단위 트리거가 전이 테이블을 묶어 갱신합니다.
+-- 보관/복원처럼 두 테이블 사이에서 행을 옮기는 작업은 -1/+1 이 상쇄됩니다.
+-- 이미 진행한 수업은 정산에 남아야 하므로, 회원 삭제로 함께 지워지는 출석(회원이 이미 없음)은 빼지 않고
+-- coach_workload_retained 에 코치 × 날짜별로 옮겨 둡니다. 재집계(coach_workload.py)는 출석과 함께 이 표를 세므로
+-- 트리거와 같은 값을 냅니다.
+-- 코치를 삭제하면 출석의 coach_id 가 NULL 이 되어 그 코치의 집계도 빠집니다 (비활성화는 status 로).
+
+ALTER TABLE attendance ADD COLUMN IF NOT EXISTS coach_id VARCHAR(10);
+ALTER TABLE attendance_archive ADD COLUMN IF NOT EXISTS coach_id VARCHAR(10);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'attendance_coach_id_fkey') THEN
+        ALTER TABLE attendance ADD CONSTRAINT attendance_coach_id_fkey
+            FOREIGN KEY (coach_id) REFERENCES coaches(id) ON DELETE SET NULL NOT VALID;
+    END IF;
+END;
+$$;
+
+CREATE TABLE IF NOT EXISTS coach_workload_daily (
+    coach_id VARCHAR(10) NOT NULL,
+    date DATE NOT NULL,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (coach_id, date)
+);
+
+CREATE TABLE IF NOT EXISTS coach_workload_monthly (
+    month DATE NOT NULL,
+    coach_id VARCHAR(10) NOT NULL,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, coach_id)
+);
+
+CREATE TABLE IF NOT EXISTS coach_workload_retained (
+    coach_id VARCHAR(10) NOT NULL,
+    date DATE NOT NULL,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (coach_id, date)
+);
+
+CREATE OR REPLACE FUNCTION coach_workload_add(coaches VARCHAR[], dates DATE[], counts INTEGER[])
+RETURNS void AS $$
+BEGIN
+    INSERT INTO coach_workload_daily AS w (coach_id, date, sessions)
+    SELECT c, d, SUM(n)
+    FROM unnest(coaches, dates, counts) AS x(c, d, n)
+    GROUP BY 1, 2
+    HAVING SUM(n) <> 0
+    ORDER BY 1, 2
+    ON CONFLICT (coach_id, date) DO UPDATE SET sessions = w.sessions + EXCLUDED.sessions;
+
+    INSERT INTO coach_workload_monthly AS w (month, coach_id, sessions)
+    SELECT date_trunc('month', d)::date, c, SUM(n)
+    FROM unnest(coaches, dates, counts) AS x(c, d, n)
+    GROUP BY 1, 2
+    HAVING SUM(n) <> 0
+    ORDER BY 1, 2
+    ON CONFLICT (month, coach_id) DO UPDATE SET sessions = w.sessions + EXCLUDED.sessions;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 전이 테이블의 담당 코치가 있는 행을 (코치, 날짜, ±1) 로 바꿔 더합니다.
+CREATE OR REPLACE FUNCTION coach_workload_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM coach_workload_add(array_agg(coach_id), array_agg(date), array_agg(1))
+        FROM new_rows
+        WHERE coach_id IS NOT NULL;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM coach_workload_add(array_agg(r.coach_id), array_agg(r.date), array_agg(-1))
+        FROM old_rows r
+        WHERE r.coach_id IS NOT NULL
+          AND (EXISTS (SELECT 1 FROM users u WHERE u.id = r.user_id)
+               OR EXISTS (SELECT 1 FROM users_archive ua WHERE ua.id = r.user_id));
+
+        INSERT INTO coach_workload_retained AS w (coach_id, date, sessions)
+        SELECT r.coach_id, r.date, COUNT(*)
+        FROM old_rows r
+        WHERE r.coach_id IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM users u WHERE u.id = r.user_id)
+          AND NOT EXISTS (SELECT 1 FROM users_archive ua WHERE ua.id = r.user_id)
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        ON CONFLICT (coach_id, date) DO UPDATE SET sessions = w.sessions + EXCLUDED.sessions;
+    ELSE
+        PERFORM coach_workload_add(array_agg(c.coach_id), array_agg(c.date), array_agg(c.n))
+        FROM (
+            SELECT coach_id, date, -1 AS n FROM old_rows WHERE coach_id IS NOT NULL
+            UNION ALL
+            SELECT coach_id, date, 1 FROM new_rows WHERE coach_id IS NOT NULL
+        ) c;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS attendance_coach_workload_insert ON attendance;
+CREATE TRIGGER attendance_coach_workload_insert AFTER INSERT ON attendance
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coach_workload_apply();
+
+DROP TRIGGER IF EXISTS attendance_coach_workload_delete ON attendance;
+CREATE TRIGGER attendance_coach_workload_delete AFTER DELETE ON attendance
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coach_workload_apply();
+
+DROP TRIGGER IF EXISTS attendance_coach_workload_update ON attendance;
+CREATE TRIGGER attendance_coach_workload_update AFTER UPDATE ON attendance
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coach_workload_apply();
+
+DROP TRIGGER IF EXISTS attendance_archive_coach_workload_insert ON attendance_archive;
+CREATE TRIGGER attendance_archive_coach_workload_insert AFTER INSERT ON attendance_archive
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coach_workload_apply();
+
+DROP TRIGGER IF EXISTS attendance_archive_coach_workload_delete ON attendance_archive;
+CREATE TRIGGER attendance_archive_coach_workload_delete AFTER DELETE ON attendance_archive
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION coach_workload_apply();
@@ -0,0 +1,23 @@
+"""
+출석 담당 코치 채우기
+
+0020 이후 출석 체크는 담당 코치를 바로 기록합니다. 그 전 출석 중 예약 수업과 맞춰진 것(session_bookings.attendance_id)에
+그 수업의 코치를 채웁니다. 출석 체크를 막지 않도록:
+- coach_id 인덱스는 CONCURRENTLY 로 만들고 (코치 삭제 시 ON DELETE SET NULL 조회에도 쓰임)
+- 채우기는 예약 id 순서로 배치마다 커밋하며 (이미 채워진 출석은 건너뛰므로 중단 후 다시 실행해도 됨)
+- 마지막에 외래 키를 검증합니다 (VALIDATE 는 쓰기를 막지 않는 잠금만 잡음).
+집계 테이블은 attendance UPDATE 트리거가 배치마다 함께 갱신합니다.
+"""
+import coach_workload
+
+TRANSACTION = False
+
+
+def upgrade(ctx):
+    ctx.concurrently("""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_attendance_coach_date
+        ON attendance (coach_id, date) WHERE coach_id IS NOT NULL
+    """)
+    updated = coach_workload.backfill(ctx.conn)
+    print(f"  attributed {updated} check-in(s) to coaches")
+    ctx.ddl("ALTER TABLE attendance VALIDATE CONSTRAINT attendance_coach_id_fkey")
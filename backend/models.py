@@ -1,7 +1,7 @@
 
-from pydantic import BaseModel
-from typing import Optional
-from datetime import date as date_type
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import date as date_type, datetime
 
 class ProductBase(BaseModel):
     name: str
@@ -17,6 +17,19 @@ class ProductCreate(ProductBase):
 class ProductUpdate(ProductBase):
     pass
 
+class ProductPatch(BaseModel):
+    """PATCH: 보낸 필드만 수정합니다. version 은 If-Match 헤더 대신 쓸 수 있습니다."""
+    name: Optional[str] = None
+    regMonths: Optional[int] = None
+    price: Optional[int] = None
+    durationUnit: Optional[str] = None
+    description: Optional[str] = None
+    active: Optional[bool] = None
+    version: Optional[int] = None
+
+class ProductBulkPatch(ProductPatch):
+    id: int
+
 class Product(ProductBase):
     id: int
     created_at: Optional[date_type] = None
@@ -33,11 +46,40 @@ class UserBase(BaseModel):
     remaining: Optional[int] = 0
 
 class UserCreate(UserBase):
-    pass
+    paidAmount: Optional[int] = None  # 결제 금액 (없으면 상품 가격)
 
 class UserUpdate(UserBase):
     pass
 
+class UserPatch(BaseModel):
+    """PATCH: 보낸 필드만 수정합니다. extendDays 는 종료일을 그만큼 늘립니다 (휴관 연장 등)."""
+    name: Optional[str] = None
+    gender: Optional[str] = None
+    phone: Optional[str] = None
+    productId: Optional[int] = None
+    regDate: Optional[date_type] = None
+    startDate: Optional[date_type] = None
+    endDate: Optional[date_type] = None
+    remaining: Optional[int] = None
+    extendDays: Optional[int] = None
+    version: Optional[int] = None
+
+class UserBulkPatch(UserPatch):
+    id: str
+
+class MembershipRenewal(BaseModel):
+    """재등록: 비운 날짜는 접수일 오늘, 시작일 기존 종료일 다음 날(이미 지났으면 오늘), 종료일 상품 기간으로 채웁니다."""
+    productId: int
+    regDate: Optional[date_type] = None
+    startDate: Optional[date_type] = None
+    endDate: Optional[date_type] = None
+    remaining: Optional[int] = None  # 없으면 그대로 둡니다
+    paidAmount: Optional[int] = None  # 결제 금액 (없으면 상품 가격)
+
+class MergeRequest(BaseModel):
+    duplicateIds: List[str]
+    combineMemberships: bool = False
+
 class CoachBase(BaseModel):
     id: str
     name: str
@@ -52,4 +94,65 @@ class AttendanceBase(BaseModel):
     status: Optional[str] = "Present"
 
 class AttendanceCreate(AttendanceBase):
-    pass
+    coachId: Optional[str] = None  # 담당 코치 (없으면 같은 시간대 예약 수업의 코치)
+
+class KioskCheckIn(BaseModel):
+    token: str
+
+class SessionCreate(BaseModel):
+    coachId: str
+    productId: Optional[int] = None
+    title: Optional[str] = None
+    startsAt: datetime
+    endsAt: datetime
+    capacity: int = Field(gt=0)
+    waitlistLimit: int = Field(0, ge=0)
+
+class BookingCreate(BaseModel):
+    userId: str
+
+class MessageTemplateCreate(BaseModel):
+    name: str
+    channel: str = Field("sms", pattern="^(sms|kakao)$")
+    event: str = Field("manual", pattern="^(manual|attendance|expiry|low_remaining)$")
+    eventParam: Optional[int] = None
+    body: str
+    active: bool = True
+
+class MessageTemplateUpdate(BaseModel):
+    name: Optional[str] = None
+    channel: Optional[str] = Field(None, pattern="^(sms|kakao)$")
+    event: Optional[str] = Field(None, pattern="^(manual|attendance|expiry|low_remaining)$")
+    eventParam: Optional[int] = None
+    body: Optional[str] = None
+    active: Optional[bool] = None
+
+class MessageSend(BaseModel):
+    userIds: List[str]
+    templateId: Optional[int] = None
+    channel: Optional[str] = Field(None, pattern="^(sms|kakao)$")
+    body: Optional[str] = None
+    dedupKey: Optional[str] = None
+
+class RenewalReminder(BaseModel):
+    templateId: int
+    withinDays: int = Field(7, ge=0, le=365)
+    productId: Optional[int] = None
+
+class AutomationCondition(BaseModel):
+    type: str
+    value: int
+
+class AutomationRuleCreate(BaseModel):
+    name: str
+    conditions: List[AutomationCondition]
+    action: str = Field("message", pattern="^(message|record)$")
+    templateId: Optional[int] = None
+    active: bool = True
+
+class AutomationRuleUpdate(BaseModel):
+    name: Optional[str] = None
+    conditions: Optional[List[AutomationCondition]] = None
+    action: Optional[str] = Field(None, pattern="^(message|record)$")
+    templateId: Optional[int] = None
+    active: Optional[bool] = None
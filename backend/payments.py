@@ -0,0 +1,191 @@
+"""
+결제 원장과 매출 집계
+
+회원 등록(POST /api/users, 엑셀 업로드)과 재등록(POST /api/users/{id}/renew)은 회원 행을 쓰는 문장과
+같은 문장(CTE)에서 payments 에 한 행을 넣습니다. 금액을 따로 받지 않으면 그 시점의 상품 가격입니다.
+날짜/월 × 상품별 합계(revenue_daily / revenue_monthly, migrations/0016)는 payments 트리거가 바로 갱신하므로
+매출 조회는 원장을 훑지 않고 집계 테이블만 읽습니다.
+
+원장 도입 전 회원은 backfill() 이 현재 회원 행(보관 포함)으로 한 행씩 채웁니다 (kind 'backfill').
+
+사용 예 (backend/ 에서):
+    python payments.py backfill     # 원장이 없는 회원 채우기 (중단 후 다시 실행해도 됨)
+    python payments.py rebuild      # 집계 테이블을 원장에서 다시 계산
+"""
+import argparse
+import time
+from datetime import timedelta
+
+from database import db
+import heatmap
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def sale_sql(source, kind, amount="NULL"):
+    """
+    source (CTE 이름, users 컬럼을 가진 행) 의 회원마다 결제 한 행을 넣는 INSERT 문.
+    kind / amount 는 SQL 조각(자리표시자 포함)이며, amount 가 NULL 이면 상품 가격을 씁니다.
+    결제일은 접수일(reg_date), 없으면 오늘입니다.
+    """
+    return f"""
+        INSERT INTO payments (user_id, product_id, amount, kind, paid_on)
+        SELECT m.id, COALESCE(m.product_id, 0), COALESCE({amount}, p.price, 0), {kind},
+               COALESCE(m.reg_date, CURRENT_DATE)
+        FROM {source} m
+        LEFT JOIN products p ON p.id = m.product_id
+    """
+
+
+# ---------------------------------------------------------------------------
+# 조회
+# ---------------------------------------------------------------------------
+
+def revenue(cursor, start, end, product_id=None, group_by="month"):
+    """
+    [start, end] 매출. group_by 가 month 면 범위 안의 온전한 달은 월 합계에서, 앞뒤 자투리 날짜만
+    일별 합계에서 읽습니다. cursor 는 RealDictCursor 여야 합니다.
+    """
+    product_condition = "AND product_id = %s" if product_id is not None else ""
+    product_params = [product_id] if product_id is not None else []
+    parts, params = [], []
+    if group_by == "day":
+        day_ranges, month_range = [(start, end + timedelta(days=1))], None
+    else:
+        day_ranges, month_range = heatmap.split_range(start, end)
+    period = "date" if group_by == "day" else "date_trunc('month', date)::date"
+    for range_start, range_end in day_ranges:
+        parts.append(f"""
+            SELECT {period} AS period, product_id, amount, count FROM revenue_daily
+            WHERE date >= %s AND date < %s {product_condition}
+        """)
+        params += [range_start, range_end] + product_params
+    if month_range:
+        parts.append(f"""
+            SELECT month AS period, product_id, amount, count FROM revenue_monthly
+            WHERE month >= %s AND month < %s {product_condition}
+        """)
+        params += list(month_range) + product_params
+
+    cursor.execute(f"""
+        SELECT c.period, c.product_id, p.name AS product_name,
+               SUM(c.amount)::bigint AS amount, SUM(c.count)::int AS count
+        FROM ({' UNION ALL '.join(parts)}) c
+        LEFT JOIN products p ON p.id = c.product_id
+        GROUP BY 1, 2, 3
+        HAVING SUM(c.amount) <> 0 OR SUM(c.count) <> 0
+        ORDER BY 1, 2
+    """, params)
+    rows = cursor.fetchall()
+
+    series, by_product = {}, {}
+    for row in rows:
+        bucket = series.setdefault(row['period'], {"period": str(row['period']), "amount": 0, "count": 0})
+        bucket["amount"] += row['amount']
+        bucket["count"] += row['count']
+        product = by_product.setdefault(row['product_id'], {
+            "productId": row['product_id'] or None, "productName": row['product_name'], "amount": 0, "count": 0})
+        product["amount"] += row['amount']
+        product["count"] += row['count']
+
+    return {
+        "startDate": str(start),
+        "endDate": str(end),
+        "groupBy": group_by,
+        "productId": product_id,
+        "series": list(series.values()),
+        "byProduct": sorted(by_product.values(), key=lambda p: -p["amount"]),
+        "total": {"amount": sum(b["amount"] for b in series.values()),
+                  "count": sum(b["count"] for b in series.values())}
+    }
+
+
+# ---------------------------------------------------------------------------
+# 채우기 / 재집계
+# ---------------------------------------------------------------------------
+
+def _backfill_table(conn, table, batch_size, pause):
+    """table 의 회원을 id 순서로 batch_size 명씩 넣고 배치마다 커밋합니다. 이미 결제가 있는 회원은 건너뜁니다."""
+    cursor = conn.cursor()
+    last_id, inserted = "", 0
+    while True:
+        cursor.execute(f"""
+            WITH batch AS (
+                SELECT id, product_id, COALESCE(reg_date, start_date, created_at::date) AS reg_date
+                FROM {table}
+                WHERE id > %s
+                ORDER BY id
+                LIMIT %s
+            ),
+            members AS (
+                SELECT * FROM batch b WHERE NOT EXISTS (SELECT 1 FROM payments x WHERE x.user_id = b.id)
+            ),
+            paid AS ({sale_sql("members", "'backfill'")} RETURNING 1)
+            SELECT (SELECT MAX(id) FROM batch), (SELECT COUNT(*) FROM paid)
+        """, (last_id, batch_size))
+        last_id, count = cursor.fetchone()
+        conn.commit()
+        if last_id is None:
+            return inserted
+        inserted += count
+        if pause:
+            time.sleep(pause)
+
+
+def backfill(conn, batch_size=BACKFILL_BATCH_SIZE, pause=0.05):
+    """
+    원장이 없는 회원(users, users_archive)마다 현재 상품·가격으로 결제 한 행을 넣습니다.
+    결제일은 접수일 → 시작일 → 회원 생성일 순으로 씁니다. 재등록 이력은 남아 있지 않으므로 회원당 한 행입니다.
+    """
+    started = time.perf_counter()
+    totals = {table: _backfill_table(conn, table, batch_size, pause) for table in ("users", "users_archive")}
+    print(f"[PAYMENTS] backfilled {totals['users']} member(s), {totals['users_archive']} archived "
+          f"({time.perf_counter() - started:.1f}s)")
+    return totals
+
+
+def rebuild_rollups(conn):
+    """
+    집계 테이블을 원장에서 다시 계산합니다.
+    집계 테이블을 SHARE ROW EXCLUSIVE 로 잠가 그동안 들어온 결제의 트리거는 커밋 후 반영되도록 기다리게 합니다.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("LOCK TABLE revenue_daily, revenue_monthly IN SHARE ROW EXCLUSIVE MODE")
+        cursor.execute("DELETE FROM revenue_daily")
+        cursor.execute("DELETE FROM revenue_monthly")
+        cursor.execute("""
+            INSERT INTO revenue_daily (date, product_id, amount, count)
+            SELECT paid_on, product_id, SUM(amount), COUNT(*) FROM payments GROUP BY 1, 2
+        """)
+        days = cursor.rowcount
+        cursor.execute("""
+            INSERT INTO revenue_monthly (month, product_id, amount, count)
+            SELECT date_trunc('month', date)::date, product_id, SUM(amount), SUM(count) FROM revenue_daily GROUP BY 1, 2
+        """)
+        conn.commit()
+        return days
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description="결제 원장 채우기 / 매출 집계 재계산")
+    parser.add_argument('command', choices=['backfill', 'rebuild'])
+    parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE)
+    args = parser.parse_args()
+
+    conn = db.get_connection()
+    try:
+        if args.command == 'backfill':
+            backfill(conn, args.batch_size)
+        else:
+            print(f"✅ Rebuilt {rebuild_rollups(conn)} daily bucket(s).")
+    finally:
+        db.return_connection(conn)
+        db.close_all()
+
+
+if __name__ == "__main__":
+    main()
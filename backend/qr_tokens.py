@@ -0,0 +1,230 @@
+"""
+회원 QR 출석 토큰
+
+QR 코드에는 서명된 토큰이 들어 있고, 키오스크 출석 체크는 토큰을 메모리에서만 검증한 뒤
+바로 출석 INSERT 로 갑니다 (회원 조회 없음).
+
+토큰: "<키 버전>.<payload>.<서명>"
+- payload: base64url("회원 id|상품 id|종료일 YYYYMMDD 또는 -|발급 시각|만료 시각")
+  (발급 시각은 DB 시계의 epoch 밀리초, 만료 시각은 epoch 초)
+- 서명: HMAC-SHA256(키, "<키 버전>.<payload>") 앞 16바이트 (QR 크기를 줄이기 위해)
+- 만료: 발급 후 QR_TOKEN_TTL_DAYS 일과 회원권 종료일 중 빠른 쪽. 종료일이 지난 회원은 DB 없이 거절합니다.
+  재등록으로 종료일이 바뀌면 QR 을 다시 발급받아야 합니다.
+
+서명 키: qr_signing_keys 에는 무작위 salt 만 저장하고, 실제 키는 HMAC(AUTH_SECRET, salt) 로 만듭니다
+(DB 만 유출되어서는 토큰을 위조할 수 없음). 새 토큰은 가장 최근 키로 서명하고, 이전 키로 서명된 토큰도
+폐기(retired_at)되기 전까지는 통과합니다. 키 교체는 QR_KEY_ROTATE_DAYS 마다 자동으로 하며,
+이전 키는 토큰 수명이 지난 뒤 폐기합니다.
+
+분실 등으로 폐기한 회원은 qr_revocations 에 "이 시각 이전에 발급한 토큰은 무효"로 남깁니다.
+발급 시각과 폐기 시각은 모두 DB 의 clock_timestamp() 를 밀리초로 비교하므로, 폐기 직후 다시 발급한 QR 은
+같은 초 안이거나 앱 서버 시계가 어긋나 있어도 통과합니다.
+키와 폐기 목록은 메모리에 두고 QR_REFRESH_SECONDS 마다 새로 읽습니다 (다른 워커의 변경 반영).
+"""
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from datetime import date, datetime
+
+from database import db
+import security
+
+QR_TOKEN_TTL_DAYS = int(os.getenv("QR_TOKEN_TTL_DAYS", "90"))
+QR_KEY_ROTATE_DAYS = int(os.getenv("QR_KEY_ROTATE_DAYS", "30"))
+QR_REFRESH_SECONDS = int(os.getenv("QR_REFRESH_SECONDS", "30"))
+SIGNATURE_BYTES = 16
+DAY = 86400
+
+
+class QrTokenError(Exception):
+    """status: 응답 코드 (401 잘못된 토큰, 403 만료/폐기)"""
+
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _derive(salt):
+    return hmac.new(security.SECRET_KEY, b"qr:" + bytes(salt), hashlib.sha256).digest()
+
+
+class QrKeyring:
+    """서명 키(버전 → 키)와 폐기 목록(회원 id → 이 시각 이전 발급분 무효)"""
+
+    def __init__(self):
+        self._keys = {}
+        self._active = None
+        self._revoked = {}
+        self._lock = threading.Lock()
+        self.refreshed_at = None
+
+    def refresh(self):
+        """스케줄러 진입점: 키와 폐기 목록을 다시 읽습니다. 사용 중인 키가 없으면 하나 만듭니다."""
+        conn = db.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO qr_signing_keys (salt)
+                SELECT %s WHERE NOT EXISTS (SELECT 1 FROM qr_signing_keys WHERE retired_at IS NULL)
+            """, (secrets.token_bytes(32),))
+            cursor.execute("SELECT version, salt FROM qr_signing_keys WHERE retired_at IS NULL ORDER BY version")
+            keys = {version: _derive(salt) for version, salt in cursor.fetchall()}
+            cursor.execute("SELECT user_id, floor(EXTRACT(EPOCH FROM revoked_at) * 1000)::bigint FROM qr_revocations")
+            revoked = dict(cursor.fetchall())
+            conn.commit()
+        finally:
+            db.return_connection(conn)
+        with self._lock:
+            self._keys, self._active, self._revoked = keys, max(keys), revoked
+            self.refreshed_at = time.time()
+        return len(keys)
+
+    def revoke_local(self, user_id, revoked_at):
+        with self._lock:
+            self._revoked[user_id] = revoked_at
+
+    def issue(self, user_id, product_id, end_date, issued_ms=None):
+        """issued_ms: 발급 시각 (epoch 밀리초, 폐기 시각과 같은 DB 시계로 잰 값)"""
+        if self._active is None:
+            self.refresh()
+        issued_ms = int(issued_ms if issued_ms is not None else time.time() * 1000)
+        expires = issued_ms // 1000 + QR_TOKEN_TTL_DAYS * DAY
+        if end_date is not None:
+            expires = min(expires, int(datetime.combine(end_date, datetime.max.time()).timestamp()))
+        version = self._active
+        fields = [user_id, str(product_id or ""), end_date.strftime("%Y%m%d") if end_date else "-",
+                  str(issued_ms), str(expires)]
+        payload = _b64encode("|".join(fields).encode("utf-8"))
+        message = f"{version}.{payload}"
+        signature = hmac.new(self._keys[version], message.encode("ascii"), hashlib.sha256).digest()
+        return {"token": f"{message}.{_b64encode(signature[:SIGNATURE_BYTES])}",
+                "expiresAt": datetime.fromtimestamp(expires), "keyVersion": version}
+
+    def verify(self, token, today=None, now=None):
+        """토큰을 검증해 claims dict(userId, productId, endDate, issuedAt)를 돌려줍니다. 실패하면 QrTokenError."""
+        try:
+            version, payload, signature = token.split(".")
+            key = self._keys.get(int(version))
+        except (AttributeError, ValueError):
+            raise QrTokenError(401, "QR 코드 형식이 올바르지 않습니다.")
+        if key is None:
+            raise QrTokenError(401, "사용할 수 없는 QR 코드입니다. 다시 발급받아 주세요.")
+        try:
+            expected = hmac.new(key, f"{version}.{payload}".encode("ascii"), hashlib.sha256).digest()[:SIGNATURE_BYTES]
+            valid = hmac.compare_digest(_b64decode(signature), expected)
+        except ValueError:  # ASCII 가 아닌 문자(UnicodeEncodeError), 잘못된 base64
+            valid = False
+        if not valid:
+            raise QrTokenError(401, "QR 코드 서명이 올바르지 않습니다.")
+
+        try:
+            user_id, product_id, end, issued, expires = _b64decode(payload).decode("utf-8").split("|")
+            end_date = None if end == "-" else date(int(end[:4]), int(end[4:6]), int(end[6:]))
+            issued, expires = int(issued), int(expires)
+            product_id = int(product_id) if product_id else None
+        except ValueError:
+            raise QrTokenError(401, "QR 코드 형식이 올바르지 않습니다.")
+        if end_date is not None and end_date < (today or date.today()):
+            raise QrTokenError(403, "회원권이 만료되었습니다.")
+        if expires < (now or time.time()):
+            raise QrTokenError(403, "QR 코드 유효 기간이 지났습니다. 다시 발급받아 주세요.")
+        revoked_at = self._revoked.get(user_id)
+        if revoked_at is not None and issued < revoked_at:
+            raise QrTokenError(403, "폐기된 QR 코드입니다. 다시 발급받아 주세요.")
+        return {"userId": user_id, "productId": product_id, "endDate": end_date, "issuedAt": issued}
+
+
+keyring = QrKeyring()
+
+
+def issue_for_member(cursor, user_id):
+    """회원의 현재 상품/종료일로 토큰을 발급합니다. 회원이 없으면 None."""
+    cursor.execute("""
+        SELECT id, product_id, end_date, floor(EXTRACT(EPOCH FROM clock_timestamp()) * 1000)::bigint
+        FROM users WHERE id = %s
+    """, (user_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return keyring.issue(row[0], row[1], row[2], issued_ms=row[3])
+
+
+def revoke(cursor, user_id):
+    """
+    지금까지 발급한 회원의 토큰을 모두 무효로 합니다 (호출한 쪽에서 커밋).
+    폐기 시각(epoch 밀리초)을 돌려주며, 회원이 없으면 None.
+    """
+    cursor.execute("""
+        INSERT INTO qr_revocations (user_id, revoked_at)
+        SELECT id, clock_timestamp() FROM users WHERE id = %s
+        ON CONFLICT (user_id) DO UPDATE SET revoked_at = EXCLUDED.revoked_at
+        RETURNING floor(EXTRACT(EPOCH FROM revoked_at) * 1000)::bigint
+    """, (user_id,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def rotate_keys(rotate_days=QR_KEY_ROTATE_DAYS, ttl_days=QR_TOKEN_TTL_DAYS):
+    """
+    스케줄러 진입점: 가장 최근 키가 rotate_days 보다 오래되었으면 새 키를 만들고,
+    새 키가 생긴 지 ttl_days 가 지난 이전 키(그 키로 서명된 토큰이 모두 만료됨)를 폐기합니다.
+    """
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        # 여러 워커가 동시에 돌려도 한 번만 교체되도록 잠급니다.
+        cursor.execute("LOCK TABLE qr_signing_keys IN SHARE ROW EXCLUSIVE MODE")
+        cursor.execute("""
+            INSERT INTO qr_signing_keys (salt)
+            SELECT %s WHERE NOT EXISTS (
+                SELECT 1 FROM qr_signing_keys
+                WHERE retired_at IS NULL AND created_at > LOCALTIMESTAMP - make_interval(days => %s)
+            )
+            RETURNING version
+        """, (secrets.token_bytes(32), rotate_days))
+        created = cursor.fetchone()
+        cursor.execute("""
+            UPDATE qr_signing_keys k SET retired_at = LOCALTIMESTAMP
+            WHERE retired_at IS NULL AND EXISTS (
+                SELECT 1 FROM qr_signing_keys n
+                WHERE n.version > k.version AND n.created_at < LOCALTIMESTAMP - make_interval(days => %s)
+            )
+            RETURNING version
+        """, (ttl_days,))
+        retired = [row[0] for row in cursor.fetchall()]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db.return_connection(conn)
+    if created or retired:
+        print(f"[QR] key rotated: new {created and created[0]}, retired {retired}")
+        keyring.refresh()
+    return {"created": created and created[0], "retired": retired}
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="QR 서명 키 관리")
+    parser.add_argument('command', choices=['rotate'], help="rotate: 기간과 관계없이 새 키로 교체")
+    parser.parse_args()
+    print(rotate_keys(rotate_days=0))
+    db.close_all()
+
+
+if __name__ == "__main__":
+    main()
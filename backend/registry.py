@@ -0,0 +1,62 @@
+"""
+라우터 레지스트리
+
+앱에 붙일 라우터 모듈 목록과 옵션을 한 곳에서 관리합니다.
+- optional 라우터는 모듈이 없거나 import 에 실패해도 앱 기동을 막지 않고 건너뜁니다.
+- DISABLED_ROUTERS 환경 변수(쉼표 구분, 예: "upload,admins")로 특정 라우터를 끌 수 있습니다.
+"""
+import importlib
+import os
+import time
+
+# (모듈 이름, optional, 인증 적용)
+ROUTERS = [
+    ("users", False, True),
+    ("coaches", False, True),
+    ("attendance", False, True),
+    ("products", False, True),
+    ("upload", False, True),
+    ("auth", False, False),
+    ("admins", False, True),
+    ("sync", False, True),
+    ("dashboard", False, True),
+    ("bookings", False, True),
+    ("audit", False, True),
+    ("reports", False, True),
+    ("messages", True, True),
+    ("templates", True, True),
+    ("automations", True, True),
+    ("analytics", True, True),     # numpy 가 없으면 건너뜀
+]
+
+loaded = {}
+skipped = {}
+
+
+def _disabled():
+    return {name.strip() for name in os.getenv("DISABLED_ROUTERS", "").split(",") if name.strip()}
+
+
+def register_routers(app, protected_dependencies=None):
+    """ROUTERS 목록의 라우터를 import 해서 app 에 등록합니다."""
+    disabled = _disabled()
+    for name, optional, protected in ROUTERS:
+        if name in disabled:
+            skipped[name] = "disabled"
+            continue
+
+        started = time.perf_counter()
+        try:
+            module = importlib.import_module(f"routers.{name}")
+        except ImportError as e:
+            if not optional:
+                raise
+            skipped[name] = str(e)
+            print(f"[SKIP] Optional router '{name}' not available: {e}")
+            continue
+
+        dependencies = protected_dependencies if protected and protected_dependencies else []
+        app.include_router(module.router, dependencies=dependencies)
+        loaded[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    return loaded
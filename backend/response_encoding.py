@@ -0,0 +1,235 @@
+"""
+응답 압축과 간결한 형식 협상
+
+혼잡한 체육관 Wi-Fi 의 태블릿/키오스크로 나가는 목록 응답(회원, 출석, 상품 등)을 줄입니다.
+
+1) 간결한 형식 (Accept 헤더, GET 200 JSON 응답만)
+   - application/x-columnar+json : 객체 목록을 {"columns": [키...], "rows": [[값...], ...]} 로 바꿉니다.
+     키를 한 번만 보내므로 같은 모양의 행이 많을수록 작아집니다. 최상위 목록과 최상위 객체의 값인 목록에 적용됩니다.
+   - application/msgpack : (msgpack 이 설치되어 있으면) 위와 같은 구조를 MessagePack 으로 보냅니다.
+   요청한 형식을 쓸 수 없으면 평소 JSON 그대로 보냅니다 (응답의 Content-Type 으로 구분).
+2) 압축 (Accept-Encoding): br(brotli 가 설치되어 있으면) → gzip 순으로 고르고,
+   COMPRESSION_MIN_BYTES 보다 작거나 이미 압축된 형식(xlsx 등)은 그대로 보냅니다.
+   스트리밍 응답은 조각마다 이어서 압축해 바로 내보냅니다 (전체를 모으지 않음).
+
+COMPRESSION_THREAD_BYTES 이상인 본문의 변환/압축은 스레드에서 돌려 이벤트 루프를 막지 않습니다.
+single-flight 바깥에 두므로 합쳐진 조회도 요청마다 자기 Accept 에 맞춰 인코딩됩니다.
+"""
+import asyncio
+import json
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_THREAD_BYTES = int(os.getenv("COMPRESSION_THREAD_BYTES", str(64 * 1024)))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+
+COLUMNAR_TYPE = "application/x-columnar+json"
+MSGPACK_TYPE = "application/msgpack"
+COMPRESSIBLE_TYPES = ("application/json", COLUMNAR_TYPE, MSGPACK_TYPE, "text/", "application/javascript")
+
+
+# ---------------------------------------------------------------------------
+# 협상
+# ---------------------------------------------------------------------------
+
+def _qvalues(header):
+    """"gzip, br;q=0.8" → {"gzip": 1.0, "br": 0.8}"""
+    values = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        values[name.strip().lower()] = q
+    return values
+
+
+def choose_encoding(accept_encoding):
+    """br / gzip / None"""
+    q = _qvalues(accept_encoding)
+    wildcard = q.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best = max(candidates, key=lambda name: q.get(name, wildcard))
+    return best if q.get(best, wildcard) > 0 else None
+
+
+def choose_format(accept):
+    """columnar / msgpack / None (평소 JSON)"""
+    q = _qvalues(accept)
+    formats = [("msgpack", q.get(MSGPACK_TYPE, 0.0) if msgpack is not None else 0.0),
+               ("columnar", q.get(COLUMNAR_TYPE, 0.0))]
+    name, weight = max(formats, key=lambda f: f[1])
+    return name if weight > 0 else None
+
+
+# ---------------------------------------------------------------------------
+# 변환
+# ---------------------------------------------------------------------------
+
+def to_columnar(value, nested=True):
+    """객체 목록을 {"columns", "rows"} 로 바꿉니다. 최상위 객체의 값까지만 내려갑니다."""
+    if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+        columns = list(dict.fromkeys(key for item in value for key in item))
+        return {"columns": columns, "rows": [[item.get(column) for column in columns] for item in value]}
+    if nested and isinstance(value, dict):
+        return {key: to_columnar(item, nested=False) for key, item in value.items()}
+    return value
+
+
+def encode_compact(body, fmt):
+    """JSON 본문을 (새 본문, Content-Type) 으로 바꿉니다."""
+    value = to_columnar(json.loads(body))
+    if fmt == "msgpack":
+        return msgpack.packb(value, use_bin_type=True), MSGPACK_TYPE
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), COLUMNAR_TYPE
+
+
+class _Compressor:
+    """스트리밍 압축기: compress() 는 지금까지 받은 내용을 바로 풀 수 있게 flush 한 조각을 돌려줍니다."""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip 헤더
+
+    def compress(self, data):
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data=b""):
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+def compress(data, encoding):
+    return _Compressor(encoding).finish(data)
+
+
+def _encode_whole(body, fmt, encoding):
+    """한 번에 온 본문: 형식 변환 → 압축. (본문, Content-Type 또는 None, 압축 여부)"""
+    content_type = None
+    if fmt:
+        try:
+            body, content_type = encode_compact(body, fmt)
+        except ValueError:
+            pass
+    if encoding and len(body) >= COMPRESSION_MIN_BYTES:
+        return compress(body, encoding), content_type, True
+    return body, content_type, False
+
+
+async def _offload(func, *args, size):
+    if size >= COMPRESSION_THREAD_BYTES:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
+
+
+# ---------------------------------------------------------------------------
+# 미들웨어
+# ---------------------------------------------------------------------------
+
+def _header(headers, name):
+    return next((v.decode("latin-1") for k, v in headers if k.lower() == name), "")
+
+
+def _compressible(content_type):
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class ResponseEncodingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            return await self.app(scope, receive, send)
+        encoding = choose_encoding(_header(scope["headers"], b"accept-encoding"))
+        fmt = choose_format(_header(scope["headers"], b"accept")) if scope["method"] == "GET" else None
+        if not encoding and not fmt:
+            return await self.app(scope, receive, send)
+
+        start = None
+        streaming = None  # 스트리밍 압축기 (첫 조각이 more_body 일 때)
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, streaming, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if streaming is not None:
+                chunk = await _offload(streaming.compress if more_body else streaming.finish, body, size=len(body))
+                return await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+            headers = [(k, v) for k, v in start.get("headers", [])]
+            content_type = _header(headers, b"content-type")
+            if _header(headers, b"content-encoding") or not _compressible(content_type):
+                passthrough = True
+                await send(start)
+                return await send(message)
+
+            vary = [b"Accept-Encoding"] + ([b"Accept"] if fmt else [])
+            if more_body:
+                # 스트리밍: 변환 없이 조각마다 압축합니다.
+                if not encoding:
+                    passthrough = True
+                    await send(start)
+                    return await send(message)
+                streaming = _Compressor(encoding)
+                headers = _replace(headers, content_length=None, content_encoding=encoding, vary=vary)
+                await send(dict(start, headers=headers))
+                chunk = await _offload(streaming.compress, body, size=len(body))
+                return await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+            compact = fmt if start["status"] == 200 and content_type.startswith("application/json") else None
+            new_body, new_type, compressed = await _offload(_encode_whole, body, compact, encoding, size=len(body))
+            headers = _replace(headers, content_length=len(new_body), content_type=new_type,
+                               content_encoding=encoding if compressed else None, vary=vary)
+            await send(dict(start, headers=headers))
+            await send({"type": "http.response.body", "body": new_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _replace(headers, content_length, content_encoding=None, content_type=None, vary=()):
+    """Content-Length / Content-Type / Content-Encoding / Vary 를 바꾼 헤더 목록"""
+    dropped = {b"content-length", b"vary"}
+    if content_type:
+        dropped.add(b"content-type")
+    existing_vary = [v for k, v in headers if k.lower() == b"vary"]
+    result = [(k, v) for k, v in headers if k.lower() not in dropped]
+    if content_length is not None:
+        result.append((b"content-length", str(content_length).encode("latin-1")))
+    if content_type:
+        result.append((b"content-type", content_type.encode("latin-1")))
+    if content_encoding:
+        result.append((b"content-encoding", content_encoding.encode("latin-1")))
+    result.append((b"vary", b", ".join(existing_vary + list(vary))))
+    return result
@@ -2,6 +2,8 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional
 from database import db
+import audit
+import security
 import psycopg2.extras
 
 router = APIRouter(prefix="/api/admins", tags=["admins"])
@@ -33,6 +35,8 @@ def get_admins():
 
 @router.post("/")
 def create_admin(admin: AdminCreate):
+    # 해시 계산은 연결을 잡기 전에 끝냅니다.
+    password_hash = security.hash_password(admin.password)
     conn = db.get_connection()
     try:
         cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
@@ -44,10 +48,11 @@ def create_admin(admin: AdminCreate):
 
         cursor.execute(
             "INSERT INTO admins (username, password, name, role) VALUES (%s, %s, %s, %s) RETURNING id, username, name, role, created_at",
-            (admin.username, admin.password, admin.name, admin.role)
+            (admin.username, password_hash, admin.name, admin.role)
         )
         new_admin = cursor.fetchone()
         conn.commit()
+        audit.stage("admins", new_admin['id'], "create", after=new_admin)
         return new_admin
     except HTTPException:
         raise
@@ -60,6 +65,7 @@ def create_admin(admin: AdminCreate):
 
 @router.put("/{id}")
 def update_admin(id: int, admin: AdminUpdate):
+    password_hash = security.hash_password(admin.password) if admin.password is not None else None
     conn = db.get_connection()
     try:
         cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
@@ -71,7 +77,7 @@ def update_admin(id: int, admin: AdminUpdate):
             values.append(admin.name)
         if admin.password is not None:
             updates.append("password = %s")
-            values.append(admin.password)
+            values.append(password_hash)
         if admin.role is not None:
             updates.append("role = %s")
             values.append(admin.role)
@@ -79,8 +85,17 @@ def update_admin(id: int, admin: AdminUpdate):
         if not updates:
             raise HTTPException(status_code=400, detail="수정할 내용이 없습니다.")
 
+        # 관리자 정보가 바뀌면 token_version 을 올려 기존 토큰을 모두 폐기합니다.
+        updates.append("token_version = admins.token_version + 1")
+
         values.append(id)
-        query = f"UPDATE admins SET {', '.join(updates)} WHERE id = %s RETURNING id, username, name, role, created_at"
+        query = f"""
+            UPDATE admins SET {', '.join(updates)}
+            FROM admins o
+            WHERE admins.id = %s AND o.id = admins.id
+            RETURNING admins.id, admins.username, admins.name, admins.role, admins.created_at, admins.token_version,
+                      jsonb_build_object('name', o.name, 'role', o.role) AS audit_before
+        """
         cursor.execute(query, values)
         updated = cursor.fetchone()
 
@@ -88,6 +103,13 @@ def update_admin(id: int, admin: AdminUpdate):
             raise HTTPException(status_code=404, detail="관리자를 찾을 수 없습니다.")
 
         conn.commit()
+        security.revocations.set_version(updated['id'], updated.pop('token_version'))
+        before = updated.pop('audit_before')
+        changes = audit.diff(before, {"name": updated['name'], "role": updated['role']})
+        if admin.password is not None:
+            # 해시는 남기지 않고 바뀌었다는 사실만 기록합니다.
+            changes["password"] = ["***", "***"]
+        audit.stage("admins", id, "update", changes=changes)
         return updated
     except HTTPException:
         raise
@@ -110,10 +132,13 @@ def delete_admin(id: int):
         if admin and admin['username'] == 'admin':
             raise HTTPException(status_code=400, detail="기본 관리자 계정은 삭제할 수 없습니다.")
 
-        cursor.execute("DELETE FROM admins WHERE id = %s", (id,))
-        if cursor.rowcount == 0:
+        cursor.execute("DELETE FROM admins WHERE id = %s RETURNING id, username, name, role", (id,))
+        deleted = cursor.fetchone()
+        if not deleted:
             raise HTTPException(status_code=404, detail="관리자를 찾을 수 없습니다.")
         conn.commit()
+        audit.stage("admins", id, "delete", before=deleted)
+        security.revocations.remove(id)
         return {"message": "관리자가 삭제되었습니다."}
     except HTTPException:
         raise
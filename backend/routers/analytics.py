@@ -0,0 +1,148 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from database import db, PoolTimeout
+from cache import TTLCache
+import psycopg2.extras
+
+import analytics
+
+router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+
+# 스냅샷 위에서 계산한 결과 (파라미터별). 스냅샷이 바뀌면 키가 달라집니다.
+_results = TTLCache(ttl=analytics.ANALYTICS_CACHE_SECONDS, maxsize=256)
+
+
+def _products():
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute("SELECT id, name, reg_months, duration_unit FROM products")
+        rows = cursor.fetchall()
+        conn.commit()
+        return {row['id']: row for row in rows}
+    finally:
+        db.return_connection(conn)
+
+
+def _member_names(ids):
+    if not ids:
+        return {}
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, name FROM users WHERE id = ANY(%s)
+            UNION ALL
+            SELECT id, name FROM users_archive WHERE id = ANY(%s)
+        """, (ids, ids))
+        rows = cursor.fetchall()
+        conn.commit()
+        return dict(rows)
+    finally:
+        db.return_connection(conn)
+
+
+def _product_info(products, product_id):
+    product = products.get(product_id)
+    if product is None:
+        return {"productId": product_id if product_id >= 0 else None, "productName": None}
+    return {"productId": product_id, "productName": product['name'],
+            "regMonths": product['reg_months'], "durationUnit": product['duration_unit']}
+
+
+async def _compute(key, compute):
+    """스냅샷을 (필요하면 만들어) 가져와 compute(snapshot) 결과를 캐시합니다."""
+    try:
+        snapshot = await run_in_threadpool(analytics.get_snapshot)
+        cache_key = (snapshot.built_at,) + key
+        cached = _results.get(cache_key)
+        if cached is not None:
+            return cached
+        result = await run_in_threadpool(compute, snapshot)
+    except PoolTimeout:
+        raise
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="분석 데이터 계산 중 오류가 발생했습니다.")
+    result["generatedAt"] = snapshot.built_at
+    _results.set(cache_key, result)
+    return result
+
+
+@router.get("/retention")
+async def get_retention(
+    by: str = Query("month", pattern="^(month|product)$"),
+    weeks: int = Query(26, ge=1, le=analytics.ANALYTICS_WEEKS),
+    productId: Optional[int] = None,
+    minSize: int = Query(1, ge=1)
+):
+    """
+    코호트별 주차 유지율 곡선. by=month 는 시작 월, by=product 는 상품별 코호트입니다.
+    retention[w] 는 w 주차에 한 번 이상 출석한 회원 비율이며, 아직 도래하지 않은 주차는 null 입니다.
+    """
+    def compute(snapshot):
+        cohorts = analytics.cohort_retention(snapshot, by=by, weeks=weeks, product_id=productId, min_size=minSize)
+        if by == "product":
+            products = _products()
+            for cohort in cohorts:
+                cohort.update(_product_info(products, cohort["cohort"]))
+        return {"by": by, "weeks": weeks, "cohorts": cohorts}
+
+    return await _compute(("retention", by, weeks, productId, minSize), compute)
+
+
+@router.get("/frequency")
+async def get_frequency():
+    """주당 출석 횟수 분포 (전체/상품별)와 초기 출석 빈도별 미갱신 비율"""
+    def compute(snapshot):
+        result = analytics.weekly_frequency(snapshot)
+        products = _products()
+        for row in result["byProduct"]:
+            row.update(_product_info(products, row["productId"]))
+        return result
+
+    return await _compute(("frequency",), compute)
+
+
+@router.get("/products")
+async def get_product_retention():
+    """상품별 현재 회원 비율, 평균 재적 기간, 주당 평균 출석"""
+    def compute(snapshot):
+        products = _products()
+        rows = analytics.product_summary(snapshot)
+        for row in rows:
+            row.update(_product_info(products, row["productId"]))
+        return {"products": rows}
+
+    return await _compute(("products",), compute)
+
+
+@router.get("/churn-risk")
+async def get_churn_risk(limit: int = Query(50, ge=1, le=1000), productId: Optional[int] = None):
+    """현재 회원의 이탈 위험 점수 상위 목록과 점수 분포 (0.1 단위 10 구간)"""
+    def compute(snapshot):
+        result = analytics.churn_risk(snapshot, limit=limit, product_id=productId)
+        names = _member_names([m["id"] for m in result["members"]])
+        for member in result["members"]:
+            member["name"] = names.get(member["id"])
+        return result
+
+    return await _compute(("churn-risk", limit, productId), compute)
+
+
+@router.post("/refresh")
+async def refresh_snapshot():
+    """캐시를 버리고 스냅샷을 다시 만듭니다."""
+    try:
+        result = await run_in_threadpool(analytics.refresh)
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="분석 데이터 계산 중 오류가 발생했습니다.")
+    _results.clear()
+    return result
@@ -1,22 +1,44 @@
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from typing import Optional
+from datetime import date, datetime, timedelta
 from database import db
-from models import AttendanceCreate
+from models import AttendanceCreate, KioskCheckIn
+from archive import ATTENDANCE_COLUMNS
+import attendance_bitmaps
+import audit
+import booking
+import heatmap
+import messaging
 import psycopg2.extras
+import qr_tokens
 
 router = APIRouter(prefix="/api/attendance", tags=["attendance"])
 
+# includeArchived 조회용: 보관된 출석은 보관된 회원과만 연결됩니다.
+ALL_ATTENDANCE_SQL = f"""
+    (SELECT {', '.join('h.' + c for c in ATTENDANCE_COLUMNS)}, u.name AS user_name FROM attendance h JOIN users u ON h.user_id = u.id
+     UNION ALL
+     SELECT {', '.join('aa.' + c for c in ATTENDANCE_COLUMNS)}, ua.name FROM attendance_archive aa JOIN users_archive ua ON aa.user_id = ua.id)
+"""
+
 @router.get("/")
-def get_attendance(startDate: Optional[str] = None, endDate: Optional[str] = None, userId: Optional[str] = None):
+def get_attendance(startDate: Optional[str] = None, endDate: Optional[str] = None, userId: Optional[str] = None,
+                   includeArchived: bool = False):
     conn = db.get_connection()
     try:
         cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        query = """
-            SELECT a.*, u.name as user_name, 'General' as user_type
-            FROM attendance a
-            JOIN users u ON a.user_id = u.id
-        """
+        if includeArchived:
+            query = f"""
+                SELECT a.*, 'General' as user_type
+                FROM {ALL_ATTENDANCE_SQL} a
+            """
+        else:
+            query = """
+                SELECT a.*, u.name as user_name, 'General' as user_type
+                FROM attendance a
+                JOIN users u ON a.user_id = u.id
+            """
         params = []
         conditions = []
 
@@ -50,7 +72,8 @@ def get_attendance(startDate: Optional[str] = None, endDate: Optional[str] = Non
                 'userType': record['user_type'],
                 'date': str(record['date']),
                 'time': str(record['time']),
-                'status': record.get('status', 'Present')
+                'status': record.get('status', 'Present'),
+                'coachId': record.get('coach_id')
             })
         
         return result
@@ -60,37 +83,79 @@ def get_attendance(startDate: Optional[str] = None, endDate: Optional[str] = Non
     finally:
         db.return_connection(conn)
 
-@router.post("/", status_code=201)
-def check_attendance(attendance: AttendanceCreate):
-    conn = db.get_connection()
+# 출석 체크 한 번 = 문장 한 번: 출석 INSERT, 같은 시간대 수업 예약 출석 처리, 출석 알림 적재를 CTE 로 묶습니다.
+# 회원/코치 존재 여부는 attendance 외래 키가 확인합니다 (없으면 ForeignKeyViolation).
+# 담당 코치를 따로 받지 않으면 같은 시간대 예약 수업의 코치로 기록합니다.
+CHECKIN_SQL = f"""
+    WITH a AS (
+        INSERT INTO attendance (user_id, date, time, status, coach_id)
+        VALUES (%(user)s, %(date)s, %(time)s, %(status)s, COALESCE(%(coach)s, ({booking.checkin_coach_sql()})))
+        RETURNING *
+    ),
+    b AS ({booking.checkin_bookings_sql("(SELECT id FROM a)")}),
+    m AS ({messaging.EVENT_SQL} RETURNING id)
+    SELECT a.*, ARRAY(SELECT id FROM b) AS booking_ids, (SELECT COUNT(*) FROM m) AS queued
+    FROM a
+"""
+
+def _check_in(cursor, user_id, date, time, status="Present", coach_id=None):
+    """출석을 넣고 (출석 행 + booking_ids, 적재한 알림 수) 를 돌려줍니다 (호출한 쪽에서 커밋)."""
+    cursor.execute(CHECKIN_SQL, {"user": user_id, "user_id": user_id, "date": date, "time": time,
+                                 "status": status, "coach": coach_id, "early": booking.CHECKIN_EARLY_MINUTES,
+                                 "event": "attendance"})
+    new_attendance = cursor.fetchone()
+    queued = new_attendance.pop('queued')
+    audit.stage("attendance", new_attendance['id'], "create",
+                after={k: v for k, v in new_attendance.items() if k != 'booking_ids'})
+    return new_attendance, queued
+
+def _check_in_response(conn, user_id, date, time, status="Present", coach_id=None):
+    """출석 체크 공통 처리: 커밋, 알림 깨우기, 오류 응답 변환"""
     try:
         cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        # 회원 존재 여부 확인
-        cursor.execute("SELECT id FROM users WHERE id = %s", (attendance.userId,))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="회원을 찾을 수 없습니다.")
-
-        query = """
-            INSERT INTO attendance (user_id, date, time, status)
-            VALUES (%s, %s, %s, %s)
-            RETURNING *
-        """
-        cursor.execute(query, (
-            attendance.userId, attendance.date, attendance.time, attendance.status
-        ))
+        new_attendance, queued = _check_in(cursor, user_id, date, time, status, coach_id)
         conn.commit()
-        new_attendance = cursor.fetchone()
+        if queued:
+            messaging.dispatcher.wake()
         return new_attendance
+    except psycopg2.errors.ForeignKeyViolation as e:
+        conn.rollback()
+        if e.diag.constraint_name == 'attendance_coach_id_fkey':
+            raise HTTPException(status_code=404, detail="코치를 찾을 수 없습니다.")
+        raise HTTPException(status_code=404, detail="회원을 찾을 수 없습니다.")
     except psycopg2.errors.UniqueViolation:
         conn.rollback()
         raise HTTPException(status_code=409, detail="이미 해당 시간에 출석 기록이 존재합니다.")
-    except HTTPException:
-        raise
     except Exception as e:
         conn.rollback()
         print(e)
         raise HTTPException(status_code=500, detail="출석 체크 중 오류가 발생했습니다.")
+
+@router.post("/", status_code=201)
+def check_attendance(attendance: AttendanceCreate):
+    conn = db.get_connection()
+    try:
+        return _check_in_response(conn, attendance.userId, attendance.date, attendance.time, attendance.status,
+                                  attendance.coachId)
+    finally:
+        db.return_connection(conn)
+
+@router.post("/kiosk", status_code=201)
+def kiosk_check_in(request: KioskCheckIn):
+    """
+    키오스크 QR 출석 체크. 토큰 서명·만료·폐기 여부를 메모리에서 확인한 뒤 바로 출석을 넣습니다.
+    잘못된 토큰은 401, 만료된 회원권/폐기된 QR 은 403 이며 이 경우 DB 에 접근하지 않습니다.
+    """
+    try:
+        claims = qr_tokens.keyring.verify(request.token)
+    except qr_tokens.QrTokenError as e:
+        raise HTTPException(status_code=e.status, detail=e.detail)
+    now = datetime.now()
+    conn = db.get_connection()
+    try:
+        result = _check_in_response(conn, claims['userId'], now.date(), now.strftime("%H:%M:%S"))
+        result['endDate'] = claims['endDate']
+        return result
     finally:
         db.return_connection(conn)
 
@@ -130,3 +195,78 @@ def get_attendance_stats(startDate: Optional[str] = None, endDate: Optional[str]
         raise HTTPException(status_code=500, detail="출석 통계 조회 중 오류가 발생했습니다.")
     finally:
         db.return_connection(conn)
+
+@router.get("/heatmap")
+def get_attendance_heatmap(startDate: Optional[date] = None, endDate: Optional[date] = None,
+                           productId: Optional[int] = None,
+                           bucketHours: int = Query(1, ge=1, le=24, description="시간 구간 크기 (1, 2, 3, 4, 6, 8, 12, 24)")):
+    """
+    요일 × 시간대별 출석 수 (보관된 출석 포함). 기본 범위는 최근 1년입니다.
+    미리 집계된 시간대 합계에서 읽으므로 범위가 길어도 원본 출석을 훑지 않습니다.
+    """
+    if 24 % bucketHours != 0:
+        raise HTTPException(status_code=400, detail="bucketHours 는 24의 약수여야 합니다.")
+    end = endDate or date.today()
+    start = startDate or end - timedelta(days=364)
+    if start > end:
+        raise HTTPException(status_code=400, detail="시작일이 종료일보다 늦습니다.")
+
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        result = heatmap.heatmap(cursor, start, end, productId, bucketHours)
+        conn.commit()
+        return result
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="출석 시간대 집계 조회 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+@router.get("/streak/{userId}")
+def get_attendance_streak(userId: str, months: int = Query(12, ge=1, le=36)):
+    """회원의 현재/최장 연속 출석과 최근 months 개월 월별 출석일 (출석 비트맵에서 계산)"""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute("SELECT 1 FROM users WHERE id = %s", (userId,))
+        if cursor.fetchone() is None:
+            raise HTTPException(status_code=404, detail="회원을 찾을 수 없습니다.")
+        result = attendance_bitmaps.member_summary(cursor, userId, months)
+        conn.commit()
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="연속 출석 조회 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+@router.get("/frequency")
+def get_attendance_frequency(days: int = Query(30, ge=1, le=366), minDays: int = Query(8, ge=1),
+                             endDate: Optional[date] = None, productId: Optional[int] = None,
+                             limit: int = Query(200, ge=0, le=5000)):
+    """
+    endDate(기본 오늘)까지 최근 days 일 동안 minDays 일 이상 출석한 회원 수와 출석일 많은 순 상위 limit 명.
+    출석 비트맵의 AND / 비트 수 계산으로 집계하므로 원본 출석을 훑지 않습니다.
+    """
+    if minDays > days:
+        raise HTTPException(status_code=400, detail="minDays 는 days 보다 클 수 없습니다.")
+    end = endDate or date.today()
+    start = end - timedelta(days=days - 1)
+
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        result = attendance_bitmaps.frequency_cohort(cursor, start, end, minDays, productId, limit)
+        conn.commit()
+        return result
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="출석 빈도 조회 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
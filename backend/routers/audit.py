@@ -0,0 +1,87 @@
+from fastapi import APIRouter, HTTPException
+from typing import Optional
+from datetime import datetime, timedelta
+from database import db
+import audit
+import psycopg2.extras
+
+router = APIRouter(prefix="/api/audit", tags=["audit"])
+
+
+def _event_json(row):
+    return {
+        "id": row['id'],
+        "occurredAt": row['occurred_at'],
+        "adminId": row['admin_id'],
+        "adminName": row['admin_name'],
+        "entity": row['entity'],
+        "entityId": row['entity_id'],
+        "action": row['action'],
+        "changes": row['changes'],
+        "method": row['method'],
+        "path": row['path'],
+        "clientIp": row['client_ip']
+    }
+
+
+@router.get("/")
+def get_audit_log(entity: Optional[str] = None, entityId: Optional[str] = None, adminId: Optional[int] = None,
+                  action: Optional[str] = None, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                  beforeId: Optional[int] = None, limit: int = 100):
+    """
+    감사 로그 (최근 순). 기간을 주지 않으면 최근 30일만 봅니다 (해당 월 파티션만 읽음).
+    다음 페이지는 응답의 nextBefore / nextBeforeId 를 end / beforeId 로 넘깁니다.
+    기록은 최대 AUDIT_FLUSH_SECONDS 늦게 보입니다.
+    """
+    end = end or datetime.now()
+    start = start or end - timedelta(days=30)
+    if start > end:
+        raise HTTPException(status_code=400, detail="시작 시각이 종료 시각보다 늦습니다.")
+    limit = min(max(limit, 1), 1000)
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        conditions = ["occurred_at >= %s"]
+        params = [start]
+        if beforeId is not None:
+            conditions.append("(occurred_at, id) < (%s, %s)")
+            params += [end, beforeId]
+        else:
+            conditions.append("occurred_at <= %s")
+            params.append(end)
+        if entity:
+            conditions.append("entity = %s")
+            params.append(entity)
+            if entityId:
+                conditions.append("entity_id = %s")
+                params.append(entityId)
+        if adminId is not None:
+            conditions.append("admin_id = %s")
+            params.append(adminId)
+        if action:
+            conditions.append("action = %s")
+            params.append(action)
+        params.append(limit)
+        cursor.execute(f"""
+            SELECT * FROM audit_log
+            WHERE {' AND '.join(conditions)}
+            ORDER BY occurred_at DESC, id DESC
+            LIMIT %s
+        """, params)
+        events = [_event_json(row) for row in cursor.fetchall()]
+        last = events[-1] if len(events) == limit else None
+        return {"events": events,
+                "nextBefore": last and last["occurredAt"], "nextBeforeId": last and last["id"]}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="감사 로그 조회 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+@router.get("/stats")
+def get_audit_stats():
+    """메모리 버퍼 상태 (대기 중인 이벤트, 누적 기록/버림/실패 수)"""
+    return dict(audit.writer.stats, pending=audit.writer.pending, capacity=audit.AUDIT_BUFFER_SIZE)
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from database import db
+from database import db, PoolTimeout
+import security
 import psycopg2.extras
+import time
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -9,33 +12,85 @@ class LoginRequest(BaseModel):
     username: str
     password: str
 
-@router.post("/login")
-def login(request: LoginRequest):
+def _fetch_admin(username):
     conn = db.get_connection()
     try:
         cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        # 사용자 조회
-        # *주의*: 현재는 평문 비밀번호를 사용합니다. 
-        # 실제 운영 환경에서는 bcrypt 등을 사용하여 해시된 비밀번호를 비교해야 합니다.
-        query = "SELECT * FROM admins WHERE username = %s AND password = %s"
-        cursor.execute(query, (request.username, request.password))
+        cursor.execute("SELECT id, username, password, name, role, token_version FROM admins WHERE username = %s", (username,))
         admin = cursor.fetchone()
-        
-        if not admin:
+        conn.commit()
+        return admin
+    finally:
+        db.return_connection(conn)
+
+def _store_password_hash(admin_id, password_hash):
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE admins SET password = %s WHERE id = %s", (password_hash, admin_id))
+        conn.commit()
+    finally:
+        db.return_connection(conn)
+
+def _token_response(admin, auth_time=None):
+    token = security.issue_token(admin, auth_time=auth_time)
+    return {
+        "id": admin['id'],
+        "username": admin['username'],
+        "name": admin['name'],
+        "role": admin['role'],
+        "accessToken": token,
+        "tokenType": "Bearer",
+        "expiresIn": security.decode_token(token)["exp"] - int(time.time())
+    }
+
+@router.post("/login")
+async def login(request: LoginRequest):
+    try:
+        # DB 연결은 조회하는 동안만 사용하고, 해시 검증은 전용 스레드 풀에서 수행합니다.
+        admin = await run_in_threadpool(_fetch_admin, request.username)
+        if not admin or not await security.verify_password_async(request.password, admin['password']):
             raise HTTPException(status_code=401, detail="아이디 또는 비밀번호가 일치하지 않습니다.")
-            
-        return {
-            "id": admin['id'],
-            "username": admin['username'],
-            "name": admin['name'],
-            "role": admin['role']
-        }
-
-    except HTTPException:
+
+        # 평문이거나 반복 횟수가 바뀐 해시는 로그인 성공 시 다시 저장합니다.
+        if security.needs_rehash(admin['password']):
+            password_hash = await security.hash_password_async(request.password)
+            await run_in_threadpool(_store_password_hash, admin['id'], password_hash)
+
+        security.revocations.set_version(admin['id'], admin['token_version'])
+        return _token_response(admin)
+
+    except (HTTPException, PoolTimeout):
         raise
     except Exception as e:
         print(f"로그인 오류: {e}")
         raise HTTPException(status_code=500, detail="로그인 처리 중 오류가 발생했습니다.")
-    finally:
-        db.return_connection(conn)
+
+@router.post("/refresh")
+def refresh_token(claims: dict = Depends(security.require_admin)):
+    """
+    유효한(폐기되지 않은) 토큰으로 새 토큰을 발급합니다. DB를 조회하지 않습니다.
+    새 토큰은 처음 로그인한 시각을 이어받으며, 로그인 후 MAX_SESSION_AGE 가 지나면 갱신하지 않습니다.
+    """
+    auth_time = security.session_started(claims)
+    if time.time() - auth_time >= security.MAX_SESSION_AGE:
+        raise HTTPException(status_code=401, detail="로그인 유지 시간이 지났습니다. 다시 로그인해 주세요.",
+                            headers={"WWW-Authenticate": "Bearer"})
+    admin = {
+        "id": claims["sub"],
+        "username": claims["usr"],
+        "name": claims["name"],
+        "role": claims["role"],
+        "token_version": claims["ver"]
+    }
+    return _token_response(admin, auth_time)
+
+@router.get("/me")
+def get_me(claims: dict = Depends(security.require_admin)):
+    return {
+        "id": claims["sub"],
+        "username": claims["usr"],
+        "name": claims["name"],
+        "role": claims["role"],
+        "expiresAt": claims["exp"]
+    }
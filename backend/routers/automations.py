@@ -0,0 +1,216 @@
+from fastapi import APIRouter, HTTPException
+from database import db
+from models import AutomationRuleCreate, AutomationRuleUpdate
+import automations
+import psycopg2.errors
+import psycopg2.extras
+
+router = APIRouter(prefix="/api/automations", tags=["automations"])
+
+# 수정할 수 있는 필드: (API 이름, 컬럼)
+UPDATE_FIELDS = [
+    ("name", "name"),
+    ("conditions", "conditions"),
+    ("action", "action"),
+    ("templateId", "template_id"),
+    ("active", "active"),
+]
+
+
+def _rule_json(row):
+    return {
+        "id": row['id'],
+        "name": row['name'],
+        "conditions": row['conditions'],
+        "action": row['action'],
+        "templateId": row['template_id'],
+        "active": row['active'],
+        "lastEvaluatedAt": row['last_evaluated_at'],
+        "lastDurationMs": row['last_duration_ms'],
+        "createdAt": row['created_at'],
+        "updatedAt": row['updated_at']
+    }
+
+
+def _conditions(conditions):
+    try:
+        return automations.validate_conditions([c.model_dump() for c in conditions])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _check_action(action, template_id):
+    if action == 'message' and template_id is None:
+        raise HTTPException(status_code=400, detail="메시지 동작에는 templateId 가 필요합니다.")
+
+
+@router.get("/")
+def get_rules():
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute("SELECT * FROM automation_rules ORDER BY id")
+        return {"conditionTypes": list(automations.CONDITIONS), "actions": list(automations.ACTIONS),
+                "rules": [_rule_json(row) for row in cursor.fetchall()]}
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="자동화 규칙 조회 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+@router.post("/", status_code=201)
+def create_rule(rule: AutomationRuleCreate):
+    conditions = _conditions(rule.conditions)
+    _check_action(rule.action, rule.templateId)
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute("""
+            INSERT INTO automation_rules (name, conditions, action, template_id, active)
+            VALUES (%s, %s, %s, %s, %s)
+            RETURNING *
+        """, (rule.name, psycopg2.extras.Json(conditions), rule.action, rule.templateId, rule.active))
+        created = cursor.fetchone()
+        conn.commit()
+        return _rule_json(created)
+    except psycopg2.errors.UniqueViolation:
+        conn.rollback()
+        raise HTTPException(status_code=409, detail="같은 이름의 규칙이 이미 있습니다.")
+    except psycopg2.errors.ForeignKeyViolation:
+        conn.rollback()
+        raise HTTPException(status_code=404, detail="템플릿을 찾을 수 없습니다.")
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="자동화 규칙 추가 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+@router.put("/{id}")
+def update_rule(id: int, rule: AutomationRuleUpdate):
+    """규칙을 수정합니다. 워터마크를 지우므로 다음 평가에서 전체 회원을 다시 봅니다."""
+    values = rule.model_dump(exclude_unset=True)
+    if not values:
+        raise HTTPException(status_code=400, detail="수정할 내용이 없습니다.")
+    if rule.conditions is not None:
+        values['conditions'] = psycopg2.extras.Json(_conditions(rule.conditions))
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        assignments = [f"{column} = %({field})s" for field, column in UPDATE_FIELDS if field in values]
+        cursor.execute(f"""
+            UPDATE automation_rules
+            SET {', '.join(assignments)}, last_evaluated_at = NULL, last_evaluated_date = NULL,
+                last_attendance_id = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE id = %(id)s
+            RETURNING *
+        """, dict(values, id=id))
+        updated = cursor.fetchone()
+        if not updated:
+            raise HTTPException(status_code=404, detail="규칙을 찾을 수 없습니다.")
+        _check_action(updated['action'], updated['template_id'])
+        conn.commit()
+        return _rule_json(updated)
+    except psycopg2.errors.UniqueViolation:
+        conn.rollback()
+        raise HTTPException(status_code=409, detail="같은 이름의 규칙이 이미 있습니다.")
+    except psycopg2.errors.ForeignKeyViolation:
+        conn.rollback()
+        raise HTTPException(status_code=404, detail="템플릿을 찾을 수 없습니다.")
+    except HTTPException:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="자동화 규칙 수정 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+@router.delete("/{id}")
+def delete_rule(id: int):
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM automation_rules WHERE id = %s", (id,))
+        if cursor.rowcount == 0:
+            raise HTTPException(status_code=404, detail="규칙을 찾을 수 없습니다.")
+        conn.commit()
+        return {"message": "규칙이 삭제되었습니다."}
+    except HTTPException:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="자동화 규칙 삭제 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+@router.post("/run")
+def run_all_rules(full: bool = False):
+    """활성 규칙 전체를 지금 평가합니다 (full=true 면 워터마크와 관계없이 전체 회원)."""
+    try:
+        return automations.evaluate_all(full)
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="자동화 규칙 평가 중 오류가 발생했습니다.")
+
+
+@router.post("/{id}/run")
+def run_rule(id: int, full: bool = False):
+    try:
+        result = automations.run_rule(id, full)
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="자동화 규칙 평가 중 오류가 발생했습니다.")
+    if result is None:
+        raise HTTPException(status_code=409, detail="규칙이 없거나 다른 곳에서 평가 중입니다.")
+    return result
+
+
+@router.get("/{id}/preview")
+def preview_rule(id: int, limit: int = 20):
+    """조건에 맞는 회원 수와 일부 목록 (실행 여부와 관계없이 현재 기준, 실행하지 않음)"""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute("SELECT conditions FROM automation_rules WHERE id = %s", (id,))
+        rule = cursor.fetchone()
+        if not rule:
+            raise HTTPException(status_code=404, detail="규칙을 찾을 수 없습니다.")
+        count, members = automations.preview(cursor, rule['conditions'], min(max(limit, 1), 200))
+        return {"count": count, "members": members}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="자동화 규칙 미리보기 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+@router.get("/{id}/firings")
+def get_firings(id: int, limit: int = 100):
+    """규칙이 실행된 회원 (최근 순)"""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute("""
+            SELECT f.user_id, u.name AS user_name, f.fire_key, f.fired_at
+            FROM automation_firings f LEFT JOIN users u ON u.id = f.user_id
+            WHERE f.rule_id = %s
+            ORDER BY f.fired_at DESC
+            LIMIT %s
+        """, (id, min(max(limit, 1), 1000)))
+        return [{"userId": row['user_id'], "userName": row['user_name'], "fireKey": row['fire_key'],
+                 "firedAt": row['fired_at']} for row in cursor.fetchall()]
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="자동화 실행 기록 조회 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
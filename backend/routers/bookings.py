@@ -0,0 +1,230 @@
+from fastapi import APIRouter, HTTPException, Response
+from typing import Optional
+from datetime import date, timedelta
+from database import db
+from models import SessionCreate, BookingCreate
+import booking
+import psycopg2.errors
+import psycopg2.extras
+
+router = APIRouter(prefix="/api/sessions", tags=["sessions"])
+
+
+def _session_json(row):
+    return {
+        "id": row['id'],
+        "coachId": row['coach_id'],
+        "coachName": row.get('coach_name'),
+        "productId": row['product_id'],
+        "title": row['title'],
+        "startsAt": row['starts_at'],
+        "endsAt": row['ends_at'],
+        "capacity": row['capacity'],
+        "booked": row['booked'],
+        "available": max(row['capacity'] - row['booked'], 0),
+        "waitlistLimit": row['waitlist_limit'],
+        "waitlisted": row['waitlisted'],
+        "status": row['status']
+    }
+
+
+def _booking_json(row):
+    if row is None:
+        return None
+    result = {
+        "id": row['id'],
+        "sessionId": row['session_id'],
+        "userId": row['user_id'],
+        "status": row['status'],
+        "attendanceId": row['attendance_id'],
+        "createdAt": row['created_at']
+    }
+    if 'user_name' in row:
+        result["userName"] = row['user_name']
+    if 'position' in row:
+        result["position"] = row['position']
+    return result
+
+
+@router.get("/")
+def get_sessions(startDate: Optional[date] = None, endDate: Optional[date] = None, coachId: Optional[str] = None,
+                 includeCancelled: bool = False):
+    """수업 목록 (기본: 오늘부터 2주). 정원/예약/대기 인원이 함께 내려갑니다."""
+    start = startDate or date.today()
+    end = endDate or start + timedelta(days=13)
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        conditions = ["s.starts_at >= %s", "s.starts_at < %s"]
+        params = [start, end + timedelta(days=1)]
+        if coachId:
+            conditions.append("s.coach_id = %s")
+            params.append(coachId)
+        if not includeCancelled:
+            conditions.append("s.status <> 'cancelled'")
+        cursor.execute(f"""
+            SELECT s.*, c.name AS coach_name
+            FROM coach_sessions s JOIN coaches c ON c.id = s.coach_id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY s.starts_at, s.id
+        """, params)
+        return [_session_json(row) for row in cursor.fetchall()]
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="수업 조회 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+@router.get("/bookings")
+def get_member_bookings(userId: str, includePast: bool = False):
+    """회원의 예약 목록 (기본: 앞으로 있을 수업만)"""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute(f"""
+            SELECT b.*, s.starts_at, s.ends_at, s.title, s.coach_id,
+                   CASE WHEN b.status = 'waitlisted' THEN (
+                       SELECT COUNT(*) FROM session_bookings w
+                       WHERE w.session_id = b.session_id AND w.status = 'waitlisted'
+                         AND (w.created_at, w.id) <= (b.created_at, b.id)
+                   ) END AS position
+            FROM session_bookings b JOIN coach_sessions s ON s.id = b.session_id
+            WHERE b.user_id = %s {'' if includePast else 'AND s.ends_at >= LOCALTIMESTAMP'}
+            ORDER BY s.starts_at
+        """, (userId,))
+        return [dict(_booking_json(row), startsAt=row['starts_at'], endsAt=row['ends_at'],
+                     title=row['title'], coachId=row['coach_id']) for row in cursor.fetchall()]
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="예약 조회 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+@router.get("/{id}")
+def get_session(id: int):
+    """수업 정보와 예약 명단 (확정 → 대기 순)"""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute("""
+            SELECT s.*, c.name AS coach_name
+            FROM coach_sessions s JOIN coaches c ON c.id = s.coach_id
+            WHERE s.id = %s
+        """, (id,))
+        session = cursor.fetchone()
+        if not session:
+            raise HTTPException(status_code=404, detail="수업을 찾을 수 없습니다.")
+        cursor.execute("""
+            SELECT b.*, u.name AS user_name
+            FROM session_bookings b JOIN users u ON u.id = b.user_id
+            WHERE b.session_id = %s AND b.status <> 'cancelled'
+            ORDER BY b.status = 'waitlisted', b.created_at, b.id
+        """, (id,))
+        result = _session_json(session)
+        result["bookings"] = [_booking_json(row) for row in cursor.fetchall()]
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="수업 조회 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+@router.post("/", status_code=201)
+def create_session(session: SessionCreate):
+    if session.endsAt <= session.startsAt:
+        raise HTTPException(status_code=400, detail="종료 시각은 시작 시각보다 늦어야 합니다.")
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute("""
+            INSERT INTO coach_sessions (coach_id, product_id, title, starts_at, ends_at, capacity, waitlist_limit)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            RETURNING *
+        """, (session.coachId, session.productId, session.title, session.startsAt, session.endsAt,
+              session.capacity, session.waitlistLimit))
+        created = cursor.fetchone()
+        conn.commit()
+        return _session_json(created)
+    except psycopg2.errors.ForeignKeyViolation:
+        conn.rollback()
+        raise HTTPException(status_code=404, detail="코치 또는 상품을 찾을 수 없습니다.")
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="수업 추가 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+@router.delete("/{id}")
+def cancel_session(id: int):
+    """수업을 취소합니다. 남은 예약은 모두 취소됩니다."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cancelled = booking.cancel_session(cursor, id)
+        conn.commit()
+        return {"message": "수업이 취소되었습니다.", "cancelledBookings": cancelled}
+    except HTTPException:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="수업 취소 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+@router.post("/{id}/bookings", status_code=201)
+def create_booking(id: int, request: BookingCreate, response: Response):
+    """
+    수업을 예약합니다. 자리가 있으면 201 (status=booked),
+    정원이 찼고 대기 가능하면 202 (status=waitlisted, position=대기 순번), 둘 다 아니면 409 입니다.
+    """
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        created = booking.reserve(cursor, id, request.userId)
+        conn.commit()
+        if created['status'] == 'waitlisted':
+            response.status_code = 202
+        return _booking_json(created)
+    except psycopg2.errors.UniqueViolation:
+        conn.rollback()
+        raise HTTPException(status_code=409, detail="이미 예약한 수업입니다.")
+    except HTTPException:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="수업 예약 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+@router.delete("/{id}/bookings/{bookingId}")
+def cancel_booking(id: int, bookingId: int):
+    """예약을 취소합니다. 확정 예약이 취소되면 첫 번째 대기자가 확정으로 승격됩니다."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cancelled, promoted = booking.cancel(cursor, id, bookingId)
+        conn.commit()
+        return {"message": "예약이 취소되었습니다.", "booking": _booking_json(cancelled),
+                "promoted": _booking_json(promoted)}
+    except HTTPException:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="예약 취소 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Response
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
+from datetime import date
 from database import db
 import psycopg2.extras
+import versioning
+import audit
+import coach_workload
 
 router = APIRouter(prefix="/api/coaches", tags=["coaches"])
 
@@ -18,6 +22,20 @@ class CoachUpdate(BaseModel):
     specialty: Optional[str] = None
     status: Optional[str] = None
 
+class CoachPatch(CoachUpdate):
+    version: Optional[int] = None
+
+class CoachBulkPatch(CoachPatch):
+    id: str
+
+# PATCH 로 수정할 수 있는 필드: (API 이름, 컬럼, SQL 타입)
+PATCH_FIELDS = [
+    ("name", "name", "varchar"),
+    ("phone", "phone", "varchar"),
+    ("specialty", "specialty", "varchar"),
+    ("status", "status", "varchar"),
+]
+
 @router.get("/")
 def get_coaches():
     conn = db.get_connection()
@@ -50,6 +68,38 @@ def get_coach(id: str):
     finally:
         db.return_connection(conn)
 
+@router.get("/{id}/workload")
+def get_coach_workload(id: str, startDate: Optional[date] = None, endDate: Optional[date] = None,
+                       groupBy: str = Query("month", pattern="^(day|month)$")):
+    """
+    코치의 기간별 수업(담당 출석) 수. 기본 범위는 올해 1월 1일부터 오늘까지입니다.
+    미리 집계된 일/월 합계에서 읽으므로 범위가 길어도 원본 출석을 훑지 않습니다.
+    """
+    end = endDate or date.today()
+    start = startDate or end.replace(month=1, day=1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="시작일이 종료일보다 늦습니다.")
+
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute("SELECT name FROM coaches WHERE id = %s", (id,))
+        coach = cursor.fetchone()
+        if not coach:
+            raise HTTPException(status_code=404, detail="코치를 찾을 수 없습니다.")
+        result = coach_workload.workload(cursor, id, start, end, groupBy)
+        result["name"] = coach['name']
+        conn.commit()
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="코치 수업 집계 조회 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
 @router.post("/")
 def create_coach(coach: CoachCreate):
     conn = db.get_connection()
@@ -70,6 +120,7 @@ def create_coach(coach: CoachCreate):
         )
         new_coach = cursor.fetchone()
         conn.commit()
+        audit.stage("coaches", new_id, "create", after=new_coach)
         return new_coach
     except Exception as e:
         conn.rollback()
@@ -103,7 +154,12 @@ def update_coach(id: str, coach: CoachUpdate):
             raise HTTPException(status_code=400, detail="수정할 내용이 없습니다.")
 
         values.append(id)
-        query = f"UPDATE coaches SET {', '.join(updates)} WHERE id = %s RETURNING *"
+        query = f"""
+            UPDATE coaches SET {', '.join(updates)}
+            FROM coaches o
+            WHERE coaches.id = %s AND o.id = coaches.id
+            RETURNING coaches.*, to_jsonb(o) AS audit_before
+        """
         cursor.execute(query, values)
         updated = cursor.fetchone()
 
@@ -111,6 +167,7 @@ def update_coach(id: str, coach: CoachUpdate):
             raise HTTPException(status_code=404, detail="코치를 찾을 수 없습니다.")
 
         conn.commit()
+        audit.stage_update("coaches", updated)
         return updated
     except HTTPException:
         raise
@@ -121,15 +178,68 @@ def update_coach(id: str, coach: CoachUpdate):
     finally:
         db.return_connection(conn)
 
+def _patch_error(conn, e):
+    conn.rollback()
+    if isinstance(e, psycopg2.errors.NotNullViolation):
+        return HTTPException(status_code=400, detail="필수 항목은 비울 수 없습니다.")
+    print(e)
+    return HTTPException(status_code=500, detail="코치 수정 중 오류가 발생했습니다.")
+
+@router.patch("/")
+def patch_coaches(items: List[CoachBulkPatch]):
+    """여러 코치를 한 문장으로 수정합니다 (예: 상태 일괄 변경)."""
+    if not items:
+        raise HTTPException(status_code=400, detail="수정할 내용이 없습니다.")
+    payload = [item.model_dump(exclude_unset=True) for item in items]
+    if len({item["id"] for item in payload}) != len(payload):
+        raise HTTPException(status_code=400, detail="같은 코치가 여러 번 포함되어 있습니다.")
+
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        result = versioning.patch_rows(cursor, "coaches", payload, PATCH_FIELDS)
+        conn.commit()
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _patch_error(conn, e)
+    finally:
+        db.return_connection(conn)
+
+@router.patch("/{id}")
+def patch_coach(id: str, patch: CoachPatch, response: Response, if_match: Optional[str] = Header(None)):
+    """보낸 필드만 수정합니다. If-Match(또는 본문 version)가 현재 버전과 다르면 412 입니다."""
+    changes = patch.model_dump(exclude_unset=True)
+    body_version = changes.pop("version", None)
+    expected_version = versioning.parse_if_match(if_match) if if_match else body_version
+
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        result = versioning.patch_row(cursor, "coaches", id, changes, PATCH_FIELDS, expected_version,
+                                      not_found="코치를 찾을 수 없습니다.")
+        conn.commit()
+        response.headers["ETag"] = versioning.etag(result["version"])
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _patch_error(conn, e)
+    finally:
+        db.return_connection(conn)
+
 @router.delete("/{id}")
 def delete_coach(id: str):
     conn = db.get_connection()
     try:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM coaches WHERE id = %s", (id,))
-        if cursor.rowcount == 0:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute("DELETE FROM coaches WHERE id = %s RETURNING *", (id,))
+        deleted = cursor.fetchone()
+        if not deleted:
             raise HTTPException(status_code=404, detail="코치를 찾을 수 없습니다.")
         conn.commit()
+        audit.stage("coaches", id, "delete", before=deleted)
         return {"message": "코치가 삭제되었습니다."}
     except HTTPException:
         raise
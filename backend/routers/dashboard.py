@@ -0,0 +1,137 @@
+import asyncio
+import os
+
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from database import db, PoolTimeout
+from cache import TTLCache
+import psycopg2.extras
+
+router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
+
+_cache = TTLCache(ttl=float(os.getenv("DASHBOARD_CACHE_SECONDS", "5")), maxsize=4)
+
+# 현재 회원: 종료일이 오늘 이후이거나, 종료일 없는 횟수권(FPT)에 잔여 횟수가 있는 회원
+ACTIVE_CONDITION = "(end_date >= CURRENT_DATE OR (end_date IS NULL AND remaining > 0))"
+
+# 대시보드 구성 쿼리. 서로 독립적이므로 각각 다른 풀 연결에서 동시에 실행됩니다.
+SUMMARY_QUERIES = {
+    "members": f"""
+        SELECT
+            COUNT(*) AS total,
+            COUNT(*) FILTER (WHERE {ACTIVE_CONDITION}) AS active,
+            COUNT(*) FILTER (WHERE {ACTIVE_CONDITION} AND gender = '남') AS active_male,
+            COUNT(*) FILTER (WHERE {ACTIVE_CONDITION} AND gender = '여') AS active_female,
+            COUNT(*) FILTER (WHERE end_date < CURRENT_DATE) AS expired,
+            COUNT(*) FILTER (WHERE end_date BETWEEN CURRENT_DATE AND CURRENT_DATE + 7) AS expiring_this_week
+        FROM users
+    """,
+    "today": """
+        SELECT
+            COUNT(*) AS check_ins,
+            COUNT(DISTINCT a.user_id) AS unique_members,
+            COUNT(*) FILTER (WHERE u.gender = '남') AS male,
+            COUNT(*) FILTER (WHERE u.gender = '여') AS female
+        FROM attendance a
+        JOIN users u ON a.user_id = u.id
+        WHERE a.date = CURRENT_DATE
+    """,
+    "by_product": f"""
+        SELECT p.id, p.name,
+               COALESCE(t.check_ins, 0) AS check_ins,
+               COALESCE(m.active_members, 0) AS active_members
+        FROM products p
+        LEFT JOIN (
+            SELECT u.product_id, COUNT(*) AS check_ins
+            FROM attendance a JOIN users u ON a.user_id = u.id
+            WHERE a.date = CURRENT_DATE
+            GROUP BY u.product_id
+        ) t ON t.product_id = p.id
+        LEFT JOIN (
+            SELECT product_id, COUNT(*) AS active_members
+            FROM users WHERE {ACTIVE_CONDITION}
+            GROUP BY product_id
+        ) m ON m.product_id = p.id
+        WHERE p.active OR t.check_ins > 0 OR m.active_members > 0
+        ORDER BY p.id
+    """,
+    "coaches": """
+        SELECT status, specialty, COUNT(*) AS count
+        FROM coaches
+        GROUP BY status, specialty
+        ORDER BY status, specialty
+    """,
+    "coach_sessions": """
+        SELECT
+            (SELECT COALESCE(SUM(sessions), 0) FROM coach_workload_daily WHERE date = CURRENT_DATE) AS today,
+            (SELECT COALESCE(SUM(sessions), 0) FROM coach_workload_monthly
+             WHERE month = date_trunc('month', CURRENT_DATE)::date) AS this_month
+    """,
+}
+
+
+def _fetch(sql):
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute(sql)
+        rows = cursor.fetchall()
+        conn.commit()
+        return rows
+    finally:
+        db.return_connection(conn)
+
+
+@router.get("/summary")
+async def get_summary():
+    """
+    관리자 홈 화면용 집계. 회원/상품/코치/출석 목록을 따로 받아 브라우저에서 계산하던 것을
+    한 번의 요청과 작은 응답으로 대체합니다. 결과는 몇 초 동안 캐시됩니다.
+    """
+    cached = _cache.get("summary")
+    if cached is not None:
+        return cached
+
+    try:
+        names = list(SUMMARY_QUERIES)
+        results = await asyncio.gather(*(run_in_threadpool(_fetch, SUMMARY_QUERIES[n]) for n in names))
+        rows = dict(zip(names, results))
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="대시보드 집계 중 오류가 발생했습니다.")
+
+    members = rows["members"][0]
+    today = rows["today"][0]
+    summary = {
+        "members": {
+            "total": members["total"],
+            "active": members["active"],
+            "activeByGender": {"male": members["active_male"], "female": members["active_female"]},
+            "expired": members["expired"],
+            "expiringThisWeek": members["expiring_this_week"]
+        },
+        "today": {
+            "checkIns": today["check_ins"],
+            "uniqueMembers": today["unique_members"],
+            "byGender": {"male": today["male"], "female": today["female"]}
+        },
+        "products": [{
+            "id": p["id"],
+            "name": p["name"],
+            "checkInsToday": p["check_ins"],
+            "activeMembers": p["active_members"]
+        } for p in rows["by_product"]],
+        "coaches": [{
+            "status": c["status"],
+            "specialty": c["specialty"],
+            "count": c["count"]
+        } for c in rows["coaches"]],
+        "coachSessions": {
+            "today": rows["coach_sessions"][0]["today"],
+            "thisMonth": rows["coach_sessions"][0]["this_month"]
+        }
+    }
+    _cache.set("summary", summary)
+    return summary
@@ -0,0 +1,188 @@
+from fastapi import APIRouter, HTTPException
+from typing import Optional
+from datetime import date
+from database import db
+from models import MessageSend, RenewalReminder
+import messaging
+import psycopg2.extras
+
+router = APIRouter(prefix="/api/messages", tags=["messages"])
+
+
+def _message_json(row):
+    return {
+        "id": row['id'],
+        "userId": row['user_id'],
+        "templateId": row['template_id'],
+        "channel": row['channel'],
+        "recipient": row['recipient'],
+        "body": row['body'],
+        "status": row['status'],
+        "attempts": row['attempts'],
+        "nextAttemptAt": row['next_attempt_at'],
+        "providerMessageId": row['provider_message_id'],
+        "lastError": row['last_error'],
+        "createdAt": row['created_at'],
+        "sentAt": row['sent_at']
+    }
+
+
+def _get_template(cursor, template_id):
+    cursor.execute("SELECT id, channel, body, active FROM message_templates WHERE id = %s", (template_id,))
+    template = cursor.fetchone()
+    if not template:
+        raise HTTPException(status_code=404, detail="템플릿을 찾을 수 없습니다.")
+    if not template['active']:
+        raise HTTPException(status_code=400, detail="비활성 템플릿입니다.")
+    return template
+
+
+@router.get("/")
+def get_messages(status: Optional[str] = None, userId: Optional[str] = None, beforeId: Optional[int] = None,
+                 limit: int = 100):
+    """발송 내역 (최근 순). beforeId 로 다음 페이지를 가져옵니다."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        conditions, params = ["TRUE"], []
+        if status:
+            conditions.append("status = %s")
+            params.append(status)
+        if userId:
+            conditions.append("user_id = %s")
+            params.append(userId)
+        if beforeId:
+            conditions.append("id < %s")
+            params.append(beforeId)
+        params.append(min(max(limit, 1), 1000))
+        cursor.execute(f"""
+            SELECT * FROM message_outbox
+            WHERE {' AND '.join(conditions)}
+            ORDER BY id DESC
+            LIMIT %s
+        """, params)
+        return [_message_json(row) for row in cursor.fetchall()]
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="메시지 조회 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+@router.get("/stats")
+def get_message_stats():
+    """채널/상태별 건수, 가장 오래 기다린 메시지, 디스패처 누적 지표"""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute("""
+            SELECT channel, status, COUNT(*) AS count, MIN(created_at) AS oldest
+            FROM message_outbox
+            GROUP BY channel, status
+        """)
+        queue = {}
+        for row in cursor.fetchall():
+            queue.setdefault(row['channel'], {})[row['status']] = {"count": row['count'], "oldest": row['oldest']}
+        return {"queue": queue, "dispatcher": messaging.dispatcher.stats,
+                "providers": {c: p.name for c, p in messaging.dispatcher.providers.items()}}
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="메시지 통계 조회 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+@router.post("/send", status_code=202)
+def send_messages(request: MessageSend):
+    """
+    지정한 회원들에게 메시지를 넣습니다 (발송은 디스패처가 비동기로 처리).
+    templateId 또는 channel + body 중 하나가 필요합니다. 연락처가 없는 회원은 건너뜁니다.
+    """
+    if not request.userIds:
+        raise HTTPException(status_code=400, detail="회원을 선택해 주세요.")
+    if request.templateId is None and not (request.channel and request.body):
+        raise HTTPException(status_code=400, detail="templateId 또는 channel 과 body 가 필요합니다.")
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        if request.templateId is not None:
+            template = _get_template(cursor, request.templateId)
+            channel, body = request.channel or template['channel'], request.body or template['body']
+        else:
+            channel, body = request.channel, request.body
+        queued = messaging.enqueue_members(cursor, request.userIds, channel, body, request.templateId,
+                                           request.dedupKey)
+        conn.commit()
+        messaging.dispatcher.wake()
+        return {"queued": queued, "skipped": len(set(request.userIds)) - queued}
+    except HTTPException:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="메시지 등록 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+@router.post("/renewal-reminders", status_code=202)
+def send_renewal_reminders(request: RenewalReminder):
+    """
+    오늘부터 withinDays 일 안에 종료되는 회원 전체에게 재등록 안내를 넣습니다.
+    INSERT ... SELECT 한 번으로 처리하고, 같은 템플릿·종료일로는 회원당 한 번만 들어갑니다
+    (다시 호출해도 새로 대상이 된 회원만 추가됨).
+    """
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        template = _get_template(cursor, request.templateId)
+        condition = "u.end_date BETWEEN CURRENT_DATE AND CURRENT_DATE + %(days)s"
+        params = {"days": request.withinDays, "product_id": request.productId}
+        if request.productId is not None:
+            condition += " AND u.product_id = %(product_id)s"
+        queued = messaging.enqueue_template(
+            cursor, template, condition, params,
+            "'renewal:' || %(template_id)s || ':' || u.id || ':' || u.end_date")
+        conn.commit()
+        messaging.dispatcher.wake()
+        print(f"[MESSAGES] renewal reminders queued: {queued} (template {template['id']}, {request.withinDays} days)")
+        return {"queued": queued, "asOf": date.today()}
+    except HTTPException:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="재등록 안내 등록 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+@router.post("/{id}/retry")
+def retry_message(id: int):
+    """실패한 메시지를 다시 대기 상태로 돌립니다."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute("""
+            UPDATE message_outbox
+            SET status = 'pending', attempts = 0, next_attempt_at = LOCALTIMESTAMP, last_error = NULL
+            WHERE id = %s AND status = 'failed'
+            RETURNING *
+        """, (id,))
+        retried = cursor.fetchone()
+        if not retried:
+            raise HTTPException(status_code=404, detail="다시 보낼 실패 메시지를 찾을 수 없습니다.")
+        conn.commit()
+        messaging.dispatcher.wake()
+        return _message_json(retried)
+    except HTTPException:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="메시지 재시도 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
@@ -1,8 +1,11 @@
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Response
+from typing import List, Optional
 from database import db
-from models import ProductCreate, ProductUpdate
+from models import ProductCreate, ProductUpdate, ProductPatch, ProductBulkPatch
 import psycopg2.extras
+import versioning
+import audit
 
 router = APIRouter(prefix="/api/products", tags=["products"])
 
@@ -22,7 +25,8 @@ def get_products():
             "price": p["price"],
             "description": p["description"],
             "active": p["active"],
-            "createdAt": p["created_at"]
+            "createdAt": p["created_at"],
+            "version": p["version"]
         } for p in products]
     except Exception as e:
         print(e)
@@ -43,6 +47,7 @@ def create_product(product: ProductCreate):
         cursor.execute(query, (product.name, product.regMonths, product.durationUnit, product.price, product.description, product.active))
         conn.commit()
         new_product = cursor.fetchone()
+        audit.stage("products", new_product["id"], "create", after=new_product)
         return {
             "id": new_product["id"],
             "name": new_product["name"],
@@ -51,7 +56,8 @@ def create_product(product: ProductCreate):
             "price": new_product["price"],
             "description": new_product["description"],
             "active": new_product["active"],
-            "createdAt": new_product["created_at"]
+            "createdAt": new_product["created_at"],
+            "version": new_product["version"]
         }
     except Exception as e:
         conn.rollback()
@@ -68,14 +74,16 @@ def update_product(id: int, product: ProductUpdate):
         query = """
             UPDATE products 
             SET name = %s, reg_months = %s, duration_unit = %s, price = %s, description = %s, active = %s
-            WHERE id = %s
-            RETURNING *
+            FROM products o
+            WHERE products.id = %s AND o.id = products.id
+            RETURNING products.*, to_jsonb(o) AS audit_before
         """
         cursor.execute(query, (product.name, product.regMonths, product.durationUnit, product.price, product.description, product.active, id))
         conn.commit()
         updated_product = cursor.fetchone()
         if not updated_product:
             raise HTTPException(status_code=404, detail="상품을 찾을 수 없습니다.")
+        audit.stage_update("products", updated_product)
         return {
             "id": updated_product["id"],
             "name": updated_product["name"],
@@ -84,7 +92,8 @@ def update_product(id: int, product: ProductUpdate):
             "price": updated_product["price"],
             "description": updated_product["description"],
             "active": updated_product["active"],
-            "createdAt": updated_product["created_at"]
+            "createdAt": updated_product["created_at"],
+            "version": updated_product["version"]
         }
     except HTTPException:
         raise
@@ -95,6 +104,67 @@ def update_product(id: int, product: ProductUpdate):
     finally:
         db.return_connection(conn)
 
+# PATCH 로 수정할 수 있는 필드: (API 이름, 컬럼, SQL 타입)
+PATCH_FIELDS = [
+    ("name", "name", "varchar"),
+    ("regMonths", "reg_months", "integer"),
+    ("durationUnit", "duration_unit", "varchar"),
+    ("price", "price", "integer"),
+    ("description", "description", "text"),
+    ("active", "active", "boolean"),
+]
+
+def _patch_error(conn, e):
+    conn.rollback()
+    if isinstance(e, (psycopg2.errors.NotNullViolation, psycopg2.errors.CheckViolation)):
+        return HTTPException(status_code=400, detail="상품 정보가 올바르지 않습니다.")
+    print(e)
+    return HTTPException(status_code=500, detail="상품 수정 중 오류가 발생했습니다.")
+
+@router.patch("/")
+def patch_products(items: List[ProductBulkPatch]):
+    """여러 상품을 한 문장으로 수정합니다 (예: 가격 일괄 변경, 비활성화)."""
+    if not items:
+        raise HTTPException(status_code=400, detail="수정할 내용이 없습니다.")
+    payload = [item.model_dump(exclude_unset=True) for item in items]
+    if len({item["id"] for item in payload}) != len(payload):
+        raise HTTPException(status_code=400, detail="같은 상품이 여러 번 포함되어 있습니다.")
+
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        result = versioning.patch_rows(cursor, "products", payload, PATCH_FIELDS, id_type="integer")
+        conn.commit()
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _patch_error(conn, e)
+    finally:
+        db.return_connection(conn)
+
+@router.patch("/{id}")
+def patch_product(id: int, patch: ProductPatch, response: Response, if_match: Optional[str] = Header(None)):
+    """보낸 필드만 수정합니다. If-Match(또는 본문 version)가 현재 버전과 다르면 412 입니다."""
+    changes = patch.model_dump(exclude_unset=True)
+    body_version = changes.pop("version", None)
+    expected_version = versioning.parse_if_match(if_match) if if_match else body_version
+
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        result = versioning.patch_row(cursor, "products", id, changes, PATCH_FIELDS, expected_version,
+                                      not_found="상품을 찾을 수 없습니다.")
+        conn.commit()
+        response.headers["ETag"] = versioning.etag(result["version"])
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _patch_error(conn, e)
+    finally:
+        db.return_connection(conn)
+
 @router.delete("/{id}")
 def delete_product(id: int):
     conn = db.get_connection()
@@ -117,6 +187,7 @@ def delete_product(id: int):
             deactivated_product = cursor.fetchone()
             if not deactivated_product:
                 raise HTTPException(status_code=404, detail="상품을 찾을 수 없습니다.")
+            audit.stage("products", id, "deactivate", changes={"active": [True, False], "members": user_count})
             return {
                 "message": f"해당 상품을 사용 중인 회원이 {user_count}명 있어 비활성화 처리되었습니다.",
                 "deactivated": True
@@ -128,6 +199,7 @@ def delete_product(id: int):
             deleted_product = cursor.fetchone()
             if not deleted_product:
                 raise HTTPException(status_code=404, detail="상품을 찾을 수 없습니다.")
+            audit.stage("products", id, "delete", before=deleted_product)
             return {
                 "message": "상품이 삭제되었습니다.",
                 "deactivated": False
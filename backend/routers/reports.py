@@ -0,0 +1,103 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from datetime import date
+from database import db
+import coach_workload
+import payments
+import psycopg2.extras
+
+router = APIRouter(prefix="/api/reports", tags=["reports"])
+
+@router.get("/revenue")
+def get_revenue(startDate: Optional[date] = None, endDate: Optional[date] = None, productId: Optional[int] = None,
+                groupBy: str = Query("month", pattern="^(day|month)$")):
+    """
+    기간 매출 (결제 원장 기준, 보관된 회원 포함). 기본 범위는 올해 1월 1일부터 오늘까지입니다.
+    미리 집계된 일/월 합계에서 읽으므로 범위가 길어도 원장을 훑지 않습니다.
+    """
+    end = endDate or date.today()
+    start = startDate or end.replace(month=1, day=1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="시작일이 종료일보다 늦습니다.")
+
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        result = payments.revenue(cursor, start, end, productId, groupBy)
+        conn.commit()
+        return result
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="매출 조회 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+@router.get("/payments")
+def get_payments(userId: Optional[str] = None, startDate: Optional[date] = None, endDate: Optional[date] = None,
+                 limit: int = Query(200, ge=1, le=2000)):
+    """결제 원장 (최근 순). 회원별 결제 이력 확인용입니다."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        conditions, params = [], []
+        if userId:
+            conditions.append("x.user_id = %s")
+            params.append(userId)
+        if startDate:
+            conditions.append("x.paid_on >= %s")
+            params.append(startDate)
+        if endDate:
+            conditions.append("x.paid_on <= %s")
+            params.append(endDate)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        params.append(limit)
+        cursor.execute(f"""
+            SELECT x.*, p.name AS product_name
+            FROM payments x
+            LEFT JOIN products p ON p.id = x.product_id
+            {where}
+            ORDER BY x.paid_on DESC, x.id DESC
+            LIMIT %s
+        """, params)
+        return [{
+            "id": row['id'],
+            "userId": row['user_id'],
+            "productId": row['product_id'] or None,
+            "productName": row['product_name'],
+            "amount": row['amount'],
+            "kind": row['kind'],
+            "paidOn": row['paid_on'],
+            "createdAt": row['created_at']
+        } for row in cursor.fetchall()]
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="결제 내역 조회 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+@router.get("/payroll")
+def get_payroll(month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"),
+                rate: Optional[int] = Query(None, ge=0)):
+    """
+    월 코치 정산: 코치별 수업(담당 출석) 수와, rate(회당 금액)를 주면 정산 금액. 기본은 이번 달입니다.
+    월 합계 테이블에서 코치 수만큼의 행만 읽습니다.
+    """
+    if month:
+        year, mon = (int(v) for v in month.split('-'))
+        if not 1 <= mon <= 12:
+            raise HTTPException(status_code=400, detail="month 는 YYYY-MM 형식이어야 합니다.")
+        target = date(year, mon, 1)
+    else:
+        target = date.today().replace(day=1)
+
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        result = coach_workload.payroll(cursor, target, rate)
+        conn.commit()
+        return result
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="코치 정산 조회 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
@@ -0,0 +1,135 @@
+from fastapi import APIRouter, HTTPException, Query
+from database import db
+import psycopg2.extras
+
+router = APIRouter(prefix="/api/sync", tags=["sync"])
+
+# 툼스톤은 이 기간이 지나면 정리되고, 그보다 오래된 토큰은 전체 재동기화가 필요합니다.
+TOMBSTONE_RETENTION_DAYS = 30
+
+
+def _user_row(u):
+    return {
+        "id": u["id"],
+        "name": u["name"],
+        "gender": u["gender"],
+        "phone": u["phone"],
+        "productId": u["product_id"],
+        "regDate": u["reg_date"],
+        "startDate": u["start_date"],
+        "endDate": u["end_date"],
+        "remaining": u["remaining"]
+    }
+
+
+def _product_row(p):
+    return {
+        "id": p["id"],
+        "name": p["name"],
+        "regMonths": p["reg_months"],
+        "durationUnit": p.get("duration_unit", "months"),
+        "price": p["price"],
+        "active": p["active"]
+    }
+
+
+def _coach_row(c):
+    return {
+        "id": c["id"],
+        "name": c["name"],
+        "phone": c["phone"],
+        "status": c["status"],
+        "specialty": c["specialty"]
+    }
+
+
+@router.get("/")
+def get_changes(since: int = 0, limit: int = Query(1000, ge=1, le=5000)):
+    """
+    since 토큰 이후 생성·수정·삭제된 회원/상품/코치만 돌려줍니다.
+    응답의 token 을 다음 요청의 since 로 넘기면 되고, hasMore 가 true 이면 바로 이어서 요청합니다.
+    reset 이 true 이면 토큰이 너무 오래되었으므로 로컬 데이터를 비우고 since=0 으로 다시 받아야 합니다.
+    """
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+
+        cursor.execute("SELECT min_seq FROM sync_horizon")
+        horizon = cursor.fetchone()
+        if since > 0 and horizon and since < horizon["min_seq"]:
+            return {"token": str(since), "reset": True, "hasMore": False}
+
+        # seq 는 커밋 순서대로 붙으므로 (migrations/0003) 보이는 seq 까지 토큰을 올려도 건너뛰는 변경이 없습니다.
+        # since=0 (최초 동기화)에서는 툼스톤이 필요 없습니다.
+        cursor.execute("""
+            SELECT entity, entity_id, seq, deleted
+            FROM sync_changes
+            WHERE seq > %s
+              AND (%s OR NOT deleted)
+            ORDER BY seq
+            LIMIT %s
+        """, (since, since > 0, limit + 1))
+        changes = cursor.fetchall()
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        live = {"users": [], "products": [], "coaches": []}
+        deleted = {"users": [], "products": [], "coaches": []}
+        for change in changes:
+            target = deleted if change["deleted"] else live
+            if change["entity"] in target:
+                target[change["entity"]].append(change["entity_id"])
+
+        result = {
+            "token": str(changes[-1]["seq"] if changes else since),
+            "reset": False,
+            "hasMore": has_more,
+            "users": [],
+            "products": [],
+            "coaches": [],
+            "deleted": {k: v for k, v in deleted.items() if v}
+        }
+
+        if live["users"]:
+            cursor.execute("SELECT * FROM users WHERE id = ANY(%s)", (live["users"],))
+            result["users"] = [_user_row(u) for u in cursor.fetchall()]
+        if live["products"]:
+            cursor.execute("SELECT * FROM products WHERE id = ANY(%s)", ([int(i) for i in live["products"]],))
+            result["products"] = [_product_row(p) for p in cursor.fetchall()]
+        if live["coaches"]:
+            cursor.execute("SELECT * FROM coaches WHERE id = ANY(%s)", (live["coaches"],))
+            result["coaches"] = [_coach_row(c) for c in cursor.fetchall()]
+
+        conn.commit()
+        return result
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="동기화 조회 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+def prune_tombstones(retention_days=TOMBSTONE_RETENTION_DAYS):
+    """오래된 툼스톤을 지우고 sync_horizon 을 올립니다. 지운 행 수를 돌려줍니다."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            WITH pruned AS (
+                DELETE FROM sync_changes
+                WHERE deleted AND changed_at < CURRENT_TIMESTAMP - make_interval(days => %s)
+                RETURNING seq
+            )
+            UPDATE sync_horizon
+            SET min_seq = GREATEST(min_seq, (SELECT COALESCE(MAX(seq), 0) FROM pruned))
+            RETURNING (SELECT COUNT(*) FROM pruned)
+        """, (retention_days,))
+        count = cursor.fetchone()[0]
+        conn.commit()
+        return count
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db.return_connection(conn)
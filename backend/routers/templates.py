@@ -0,0 +1,159 @@
+from fastapi import APIRouter, HTTPException
+from database import db
+from models import MessageTemplateCreate, MessageTemplateUpdate
+import messaging
+import psycopg2.errors
+import psycopg2.extras
+
+router = APIRouter(prefix="/api/templates", tags=["templates"])
+
+# 수정할 수 있는 필드: (API 이름, 컬럼)
+UPDATE_FIELDS = [
+    ("name", "name"),
+    ("channel", "channel"),
+    ("event", "event"),
+    ("eventParam", "event_param"),
+    ("body", "body"),
+    ("active", "active"),
+]
+
+
+def _template_json(row):
+    return {
+        "id": row['id'],
+        "name": row['name'],
+        "channel": row['channel'],
+        "event": row['event'],
+        "eventParam": row['event_param'],
+        "body": row['body'],
+        "active": row['active'],
+        "createdAt": row['created_at'],
+        "updatedAt": row['updated_at']
+    }
+
+
+def _check_event(event, event_param):
+    if event in messaging.SCHEDULED_EVENTS and event_param is None:
+        raise HTTPException(status_code=400, detail="예약 알림 템플릿은 eventParam(일수/횟수)이 필요합니다.")
+
+
+@router.get("/")
+def get_templates():
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute("SELECT * FROM message_templates ORDER BY name")
+        return {"fields": list(messaging.TEMPLATE_FIELDS),
+                "templates": [_template_json(row) for row in cursor.fetchall()]}
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="템플릿 조회 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+@router.post("/", status_code=201)
+def create_template(template: MessageTemplateCreate):
+    _check_event(template.event, template.eventParam)
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute("""
+            INSERT INTO message_templates (name, channel, event, event_param, body, active)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            RETURNING *
+        """, (template.name, template.channel, template.event, template.eventParam, template.body, template.active))
+        created = cursor.fetchone()
+        conn.commit()
+        return _template_json(created)
+    except psycopg2.errors.UniqueViolation:
+        conn.rollback()
+        raise HTTPException(status_code=409, detail="같은 이름의 템플릿이 이미 있습니다.")
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="템플릿 추가 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+@router.put("/{id}")
+def update_template(id: int, template: MessageTemplateUpdate):
+    values = template.model_dump(exclude_unset=True)
+    if not values:
+        raise HTTPException(status_code=400, detail="수정할 내용이 없습니다.")
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        assignments = [f"{column} = %({field})s" for field, column in UPDATE_FIELDS if field in values]
+        cursor.execute(f"""
+            UPDATE message_templates SET {', '.join(assignments)}, updated_at = CURRENT_TIMESTAMP
+            WHERE id = %(id)s
+            RETURNING *
+        """, dict(values, id=id))
+        updated = cursor.fetchone()
+        if not updated:
+            raise HTTPException(status_code=404, detail="템플릿을 찾을 수 없습니다.")
+        _check_event(updated['event'], updated['event_param'])
+        conn.commit()
+        return _template_json(updated)
+    except psycopg2.errors.UniqueViolation:
+        conn.rollback()
+        raise HTTPException(status_code=409, detail="같은 이름의 템플릿이 이미 있습니다.")
+    except HTTPException:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="템플릿 수정 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+@router.delete("/{id}")
+def delete_template(id: int):
+    """템플릿을 지웁니다. 이미 넣은 메시지는 그대로 발송됩니다 (template_id 만 비워짐)."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM message_templates WHERE id = %s", (id,))
+        if cursor.rowcount == 0:
+            raise HTTPException(status_code=404, detail="템플릿을 찾을 수 없습니다.")
+        conn.commit()
+        return {"message": "템플릿이 삭제되었습니다."}
+    except HTTPException:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="템플릿 삭제 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+
+@router.get("/{id}/preview")
+def preview_template(id: int, userId: str):
+    """회원 한 명의 값으로 채운 본문을 미리 봅니다 (발송하지 않음)."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute(f"""
+            SELECT t.channel, u.phone AS recipient, {messaging.render_sql('t.body')} AS body
+            FROM message_templates t
+            JOIN users u ON u.id = %(user_id)s
+            LEFT JOIN products p ON p.id = u.product_id
+            WHERE t.id = %(id)s
+        """, {"id": id, "user_id": userId})
+        row = cursor.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="템플릿 또는 회원을 찾을 수 없습니다.")
+        return row
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="템플릿 미리보기 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
@@ -1,7 +1,10 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from database import db
+from fastapi.concurrency import run_in_threadpool
+from database import db, PoolTimeout
 import psycopg2.extras
-import openpyxl
+import lazy_imports
+import dedup
+import payments
 from io import BytesIO
 from datetime import date
 import calendar
@@ -15,11 +18,16 @@ async def upload_users(file: UploadFile = File(...)):
     """
     if not file.filename.endswith(('.xlsx', '.xls')):
         raise HTTPException(status_code=400, detail="엑셀 파일만 업로드 가능합니다.")
-    
+
+    contents = await file.read()
+    # 엑셀 파싱과 DB 작업(풀이 찼을 때 연결을 기다리는 것 포함)은 이벤트 루프를 막지 않도록 스레드 풀에서 합니다.
+    return await run_in_threadpool(_import_users, contents)
+
+
+def _import_users(contents):
     try:
         # Read Excel file
-        contents = await file.read()
-        wb = openpyxl.load_workbook(BytesIO(contents))
+        wb = lazy_imports.openpyxl().load_workbook(BytesIO(contents))
         ws = wb.active
         
         conn = db.get_connection()
@@ -28,6 +36,7 @@ async def upload_users(file: UploadFile = File(...)):
         success_count = 0
         failed_count = 0
         errors = []
+        parsed = []
         
         # Skip header row, start from row 2
         for row_idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
@@ -83,6 +92,42 @@ async def upload_users(file: UploadFile = File(...)):
                     failed_count += 1
                     continue
                 
+                parsed.append(dict(row_idx=row_idx, row=row, name=name, gender=gender, phone=phone,
+                                   product_name=product_name, reg_date=reg_date, start_date=start_date,
+                                   end_date=end_date, remaining=remaining))
+
+            except Exception as e:
+                print(f"---------- [UPLOAD ERROR] Row {row_idx} ----------")
+                print(f"Error: {str(e)}")
+                print(f"Row Data: {row}")
+                print("--------------------------------------------------")
+                errors.append(f"행 {row_idx}: {str(e)}")
+                failed_count += 1
+                continue
+
+        # 중복 후보는 모든 행에 대해 한 번의 인덱스 조회로 찾습니다.
+        candidates = dedup.find_candidates(cursor, [(p['name'], p['phone']) for p in parsed])
+        seen = {}
+        duplicates = []
+
+        for item, matches in zip(parsed, candidates):
+            row_idx, row = item['row_idx'], item['row']
+            name, gender, phone = item['name'], item['gender'], item['phone']
+            product_name, remaining = item['product_name'], item['remaining']
+            reg_date, start_date, end_date = item['reg_date'], item['start_date'], item['end_date']
+            try:
+                # 정규화한 이름·전화번호가 같은 회원(기존 또는 파일 안의 앞 행)은 건너뜁니다.
+                key = (dedup.normalize_name(name), dedup.normalize_phone(phone))
+                exact = [m for m in matches if m['match'] == 'exact']
+                if exact or key in seen:
+                    duplicate_of = f"회원 {exact[0]['id']}" if exact else f"행 {seen[key]}"
+                    errors.append(f"행 {row_idx}: 이미 등록된 회원과 중복 ({duplicate_of})")
+                    failed_count += 1
+                    continue
+                seen[key] = row_idx
+                if matches:
+                    duplicates.append({"row": row_idx, "name": name, "phone": phone, "candidates": matches})
+
                 # Find product by name
                 cursor.execute("SELECT id, reg_months, duration_unit FROM products WHERE name = %s AND active = true", (product_name,))
                 product = cursor.fetchone()
@@ -120,15 +165,23 @@ async def upload_users(file: UploadFile = File(...)):
                 # If reg_months is 0 or None (FPT), end_date remains None
                 
                 # Generate user ID
-                cursor.execute("SELECT MAX(CAST(id AS INTEGER)) as max_id FROM users WHERE id ~ '^[0-9]+$'")
+                cursor.execute("""
+                    SELECT MAX(CAST(id AS INTEGER)) as max_id
+                    FROM (SELECT id FROM users UNION ALL SELECT id FROM users_archive) ids
+                    WHERE id ~ '^[0-9]+$'
+                """)
                 result = cursor.fetchone()
                 max_id = result['max_id'] if result and result['max_id'] else 0
                 user_id = str(max_id + 1 + success_count)
                 
-                # Insert user (end_date can be NULL for FPT)
-                query = """
-                    INSERT INTO users (id, name, gender, phone, product_id, reg_date, start_date, end_date, remaining)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                # Insert user (end_date can be NULL for FPT) — 결제 원장도 같은 문장에서 상품 가격으로 넣습니다.
+                query = f"""
+                    WITH u AS (
+                        INSERT INTO users (id, name, gender, phone, product_id, reg_date, start_date, end_date, remaining)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                        RETURNING *
+                    )
+                    {payments.sale_sql("u", "'registration'")}
                 """
                 cursor.execute(query, (
                     user_id, name, gender, phone, product_id,
@@ -152,9 +205,12 @@ async def upload_users(file: UploadFile = File(...)):
         return {
             "success": success_count,
             "failed": failed_count,
-            "errors": errors[:10]  # Return first 10 errors
+            "errors": errors[:10],  # Return first 10 errors
+            "duplicates": duplicates[:50]  # 비슷한 기존 회원이 있는 행 (등록은 됨)
         }
         
+    except PoolTimeout:
+        raise
     except Exception as e:
         if 'conn' in locals():
             conn.rollback()
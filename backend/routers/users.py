@@ -1,126 +1,161 @@
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
 from typing import List, Optional
+from urllib.parse import quote
 from database import db
-from models import UserCreate, UserUpdate
+import artifacts
+import audit
+import booking
+import lazy_imports
+import os
+import payments
+import qr_tokens
+from models import UserCreate, UserUpdate, UserPatch, UserBulkPatch, MergeRequest, MembershipRenewal
+import dedup
+import versioning
+from archive import USER_COLUMNS, restore_member
 import psycopg2.extras
-from datetime import timedelta, date # Import date class explicitly
+from datetime import timedelta, date, datetime # Import date class explicitly
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
-@router.get("/export")
-def export_users(type: Optional[str] = None):
+XLSX_MEDIA_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+TEMPLATE_VERSION = "v1"  # 양식 내용을 바꾸면 올려 주세요.
+
+# 엑셀 목록의 내용 버전: 회원/상품이 바뀌면 sync_changes 의 seq 가 올라갑니다.
+# seq 는 커밋 순서대로 붙으므로 (migrations/0003) 커밋된 변경은 모두 보이는 최대 seq 보다 작거나 같고,
+# 어떤 변경이 커밋되든 최대 seq 가 올라가 목록이 다시 만들어집니다.
+# 툼스톤 정리로 최대 seq 가 내려가는 경우를 대비해 회원 수도 함께 씁니다.
+EXPORT_VERSION_SQL = """
+    SELECT (SELECT COALESCE(MAX(seq), 0) FROM sync_changes WHERE entity IN ('users', 'products')) AS seq,
+           (SELECT COUNT(*) FROM users) AS count
+"""
+
+def _export_name(type):
+    # type filter usually meant membership type; the client sends product_id, anything else is ignored.
+    return f"users-export-{type}" if type and type.isdigit() else "users-export-all"
+
+def _export_version(cursor):
+    cursor.execute(EXPORT_VERSION_SQL)
+    row = cursor.fetchone()
+    return f"s{row['seq']}-n{row['count']}"
+
+def _render_export(cursor, type, file):
+    # Join with products to get product name
+    query = """
+        SELECT u.*, p.name as product_name, p.reg_months 
+        FROM users u
+        LEFT JOIN products p ON u.product_id = p.id
+    """
+    params = []
+    if type and type.isdigit():
+        query += " WHERE u.product_id = %s"
+        params.append(type)
+    query += " ORDER BY u.created_at DESC"
+
+    cursor.execute(query, tuple(params))
+    users = cursor.fetchall()
+
+    wb = lazy_imports.openpyxl().Workbook()
+    ws = wb.active
+    ws.title = "회원 목록"
+
+    headers = ['ID', '이름', '성별', '전화번호', '회원권 유형', '등록 개월', '등록일', '시작일', '종료일', '잔여 횟수']
+    ws.append(headers)
+
+    for user in users:
+        ws.append([
+            user['id'], user['name'], user['gender'], user['phone'], user['product_name'] or 'Unknown',
+            user['reg_months'], user['reg_date'], user['start_date'], user['end_date'], user['remaining']
+        ])
+    wb.save(file)
+
+def _render_template(file):
+    wb = lazy_imports.openpyxl().Workbook()
+    ws = wb.active
+    ws.title = "회원 양식"
+
+    # User puts the product name in '상품명'; upload looks it up.
+    headers = ['이름', '성별', '전화번호', '상품명', '접수일', '시작일', '종료일', '잔여 횟수']
+    ws.append(headers)
+
+    # Sample data
+    samples = [
+        ['홍길동', '남', '010-1234-5678', 'FPT 12개월', '2026-01-15', '2026-01-15', '2027-01-15', 100],
+        ['김영희', '여', '010-2345-6789', 'FPT 6개월', '2026-01-15', '2026-01-15', '2026-07-15', 50]
+    ]
+    for row in samples:
+        ws.append(row)
+    wb.save(file)
+
+def _attachment(filename):
+    return {'Content-Disposition': f'attachment; filename="{quote(filename)}"'}
+
+def render_export_artifact(type=None):
+    """현재 버전의 회원 목록 엑셀을 디스크에 만들고 (이미 있으면 그대로) 경로와 ETag 를 돌려줍니다."""
     conn = db.get_connection()
     try:
         cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        # Join with products to get product name
-        query = """
-            SELECT u.*, p.name as product_name, p.reg_months 
-            FROM users u
-            LEFT JOIN products p ON u.product_id = p.id
-        """
-        params = []
-        if type: # type filter usually meant membership type, now product name? Let's assume user passes product_id or we filter by joined name. 
-                 # For backward compatibility or simplicity, let's filter by product_id if passed as 'type' or just ignore for now if not critical.
-                 # User asked to "change type to product_id", so client likely sends product_id.
-                 # But sticking to previous logic, let's assume 'type' parameter might be used for product_id filtering.
-            if type.isdigit():
-                 query += " WHERE u.product_id = %s"
-                 params.append(type)
-        
-        query += " ORDER BY u.created_at DESC"
-        
-        cursor.execute(query, tuple(params))
-        users = cursor.fetchall()
-        
-        import openpyxl
-        from io import BytesIO
-        from fastapi.responses import StreamingResponse
-        from datetime import datetime
-        from urllib.parse import quote
-
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "회원 목록"
-        
-        headers = ['ID', '이름', '성별', '전화번호', '회원권 유형', '등록 개월', '등록일', '시작일', '종료일', '잔여 횟수']
-        ws.append(headers)
-        
-        for user in users:
-            ws.append([
-                user['id'], user['name'], user['gender'], user['phone'], user['product_name'] or 'Unknown',
-                user['reg_months'], user['reg_date'], user['start_date'], user['end_date'], user['remaining']
-            ])
-            
-        buffer = BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        
-        today = datetime.now().strftime("%Y-%m-%d")
-        filename = f"회원목록_{today}.xlsx"
-        encoded_filename = quote(filename)
-        
-        headers = {
-            'Content-Disposition': f'attachment; filename="{encoded_filename}"'
-        }
-        return StreamingResponse(buffer, headers=headers, media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        name = _export_name(type)
+        version = _export_version(cursor)
+        path = artifacts.get_or_render(name, version, lambda f: _render_export(cursor, type, f))
+        conn.commit()
+        return path, artifacts.etag_for(name, version)
+    finally:
+        db.return_connection(conn)
+
+def render_template_artifact():
+    name = "users-template"
+    return artifacts.get_or_render(name, TEMPLATE_VERSION, _render_template), artifacts.etag_for(name, TEMPLATE_VERSION)
+
+def prerender_artifacts():
+    """야간 작업: 전체 회원 목록과 양식을 미리 만들어 두고 지난 버전 파일을 정리합니다."""
+    export_path, _ = render_export_artifact()
+    template_path, _ = render_template_artifact()
+    removed = artifacts.prune([export_path, template_path])
+    return {"export": os.path.basename(export_path), "removed": removed}
+
+@router.get("/export")
+def export_users(request: Request, type: Optional[str] = None):
+    """
+    회원 목록 엑셀. 데이터가 바뀌지 않았다면 디스크에 저장된 파일을 그대로 내려보내며,
+    ETag 가 같으면 304 를 돌려줍니다.
+    """
+    try:
+        path, etag = render_export_artifact(type)
     except Exception as e:
         print(e)
         raise HTTPException(status_code=500, detail="엑셀 다운로드 중 오류가 발생했습니다.")
-    finally:
-        db.return_connection(conn)
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    return artifacts.file_response(request, path, etag, _attachment(f"회원목록_{today}.xlsx"), XLSX_MEDIA_TYPE)
 
 @router.get("/template")
-def get_template():
+def get_template(request: Request):
     try:
-        import openpyxl
-        from io import BytesIO
-        from fastapi.responses import StreamingResponse
-        from urllib.parse import quote
-
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "회원 양식"
-        
-        # Modified headers to match new structure concepts (User puts product ID? Or Product Name? 
-        # Ideally user puts Product Name and we look it up, or we provide a list. 
-        # For simplicity, let's keep "회원권 유형" and expect the user to input the Product ID or Name. 
-        # Giving Product ID is safer for now.)
-        headers = ['이름', '성별', '전화번호', '상품명', '접수일', '시작일', '종료일', '잔여 횟수']
-        ws.append(headers)
-        
-        # Sample data
-        samples = [
-            ['홍길동', '남', '010-1234-5678', 'FPT 12개월', '2026-01-15', '2026-01-15', '2027-01-15', 100],
-            ['김영희', '여', '010-2345-6789', 'FPT 6개월', '2026-01-15', '2026-01-15', '2026-07-15', 50]
-        ]
-        for row in samples:
-            ws.append(row)
-            
-        buffer = BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        
-        filename = "회원등록양식.xlsx"
-        encoded_filename = quote(filename)
-        
-        headers = {
-            'Content-Disposition': f'attachment; filename="{encoded_filename}"'
-        }
-        return StreamingResponse(buffer, headers=headers, media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        path, etag = render_template_artifact()
     except Exception as e:
         print(e)
         raise HTTPException(status_code=500, detail="양식 다운로드 중 오류가 발생했습니다.")
 
+    return artifacts.file_response(request, path, etag, _attachment("회원등록양식.xlsx"), XLSX_MEDIA_TYPE)
+
+# includeArchived 조회용: hot 테이블과 보관 테이블을 합친 회원 집합
+ALL_USERS_SQL = f"""
+    (SELECT {', '.join(USER_COLUMNS)}, FALSE AS archived FROM users
+     UNION ALL
+     SELECT {', '.join(USER_COLUMNS)}, TRUE AS archived FROM users_archive)
+"""
+
 @router.get("/")
-def get_users(type: Optional[str] = None, search: Optional[str] = None):
+def get_users(type: Optional[str] = None, search: Optional[str] = None, includeArchived: bool = False):
     conn = db.get_connection()
     try:
         cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
         # Join with products
-        query = """
+        query = f"""
             SELECT u.*, p.name as product_name, p.reg_months 
-            FROM users u
+            FROM {ALL_USERS_SQL if includeArchived else "users"} u
             LEFT JOIN products p ON u.product_id = p.id
         """
         params = []
@@ -148,7 +183,7 @@ def get_users(type: Optional[str] = None, search: Optional[str] = None):
         # Let's map key fields to what frontend expects if it expects 'type' and 'regMonths'.
         # Actually frontend likely expects 'productName' and 'regMonths' now, or we adapt.
         # Let's return flattened structure with camelCase.
-        return [{
+        result = [{
             "id": u["id"],
             "name": u["name"],
             "gender": u["gender"],
@@ -161,6 +196,10 @@ def get_users(type: Optional[str] = None, search: Optional[str] = None):
             "endDate": u["end_date"],
             "remaining": u["remaining"]
         } for u in users]
+        if includeArchived:
+            for item, u in zip(result, users):
+                item["archived"] = u["archived"]
+        return result
 
     except Exception as e:
         print(e)
@@ -168,8 +207,56 @@ def get_users(type: Optional[str] = None, search: Optional[str] = None):
     finally:
         db.return_connection(conn)
 
+@router.get("/duplicates")
+def get_duplicates(match: Optional[str] = Query(None, pattern="^(exact|phone|name)$"), limit: int = Query(500, ge=1, le=5000)):
+    """
+    중복 후보 묶음 보고서. 정규화 키 블록 안에서만 비교하므로 회원 수에 거의 선형입니다.
+    match 를 주면 그 종류의 쌍이 있는 묶음만 돌려줍니다.
+    """
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        clusters, pairs, skipped = dedup.find_clusters(cursor)
+        if match:
+            wanted = {member for pair, kind in pairs.items() if kind == match for member in pair}
+            clusters = [c for c in clusters if wanted.intersection(c)]
+        clusters.sort(key=len, reverse=True)
+        total = len(clusters)
+        clusters = clusters[:limit]
+
+        ids = [member for cluster in clusters for member in cluster]
+        cursor.execute("""
+            SELECT u.id, u.name, u.gender, u.phone, u.product_id, p.name AS product_name,
+                   u.reg_date, u.end_date, u.remaining, u.created_at
+            FROM users u LEFT JOIN products p ON u.product_id = p.id
+            WHERE u.id = ANY(%s)
+        """, (ids,))
+        members = {row['id']: row for row in cursor.fetchall()}
+        conn.commit()
+
+        cluster_of = {member: i for i, cluster in enumerate(clusters) for member in cluster}
+        cluster_pairs = [[] for _ in clusters]
+        for (a, b), kind in pairs.items():
+            if a in cluster_of:
+                cluster_pairs[cluster_of[a]].append({"a": a, "b": b, "match": kind})
+
+        return {
+            "total": total,
+            "skippedBlocks": skipped,
+            "clusters": [{
+                "members": sorted((members[m] for m in cluster if m in members),
+                                  key=lambda r: r['created_at'] or datetime.min),
+                "pairs": cluster_pairs[i]
+            } for i, cluster in enumerate(clusters)]
+        }
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="중복 회원 조회 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
 @router.get("/{id}")
-def get_user(id: str):
+def get_user(id: str, includeArchived: bool = False):
     conn = db.get_connection()
     try:
         cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
@@ -181,10 +268,15 @@ def get_user(id: str):
         """
         cursor.execute(query, (id,))
         user = cursor.fetchone()
+        archived = False
+        if not user and includeArchived:
+            cursor.execute(query.replace("FROM users u", "FROM users_archive u"), (id,))
+            user = cursor.fetchone()
+            archived = user is not None
         if not user:
             raise HTTPException(status_code=404, detail="회원을 찾을 수 없습니다.")
         
-        return {
+        result = {
             "id": user["id"],
             "name": user["name"],
             "gender": user["gender"],
@@ -197,6 +289,104 @@ def get_user(id: str):
             "endDate": user["end_date"],
             "remaining": user["remaining"]
         }
+        if includeArchived:
+            result["archived"] = archived
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="회원 조회 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+# 회원 상세 화면에 필요한 값을 한 문장으로 읽습니다: 회원(보관 포함 선택), 상품, 최근 출석 N건,
+# 최근 M개월 월별 출석 수(0인 달 포함), 만료까지 남은 일수. 출석은 (user_id, date, time) 인덱스를
+# 거꾸로 읽어 LIMIT 만큼만 봅니다.
+PROFILE_SQL = f"""
+    WITH m AS (
+        SELECT {', '.join(USER_COLUMNS)}, FALSE AS archived FROM users WHERE id = %(id)s
+        UNION ALL
+        SELECT {', '.join(USER_COLUMNS)}, TRUE FROM users_archive
+        WHERE id = %(id)s AND %(include_archived)s AND NOT EXISTS (SELECT 1 FROM users WHERE id = %(id)s)
+    ),
+    months AS (
+        SELECT generate_series(date_trunc('month', CURRENT_DATE) - make_interval(months => %(months)s - 1),
+                               date_trunc('month', CURRENT_DATE), INTERVAL '1 month')::date AS month
+    )
+    SELECT m.*, p.name AS product_name, p.reg_months, p.duration_unit, p.price,
+           m.end_date - CURRENT_DATE AS days_to_expiry,
+           recent.checkins, monthly.counts
+    FROM m
+    LEFT JOIN products p ON p.id = m.product_id
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(json_agg(json_build_object('id', a.id, 'date', a.date, 'time', a.time, 'status', a.status)
+                                 ORDER BY a.date DESC, a.time DESC), '[]'::json) AS checkins
+        FROM (
+            (SELECT id, date, time, status FROM attendance
+             WHERE user_id = m.id ORDER BY date DESC, time DESC LIMIT %(recent)s)
+            UNION ALL
+            (SELECT id, date, time, status FROM attendance_archive
+             WHERE m.archived AND user_id = m.id ORDER BY date DESC, time DESC LIMIT %(recent)s)
+            ORDER BY date DESC, time DESC
+            LIMIT %(recent)s
+        ) a
+    ) recent
+    CROSS JOIN LATERAL (
+        SELECT json_agg(json_build_object('month', to_char(months.month, 'YYYY-MM'), 'count', COALESCE(c.count, 0))
+                        ORDER BY months.month) AS counts
+        FROM months
+        LEFT JOIN (
+            SELECT date_trunc('month', date)::date AS month, COUNT(*) AS count
+            FROM (SELECT date FROM attendance WHERE user_id = m.id AND date >= (SELECT MIN(month) FROM months)
+                  UNION ALL
+                  SELECT date FROM attendance_archive
+                  WHERE m.archived AND user_id = m.id AND date >= (SELECT MIN(month) FROM months)) d
+            GROUP BY 1
+        ) c ON c.month = months.month
+    ) monthly
+"""
+
+@router.get("/{id}/profile")
+def get_user_profile(id: str, recent: int = Query(20, ge=1, le=100), months: int = Query(12, ge=1, le=36),
+                     includeArchived: bool = False):
+    """
+    회원 상세 화면용: 회원, 상품, 잔여 횟수, 최근 출석 recent 건, 최근 months 개월 월별 출석 수, 만료까지 남은 일수.
+    GET /api/users/{id} + GET /api/attendance?userId= + GET /api/products/ 세 번 대신 한 번의 조회로 답합니다.
+    """
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute(PROFILE_SQL, {"id": id, "include_archived": includeArchived, "recent": recent,
+                                     "months": months})
+        row = cursor.fetchone()
+        conn.commit()
+        if not row:
+            raise HTTPException(status_code=404, detail="회원을 찾을 수 없습니다.")
+        days_to_expiry = row["days_to_expiry"]
+        return {
+            "id": row["id"],
+            "name": row["name"],
+            "gender": row["gender"],
+            "phone": row["phone"],
+            "regDate": row["reg_date"],
+            "startDate": row["start_date"],
+            "endDate": row["end_date"],
+            "remaining": row["remaining"],
+            "version": row["version"],
+            "archived": row["archived"],
+            "product": {
+                "id": row["product_id"],
+                "name": row["product_name"],
+                "regMonths": row["reg_months"],
+                "durationUnit": row["duration_unit"],
+                "price": row["price"]
+            } if row["product_id"] is not None else None,
+            "daysToExpiry": days_to_expiry,
+            "expired": days_to_expiry is not None and days_to_expiry < 0,
+            "recentAttendance": row["checkins"],
+            "monthlyAttendance": row["counts"]
+        }
     except HTTPException:
         raise
     except Exception as e:
@@ -206,14 +396,35 @@ def get_user(id: str):
         db.return_connection(conn)
 
 @router.post("/", status_code=201)
-def create_user(user: UserCreate):
+def create_user(user: UserCreate, force: bool = False):
+    """
+    회원 등록. 정규화한 이름·전화번호가 같은 회원이 이미 있으면 409 (force=true 로 무시),
+    그 밖의 비슷한 회원은 응답의 duplicateCandidates 로 알려 줍니다.
+    """
     conn = db.get_connection()
     try:
         cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
         
+        # 보관된 회원이 다시 등록하는 경우 새로 만들지 않고 복원하도록 안내합니다.
+        cursor.execute("SELECT id FROM users_archive WHERE name = %s AND phone = %s", (user.name, user.phone))
+        archived = cursor.fetchone()
+        if archived:
+            raise HTTPException(status_code=409, detail=f"보관된 회원입니다. 회원 {archived['id']}을(를) 복원해 주세요.")
+
+        # 중복 후보 (인덱스 조회 한 번)
+        candidates = dedup.find_candidates(cursor, [(user.name, user.phone)])[0]
+        exact = [c for c in candidates if c['match'] == 'exact']
+        if exact and not force:
+            raise HTTPException(status_code=409, detail=f"이미 등록된 회원과 중복됩니다 (회원 {exact[0]['id']}).")
+
         # ID 자동 생성 (입력되지 않은 경우)
+        # 보관된 회원의 ID도 포함해야 복원 시 ID가 겹치지 않습니다.
         if not user.id:
-            cursor.execute("SELECT MAX(CAST(id AS INTEGER)) as max_id FROM users WHERE id ~ '^[0-9]+$'")
+            cursor.execute("""
+                SELECT MAX(CAST(id AS INTEGER)) as max_id
+                FROM (SELECT id FROM users UNION ALL SELECT id FROM users_archive) ids
+                WHERE id ~ '^[0-9]+$'
+            """)
             row = cursor.fetchone()
             max_id = row['max_id'] if row and row['max_id'] else 0
             user.id = str(max_id + 1)
@@ -251,26 +462,39 @@ def create_user(user: UserCreate):
         
         user.endDate = calculated_end_date
 
-        query = """
-            INSERT INTO users (id, name, gender, phone, product_id, reg_date, start_date, end_date, remaining)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING *
+        # 회원과 결제 원장을 한 문장으로 넣습니다.
+        query = f"""
+            WITH u AS (
+                INSERT INTO users (id, name, gender, phone, product_id, reg_date, start_date, end_date, remaining)
+                VALUES (%(id)s, %(name)s, %(gender)s, %(phone)s, %(product)s, %(reg)s, %(start)s, %(end)s, %(remaining)s)
+                RETURNING *
+            ),
+            paid AS ({payments.sale_sql("u", "'registration'", "%(amount)s")} RETURNING amount)
+            SELECT u.*, (SELECT amount FROM paid) AS paid_amount FROM u
         """
-        cursor.execute(query, (
-            user.id, user.name, user.gender, user.phone, user.productId, 
-            user.regDate, user.startDate, user.endDate, user.remaining
-        ))
-        conn.commit()
+        cursor.execute(query, {
+            "id": user.id, "name": user.name, "gender": user.gender, "phone": user.phone,
+            "product": user.productId, "reg": user.regDate, "start": user.startDate, "end": user.endDate,
+            "remaining": user.remaining, "amount": user.paidAmount
+        })
         new_user = cursor.fetchone()
+        conn.commit()
+        paid_amount = new_user.pop('paid_amount')
+        audit.stage("users", new_user['id'], "create", after=new_user)
         
         # Return with product info?
         new_user['productId'] = new_user['product_id']
         del new_user['product_id']
+        new_user['paidAmount'] = paid_amount
+        new_user['duplicateCandidates'] = candidates
         return new_user
         
     except psycopg2.errors.UniqueViolation:
         conn.rollback()
         raise HTTPException(status_code=409, detail="이미 등록된 이름과 전화번호입니다.")
+    except HTTPException:
+        conn.rollback()
+        raise
     except Exception as e:
         conn.rollback()
         print(e)
@@ -292,8 +516,9 @@ def update_user(id: str, user: UserUpdate):
             UPDATE users 
             SET name = %s, gender = %s, phone = %s, product_id = %s, 
                 reg_date = %s, start_date = %s, end_date = %s, remaining = %s, updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
-            RETURNING *
+            FROM users o
+            WHERE users.id = %s AND o.id = users.id
+            RETURNING users.*, to_jsonb(o) AS audit_before
         """
         cursor.execute(query, (
             user.name, user.gender, user.phone, user.productId,
@@ -303,6 +528,7 @@ def update_user(id: str, user: UserUpdate):
         updated_user = cursor.fetchone()
         if not updated_user:
             raise HTTPException(status_code=404, detail="회원을 찾을 수 없습니다.")
+        audit.stage_update("users", updated_user)
         
         updated_user['productId'] = updated_user['product_id']
         del updated_user['product_id']
@@ -320,16 +546,107 @@ def update_user(id: str, user: UserUpdate):
     finally:
         db.return_connection(conn)
 
+# PATCH 로 수정할 수 있는 필드: (API 이름, 컬럼, SQL 타입)
+PATCH_FIELDS = [
+    ("name", "name", "varchar"),
+    ("gender", "gender", "varchar"),
+    ("phone", "phone", "varchar"),
+    ("productId", "product_id", "integer"),
+    ("regDate", "reg_date", "date"),
+    ("startDate", "start_date", "date"),
+    ("endDate", "end_date", "date"),
+    ("remaining", "remaining", "integer"),
+]
+BULK_PATCH_LIMIT = 1000
+
+def _patch_error(conn, e):
+    conn.rollback()
+    if isinstance(e, psycopg2.errors.UniqueViolation):
+        return HTTPException(status_code=409, detail="이미 등록된 이름과 전화번호입니다.")
+    if isinstance(e, psycopg2.errors.ForeignKeyViolation):
+        return HTTPException(status_code=400, detail="존재하지 않는 상품입니다.")
+    if isinstance(e, psycopg2.errors.NotNullViolation):
+        return HTTPException(status_code=400, detail="필수 항목은 비울 수 없습니다.")
+    print(e)
+    return HTTPException(status_code=500, detail="회원 수정 중 오류가 발생했습니다.")
+
+@router.patch("/")
+def patch_users(items: List[UserBulkPatch]):
+    """
+    여러 회원을 한 문장으로 수정합니다 (예: 휴관 주간만큼 300명 종료일 연장 → 항목마다 {"id", "extendDays": 7}).
+    항목별 version 이 있으면 일치하는 행만 수정하고, 나머지는 conflicts 로 돌려줍니다.
+    """
+    if not items:
+        raise HTTPException(status_code=400, detail="수정할 내용이 없습니다.")
+    if len(items) > BULK_PATCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {BULK_PATCH_LIMIT}명까지 수정할 수 있습니다.")
+    payload = [item.model_dump(exclude_unset=True) for item in items]
+    if len({item["id"] for item in payload}) != len(payload):
+        raise HTTPException(status_code=400, detail="같은 회원이 여러 번 포함되어 있습니다.")
+
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        result = versioning.patch_rows(
+            cursor, "users", payload, PATCH_FIELDS,
+            overrides={"end_date": "{default} + COALESCE(v.extend_days, 0)",
+                       "updated_at": "CURRENT_TIMESTAMP"},
+            extra_inputs=[("extendDays", "extend_days", "integer")],
+            emit_with={"extendDays": "endDate"})
+        conn.commit()
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _patch_error(conn, e)
+    finally:
+        db.return_connection(conn)
+
+@router.patch("/{id}")
+def patch_user(id: str, patch: UserPatch, response: Response, if_match: Optional[str] = Header(None)):
+    """
+    보낸 필드만 수정합니다. If-Match(또는 본문 version)가 현재 버전과 다르면 412 입니다.
+    응답에는 id, 새 version, 바뀐 필드만 들어갑니다.
+    """
+    changes = patch.model_dump(exclude_unset=True)
+    body_version = changes.pop("version", None)
+    expected_version = versioning.parse_if_match(if_match) if if_match else body_version
+    extend_days = changes.pop("extendDays", None)
+    if not changes and not extend_days:
+        raise HTTPException(status_code=400, detail="수정할 내용이 없습니다.")
+
+    overrides = {"updated_at": ("CURRENT_TIMESTAMP", [])}
+    if extend_days:
+        overrides["end_date"] = ("{default} + %s", [extend_days])
+
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        result = versioning.patch_row(cursor, "users", id, changes, PATCH_FIELDS, expected_version, overrides,
+                                      emit=("endDate",) if extend_days else (), not_found="회원을 찾을 수 없습니다.")
+        conn.commit()
+        response.headers["ETag"] = versioning.etag(result["version"])
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _patch_error(conn, e)
+    finally:
+        db.return_connection(conn)
+
 @router.delete("/{id}")
 def delete_user(id: str):
     conn = db.get_connection()
     try:
         cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        # 앞으로 있을 수업 예약을 먼저 취소해 대기자가 자리를 이어받게 합니다.
+        booking.cancel_member_bookings(cursor, id)
         cursor.execute("DELETE FROM users WHERE id = %s RETURNING *", (id,))
         conn.commit()
         deleted_user = cursor.fetchone()
         if not deleted_user:
             raise HTTPException(status_code=404, detail="회원을 찾을 수 없습니다.")
+        audit.stage("users", id, "delete", before=deleted_user)
         return {"message": "회원이 삭제되었습니다.", "user": deleted_user}
     except HTTPException:
         raise
@@ -339,3 +656,190 @@ def delete_user(id: str):
         raise HTTPException(status_code=500, detail="회원 삭제 중 오류가 발생했습니다.")
     finally:
         db.return_connection(conn)
+
+@router.post("/{id}/merge")
+def merge_users(id: str, request: MergeRequest):
+    """
+    duplicateIds 회원을 이 회원으로 합칩니다. 출석 기록은 한 번의 UPDATE 로 옮기고 중복 회원은 삭제합니다.
+    combineMemberships 이면 종료일은 가장 늦은 날짜, 잔여 횟수는 합계로 맞춥니다.
+    """
+    duplicate_ids = [d for d in dict.fromkeys(request.duplicateIds) if d != id]
+    if not duplicate_ids:
+        raise HTTPException(status_code=400, detail="합칠 회원을 선택해 주세요.")
+
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        # 대상과 중복 회원을 함께 잠가 병합 도중 출석 체크나 수정이 끼어들지 않게 합니다.
+        cursor.execute("SELECT id, end_date, remaining FROM users WHERE id = ANY(%s) ORDER BY id FOR UPDATE",
+                       ([id] + duplicate_ids,))
+        rows = {row['id']: row for row in cursor.fetchall()}
+        if id not in rows:
+            raise HTTPException(status_code=404, detail="회원을 찾을 수 없습니다.")
+        missing = [d for d in duplicate_ids if d not in rows]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"회원을 찾을 수 없습니다: {', '.join(missing)}")
+
+        result = dedup.merge_members(cursor, id, duplicate_ids)
+
+        if request.combineMemberships:
+            end_dates = [r['end_date'] for r in rows.values() if r['end_date']]
+            cursor.execute("UPDATE users SET end_date = %s, remaining = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+                           (max(end_dates) if end_dates else None,
+                            sum(r['remaining'] or 0 for r in rows.values()), id))
+        conn.commit()
+        audit.stage("users", id, "merge", changes={"merged": duplicate_ids, "moved": result["moved"],
+                                                   "combineMemberships": request.combineMemberships})
+        return {"id": id, "merged": duplicate_ids, "moved": result["moved"], "droppedAttendance": result["dropped"]}
+    except HTTPException:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="회원 병합 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+@router.get("/{id}/qr")
+def get_member_qr(id: str):
+    """키오스크 출석용 QR 토큰을 발급합니다 (화면에서 QR 코드로 그립니다)."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        issued = qr_tokens.issue_for_member(cursor, id)
+        if issued is None:
+            raise HTTPException(status_code=404, detail="회원을 찾을 수 없습니다.")
+        return issued
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="QR 발급 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+@router.post("/{id}/qr/revoke")
+def revoke_member_qr(id: str):
+    """지금까지 발급한 회원의 QR 을 모두 무효로 합니다 (분실 등). 다른 워커에는 QR_REFRESH_SECONDS 안에 반영됩니다."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        revoked_at = qr_tokens.revoke(cursor, id)
+        if revoked_at is None:
+            raise HTTPException(status_code=404, detail="회원을 찾을 수 없습니다.")
+        conn.commit()
+        qr_tokens.keyring.revoke_local(id, revoked_at)
+        audit.stage("users", id, "qr-revoke", changes={})
+        return {"message": "QR 코드가 폐기되었습니다. 새로 발급해 주세요."}
+    except HTTPException:
+        raise
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="QR 폐기 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+@router.post("/{id}/restore")
+def restore_user(id: str):
+    """보관된 회원과 출석 기록을 복원합니다 (재등록 시)."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        restored = restore_member(cursor, id)
+        if not restored:
+            raise HTTPException(status_code=404, detail="보관된 회원을 찾을 수 없습니다.")
+        conn.commit()
+        audit.stage("users", id, "restore", after=restored)
+        restored['productId'] = restored['product_id']
+        del restored['product_id']
+        return restored
+    except psycopg2.errors.UniqueViolation:
+        conn.rollback()
+        raise HTTPException(status_code=409, detail="같은 이름과 전화번호의 회원이 이미 있습니다.")
+    except HTTPException:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="회원 복원 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
+
+def _membership_end(start, reg_months, duration_unit):
+    """상품 기간으로 종료일을 계산합니다. 기간이 없는 상품(횟수제)은 None."""
+    if not reg_months or reg_months <= 0:
+        return None
+    if duration_unit == 'days':
+        return start + timedelta(days=reg_months)
+    import calendar
+    target_month = start.month + reg_months
+    year = start.year + (target_month - 1) // 12
+    month = (target_month - 1) % 12 + 1
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+@router.post("/{id}/renew")
+def renew_membership(id: str, renewal: MembershipRenewal):
+    """
+    재등록: 회원권(상품, 접수일/시작일/종료일, 잔여 횟수)을 바꾸고 같은 문장에서 결제 원장에 한 행을 넣습니다.
+    회원 행을 잠그므로 같은 회원의 재등록이 동시에 들어와도 차례로 처리됩니다.
+    """
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute("""
+            SELECT u.end_date, p.reg_months, p.duration_unit
+            FROM users u, products p
+            WHERE u.id = %s AND p.id = %s
+            FOR UPDATE OF u
+        """, (id, renewal.productId))
+        current = cursor.fetchone()
+        if not current:
+            cursor.execute("SELECT 1 FROM users WHERE id = %s", (id,))
+            if cursor.fetchone():
+                raise HTTPException(status_code=400, detail="유효하지 않은 회원권(상품)입니다.")
+            raise HTTPException(status_code=404, detail="회원을 찾을 수 없습니다.")
+
+        today = date.today()
+        reg_date = renewal.regDate or today
+        start_date = renewal.startDate
+        if start_date is None:
+            # 남은 기간이 있으면 이어서, 이미 끝났으면 오늘부터
+            previous_end = current['end_date']
+            start_date = previous_end + timedelta(days=1) if previous_end and previous_end >= today else today
+        end_date = renewal.endDate or _membership_end(start_date, current['reg_months'], current['duration_unit'])
+
+        cursor.execute(f"""
+            WITH u AS (
+                UPDATE users
+                SET product_id = %(product)s, reg_date = %(reg)s, start_date = %(start)s, end_date = %(end)s,
+                    remaining = COALESCE(%(remaining)s, users.remaining), updated_at = CURRENT_TIMESTAMP
+                FROM users o
+                WHERE users.id = %(id)s AND o.id = users.id
+                RETURNING users.*, to_jsonb(o) AS audit_before
+            ),
+            paid AS ({payments.sale_sql("u", "'renewal'", "%(amount)s")} RETURNING id, amount)
+            SELECT u.*, paid.id AS payment_id, paid.amount AS paid_amount FROM u, paid
+        """, {"id": id, "product": renewal.productId, "reg": reg_date, "start": start_date, "end": end_date,
+              "remaining": renewal.remaining, "amount": renewal.paidAmount})
+        renewed = cursor.fetchone()
+        conn.commit()
+        payment = {"id": renewed.pop('payment_id'), "amount": renewed.pop('paid_amount'), "paidOn": reg_date}
+        audit.stage_update("users", renewed)
+
+        renewed['productId'] = renewed['product_id']
+        del renewed['product_id']
+        renewed['payment'] = payment
+        return renewed
+
+    except HTTPException:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise HTTPException(status_code=500, detail="재등록 중 오류가 발생했습니다.")
+    finally:
+        db.return_connection(conn)
@@ -0,0 +1,96 @@
+"""
+주기 작업 스케줄러
+
+앱 이벤트 루프 위에서 도는 간단한 asyncio 스케줄러입니다. 작업 함수는 동기 함수이며
+스레드에서 실행되므로 요청 처리를 막지 않습니다. 작업이 실패해도 다음 주기에 다시 실행됩니다.
+
+여러 워커 프로세스로 띄우면 프로세스마다 작업이 돌기 때문에, 작업 함수는
+중복 실행에 안전해야 합니다 (SKIP LOCKED, advisory lock 등).
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+
+class Job:
+    def __init__(self, name, func, interval=None, at=None):
+        self.name = name
+        self.func = func
+        self.interval = interval  # 초 단위 주기
+        self.at = at              # (시, 분) 매일 실행 시각
+        self.last_run = None
+        self.last_duration = None
+        self.last_error = None
+
+    def seconds_until_next(self, now=None):
+        if self.interval is not None:
+            return self.interval
+        now = now or datetime.now()
+        hour, minute = self.at
+        target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if target <= now:
+            target += timedelta(days=1)
+        return (target - now).total_seconds()
+
+
+class Scheduler:
+    def __init__(self):
+        self._jobs = {}
+        self._tasks = []
+
+    @property
+    def enabled(self):
+        return os.getenv("SCHEDULER_ENABLED", "true").lower() not in ("0", "false", "no")
+
+    def every(self, seconds, name, func):
+        self._jobs[name] = Job(name, func, interval=seconds)
+
+    def daily(self, hour, minute, name, func):
+        self._jobs[name] = Job(name, func, at=(hour, minute))
+
+    async def run_now(self, name):
+        """작업을 즉시 한 번 실행하고 결과를 돌려줍니다."""
+        job = self._jobs[name]
+        started = time.perf_counter()
+        try:
+            result = await asyncio.to_thread(job.func)
+            job.last_error = None
+            return result
+        except Exception as e:
+            job.last_error = str(e)
+            print(f"[SCHEDULER] {name} failed: {e}")
+        finally:
+            job.last_run = datetime.now()
+            job.last_duration = time.perf_counter() - started
+
+    async def _loop(self, job):
+        while True:
+            await asyncio.sleep(job.seconds_until_next())
+            await self.run_now(job.name)
+
+    def start(self):
+        if not self.enabled or self._tasks:
+            return
+        for job in self._jobs.values():
+            self._tasks.append(asyncio.create_task(self._loop(job), name=f"job:{job.name}"))
+        print(f"[OK] Scheduler started ({', '.join(self._jobs) or 'no jobs'}).")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def status(self):
+        return [{
+            "name": job.name,
+            "interval": job.interval,
+            "at": f"{job.at[0]:02d}:{job.at[1]:02d}" if job.at else None,
+            "lastRun": job.last_run,
+            "lastDurationMs": round(job.last_duration * 1000) if job.last_duration is not None else None,
+            "lastError": job.last_error
+        } for job in self._jobs.values()]
+
+
+scheduler = Scheduler()
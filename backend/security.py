@@ -0,0 +1,213 @@
+"""
+인증 유틸리티
+
+- 비밀번호: PBKDF2-SHA256 해시 (표준 라이브러리). 해시 계산은 전용 스레드 풀에서 실행해
+  로그인이 몰려도 이벤트 루프나 일반 요청용 스레드 풀을 점유하지 않습니다.
+- 액세스 토큰: HMAC-SHA256 으로 서명한 짧은 수명의 토큰. 검증은 메모리에서만 이뤄지며 DB를 조회하지 않습니다.
+  갱신한 토큰도 처음 로그인한 시각(auth)을 이어받아, 로그인 후 MAX_SESSION_AGE 가 지나면 더 갱신할 수 없습니다.
+- 폐기: 관리자별 token_version 을 메모리에 캐시하고 주기적으로 새로고침합니다.
+  관리자 정보가 바뀌면 버전이 올라가 이전 토큰은 모두 거부됩니다.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import Header, HTTPException
+from database import db
+
+PASSWORD_SCHEME = "pbkdf2_sha256"
+PASSWORD_ITERATIONS = int(os.getenv("PASSWORD_ITERATIONS", "260000"))
+ACCESS_TOKEN_TTL = int(os.getenv("ACCESS_TOKEN_TTL", "900"))
+# 로그인 후 토큰 갱신(/api/auth/refresh)으로 이어 쓸 수 있는 최대 시간. 지나면 다시 로그인해야 합니다.
+MAX_SESSION_AGE = int(os.getenv("MAX_SESSION_AGE", str(12 * 3600)))
+REVOCATION_REFRESH_SECONDS = int(os.getenv("REVOCATION_REFRESH_SECONDS", "30"))
+
+_secret = os.getenv("AUTH_SECRET")
+if not _secret:
+    # 개발 환경용: 프로세스마다 다른 키이므로 재시작하거나 워커가 여러 개이면 토큰이 무효가 됩니다.
+    print("[WARN] AUTH_SECRET is not set. Using a random per-process signing key.")
+    _secret = secrets.token_hex(32)
+SECRET_KEY = _secret.encode('utf-8')
+
+_hash_executor = ThreadPoolExecutor(max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", "4")),
+                                    thread_name_prefix="password-hash")
+
+
+# ---------------------------------------------------------------------------
+# 비밀번호 해시
+# ---------------------------------------------------------------------------
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def is_hashed(stored):
+    return bool(stored) and stored.startswith(PASSWORD_SCHEME + "$")
+
+
+def hash_password(password, iterations=PASSWORD_ITERATIONS):
+    salt = secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+    return f"{PASSWORD_SCHEME}${iterations}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def verify_password(password, stored):
+    """저장된 값이 아직 평문이면(마이그레이션 이전 행) 평문 비교로 확인합니다."""
+    if not stored:
+        return False
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8'))
+    try:
+        _, iterations, salt, digest = stored.split('$')
+        candidate = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), _b64decode(salt), int(iterations))
+    except ValueError:
+        return False
+    return hmac.compare_digest(candidate, _b64decode(digest))
+
+
+def needs_rehash(stored):
+    if not is_hashed(stored):
+        return True
+    return int(stored.split('$')[1]) != PASSWORD_ITERATIONS
+
+
+async def hash_password_async(password):
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, hash_password, password)
+
+
+async def verify_password_async(password, stored):
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, verify_password, password, stored)
+
+
+# ---------------------------------------------------------------------------
+# 액세스 토큰
+# ---------------------------------------------------------------------------
+
+class TokenError(Exception):
+    pass
+
+
+def _sign(payload):
+    return _b64encode(hmac.new(SECRET_KEY, payload.encode('ascii'), hashlib.sha256).digest())
+
+
+def session_started(claims):
+    """토큰이 이어받은 로그인 시각 (auth 가 없는 이전 토큰은 발급 시각)"""
+    return claims.get("auth", claims.get("iat", 0))
+
+
+def issue_token(admin, ttl=ACCESS_TOKEN_TTL, auth_time=None):
+    """
+    admin: id, username, name, role, token_version 을 가진 dict.
+    auth_time 은 로그인 시각이며 (갱신할 때 이전 토큰의 값), 만료는 로그인 후 MAX_SESSION_AGE 를 넘지 않습니다.
+    """
+    now = int(time.time())
+    auth_time = now if auth_time is None else int(auth_time)
+    claims = {
+        "sub": admin["id"],
+        "usr": admin["username"],
+        "name": admin["name"],
+        "role": admin["role"],
+        "ver": admin["token_version"],
+        "iat": now,
+        "auth": auth_time,
+        "exp": min(now + ttl, auth_time + MAX_SESSION_AGE)
+    }
+    payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    return f"{payload}.{_sign(payload)}"
+
+
+def decode_token(token):
+    """서명과 만료만 확인합니다 (폐기 여부는 verify_token 에서). 어떤 입력이든 실패는 TokenError 입니다."""
+    try:
+        payload, signature = token.split('.')
+        # ASCII 가 아닌 문자는 _sign 의 encode(UnicodeEncodeError) 또는 compare_digest(TypeError)에서 걸립니다.
+        valid = hmac.compare_digest(signature, _sign(payload))
+    except (AttributeError, TypeError, ValueError):
+        raise TokenError("malformed token")
+    if not valid:
+        raise TokenError("bad signature")
+    try:
+        claims = json.loads(_b64decode(payload))
+        expires = claims["exp"]
+        claims["sub"], claims["ver"]
+        expired = expires < time.time()
+    except (TypeError, ValueError, KeyError):
+        raise TokenError("malformed claims")
+    if expired:
+        raise TokenError("expired")
+    return claims
+
+
+class RevocationCache:
+    """관리자 id → 현재 token_version. 토큰의 ver 가 다르면 폐기된 토큰입니다."""
+
+    def __init__(self):
+        self._versions = None
+        self._lock = threading.Lock()
+        self.refreshed_at = None
+
+    def refresh(self):
+        conn = db.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, token_version FROM admins")
+            versions = dict(cursor.fetchall())
+            conn.commit()
+        finally:
+            db.return_connection(conn)
+        with self._lock:
+            self._versions = versions
+            self.refreshed_at = time.time()
+        return len(versions)
+
+    def set_version(self, admin_id, version):
+        with self._lock:
+            if self._versions is not None:
+                self._versions[admin_id] = version
+
+    def remove(self, admin_id):
+        with self._lock:
+            if self._versions is not None:
+                self._versions.pop(admin_id, None)
+
+    def is_current(self, admin_id, version):
+        current = self._versions.get(admin_id) if self._versions is not None else None
+        if current is None and (self.refreshed_at is None or time.time() - self.refreshed_at > 5):
+            # 다른 워커에서 방금 만든 관리자일 수 있으므로 한 번만 새로 읽습니다 (5초에 최대 1회).
+            self.refresh()
+            current = self._versions.get(admin_id)
+        # 서명된 토큰의 버전이 캐시보다 크면 다른 워커에서 버전이 올라간 뒤 발급된 것입니다.
+        return current is not None and version >= current
+
+
+revocations = RevocationCache()
+
+
+def verify_token(token):
+    claims = decode_token(token)
+    if not revocations.is_current(claims["sub"], claims["ver"]):
+        raise TokenError("revoked")
+    return claims
+
+
+def require_admin(authorization: str = Header(None)):
+    """FastAPI 의존성: Authorization: Bearer <token> 을 메모리에서 검증하고 claims 를 돌려줍니다."""
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="로그인이 필요합니다.", headers={"WWW-Authenticate": "Bearer"})
+    try:
+        return verify_token(authorization[7:])
+    except TokenError:
+        raise HTTPException(status_code=401, detail="인증이 만료되었거나 유효하지 않습니다.",
+                            headers={"WWW-Authenticate": "Bearer"})
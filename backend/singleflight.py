@@ -0,0 +1,158 @@
+"""
+동시 조회 합치기 (single-flight)
+
+개장 시각처럼 여러 기기가 같은 목록을 거의 동시에 요청하면, 요청마다 풀 연결을 하나씩 잡고 같은 쿼리를 돌립니다.
+COALESCED_ROUTES 의 GET 요청은 (경로, 쿼리 문자열, Authorization) 이 같으면 먼저 온 요청(leader) 하나만
+핸들러를 실행하고, 그동안 들어온 요청은 그 응답 바이트를 그대로 받습니다.
+
+- 실행은 leader 요청과 분리된 태스크에서 돌기 때문에 leader 의 클라이언트가 끊겨도 기다리던 요청은
+  결과를 받습니다. 기다리는 요청이 모두 끊겨도 실행은 끝까지 마치고 결과를 잠깐 보관합니다.
+- 끝난 200 응답은 SINGLEFLIGHT_STALE_MS 동안 다시 씁니다 (0 이면 실행 중인 요청만 합침).
+- 이 워커에서 쓰기 요청(POST/PUT/PATCH/DELETE)이 끝나면 세대가 바뀌어 그 뒤의 조회는 새로 실행됩니다
+  (방금 등록한 회원이 목록에 바로 보임). 다른 워커의 쓰기는 최대 SINGLEFLIGHT_STALE_MS 늦게 보입니다.
+- 핸들러 안의 캐시(대시보드 요약 등)와는 별개로 동작합니다. leader 도 평소처럼 그 캐시를 거칩니다.
+
+응답에는 X-Singleflight 헤더(leader / shared / stale)가 붙습니다.
+"""
+import asyncio
+import os
+import time
+
+from admission import route_matches
+from cache import TTLCache
+
+SINGLEFLIGHT_ENABLED = os.getenv("SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+SINGLEFLIGHT_STALE_MS = int(os.getenv("SINGLEFLIGHT_STALE_MS", "500"))
+# 이보다 큰 응답은 실행 중 합치기만 하고 보관하지 않습니다.
+SINGLEFLIGHT_MAX_BYTES = int(os.getenv("SINGLEFLIGHT_MAX_BYTES", str(5 * 1024 * 1024)))
+
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+COALESCED_ROUTES = [
+    ("GET", "/api/users"),
+    ("GET", "/api/products"),
+    ("GET", "/api/coaches"),
+    ("GET", "/api/attendance/stats"),
+    ("GET", "/api/attendance/heatmap"),
+    ("GET", "/api/attendance/frequency"),
+    ("GET", "/api/dashboard/*"),
+    ("GET", "/api/reports/*"),
+]
+
+_flights = {}
+_recent = TTLCache(ttl=SINGLEFLIGHT_STALE_MS / 1000, maxsize=256)
+_generation = 0
+_stats = {"leader": 0, "shared": 0, "stale": 0, "detached": 0}
+
+
+def metrics():
+    return dict(_stats, inFlight=len(_flights), retained=len(_recent), generation=_generation,
+                enabled=SINGLEFLIGHT_ENABLED, staleMs=SINGLEFLIGHT_STALE_MS)
+
+
+def invalidate():
+    """보관한 응답을 버리고, 실행 중인 요청에도 새로 오는 조회가 합류하지 않게 합니다."""
+    global _generation
+    _generation += 1
+    _recent.clear()
+
+
+async def _execute(app, scope):
+    """요청과 분리된 태스크에서 핸들러를 실행하고 응답 전체를 모아 돌려줍니다."""
+    response = {"status": 500, "headers": [], "body": b""}
+    chunks = []
+    requested = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = [(k, v) for k, v in message.get("headers", []) if k.lower() != b"x-singleflight"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        finished.set()
+    response["body"] = b"".join(chunks)
+    return response
+
+
+def _consume(task):
+    # 기다리던 요청이 모두 끊긴 뒤 실패한 실행의 예외가 "never retrieved" 로 남지 않게 합니다.
+    if not task.cancelled():
+        task.exception()
+
+
+async def _replay(send, response, role):
+    await send({"type": "http.response.start", "status": response["status"],
+                "headers": response["headers"] + [(b"x-singleflight", role)]})
+    await send({"type": "http.response.body", "body": response["body"]})
+
+
+class SingleFlightMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        method = scope["method"]
+        if method in MUTATING_METHODS:
+            try:
+                return await self.app(scope, receive, send)
+            finally:
+                invalidate()
+        path = scope["path"].rstrip("/") or "/"
+        if not SINGLEFLIGHT_ENABLED or not route_matches(COALESCED_ROUTES, method, path):
+            return await self.app(scope, receive, send)
+
+        authorization = next((v for k, v in scope["headers"] if k == b"authorization"), b"")
+        # 키는 원래 경로로 만듭니다 ("/api/users" 는 "/api/users/" 로 가는 307 이라 응답이 다릅니다).
+        key = (_generation, scope["path"], scope.get("query_string", b""), authorization)
+
+        stored = _recent.get(key)
+        if stored is not None:
+            _stats["stale"] += 1
+            return await _replay(send, stored, b"stale")
+
+        flight = _flights.get(key)
+        if flight is None:
+            role = b"leader"
+            flight = asyncio.get_running_loop().create_task(self._fly(key, scope))
+            flight.add_done_callback(_consume)
+            _flights[key] = flight
+        else:
+            role = b"shared"
+        _stats[role.decode()] += 1
+
+        # shield: 이 요청이 취소되어도(클라이언트 끊김) 공유 실행은 계속됩니다.
+        try:
+            response = await asyncio.shield(flight)
+        except asyncio.CancelledError:
+            if not flight.done():
+                _stats["detached"] += 1
+            raise
+        await _replay(send, response, role)
+
+    async def _fly(self, key, scope):
+        started = time.monotonic()
+        try:
+            response = await _execute(self.app, scope)
+        finally:
+            _flights.pop(key, None)
+        if (response["status"] == 200 and SINGLEFLIGHT_STALE_MS > 0 and key[0] == _generation
+                and len(response["body"]) <= SINGLEFLIGHT_MAX_BYTES):
+            # 보관 기간은 실행이 시작된 시각부터 셉니다 (오래 걸린 응답을 더 오래 쓰지 않도록).
+            remaining = SINGLEFLIGHT_STALE_MS / 1000 - (time.monotonic() - started)
+            if remaining > 0:
+                _recent.set(key, response, ttl=remaining)
+        return response
@@ -0,0 +1,169 @@
+"""
+낙관적 동시성 제어 PATCH 도우미
+
+users / products / coaches 의 version 컬럼(수정될 때마다 트리거가 1 씩 올림)을 WHERE 절에서 비교해
+다른 사람이 먼저 고친 행을 덮어쓰지 않도록 합니다.
+
+- 기준 버전은 If-Match 헤더("3", W/"3") 또는 본문의 version 으로 받습니다. 둘 다 없으면 조건 없이 수정합니다.
+- 버전이 다르면 412 와 함께 현재 버전을 ETag 로 돌려줍니다.
+- 응답에는 id, 새 version, 그리고 보낸 필드만 들어갑니다.
+- 여러 행 수정(bulk)은 jsonb_to_recordset 으로 펼친 요청 배열을 UPDATE ... FROM 한 문장으로 적용합니다.
+- 같은 테이블을 FROM 에 한 번 더 붙여(o) 수정 전 값을 같은 문장에서 돌려받아 감사 로그에 넘깁니다.
+  (같은 행을 동시에 고치는 드문 경우 o 는 문장 시작 시점의 값일 수 있습니다.)
+
+fields 는 (API 필드 이름, 컬럼 이름, SQL 타입) 목록입니다.
+overrides 는 컬럼별 SET 식을 바꿉니다. 식 안의 {default} 는 "보낸 값 또는 기존 값"으로 치환됩니다
+(예: 종료일 연장 "{default} + 7").
+"""
+import json
+
+from fastapi import HTTPException
+import psycopg2.extras
+
+import audit
+
+
+def parse_if_match(value):
+    """If-Match 헤더에서 버전 숫자를 꺼냅니다. 없거나 '*' 이면 None."""
+    if not value or value.strip() == "*":
+        return None
+    tag = value.split(",")[0].strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match 헤더 형식이 올바르지 않습니다.")
+
+
+def etag(version):
+    return f'"{version}"'
+
+
+def _emit(fields, row, sent):
+    """RETURNING 행을 API 필드 이름으로 바꾸되 id, version 과 보낸 필드만 남깁니다."""
+    result = {"id": row["id"], "version": row["version"]}
+    for api, column, _ in fields:
+        if api in sent:
+            result[api] = row[column]
+    return result
+
+
+def _stage_audit(table, fields, row):
+    """RETURNING 행(수정 후 컬럼 + audit_before)에서 보낸 필드 기준 변경 내용을 감사 로그에 넣습니다."""
+    before = row.pop("audit_before") or {}
+    after = {column: row[column] for _, column, _ in fields}
+    audit.stage(table, row["id"], "update", {column: before.get(column) for column in after}, after)
+
+
+def patch_row(cursor, table, id, patch, fields, expected_version=None, overrides=None, emit=(),
+              not_found="대상을 찾을 수 없습니다."):
+    """
+    한 행을 수정합니다. patch 는 보낸 필드만 담은 dict (API 이름 → 값) 입니다.
+    overrides: {컬럼: (SQL 식, 추가 파라미터)}. emit: 응답에 더 넣을 API 필드 이름.
+    반환값은 응답 dict 이며, 찾을 수 없으면 404, 버전이 다르면 412 를 발생시킵니다.
+    """
+    overrides = overrides or {}
+    values_by_column = {column: patch[api] for api, column, _ in fields if api in patch}
+    if not values_by_column and not overrides:
+        raise HTTPException(status_code=400, detail="수정할 내용이 없습니다.")
+
+    assignments = []
+    values = []
+    for _, column, _ in fields:
+        if column not in values_by_column and column not in overrides:
+            continue
+        default, params = ("%s", [values_by_column[column]]) if column in values_by_column else (f"t.{column}", [])
+        if column in overrides:
+            expression, extra = overrides[column]
+            default, params = expression.format(default=default), params + list(extra)
+        assignments.append(f"{column} = {default}")
+        values.extend(params)
+    for column, (expression, extra) in overrides.items():
+        if column not in {c for _, c, _ in fields}:
+            assignments.append(f"{column} = {expression}")
+            values.extend(extra)
+
+    where = "t.id = %s AND o.id = t.id"
+    values.append(id)
+    if expected_version is not None:
+        where += " AND t.version = %s"
+        values.append(expected_version)
+
+    cursor.execute(f"""
+        UPDATE {table} AS t SET {', '.join(assignments)}
+        FROM {table} AS o
+        WHERE {where}
+        RETURNING t.id, t.version, {', '.join(f't.{column}' for _, column, _ in fields)}, to_jsonb(o) AS audit_before
+    """, values)
+    row = cursor.fetchone()
+    if row is None:
+        cursor.execute(f"SELECT version FROM {table} WHERE id = %s", (id,))
+        current = cursor.fetchone()
+        if current is None:
+            raise HTTPException(status_code=404, detail=not_found)
+        raise HTTPException(status_code=412, detail="다른 사용자가 먼저 수정했습니다. 새로 불러온 뒤 다시 시도해 주세요.",
+                            headers={"ETag": etag(current["version"])})
+    _stage_audit(table, fields, row)
+    return _emit(fields, row, set(patch) | set(emit))
+
+
+def patch_rows(cursor, table, items, fields, id_type="text", overrides=None, extra_inputs=(), emit_with=None):
+    """
+    여러 행을 한 UPDATE 문으로 수정합니다.
+    items: [{"id": ..., "version": (선택), <필드>...}] — 항목마다 보낸 필드만 바뀝니다.
+    overrides: {컬럼: SQL 식} — 식에서 v.<컬럼>, t.<컬럼>, {default} 를 쓸 수 있습니다.
+    extra_inputs: overrides 에서 v.<별칭> 으로 쓰는 추가 입력 (API 이름, 별칭, SQL 타입).
+    emit_with: {추가 입력 API 이름: 함께 응답에 넣을 필드 이름}
+
+    반환값: {"updated": [...], "conflicts": [id...], "notFound": [id...]}
+    """
+    overrides = overrides or {}
+    emit_with = emit_with or {}
+    inputs = list(fields) + list(extra_inputs)
+    records = []
+    for item in items:
+        record = {"id": item["id"], "version": item.get("version"),
+                  "sent": [api for api, _, _ in inputs if api in item]}
+        for api, column, _ in inputs:
+            record[column] = item.get(api)
+        records.append(record)
+
+    assignments = []
+    for api, column, _ in fields:
+        default = f"CASE WHEN '{api}' = ANY(v.sent) THEN v.{column} ELSE t.{column} END"
+        expression = overrides[column].format(default=default) if column in overrides else default
+        assignments.append(f"{column} = {expression}")
+    for column, expression in overrides.items():
+        if column not in {c for _, c, _ in fields}:
+            assignments.append(f"{column} = {expression}")
+    definition = ", ".join([f"id {id_type}", "version integer", "sent text[]"] +
+                           [f"{column} {sql_type}" for _, column, sql_type in inputs])
+
+    cursor.execute(f"""
+        UPDATE {table} AS t SET {', '.join(assignments)}
+        FROM jsonb_to_recordset(%s::jsonb) AS v({definition}), {table} AS o
+        WHERE t.id = v.id AND o.id = t.id AND (v.version IS NULL OR t.version = v.version)
+        RETURNING t.id, t.version, {', '.join(f't.{column}' for _, column, _ in fields)}, to_jsonb(o) AS audit_before
+    """, (psycopg2.extras.Json(records, dumps=lambda value: json.dumps(value, default=str)),))
+    rows = {row["id"]: row for row in cursor.fetchall()}
+    for row in rows.values():
+        _stage_audit(table, fields, row)
+
+    updated = []
+    missing = []
+    for item in items:
+        row = rows.get(item["id"])
+        if row is None:
+            missing.append(item["id"])
+        else:
+            sent = set(item) | {emit_with[api] for api in item if api in emit_with}
+            updated.append(_emit(fields, row, sent))
+
+    conflicts, not_found = [], []
+    if missing:
+        cursor.execute(f"SELECT id FROM {table} WHERE id = ANY(%s)", (missing,))
+        existing = {row["id"] for row in cursor.fetchall()}
+        for id in missing:
+            (conflicts if id in existing else not_found).append(id)
+    return {"updated": updated, "conflicts": conflicts, "notFound": not_found}